@@ -4,6 +4,7 @@
 - sell_price: 售出价格
 - dispose_date: 处置日期
 - dispose_note: 处置备注
+已由版本化迁移 migrations/versions/v0001_legacy_columns.py 取代，请使用 python migrate.py upgrade
 """
 
 import os
@@ -6,6 +6,7 @@
 - rent_due_day: 收租日(每月几号)
 - tenant_name: 租客姓名
 - tenant_phone: 租客电话
+已由版本化迁移 migrations/versions/v0001_legacy_columns.py 取代，请使用 python migrate.py upgrade
 """
 
 import os
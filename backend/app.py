@@ -12,7 +12,52 @@ from utils.response import APIResponse
 
 jwt = JWTManager()
 
-def create_app():
+def init_database(app):
+    """创建数据表，并在管理员不存在时创建默认管理员及其默认分类"""
+    from models.user import User
+    
+    with app.app_context():
+        print("正在初始化数据库...")
+        try:
+            db.create_all()
+            print("数据表创建成功")
+
+            # 已有库补齐新增的字段和索引（新库只登记版本）
+            from migrations import MigrationRunner
+            MigrationRunner(db.engine).upgrade()
+            
+            # 检查管理员用户
+            admin = User.query.filter_by(username='admin').first()
+            if not admin:
+                admin = User(
+                    username='admin',
+                    email='admin@timevalue.com',
+                    password='admin123'
+                )
+                admin.role = 'admin'
+                db.session.add(admin)
+                db.session.commit()
+                
+                # 初始化默认分类
+                from services.category_service import initialize_user_categories
+                initialize_user_categories(admin.id, skip_if_exists=False)
+                
+                print("默认管理员已创建: admin/admin123")
+            else:
+                print("管理员用户已存在")
+            
+        except Exception as e:
+            print(f"数据库初始化错误: {e}")
+            import traceback
+            traceback.print_exc()
+
+def create_app(init_db=None):
+    """
+    创建应用
+    
+    Args:
+        init_db: 是否建表并检查默认管理员；None时由环境变量 DB_AUTO_INIT 决定（默认不执行）
+    """
     app = Flask(__name__)
     
     app.config['DEBUG'] = True
@@ -25,7 +70,7 @@ def create_app():
     # 数据库配置
     app.config['SQLALCHEMY_DATABASE_URI'] = DatabaseConfig.get_database_uri_from_env()
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = DatabaseSettings.get_engine_options()
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = DatabaseSettings.get_engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
     
     db.init_app(app)
     jwt.init_app(app)
@@ -43,6 +88,11 @@ def create_app():
     from models.ai_report import AIReport
     from models.asset_expense import AssetExpense
     from models.notification_settings import UserNotificationSettings
+    from models.wechat_credential import WechatCredential
+    from models.wechat_qrcode_session import WechatQrcodeSession
+    from models.notification_outbox import NotificationOutbox
+    from models.monthly_rollup import MonthlyIncomeRollup, MonthlyExpenseRollup
+    from models.forecast_version import ForecastVersion
     
     # 注册蓝图
     from routes.auth import auth_bp
@@ -60,6 +110,9 @@ def create_app():
     from routes.expenses import expenses_bp  # 资产费用
     from routes.notifications import notifications_bp  # 通知设置
     from routes.preferences import preferences_bp  # 偏好设置
+    from routes.metrics import metrics_bp  # 运行指标
+    from routes.imports import imports_bp  # 批量导入
+    from routes.exports import exports_bp  # 账户数据导出
     
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(categories_bp, url_prefix='/api')
@@ -76,38 +129,34 @@ def create_app():
     app.register_blueprint(expenses_bp, url_prefix='/api')  # 资产费用
     app.register_blueprint(notifications_bp, url_prefix='/api')  # 通知设置
     app.register_blueprint(preferences_bp, url_prefix='/api')  # 偏好设置
+    app.register_blueprint(metrics_bp, url_prefix='/api')  # 运行指标
+    app.register_blueprint(imports_bp, url_prefix='/api')  # 批量导入
+    app.register_blueprint(exports_bp, url_prefix='/api')  # 账户数据导出
     
-    # 创建数据表
-    with app.app_context():
-        print("正在初始化数据库...")
-        try:
-            db.create_all()
-            print("数据表创建成功")
-            
-            # 检查管理员用户
-            admin = User.query.filter_by(username='admin').first()
-            if not admin:
-                admin = User(
-                    username='admin',
-                    email='admin@timevalue.com',
-                    password='admin123'
-                )
-                admin.role = 'admin'
-                db.session.add(admin)
-                db.session.commit()
-                
-                # 初始化默认分类
-                from services.category_service import initialize_user_categories
-                initialize_user_categories(admin.id, skip_if_exists=False)
-                
-                print("默认管理员已创建: admin/admin123")
-            else:
-                print("管理员用户已存在")
-            
-        except Exception as e:
-            print(f"数据库初始化错误: {e}")
-            import traceback
-            traceback.print_exc()
+    # 请求耗时、SQL与连接池指标
+    from utils.metrics import init_metrics
+    init_metrics(app)
+    
+    # 慢查询记录（超过 SLOW_QUERY_THRESHOLD_MS 的SQL及其执行计划）
+    from utils.slow_query import init_slow_query_log
+    init_slow_query_log(app)
+    
+    # 健康探测（探测线程在进程收到第一个探测请求时启动）
+    from services.health_prober import health_prober
+    health_prober.init_app(app)
+    
+    # 命令行初始化数据库：flask --app app init-db
+    @app.cli.command('init-db')
+    def init_db_command():
+        """创建数据表并初始化默认管理员"""
+        init_database(app)
+    
+    # 建表与管理员检查只在显式初始化时执行（init_db.py / flask init-db / python app.py / DB_AUTO_INIT=1），
+    # 避免每个worker和每次报告任务创建应用时都访问数据库
+    if init_db is None:
+        init_db = os.getenv('DB_AUTO_INIT', '').lower() in ('1', 'true', 'yes')
+    if init_db:
+        init_database(app)
     
     return app
 
@@ -122,7 +171,9 @@ if __name__ == '__main__':
     print("📚 GitHub: https://github.com/fupukeji")
     print("="*60 + "\n")
     
-    app = create_app()
+    # 本地开发入口默认初始化数据库（幂等），Gunicorn等生产入口不执行
+    import sys
+    app = create_app(init_db='--no-init-db' not in sys.argv)
     print("✅ 后端服务启动成功 - http://localhost:5000")
     print("📖 API文档: http://localhost:5000/api")
     print("⚠️  请确保前端服务也已启动")
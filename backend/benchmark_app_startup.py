@@ -0,0 +1,172 @@
+"""
+应用启动耗时基准
+在全新的子进程中多次执行 `import app` + `create_app()`，统计导入耗时、创建应用耗时，
+并用 `python -X importtime` 找出启动路径上最慢的模块，检查重量级依赖是否被提前加载
+
+使用方法：
+  python benchmark_app_startup.py                          # 默认运行7次
+  python benchmark_app_startup.py --runs 15 --init-db      # 同时统计建表/管理员检查耗时
+  python benchmark_app_startup.py --save startup.json      # 保存结果作为基线
+  python benchmark_app_startup.py --baseline startup.json  # 与基线比较，超出 --max-regression 返回非0
+
+预期结果：
+  LangGraph/langchain、requests、NumPy、智谱服务、报告工作流与模板渲染等模块在启动后均未加载（首次使用时才导入）
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 启动时不应加载的模块（按需导入）
+LAZY_MODULES = [
+    'langgraph',
+    'langchain_core',
+    'requests',
+    'services.zhipu_service',
+    'workflows.service',
+    'workflows.report_renderer',
+    'numpy',
+]
+
+PROBE_SCRIPT = r'''
+import contextlib, io, json, sys, time
+t0 = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    import app as app_module
+t1 = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    application = app_module.create_app(init_db=False)
+t2 = time.perf_counter()
+init_ms = None
+if INIT_DB:
+    with contextlib.redirect_stdout(io.StringIO()):
+        app_module.init_database(application)
+    init_ms = (time.perf_counter() - t2) * 1000
+t3 = time.perf_counter()
+status = application.test_client().get('/api/health').status_code
+t4 = time.perf_counter()
+print(json.dumps({
+    'import_ms': (t1 - t0) * 1000,
+    'create_app_ms': (t2 - t1) * 1000,
+    'init_db_ms': init_ms,
+    'first_request_ms': (t4 - t3) * 1000,
+    'first_request_status': status,
+    'loaded': [m for m in LAZY_MODULES if m in sys.modules],
+}))
+'''
+
+
+def _env(database_url):
+    env = dict(os.environ)
+    env['DATABASE_URL'] = database_url
+    env.pop('DB_AUTO_INIT', None)
+    return env
+
+
+def run_probe(database_url, init_db):
+    script = f'INIT_DB = {init_db!r}\nLAZY_MODULES = {LAZY_MODULES!r}\n' + PROBE_SCRIPT
+    output = subprocess.run(
+        [sys.executable, '-c', script], cwd=BACKEND_DIR, env=_env(database_url),
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def slowest_imports(database_url, top):
+    """python -X importtime 统计的累计耗时最高的模块"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import app; app.create_app(init_db=False)'],
+        cwd=BACKEND_DIR, env=_env(database_url), capture_output=True, text=True, check=True
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, module = line.split(':', 1)[1].split('|')
+        # 模块名前的缩进表示嵌套层级，只看 app 及其直接导入的模块
+        if module[1:].startswith('   '):
+            continue
+        rows.append((int(cumulative_us), int(self_us), module.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def summarize(samples, key):
+    values = [s[key] for s in samples if s[key] is not None]
+    if not values:
+        return None
+    return {'median': statistics.median(values), 'min': min(values), 'max': max(values)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='应用启动耗时基准')
+    parser.add_argument('--runs', type=int, default=7, help='子进程运行次数')
+    parser.add_argument('--init-db', action='store_true', help='同时统计建表与管理员检查耗时')
+    parser.add_argument('--top', type=int, default=12, help='显示最慢的导入模块数量')
+    parser.add_argument('--database-url', help='数据库连接串（默认临时SQLite文件）')
+    parser.add_argument('--save', help='将结果保存为JSON（作为基线）')
+    parser.add_argument('--baseline', help='与基线JSON比较')
+    parser.add_argument('--max-regression', type=float, default=0.2, help='允许相对基线变慢的比例')
+    args = parser.parse_args()
+
+    database_url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='timevalue_startup_'), 'startup.db')}"
+
+    # 预热一次（生成 .pyc），不计入统计
+    run_probe(database_url, args.init_db)
+    samples = [run_probe(database_url, args.init_db) for _ in range(args.runs)]
+
+    result = {
+        'python': sys.version.split()[0],
+        'runs': args.runs,
+        'import_ms': summarize(samples, 'import_ms'),
+        'create_app_ms': summarize(samples, 'create_app_ms'),
+        'init_db_ms': summarize(samples, 'init_db_ms'),
+        'first_request_ms': summarize(samples, 'first_request_ms'),
+        'startup_ms': statistics.median(s['import_ms'] + s['create_app_ms'] for s in samples),
+        'eager_loaded': sorted({m for s in samples for m in s['loaded']}),
+    }
+
+    print("=" * 72)
+    print("⏱️  应用启动耗时基准")
+    print("=" * 72)
+    print(f"Python {result['python']}  运行 {args.runs} 次（中位数 / 最小 / 最大，毫秒）")
+    for key, label in (('import_ms', '导入 app'), ('create_app_ms', 'create_app()'),
+                       ('init_db_ms', '建表/管理员检查'), ('first_request_ms', '首个请求 /api/health')):
+        stats = result[key]
+        if stats:
+            print(f"  {label:<20} {stats['median']:8.1f}  {stats['min']:8.1f}  {stats['max']:8.1f}")
+    print(f"  {'启动合计':<20} {result['startup_ms']:8.1f}")
+    print("-" * 72)
+    print("app 直接导入的最慢模块（累计 / 自身，毫秒）:")
+    for cumulative_us, self_us, module in slowest_imports(database_url, args.top):
+        print(f"  {cumulative_us / 1000:8.1f}  {self_us / 1000:8.1f}  {module}")
+    print("-" * 72)
+    if result['eager_loaded']:
+        print(f"❌ 启动时已加载应按需导入的模块: {', '.join(result['eager_loaded'])}")
+    else:
+        print(f"✅ 按需导入的模块均未在启动时加载: {', '.join(LAZY_MODULES)}")
+
+    passed = not result['eager_loaded']
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        limit = baseline['startup_ms'] * (1 + args.max_regression)
+        print(f"基线启动耗时 {baseline['startup_ms']:.1f}ms，本次 {result['startup_ms']:.1f}ms（上限 {limit:.1f}ms）")
+        passed = passed and result['startup_ms'] <= limit
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"结果已保存: {args.save}")
+
+    print("=" * 72)
+    print("✅ 通过" if passed else "❌ 未通过")
+    return 0 if passed else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,223 @@
+"""
+报告HTML渲染微基准
+对比不同渲染方式在大量行数据（资产状态、列表项、过期项目）下的耗时与内存分配
+
+使用方法：
+  python benchmark_report_render.py --rows 100 500 1000 --iterations 50
+  python benchmark_report_render.py --rows 500 --json render_bench.json
+
+对比项：
+  - concat:  逐行字符串拼接（模板化之前 _generate_list_items 等函数的写法），仅渲染状态分布和列表片段
+  - macros:  与 concat 相同的片段，使用预编译模板宏渲染（含HTML转义）
+  - cold:    整份报告，每次新建模板环境（每次渲染都重新解析编译模板）
+  - cached:  整份报告，预编译模板按章节渲染后拼接（报告工作流使用的方式）
+  - stream:  整份报告，预编译模板流式渲染，逐块消费不拼接整份报告（/reports/<id>/content 使用的方式）
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+import tracemalloc
+
+
+STATUS_COLORS = {
+    "正常": "#52c41a",
+    "待维护": "#faad14",
+    "已报废": "#d9d9d9",
+    "闲置": "#1890ff"
+}
+
+
+def build_report_data(rows):
+    """构造包含指定行数的报告数据"""
+    return {
+        "qualitative_conclusion": {
+            "overall_rating": "B",
+            "risk_level": "中",
+            "severity_level": "中",
+            "executive_summary": "本期资产整体运行平稳。" * 10,
+            "priority_actions": [f"优先行动{i}" for i in range(rows)]
+        },
+        "fixed_assets": {
+            "data": {
+                "total_assets": rows,
+                "total_current_value": 1234567.89,
+                "depreciation_rate": 23.4,
+                "status_stats": {f"状态{i}": i + 1 for i in range(rows)}
+            },
+            "analysis": {"roi": 5.67, "health_score": 78.9}
+        },
+        "virtual_assets": {
+            "data": {
+                "total_projects": rows,
+                "total_amount": 98765.4,
+                "utilization_rate": 66.6,
+                "waste_rate": 3.2,
+                "expiring_soon": [{"name": f"项目{i}", "days": i % 30 + 1} for i in range(rows)]
+            },
+            "analysis": {"efficiency_score": 72.5}
+        },
+        "integrated_analysis": {
+            "overall_assessment": "良好",
+            "key_strengths": [f"优势{i}" for i in range(rows)],
+            "risk_alerts": [f"风险{i}" for i in range(rows)],
+            "optimization_suggestions": [f"建议{i}" for i in range(rows)]
+        },
+        "comparison_analysis": {
+            "fixed_assets": {"growth_rate": 2.5, "trend": "上升"},
+            "virtual_assets": {"growth_rate": -1.2, "trend": "下降"},
+            "overall_trend": "稳定"
+        }
+    }
+
+
+def concat_status_chart(status_stats):
+    """逐行拼接的资产状态分布（对照组）"""
+    total = sum(status_stats.values())
+    html = '<div style="background: white; padding: 20px; border-radius: 8px; margin: 20px 0;">'
+    html += '<h3 style="margin: 0 0 15px 0; font-size: 16px; color: #666;">📊 资产状态分布</h3>'
+    html += '<div style="display: grid; gap: 10px;">'
+    for status, count in status_stats.items():
+        percentage = (count / total) * 100
+        color = STATUS_COLORS.get(status, "#1890ff")
+        html += f'''
+        <div>
+          <div style="display: flex; justify-content: space-between; margin-bottom: 5px; font-size: 13px;">
+            <span>{status}</span>
+            <span style="font-weight: 600;">{count}个 ({percentage:.1f}%)</span>
+          </div>
+          <div style="background: #f0f0f0; height: 20px; border-radius: 10px; overflow: hidden;">
+            <div style="background: {color}; height: 100%; width: {percentage}%; transition: width 0.3s ease;"></div>
+          </div>
+        </div>
+        '''
+    html += '</div></div>'
+    return html
+
+
+def concat_list_items(items, color):
+    """逐行拼接的列表项（对照组）"""
+    html = ""
+    for item in items:
+        html += f'<li style="color: {color}; margin-bottom: 8px;">{item}</li>'
+    return html
+
+
+def render_concat(data, task_context):
+    f_data = data["fixed_assets"]["data"]
+    integrated = data["integrated_analysis"]
+    html = concat_status_chart(f_data["status_stats"])
+    html += concat_list_items(integrated["key_strengths"], '#52c41a')
+    html += concat_list_items(integrated["risk_alerts"], '#ff4d4f')
+    html += concat_list_items(integrated["optimization_suggestions"], '#1890ff')
+    return len(html)
+
+
+def render_macros(data, task_context):
+    """与对照组相同的片段，改用预编译模板宏渲染"""
+    from workflows.report_renderer import _env
+
+    macros = _env.get_template("report/_macros.html").module
+    f_data = data["fixed_assets"]["data"]
+    integrated = data["integrated_analysis"]
+    html = "".join([
+        macros.asset_status_chart(f_data["status_stats"]),
+        macros.list_items(integrated["key_strengths"], '#52c41a'),
+        macros.list_items(integrated["risk_alerts"], '#ff4d4f'),
+        macros.list_items(integrated["optimization_suggestions"], '#1890ff'),
+    ])
+    return len(html)
+
+
+def render_cold(data, task_context):
+    from workflows import report_renderer
+
+    env = report_renderer._create_environment()
+    template = env.get_template("report/report.html")
+    context = report_renderer._render_context(data, task_context)
+    context["section_ids"] = report_renderer.SECTION_IDS
+    return len(template.render(context))
+
+
+def render_cached(data, task_context):
+    from workflows.report_renderer import SECTION_IDS, render_section, assemble_report
+
+    sections = {section_id: render_section(section_id, data, task_context) for section_id in SECTION_IDS}
+    return len(assemble_report(sections))
+
+
+def render_stream(data, task_context):
+    from workflows.report_renderer import stream_report
+
+    size = 0
+    for chunk in stream_report(data, task_context):
+        size += len(chunk)
+    return size
+
+
+RENDERERS = {
+    "concat": render_concat,
+    "macros": render_macros,
+    "cold": render_cold,
+    "cached": render_cached,
+    "stream": render_stream,
+}
+
+
+def measure(render, data, task_context, iterations):
+    """返回 (耗时中位数ms, 峰值内存KB, 输出字符数)"""
+    render(data, task_context)  # 预热
+
+    timings = []
+    for _ in range(iterations):
+        began = time.perf_counter()
+        render(data, task_context)
+        timings.append((time.perf_counter() - began) * 1000)
+
+    tracemalloc.start()
+    size = render(data, task_context)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return statistics.median(timings), peak / 1024, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description='报告HTML渲染微基准')
+    parser.add_argument('--rows', type=int, nargs='+', default=[100, 500, 1000], help='每个列表的行数')
+    parser.add_argument('--iterations', type=int, default=30, help='每组重复次数')
+    parser.add_argument('--json', dest='json_output', help='将结果写入JSON文件')
+    args = parser.parse_args()
+
+    task_context = {"report_type": "monthly", "start_date": "2025-01-01", "end_date": "2025-01-31"}
+    results = []
+
+    print("=" * 72)
+    print("📊 报告HTML渲染微基准")
+    print("=" * 72)
+    print(f"{'行数':>6}  {'方式':<8}{'耗时中位数(ms)':>16}{'峰值内存(KB)':>16}{'输出字符数':>14}")
+    for rows in args.rows:
+        data = build_report_data(rows)
+        for name, render in RENDERERS.items():
+            median_ms, peak_kb, size = measure(render, data, task_context, args.iterations)
+            results.append({
+                'rows': rows,
+                'renderer': name,
+                'median_ms': round(median_ms, 3),
+                'peak_kb': round(peak_kb, 1),
+                'output_chars': size
+            })
+            print(f"{rows:>6}  {name:<8}{median_ms:>16.3f}{peak_kb:>16.1f}{size:>14}")
+        print("-" * 72)
+
+    if args.json_output:
+        with open(args.json_output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"结果已写入: {args.json_output}")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,300 @@
+"""
+报告工作流端到端压测脚本
+使用本地GLM模拟服务，并发执行 ReportWorkflowService，统计各节点 p50/p95 耗时与吞吐量
+
+使用方法：
+  python benchmark_report_workflow.py --reports 20 --concurrency 5 --latency 0.5
+  python benchmark_report_workflow.py --base-url http://127.0.0.1:8765/api/paas/v4/   # 使用外部模拟服务
+
+说明：
+  - 默认使用临时SQLite数据库（通过 DATABASE_URL 指定），不会影响正式数据
+  - 每个任务与 routes/reports._generate_report_async 一样，在独立事件循环中执行工作流
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, date, timedelta
+
+
+def percentile(values, pct):
+    """计算百分位数（线性插值）"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    if len(ordered) == 1:
+        return ordered[0]
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def node_durations(final_state):
+    """
+    根据执行路径的时间戳计算各节点耗时（秒）
+
+    每个节点完成时写入时间戳，节点耗时 = 本节点时间戳 - 上一节点时间戳
+    """
+    durations = []
+    previous = final_state.get('start_time')
+    previous_ts = datetime.fromisoformat(previous) if previous else None
+    for step in final_state.get('execution_path', []):
+        ts = datetime.fromisoformat(step['timestamp'])
+        if previous_ts is not None:
+            durations.append((step['node'], (ts - previous_ts).total_seconds()))
+        previous_ts = ts
+    return durations
+
+
+def seed_benchmark_data(db, fixed_count, project_count, income_months):
+    """写入压测用户及资产数据，返回用户ID"""
+    from models.user import User
+    from models.category import Category
+    from models.fixed_asset import FixedAsset
+    from models.project import Project
+    from models.asset_income import AssetIncome
+
+    user = User(username=f'bench_{int(time.time())}', email=f'bench_{int(time.time())}@timevalue.local', password='bench123')
+    user.set_ai_api_key('mock-api-key')
+    db.session.add(user)
+    db.session.flush()
+
+    fixed_category = Category(name='压测固定资产', asset_type='fixed', user_id=user.id)
+    virtual_category = Category(name='压测虚拟资产', asset_type='virtual', user_id=user.id)
+    db.session.add_all([fixed_category, virtual_category])
+    db.session.flush()
+
+    today = date.today()
+    statuses = ['in_use', 'rent', 'idle', 'maintenance']
+    for i in range(fixed_count):
+        purchase_date = today - timedelta(days=30 * (i % 60 + 1))
+        asset = FixedAsset(
+            asset_code=f'BENCH-{user.id}-{i:05d}',
+            name=f'压测资产{i}',
+            category_id=fixed_category.id,
+            original_value=10000 + i * 100,
+            current_value=8000 + i * 80,
+            residual_rate=5,
+            purchase_date=purchase_date,
+            useful_life_years=5,
+            depreciation_start_date=purchase_date,
+            status=statuses[i % len(statuses)],
+            user_id=user.id
+        )
+        db.session.add(asset)
+        db.session.flush()
+        if asset.status == 'rent':
+            for m in range(income_months):
+                db.session.add(AssetIncome(
+                    asset_id=asset.id,
+                    income_type='rent',
+                    amount=1500,
+                    income_date=today - timedelta(days=30 * m),
+                    status='received'
+                ))
+
+    now = datetime.utcnow()
+    for i in range(project_count):
+        start = now - timedelta(days=(i % 300) + 1)
+        db.session.add(Project(
+            name=f'压测项目{i}',
+            total_amount=100 + i,
+            start_time=start,
+            end_time=start + timedelta(days=365 if i % 3 else 40),
+            user_id=user.id,
+            category_id=virtual_category.id
+        ))
+
+    db.session.commit()
+    return user.id
+
+
+def run_benchmark(args):
+    from app import create_app
+    from database import db
+    from models.ai_report import AIReport
+    from workflows.service import get_workflow_service
+
+    app = create_app(init_db=True)
+
+    with app.app_context():
+        user_id = seed_benchmark_data(db, args.fixed_assets, args.projects, args.income_months)
+        today = date.today()
+        start_date = date(today.year, today.month, 1)
+        report_ids = []
+        for _ in range(args.reports):
+            report = AIReport(
+                user_id=user_id,
+                report_type='monthly',
+                title='压测月报',
+                start_date=start_date,
+                end_date=today,
+                status='generating'
+            )
+            db.session.add(report)
+            db.session.flush()
+            report_ids.append(report.id)
+        db.session.commit()
+
+    workflow_service = get_workflow_service()
+
+    def run_one(report_id):
+        with app.app_context():
+            task_context = {
+                "report_id": report_id,
+                "user_id": user_id,
+                "api_key": 'mock-api-key',
+                "model": 'glm-4-flash',
+                "report_type": 'monthly',
+                "start_date": start_date,
+                "end_date": today,
+                "focus_areas": [],
+                "enable_ai_insights": False
+            }
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            began = time.perf_counter()
+            try:
+                final_state = loop.run_until_complete(workflow_service.execute_workflow(task_context))
+            finally:
+                loop.close()
+                db.session.remove()
+            return final_state, time.perf_counter() - began
+
+    results = []
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency, thread_name_prefix='bench_report') as pool:
+        futures = [pool.submit(run_one, report_id) for report_id in report_ids]
+        for future in as_completed(futures):
+            results.append(future.result())
+    wall_time = time.perf_counter() - wall_start
+
+    return results, wall_time
+
+
+def summarize(results, wall_time, mock_stats=None):
+    """汇总压测结果"""
+    per_node = {}
+    end_to_end = []
+    succeeded = 0
+    retries = 0
+    for final_state, elapsed in results:
+        end_to_end.append(elapsed)
+        path = final_state.get('execution_path', [])
+        if path and path[-1]['node'] == 'save_report':
+            succeeded += 1
+        retries += final_state.get('retry_count', 0)
+        for node, seconds in node_durations(final_state):
+            per_node.setdefault(node, []).append(seconds)
+
+    summary = {
+        'reports': len(results),
+        'succeeded': succeeded,
+        'total_retries': retries,
+        'wall_time_s': round(wall_time, 3),
+        'throughput_rps': round(len(results) / wall_time, 3) if wall_time > 0 else 0,
+        'end_to_end_s': {
+            'p50': round(percentile(end_to_end, 50), 3),
+            'p95': round(percentile(end_to_end, 95), 3),
+            'max': round(max(end_to_end), 3) if end_to_end else 0
+        },
+        'nodes': {
+            node: {
+                'count': len(values),
+                'p50_ms': round(percentile(values, 50) * 1000, 1),
+                'p95_ms': round(percentile(values, 95) * 1000, 1)
+            }
+            for node, values in per_node.items()
+        }
+    }
+    if mock_stats is not None:
+        summary['mock_llm'] = mock_stats
+    return summary
+
+
+def print_summary(summary):
+    print("=" * 72)
+    print("📊 报告工作流压测结果")
+    print("=" * 72)
+    print(f"报告数: {summary['reports']}  成功: {summary['succeeded']}  重试总数: {summary['total_retries']}")
+    print(f"总耗时: {summary['wall_time_s']}s  吞吐量: {summary['throughput_rps']} 报告/秒")
+    e2e = summary['end_to_end_s']
+    print(f"端到端耗时: p50={e2e['p50']}s  p95={e2e['p95']}s  max={e2e['max']}s")
+    print("-" * 72)
+    print(f"{'节点':<36}{'次数':>8}{'p50(ms)':>12}{'p95(ms)':>12}")
+    for node, stats in summary['nodes'].items():
+        print(f"{node:<36}{stats['count']:>8}{stats['p50_ms']:>12}{stats['p95_ms']:>12}")
+    if 'mock_llm' in summary:
+        print("-" * 72)
+        print(f"模拟LLM统计: {summary['mock_llm']}")
+    print("=" * 72)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='报告工作流端到端压测')
+    parser.add_argument('--reports', type=int, default=20, help='生成报告总数')
+    parser.add_argument('--concurrency', type=int, default=5, help='并发任务数')
+    parser.add_argument('--fixed-assets', type=int, default=50, help='压测用户的固定资产数')
+    parser.add_argument('--projects', type=int, default=100, help='压测用户的虚拟资产数')
+    parser.add_argument('--income-months', type=int, default=6, help='出租资产的收入月数')
+    parser.add_argument('--latency', type=float, default=0.5, help='模拟LLM响应延迟（秒）')
+    parser.add_argument('--jitter', type=float, default=0.1, help='模拟LLM延迟抖动（秒）')
+    parser.add_argument('--rate-429', type=float, default=0.0, help='模拟LLM返回429的概率')
+    parser.add_argument('--base-url', help='使用已启动的外部模拟服务，不再内置启动')
+    parser.add_argument('--database-url', help='数据库连接串（默认临时SQLite文件）')
+    parser.add_argument('--json', dest='json_output', help='将结果写入JSON文件，便于跨提交对比')
+    parser.add_argument('--verbose', action='store_true', help='显示工作流日志输出')
+    args = parser.parse_args()
+
+    tmp_dir = None
+    if args.database_url:
+        os.environ['DATABASE_URL'] = args.database_url
+    else:
+        tmp_dir = tempfile.mkdtemp(prefix='timevalue_bench_')
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}"
+
+    mock_server = None
+    if args.base_url:
+        os.environ['ZHIPU_BASE_URL'] = args.base_url
+    else:
+        from mock_glm_server import start_mock_server_in_thread
+        mock_server, base_url = start_mock_server_in_thread(
+            latency=args.latency, jitter=args.jitter, rate_429=args.rate_429, seed=42
+        )
+        os.environ['ZHIPU_BASE_URL'] = base_url
+
+    print(f"数据库: {os.environ['DATABASE_URL']}")
+    print(f"LLM地址: {os.environ['ZHIPU_BASE_URL']}")
+    print(f"报告数: {args.reports}  并发: {args.concurrency}\n")
+
+    output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    try:
+        with output:
+            results, wall_time = run_benchmark(args)
+    finally:
+        if mock_server is not None:
+            mock_server.shutdown()
+
+    summary = summarize(results, wall_time, dict(mock_server.mock_state.stats) if mock_server else None)
+    print_summary(summary)
+
+    if args.json_output:
+        with open(args.json_output, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        print(f"结果已写入: {args.json_output}")
+
+    if tmp_dir:
+        print(f"临时数据库目录: {tmp_dir}")
+
+    return 0 if summary['succeeded'] == summary['reports'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,139 @@
+"""
+微信凭证共享缓存验证脚本
+模拟多个Gunicorn worker（多进程 × 多线程）同时请求 /api/wechat/jssdk-config，
+统计本地模拟微信服务实际收到的 access_token / jsapi_ticket 请求次数
+
+使用方法：
+  python benchmark_wechat_token_cache.py --workers 4 --threads 8 --duration 10
+  python benchmark_wechat_token_cache.py --expires-in 20 --refresh-margin 5 --duration 30   # 验证提前刷新
+
+预期结果：
+  凭证每个有效期只被换取一次，即 token 请求数 ≈ ticket 请求数 ≈ ceil(duration / (expires_in - refresh_margin))，
+  与 worker 和线程数量无关；所有签名请求均成功
+"""
+import argparse
+import contextlib
+import io
+import json
+import math
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+from urllib.request import urlopen
+
+MOCK_APPID = 'wx_mock_appid'
+MOCK_SECRET = 'mock_secret'
+
+
+def _configure_env(database_url, base_url, refresh_margin):
+    os.environ['DATABASE_URL'] = database_url
+    os.environ['WECHAT_API_BASE'] = base_url
+    os.environ['WECHAT_APPID'] = MOCK_APPID
+    os.environ['WECHAT_SECRET'] = MOCK_SECRET
+    os.environ['WECHAT_TOKEN_REFRESH_MARGIN'] = str(refresh_margin)
+
+
+def worker_main(database_url, base_url, refresh_margin, threads, duration, result_queue):
+    """单个worker进程：多线程持续请求JSSDK签名接口"""
+    _configure_env(database_url, base_url, refresh_margin)
+    with contextlib.redirect_stdout(io.StringIO()):
+        from app import create_app
+        app = create_app()
+
+    from services.wechat_credential_service import wechat_credential_cache
+
+    counts = {'ok': 0, 'error': 0}
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def run():
+        client = app.test_client()
+        while time.monotonic() < stop_at:
+            response = client.get('/api/wechat/jssdk-config', query_string={'url': 'https://example.com/h5'})
+            with lock:
+                counts['ok' if response.status_code == 200 else 'error'] += 1
+
+    pool = [threading.Thread(target=run) for _ in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+
+    result_queue.put({'pid': os.getpid(), **counts, 'cache': dict(wechat_credential_cache.stats)})
+
+
+def main():
+    parser = argparse.ArgumentParser(description='微信凭证共享缓存验证')
+    parser.add_argument('--workers', type=int, default=4, help='模拟的worker进程数')
+    parser.add_argument('--threads', type=int, default=8, help='每个进程的并发线程数')
+    parser.add_argument('--duration', type=float, default=10, help='持续时间（秒）')
+    parser.add_argument('--expires-in', type=int, default=7200, help='模拟凭证有效期（秒）')
+    parser.add_argument('--refresh-margin', type=int, default=300, help='提前刷新秒数')
+    parser.add_argument('--latency', type=float, default=0.05, help='模拟微信接口延迟（秒）')
+    parser.add_argument('--database-url', help='数据库连接串（默认临时SQLite文件）')
+    args = parser.parse_args()
+
+    from mock_wechat_server import start_mock_server_in_thread
+
+    mock_server, base_url = start_mock_server_in_thread(
+        appid=MOCK_APPID, secret=MOCK_SECRET, expires_in=args.expires_in, latency=args.latency
+    )
+    database_url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='timevalue_wechat_'), 'wechat.db')}"
+
+    # 先在主进程建表，避免多个worker同时建表
+    _configure_env(database_url, base_url, args.refresh_margin)
+    with contextlib.redirect_stdout(io.StringIO()):
+        from app import create_app
+        from database import db
+        app = create_app(init_db=True)
+        with app.app_context():
+            db.engine.dispose()
+
+    print(f"数据库: {database_url}")
+    print(f"模拟微信服务: {base_url}")
+    print(f"worker: {args.workers} × 线程: {args.threads}  持续: {args.duration}s  "
+          f"凭证有效期: {args.expires_in}s  提前刷新: {args.refresh_margin}s\n")
+
+    ctx = multiprocessing.get_context('spawn')
+    result_queue = ctx.Queue()
+    processes = [
+        ctx.Process(target=worker_main, args=(database_url, base_url, args.refresh_margin,
+                                              args.threads, args.duration, result_queue))
+        for _ in range(args.workers)
+    ]
+    for process in processes:
+        process.start()
+    results = [result_queue.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    with urlopen(f'{base_url}/stats') as response:
+        stats = json.loads(response.read())
+    mock_server.shutdown()
+
+    refresh_window = max(1, args.expires_in - args.refresh_margin)
+    expected = math.ceil(args.duration / refresh_window)
+    total_ok = sum(r['ok'] for r in results)
+    total_error = sum(r['error'] for r in results)
+
+    print("=" * 72)
+    print("💬 微信凭证共享缓存验证结果")
+    print("=" * 72)
+    for r in results:
+        print(f"进程 {r['pid']}: 成功 {r['ok']}  失败 {r['error']}  缓存统计 {r['cache']}")
+    print("-" * 72)
+    print(f"签名请求: 成功 {total_ok}  失败 {total_error}")
+    print(f"微信接口调用: access_token {stats['token']} 次  jsapi_ticket {stats['ticket']} 次  "
+          f"(预期约 {expected} 次)")
+    print("=" * 72)
+
+    passed = total_error == 0 and stats['token'] <= expected + 1 and stats['ticket'] <= expected + 1
+    print("✅ 通过" if passed else "❌ 未通过")
+    return 0 if passed else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,33 @@
+"""
+AI服务配置模块
+统一管理智谱AI接口地址，便于切换到本地模拟服务进行压测
+"""
+import os
+
+
+class ZhipuConfig:
+    """智谱AI配置类"""
+
+    # 官方接口地址
+    DEFAULT_BASE_URL = 'https://open.bigmodel.cn/api/paas/v4/'
+
+    @staticmethod
+    def get_base_url():
+        """
+        获取智谱AI接口基础地址
+
+        优先读取环境变量 ZHIPU_BASE_URL（如本地模拟服务 http://127.0.0.1:8765/api/paas/v4/），
+        未配置时使用官方地址
+
+        Returns:
+            以 / 结尾的接口基础地址
+        """
+        base_url = os.getenv('ZHIPU_BASE_URL', '').strip() or ZhipuConfig.DEFAULT_BASE_URL
+        if not base_url.endswith('/'):
+            base_url += '/'
+        return base_url
+
+    @staticmethod
+    def get_chat_completions_url():
+        """获取对话补全接口完整地址"""
+        return f'{ZhipuConfig.get_base_url()}chat/completions'
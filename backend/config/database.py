@@ -56,6 +56,11 @@ class DatabaseConfig:
         Returns:
             数据库连接URI
         """
+        # 显式指定的连接串优先（如压测、本地调试使用独立的SQLite文件）
+        database_url = os.getenv('DATABASE_URL')
+        if database_url:
+            return database_url
+        
         db_type = os.getenv('DB_TYPE', 'sqlite').lower()
         
         if db_type == 'mysql':
@@ -73,19 +78,87 @@ class DatabaseConfig:
 class DatabaseSettings:
     """数据库通用设置"""
     
-    # 连接池配置
-    POOL_SIZE = 5  # 减少连接池大小
+    # 连接池配置（Gunicorn启动时按 worker × 并发数 和全局连接预算计算后通过环境变量传入）
+    POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 5))  # 减少连接池大小
     POOL_RECYCLE = 1800  # 30分钟回收连接（避免超时）
     POOL_PRE_PING = True  # 连接前ping测试
-    POOL_TIMEOUT = 30  # 连接超时时间
+    POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', 30))  # 连接超时时间
     
     # 查询配置
-    MAX_OVERFLOW = 10  # 减少溢出连接数
+    MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 10))  # 减少溢出连接数
     ECHO = False  # 是否打印SQL语句（开发环境可访为True）
     
+    # 每个进程额外预留给后台线程（报告生成线程池等）的连接数
+    BACKGROUND_CONNECTIONS = int(os.getenv('DB_BACKGROUND_CONNECTIONS', 2))
+    
+    # 没有连接预算时每个进程最多占用的连接数（与默认 DB_POOL_SIZE + DB_MAX_OVERFLOW 相同），
+    # 避免 gevent 下按协程数（默认100）为每个进程建立上百个连接
+    DEFAULT_WORKER_CONNECTIONS = 15
+    
+    @staticmethod
+    def compute_pool_sizes(workers, concurrency, connection_budget=None, instances=1):
+        """
+        按进程数与并发数计算每个进程的连接池大小
+        
+        Args:
+            workers: 每个实例的worker进程数
+            concurrency: 每个worker同时处理的请求数（线程数或gevent协程数）
+            connection_budget: 所有实例共用的数据库连接总预算，None表示按 DEFAULT_WORKER_CONNECTIONS 限制每个进程
+            instances: 部署的实例（容器）数量
+            
+        Returns:
+            (pool_size, max_overflow)，保证 实例数 × worker数 × (pool_size + max_overflow) 不超过预算
+        """
+        wanted = max(1, concurrency) + DatabaseSettings.BACKGROUND_CONNECTIONS
+        if connection_budget:
+            per_worker = max(1, connection_budget // max(1, workers * instances))
+        else:
+            per_worker = DatabaseSettings.DEFAULT_WORKER_CONNECTIONS
+        wanted = min(wanted, per_worker)
+        
+        # 常驻连接覆盖一半并发，其余按需溢出，空闲时释放
+        pool_size = max(1, (wanted + 1) // 2)
+        return pool_size, wanted - pool_size
+    
     @staticmethod
-    def get_engine_options():
-        """获取数据库引擎配置选项"""
+    def get_max_connections(database_uri):
+        """
+        查询数据库允许的最大连接数（仅MySQL）
+        
+        Returns:
+            max_connections；SQLite或查询失败时返回None
+        """
+        if not database_uri or database_uri.startswith('sqlite'):
+            return None
+        
+        from sqlalchemy import create_engine, text
+        from sqlalchemy.pool import NullPool
+        
+        engine = create_engine(database_uri, poolclass=NullPool, connect_args={'connect_timeout': 5})
+        try:
+            with engine.connect() as conn:
+                row = conn.execute(text("SHOW VARIABLES LIKE 'max_connections'")).first()
+                return int(row[1]) if row else None
+        finally:
+            engine.dispose()
+    
+    @staticmethod
+    def get_engine_options(database_uri=None):
+        """
+        获取数据库引擎配置选项
+        
+        Args:
+            database_uri: 数据库连接URI，SQLite不支持连接池和MySQL驱动参数
+        """
+        if database_uri and database_uri.startswith('sqlite'):
+            return {
+                'pool_pre_ping': DatabaseSettings.POOL_PRE_PING,
+                'connect_args': {
+                    'check_same_thread': False,
+                    'timeout': DatabaseSettings.POOL_TIMEOUT
+                }
+            }
+        
         return {
             'pool_size': DatabaseSettings.POOL_SIZE,
             'pool_recycle': DatabaseSettings.POOL_RECYCLE,
@@ -1,6 +1,13 @@
 # Gunicorn配置文件
 import multiprocessing
 import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from dotenv import load_dotenv
+
+load_dotenv()
 
 # 服务器绑定
 bind = os.getenv("GUNICORN_BIND", "0.0.0.0:80")
@@ -11,8 +18,59 @@ workers = int(os.getenv("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1)
 # 每个worker的线程数
 threads = int(os.getenv("GUNICORN_THREADS", 2))
 
-# Worker类型
-worker_class = "sync"
+# Worker类型：sync / gthread / gevent
+# gevent为协作式worker，单进程可同时挂起大量等待外部接口的请求（如 /preferences/api-key/test、AI报告相关接口），
+# 需安装 gevent；未安装时回退为 gthread
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "sync").lower()
+if worker_class == "gevent":
+    try:
+        from gevent import monkey
+        # preload_app 在master进程加载应用，必须在导入应用前打补丁
+        monkey.patch_all()
+    except ImportError:
+        print("⚠️  未安装gevent，worker类型回退为gthread")
+        worker_class = "gthread"
+
+# gevent模式下每个worker的最大并发连接数
+worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", 100))
+
+# 每个worker同时处理的请求数（sync/gthread为线程数，gevent为协程数）
+concurrency = worker_connections if worker_class == "gevent" else threads
+
+# 数据库连接池：按 实例数 × worker数 × 并发数 与全局连接预算计算每个进程的连接池大小，
+# 通过环境变量传给应用（DatabaseSettings 读取），避免大机器上连接数超过MySQL上限。
+# 未设置 DB_CONNECTION_BUDGET 时以数据库的 max_connections 作为预算，查询不到时每个进程
+# 最多 DatabaseSettings.DEFAULT_WORKER_CONNECTIONS 个连接
+from config.database import DatabaseConfig, DatabaseSettings
+
+db_max_connections = None
+db_max_connections_error = None
+try:
+    db_max_connections = DatabaseSettings.get_max_connections(DatabaseConfig.get_database_uri_from_env())
+except Exception as e:
+    db_max_connections_error = e
+
+db_connection_budget = int(os.getenv("DB_CONNECTION_BUDGET", 0)) or None
+app_instances = int(os.getenv("APP_INSTANCES", 1))
+if "DB_POOL_SIZE" not in os.environ and "DB_MAX_OVERFLOW" not in os.environ:
+    if db_connection_budget:
+        budget_source = f"DB_CONNECTION_BUDGET={db_connection_budget}"
+    elif db_max_connections:
+        budget_source = f"max_connections={db_max_connections}"
+    else:
+        budget_source = f"每个进程最多 {DatabaseSettings.DEFAULT_WORKER_CONNECTIONS} 个连接"
+    db_pool_size, db_max_overflow = DatabaseSettings.compute_pool_sizes(
+        workers, concurrency, db_connection_budget or db_max_connections, app_instances
+    )
+    os.environ["DB_POOL_SIZE"] = str(db_pool_size)
+    os.environ["DB_MAX_OVERFLOW"] = str(db_max_overflow)
+    DatabaseSettings.POOL_SIZE = db_pool_size
+    DatabaseSettings.MAX_OVERFLOW = db_max_overflow
+    print(f"🔌 数据库连接池按 {workers} worker × 并发 {concurrency} 计算（{budget_source}）："
+          f"每个进程 {db_pool_size} + {db_max_overflow} overflow")
+db_pool_size = DatabaseSettings.POOL_SIZE
+db_max_overflow = DatabaseSettings.MAX_OVERFLOW
+db_total_connections = app_instances * workers * (db_pool_size + db_max_overflow)
 
 # 最大请求数（防止内存泄漏）
 max_requests = 1000
@@ -55,10 +113,35 @@ def on_starting(server):
     """服务器启动时调用"""
     print("=" * 60)
     print("🚀 TimeValue Backend Server Starting")
+    print(f"   Worker class: {worker_class}")
     print(f"   Workers: {workers}")
-    print(f"   Threads per worker: {threads}")
+    if worker_class == "gevent":
+        print(f"   Connections per worker: {worker_connections}")
+    else:
+        print(f"   Threads per worker: {threads}")
+    print(f"   DB pool per worker: {db_pool_size} + {db_max_overflow} overflow")
+    print(f"   DB connections (max, {app_instances} instance(s)): {db_total_connections}")
     print(f"   Bind: {bind}")
     print("=" * 60)
+    check_db_connection_limit()
+    
+    # 清空上次运行留下的多进程指标快照
+    from utils.metrics import registry
+    registry.clear_multiproc_dir()
+
+def check_db_connection_limit():
+    """连接数上限检查：所有进程连接池占满时是否会超过数据库的 max_connections"""
+    if db_connection_budget and db_total_connections > db_connection_budget:
+        print(f"⚠️  连接池总上限 {db_total_connections} 超过连接预算 DB_CONNECTION_BUDGET={db_connection_budget}"
+              f"（已固定 DB_POOL_SIZE/DB_MAX_OVERFLOW）")
+    if db_max_connections_error is not None:
+        print(f"⚠️  无法查询数据库max_connections: {db_max_connections_error}")
+        return
+    max_connections = db_max_connections
+    if max_connections and db_total_connections > max_connections:
+        print(f"⚠️  连接池总上限 {db_total_connections} 超过数据库 max_connections={max_connections}，"
+              f"高峰期可能出现 Too many connections；请减少 workers/线程数，"
+              f"或设置 DB_CONNECTION_BUDGET（建议不超过 {max_connections} 减去其他客户端占用的连接）")
 
 def on_reload(server):
     """服务器重载时调用"""
@@ -72,6 +155,14 @@ def on_exit(server):
     """服务器退出时调用"""
     print("👋 TimeValue Backend shutting down...")
 
+def child_exit(server, worker):
+    """Worker退出后调用（master进程）：清理其指标快照，计数器与直方图并入归档"""
+    from utils.metrics import registry
+    try:
+        registry.mark_process_dead(worker.pid)
+    except Exception as e:
+        print(f"⚠️  清理Worker {worker.pid} 指标快照失败: {e}")
+
 # 错误处理
 def worker_abort(worker):
     """Worker异常终止时调用"""
@@ -0,0 +1,91 @@
+"""
+批量导入命令
+与 POST /api/imports/<kind> 相同的导入逻辑，用于客户初始化时直接在服务器上导入大文件
+
+使用方法：
+  python import_data.py --user admin assets 固定资产.xlsx
+  python import_data.py --user admin projects projects.csv --create-categories
+  python import_data.py --user 12 incomes incomes.csv --dry-run --errors errors.csv
+
+说明：
+  - --user 可以是用户名、邮箱或用户ID
+  - --errors 将每行的错误明细写入CSV（行号, 错误信息）
+"""
+import argparse
+import contextlib
+import csv
+import io
+import os
+import sys
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser(description='批量导入虚拟资产/固定资产/收入记录')
+    parser.add_argument('kind', choices=['projects', 'assets', 'incomes'], help='导入类型')
+    parser.add_argument('file', help='CSV或XLSX文件')
+    parser.add_argument('--user', required=True, help='数据归属用户（用户名、邮箱或ID）')
+    parser.add_argument('--chunk-size', type=int, default=2000, help='每批写入的行数')
+    parser.add_argument('--create-categories', action='store_true', help='分类不存在时自动创建')
+    parser.add_argument('--dry-run', action='store_true', help='只校验不写入')
+    parser.add_argument('--errors', help='错误明细输出CSV')
+    parser.add_argument('--database-url', help='数据库连接串（默认使用 .env 配置）')
+    args = parser.parse_args()
+
+    if args.database_url:
+        os.environ['DATABASE_URL'] = args.database_url
+
+    from app import create_app
+    from database import db
+    from models.user import User
+    from services.bulk_import_service import BulkImportError, import_file
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        app = create_app(init_db=True)
+
+    with app.app_context():
+        query = User.query.filter((User.username == args.user) | (User.email == args.user))
+        user = User.query.get(int(args.user)) if args.user.isdigit() else query.first()
+        if not user:
+            print(f"❌ 用户不存在: {args.user}")
+            return 1
+        username = user.username
+
+        started = time.perf_counter()
+        try:
+            with open(args.file, 'rb') as f:
+                result = import_file(
+                    f, args.file, user.id, args.kind, chunk_size=args.chunk_size,
+                    create_categories=args.create_categories, dry_run=args.dry_run,
+                    max_errors=sys.maxsize if args.errors else 1000
+                )
+        except BulkImportError as e:
+            print(f"❌ {e}")
+            return 1
+        elapsed = time.perf_counter() - started
+        print(f"数据库: {db.engine.url.render_as_string(hide_password=True)}")
+
+    rate = result['total'] / elapsed if elapsed else 0
+    print(f"{'校验' if args.dry_run else '导入'}完成（用户 {username}，{args.kind}）")
+    print(f"  总行数 {result['total']}  成功 {result['imported']}  失败 {result['failed']}  "
+          f"新建分类 {result['created_categories']}")
+    print(f"  耗时 {elapsed:.2f}s（{rate:.0f} 行/秒）")
+
+    for item in result['errors'][:20]:
+        print(f"  第{item['row']}行: {'；'.join(item['errors'])}")
+    if result['failed'] > 20:
+        print(f"  ... 共 {result['failed']} 行错误")
+
+    if args.errors:
+        with open(args.errors, 'w', encoding='utf-8-sig', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['行号', '错误信息'])
+            for item in result['errors']:
+                writer.writerow([item['row'], '；'.join(item['errors'])])
+        print(f"错误明细已写入: {args.errors}")
+
+    return 0 if result['failed'] == 0 else 2
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -20,6 +20,10 @@ def init_database():
         print("\n1. 创建数据表...")
         db.create_all()
         print("✓ 数据表创建成功")
+
+        # 执行版本化迁移（已有库补齐字段和索引）
+        from migrations import MigrationRunner
+        MigrationRunner(db.engine, log=lambda message: print(f"   {message}")).upgrade()
         
         # 检查管理员用户
         print("\n2. 检查管理员用户...")
@@ -0,0 +1,325 @@
+"""
+H5主要流程压测
+模拟H5用户的操作序列并发访问后端API，统计各接口吞吐量与 p50/p95/p99 延迟，结果可保存为JSON与其他提交比较
+
+每个虚拟用户依次执行：
+  login      登录（/auth/login）后获取用户信息
+  dashboard  首页统计、快到期提醒
+  lists      虚拟资产、固定资产、分类、报告列表，以及首个固定资产的收入/费用/维护记录
+  statistics 统计、资产统计、趋势、收入/维护总览
+  report     按 --report-ratio 的概率生成周报（模拟LLM），轮询至完成，记录端到端耗时
+
+使用方法：
+  python loadtest_h5_flows.py                                   # 临时SQLite + 内置服务 + 模拟LLM
+  python loadtest_h5_flows.py --users 50 --concurrency 20 --duration 60 --json load.json
+  python loadtest_h5_flows.py --baseline load.json              # 与基线比较，p95或吞吐量退化超出 --max-regression 返回非0
+  python loadtest_h5_flows.py --base-url http://127.0.0.1:5000/api --manifest synth_users.json
+                                                                # 压测已启动的服务（先用 seed_synthetic_data.py 生成数据）
+
+说明：
+  - 内置模式在临时SQLite中用 seed_synthetic_data.SyntheticSeeder 生成数据，在后台线程启动多线程WSGI服务和模拟LLM
+  - 压测外部服务时，报告生成走服务端配置的 ZHIPU_BASE_URL，请将其指向 mock_glm_server.py
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmark_report_workflow import percentile
+from seed_synthetic_data import DEFAULT_PASSWORD, SyntheticSeeder, add_range_arguments, build_ranges
+
+class LoadRecorder:
+    """线程安全的请求耗时记录"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}
+        self.errors = {}
+
+    def record(self, name, seconds, ok, detail=None):
+        with self._lock:
+            self.samples.setdefault(name, []).append(seconds)
+            if not ok:
+                errors = self.errors.setdefault(name, {})
+                errors[detail] = errors.get(detail, 0) + 1
+
+
+class VirtualUser:
+    """单个虚拟用户（独立的HTTP会话）"""
+
+    def __init__(self, base_url, username, password, recorder, rng, report_ratio, report_timeout, timeout=30):
+        import requests
+
+        self.base_url = base_url.rstrip('/')
+        self.username = username
+        self.password = password
+        self.recorder = recorder
+        self.rng = rng
+        self.report_ratio = report_ratio
+        self.report_timeout = report_timeout
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.asset_id = None
+
+    def call(self, method, path, name=None, **kwargs):
+        """发送请求并记录耗时，返回JSON（失败返回None）"""
+        name = name or f'{method} {path.split("?")[0]}'
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, self.base_url + path, timeout=self.timeout, **kwargs)
+            elapsed = time.perf_counter() - started
+            ok = response.status_code < 400
+            self.recorder.record(name, elapsed, ok, f'HTTP {response.status_code}')
+            return response.json() if ok else None
+        except Exception as e:
+            self.recorder.record(name, time.perf_counter() - started, False, type(e).__name__)
+            return None
+
+    # ==================== 流程 ====================
+
+    def login(self):
+        data = self.call('POST', '/auth/login', json={'username': self.username, 'password': self.password})
+        if not data:
+            return False
+        self.session.headers['Authorization'] = f"Bearer {data['data']['token']}"
+        self.call('GET', '/auth/user')
+        return True
+
+    def dashboard(self):
+        self.call('GET', '/analytics/dashboard')
+        self.call('GET', '/assets/expiring')
+
+    def lists(self):
+        self.call('GET', '/projects')
+        assets = self.call('GET', '/assets?page=1&per_page=20')
+        self.call('GET', '/categories')
+        self.call('GET', '/reports?page=1&per_page=20')
+        if self.asset_id is None and assets and assets.get('data'):
+            self.asset_id = self.rng.choice(assets['data'])['id']
+        if self.asset_id is not None:
+            self.call('GET', f'/assets/{self.asset_id}/incomes', name='GET /assets/<id>/incomes')
+            self.call('GET', f'/assets/{self.asset_id}/expenses', name='GET /assets/<id>/expenses')
+            self.call('GET', f'/assets/{self.asset_id}/maintenances', name='GET /assets/<id>/maintenances')
+
+    def statistics(self):
+        self.call('GET', '/statistics')
+        self.call('GET', '/assets/statistics')
+        self.call('GET', '/analytics/trends?period=month')
+        self.call('GET', '/income-overview')
+        self.call('GET', '/maintenance-overview')
+
+    def report(self):
+        """生成周报并轮询到完成，端到端耗时记为 flow:report_generation"""
+        started = time.perf_counter()
+        data = self.call('POST', '/reports/generate', json={'report_type': 'weekly'})
+        report_id = data and (data.get('data') or {}).get('report_id', (data.get('data') or {}).get('id'))
+        if not report_id:
+            self.recorder.record('flow:report_generation', time.perf_counter() - started, False, 'not_created')
+            return
+        status = 'generating'
+        while status == 'generating' and time.perf_counter() - started < self.report_timeout:
+            time.sleep(0.5)
+            detail = self.call('GET', f'/reports/{report_id}', name='GET /reports/<id>')
+            status = ((detail or {}).get('data') or {}).get('status', status)
+        self.recorder.record('flow:report_generation', time.perf_counter() - started,
+                             status == 'completed', status if status != 'generating' else 'timeout')
+
+    def run(self, deadline, iterations):
+        """登录后循环执行各流程，直到达到迭代次数或截止时间"""
+        if not self.login():
+            return 0
+        done = 0
+        while (iterations is None or done < iterations) and time.perf_counter() < deadline:
+            for flow in (self.dashboard, self.lists, self.statistics):
+                started = time.perf_counter()
+                flow()
+                self.recorder.record(f'flow:{flow.__name__}', time.perf_counter() - started, True)
+            if self.report_ratio and self.rng.random() < self.report_ratio:
+                self.report()
+            done += 1
+        return done
+
+
+# ==================== 内置服务 ====================
+
+def start_local_stack(args):
+    """临时SQLite + 合成数据 + 多线程WSGI服务 + 模拟LLM"""
+    import logging
+    from werkzeug.serving import make_server
+    from mock_glm_server import start_mock_server_in_thread
+
+    tmp_dir = tempfile.mkdtemp(prefix='timevalue_load_')
+    os.environ['DATABASE_URL'] = args.database_url or f"sqlite:///{os.path.join(tmp_dir, 'load.db')}"
+    mock_server, llm_url = start_mock_server_in_thread(latency=args.llm_latency, jitter=args.llm_jitter, seed=42)
+    os.environ['ZHIPU_BASE_URL'] = llm_url
+
+    from app import create_app
+    from database import db
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        app = create_app(init_db=True)
+        with app.app_context():
+            seeder = SyntheticSeeder(db, build_ranges(args), distribution=args.distribution,
+                                     prefix=f'load{int(time.time())}', seed=42)
+            usernames = seeder.run(args.users)
+
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)  # 不输出逐条访问日志
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, name='loadtest_wsgi', daemon=True).start()
+    base_url = f'http://127.0.0.1:{server.server_port}/api'
+    return base_url, usernames, DEFAULT_PASSWORD, [server, mock_server], tmp_dir
+
+
+# ==================== 汇总 ====================
+
+def summarize(recorder, wall_time, virtual_users, iterations):
+    endpoints = {}
+    total_requests = 0
+    total_errors = 0
+    for name, values in sorted(recorder.samples.items()):
+        errors = sum(recorder.errors.get(name, {}).values())
+        endpoints[name] = {
+            'count': len(values),
+            'errors': errors,
+            'rps': round(len(values) / wall_time, 2) if wall_time > 0 else 0,
+            'p50_ms': round(percentile(values, 50) * 1000, 1),
+            'p95_ms': round(percentile(values, 95) * 1000, 1),
+            'p99_ms': round(percentile(values, 99) * 1000, 1),
+            'max_ms': round(max(values) * 1000, 1),
+            'error_detail': recorder.errors.get(name, {})
+        }
+        if not name.startswith('flow:'):
+            total_requests += len(values)
+            total_errors += errors
+    return {
+        'virtual_users': virtual_users,
+        'iterations': iterations,
+        'wall_time_s': round(wall_time, 2),
+        'requests': total_requests,
+        'errors': total_errors,
+        'throughput_rps': round(total_requests / wall_time, 2) if wall_time > 0 else 0,
+        'endpoints': endpoints
+    }
+
+
+def print_summary(summary):
+    print("=" * 96)
+    print("📊 H5流程压测结果")
+    print("=" * 96)
+    print(f"虚拟用户: {summary['virtual_users']}  迭代: {summary['iterations']}  总耗时: {summary['wall_time_s']}s")
+    print(f"请求数: {summary['requests']}  错误: {summary['errors']}  吞吐量: {summary['throughput_rps']} 请求/秒")
+    print("-" * 96)
+    print(f"{'接口/流程':<40}{'次数':>7}{'错误':>6}{'rps':>8}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}{'max(ms)':>10}")
+    for name, stats in summary['endpoints'].items():
+        print(f"{name:<40}{stats['count']:>7}{stats['errors']:>6}{stats['rps']:>8}"
+              f"{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}{stats['max_ms']:>10}")
+    errors = {name: stats['error_detail'] for name, stats in summary['endpoints'].items() if stats['error_detail']}
+    if errors:
+        print("-" * 96)
+        print(f"错误明细: {json.dumps(errors, ensure_ascii=False)}")
+    print("=" * 96)
+
+
+def compare_with_baseline(summary, baseline, max_regression):
+    """吞吐量下降或接口p95上升超过 max_regression 比例视为退化（忽略p95低于10ms的接口抖动）"""
+    regressions = []
+    if summary['throughput_rps'] < baseline['throughput_rps'] * (1 - max_regression):
+        regressions.append(f"吞吐量 {baseline['throughput_rps']} -> {summary['throughput_rps']} 请求/秒")
+    for name, stats in summary['endpoints'].items():
+        base = baseline['endpoints'].get(name)
+        if not base or base['p95_ms'] < 10:
+            continue
+        if stats['p95_ms'] > base['p95_ms'] * (1 + max_regression):
+            regressions.append(f"{name} p95 {base['p95_ms']}ms -> {stats['p95_ms']}ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='H5主要流程压测')
+    parser.add_argument('--base-url', help='已启动服务的API地址（如 http://127.0.0.1:5000/api），默认启动内置服务')
+    parser.add_argument('--manifest', help='seed_synthetic_data.py 生成的用户清单（压测外部服务时必填）')
+    parser.add_argument('--concurrency', type=int, default=10, help='并发虚拟用户数')
+    parser.add_argument('--duration', type=float, default=30, help='压测时长（秒）')
+    parser.add_argument('--iterations', type=int, help='每个虚拟用户的迭代次数（指定后不再受 --duration 限制）')
+    parser.add_argument('--report-ratio', type=float, default=0.05, help='每次迭代生成报告的概率')
+    parser.add_argument('--report-timeout', type=float, default=120, help='单个报告等待完成的超时（秒）')
+    parser.add_argument('--seed', type=int, default=42, help='随机种子')
+    parser.add_argument('--json', dest='json_output', help='将结果写入JSON文件，便于跨提交对比')
+    parser.add_argument('--baseline', help='与基线JSON比较')
+    parser.add_argument('--max-regression', type=float, default=0.2, help='允许相对基线退化的比例')
+
+    local = parser.add_argument_group('内置服务（未指定 --base-url 时）')
+    local.add_argument('--users', type=int, default=20, help='生成的合成用户数')
+    local.add_argument('--database-url', help='数据库连接串（默认临时SQLite文件）')
+    local.add_argument('--llm-latency', type=float, default=0.3, help='模拟LLM响应延迟（秒）')
+    local.add_argument('--llm-jitter', type=float, default=0.1, help='模拟LLM延迟抖动（秒）')
+    add_range_arguments(local)
+    args = parser.parse_args()
+
+    servers = []
+    tmp_dir = None
+    if args.base_url:
+        if not args.manifest:
+            parser.error('压测外部服务时需要 --manifest')
+        with open(args.manifest, encoding='utf-8') as f:
+            manifest = json.load(f)
+        base_url, usernames, password = args.base_url, manifest['usernames'], manifest['password']
+    else:
+        print("正在生成合成数据并启动内置服务...")
+        base_url, usernames, password, servers, tmp_dir = start_local_stack(args)
+
+    print(f"API地址: {base_url}")
+    print(f"用户数: {len(usernames)}  并发: {args.concurrency}  时长: {args.duration}s  报告比例: {args.report_ratio}\n")
+
+    recorder = LoadRecorder()
+    rng = random.Random(args.seed)
+    virtual_users = [
+        VirtualUser(base_url, usernames[i % len(usernames)], password, recorder,
+                    random.Random(rng.random()), args.report_ratio, args.report_timeout)
+        for i in range(args.concurrency)
+    ]
+
+    wall_start = time.perf_counter()
+    deadline = float('inf') if args.iterations else wall_start + args.duration
+    output = contextlib.redirect_stdout(io.StringIO()) if servers else contextlib.nullcontext()
+    try:
+        with output, ThreadPoolExecutor(max_workers=args.concurrency, thread_name_prefix='vu') as pool:
+            iterations = sum(pool.map(lambda vu: vu.run(deadline, args.iterations), virtual_users))
+    finally:
+        for server in servers:
+            server.shutdown()
+    wall_time = time.perf_counter() - wall_start
+
+    summary = summarize(recorder, wall_time, args.concurrency, iterations)
+    print_summary(summary)
+
+    passed = summary['errors'] == 0
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(summary, baseline, args.max_regression)
+        for line in regressions:
+            print(f"❌ 退化: {line}")
+        if not regressions:
+            print(f"✅ 与基线相比未超出 {args.max_regression:.0%} 的退化")
+        passed = passed and not regressions
+
+    if args.json_output:
+        with open(args.json_output, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        print(f"结果已写入: {args.json_output}")
+    if tmp_dir:
+        print(f"临时数据库目录: {tmp_dir}")
+
+    return 0 if passed else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""
+数据库迁移命令
+版本化迁移位于 migrations/versions，已执行版本记录在 schema_migrations 表
+
+使用方法：
+  python migrate.py status                    # 查看各版本状态
+  python migrate.py upgrade                   # 执行全部待执行迁移
+  python migrate.py upgrade --target 0001     # 执行到指定版本
+  python migrate.py upgrade --dry-run         # 只打印将要执行的SQL
+  python migrate.py downgrade --target 0001   # 回滚到指定版本
+  python migrate.py verify                    # 检查热点查询的执行计划是否命中复合索引
+  python migrate.py unlock 0002               # 清除异常退出遗留的执行中记录
+
+说明：
+  - init_db.py / `flask --app app init-db` 建表后会自动执行 upgrade
+  - 未指定 --database-url 时使用 .env 中的数据库配置
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+
+
+def main():
+    parser = argparse.ArgumentParser(description='数据库迁移')
+    parser.add_argument('--database-url', help='数据库连接串（默认使用 .env 配置）')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('status', help='查看迁移状态')
+    upgrade_parser = subparsers.add_parser('upgrade', help='执行迁移')
+    upgrade_parser.add_argument('--target', help='目标版本（含）')
+    upgrade_parser.add_argument('--dry-run', action='store_true', help='只打印SQL')
+    downgrade_parser = subparsers.add_parser('downgrade', help='回滚迁移')
+    downgrade_parser.add_argument('--target', required=True, help='回滚后保留的最高版本（0000 表示全部回滚）')
+    downgrade_parser.add_argument('--dry-run', action='store_true', help='只打印SQL')
+    verify_parser = subparsers.add_parser('verify', help='检查热点查询执行计划')
+    verify_parser.add_argument('--show-plan', action='store_true', help='输出完整执行计划')
+    unlock_parser = subparsers.add_parser('unlock', help='清除执行中记录')
+    unlock_parser.add_argument('version')
+    args = parser.parse_args()
+
+    if args.database_url:
+        os.environ['DATABASE_URL'] = args.database_url
+
+    from app import create_app
+    from database import db
+    from migrations import MigrationRunner, verify_hot_queries
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        app = create_app(init_db=False)
+
+    with app.app_context():
+        engine = db.engine
+        print(f"数据库: {engine.url.render_as_string(hide_password=True)}")
+        runner = MigrationRunner(engine)
+
+        if args.command == 'status':
+            for item in runner.status():
+                applied = f"  {item['applied_at']:%Y-%m-%d %H:%M:%S}  {item['duration_ms']}ms" if item['applied_at'] else ''
+                print(f"  {item['version']}  {item['status']:<8}  {item['description']}{applied}")
+            return 0
+
+        if args.command == 'upgrade':
+            runner.upgrade(target=args.target, dry_run=args.dry_run)
+            return 0
+
+        if args.command == 'downgrade':
+            done = runner.downgrade(args.target, dry_run=args.dry_run)
+            print(f"已回滚: {', '.join(done) if done else '无'}")
+            return 0
+
+        if args.command == 'unlock':
+            print("✅ 已清除" if runner.unlock(args.version) else f"版本 {args.version} 没有执行中记录")
+            return 0
+
+        results = verify_hot_queries(engine)
+        icons = {'used': '✅', 'possible': '⚠️ ', 'missed': '❌', 'error': '❌'}
+        for item in results:
+            print(f"{icons[item['result']]} {item['name']:<28} {item['result']:<9} {item['index']:<44} {item['route']}")
+            if args.show_plan or item['result'] != 'used':
+                for row in item['plan']:
+                    print(f"      {json.dumps(row, ensure_ascii=False, default=str)}")
+        return 0 if all(item['result'] in ('used', 'possible') for item in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
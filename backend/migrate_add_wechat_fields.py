@@ -1,6 +1,7 @@
 """
 数据库迁移脚本：为User模型添加微信字段
 执行：python migrate_add_wechat_fields.py
+已由版本化迁移 migrations/versions/v0001_legacy_columns.py 取代，请使用 python migrate.py upgrade
 """
 from app import create_app
 from database import db
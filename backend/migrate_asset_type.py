@@ -1,5 +1,6 @@
 """
 数据库迁移脚本：为categories表添加asset_type字段
+已由版本化迁移 migrations/versions/v0001_legacy_columns.py 取代，请使用 python migrate.py upgrade
 """
 
 import sys
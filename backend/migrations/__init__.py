@@ -0,0 +1,11 @@
+"""
+版本化数据库迁移
+取代 migrate_*.py / add_*_fields.py 等一次性脚本：每个迁移是 migrations/versions 下的一个模块，
+已执行的版本记录在 schema_migrations 表中，可重复执行，多实例同时部署时只会有一个实例执行同一版本
+
+使用方法见 backend/migrate.py
+"""
+from migrations.runner import MigrationRunner, SchemaOps
+from migrations.hot_queries import HOT_QUERIES, verify_hot_queries
+
+__all__ = ['MigrationRunner', 'SchemaOps', 'HOT_QUERIES', 'verify_hot_queries']
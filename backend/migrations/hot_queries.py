@@ -0,0 +1,134 @@
+"""
+热点查询执行计划检查
+对各热点查询执行 EXPLAIN（MySQL）/ EXPLAIN QUERY PLAN（SQLite），确认命中预期的复合索引
+
+注意：MySQL 在表数据很少时可能选择全表扫描，此时预期索引只出现在 possible_keys 中，
+结果标记为 possible；请在有代表性数据量的库上检查（可用 seed_synthetic_data.py 生成）
+"""
+from datetime import date, timedelta
+
+from sqlalchemy import text
+
+HOT_QUERIES = [
+    {
+        'name': 'projects_by_user',
+        'route': 'GET /api/projects',
+        'index': 'ix_projects_user_created',
+        'sql': 'SELECT * FROM projects WHERE user_id = :user_id ORDER BY created_at DESC',
+    },
+    {
+        'name': 'reports_by_user',
+        'route': 'GET /api/reports',
+        'index': 'ix_ai_reports_user_created',
+        'sql': 'SELECT * FROM ai_reports WHERE user_id = :user_id ORDER BY created_at DESC LIMIT 20',
+    },
+    {
+        'name': 'received_incomes_in_range',
+        'route': 'GET /api/income-overview',
+        'index': 'ix_asset_incomes_asset_status_date',
+        'sql': "SELECT SUM(amount) FROM asset_incomes WHERE asset_id = :asset_id AND status = 'received' "
+               "AND income_date BETWEEN :start_date AND :end_date",
+    },
+    {
+        'name': 'due_reminders',
+        'route': 'GET /api/maintenance-reminders/due',
+        'index': 'ix_maintenance_reminders_user_active_next',
+        'sql': 'SELECT * FROM maintenance_reminders WHERE user_id = :user_id AND is_active = 1 '
+               'AND next_reminder_date <= :due_date',
+    },
+    {
+        'name': 'planned_maintenances',
+        'route': 'GET /api/maintenance-overview',
+        'index': 'ix_asset_maintenances_asset_status_next',
+        'sql': "SELECT * FROM asset_maintenances WHERE asset_id = :asset_id AND status = 'planned' "
+               "AND next_maintenance_date <= :due_date",
+    },
+    {
+        'name': 'user_overdue_maintenances',
+        'route': 'GET /api/maintenance-overview',
+        'index': 'ix_fixed_assets_user_status',
+        'sql': "SELECT m.id, fa.name FROM asset_maintenances m JOIN fixed_assets fa ON fa.id = m.asset_id "
+               "WHERE fa.user_id = :user_id AND m.status IN ('planned', 'in_progress') "
+               "AND m.next_maintenance_date < :end_date",
+    },
+    {
+        'name': 'user_income_trend',
+        'route': 'GET /api/income-overview',
+        'index': 'ix_monthly_income_rollup_user_month',
+        'sql': 'SELECT month_start, SUM(net_total) FROM monthly_income_rollup WHERE user_id = :user_id '
+               'AND month_start >= :start_date GROUP BY month_start',
+    },
+    {
+        'name': 'expiring_projects',
+        'route': 'run_notification_scan.py',
+        'index': 'ix_projects_user_end',
+        'sql': 'SELECT id, user_id, name, end_time FROM projects WHERE user_id IN (:user_id) '
+               'AND end_time BETWEEN :start_date AND :due_date',
+    },
+    {
+        'name': 'due_expenses',
+        'route': 'run_notification_scan.py',
+        'index': 'ix_asset_expenses_user_next_due',
+        'sql': 'SELECT id, user_id, expense_name, next_due_date FROM asset_expenses WHERE user_id IN (:user_id) '
+               'AND is_recurring = 1 AND next_due_date BETWEEN :start_date AND :due_date',
+    },
+]
+
+
+def _sample_params():
+    today = date.today()
+    return {
+        'user_id': 1,
+        'asset_id': 1,
+        'start_date': today - timedelta(days=365),
+        'end_date': today,
+        'due_date': today + timedelta(days=30),
+    }
+
+
+def explain(conn, sql, params):
+    """返回执行计划行（字典列表）"""
+    prefix = 'EXPLAIN QUERY PLAN ' if conn.dialect.name == 'sqlite' else 'EXPLAIN '
+    result = conn.execute(text(prefix + sql), params)
+    return [dict(row._mapping) for row in result]
+
+
+def check_plan(dialect, plan, index):
+    """
+    Returns:
+        used（命中）/ possible（MySQL可选但未选用）/ missed（未命中）
+    """
+    if dialect == 'sqlite':
+        return 'used' if any(index in str(row.get('detail', '')) for row in plan) else 'missed'
+    if any(row.get('key') == index for row in plan):
+        return 'used'
+    if any(index in str(row.get('possible_keys') or '').split(',') for row in plan):
+        return 'possible'
+    return 'missed'
+
+
+def verify_hot_queries(engine):
+    """
+    检查全部热点查询
+
+    Returns:
+        [{'name', 'route', 'index', 'result', 'plan'}]
+    """
+    params = _sample_params()
+    results = []
+    with engine.connect() as conn:
+        for query in HOT_QUERIES:
+            try:
+                plan = explain(conn, query['sql'], params)
+                result = check_plan(conn.dialect.name, plan, query['index'])
+            except Exception as e:
+                plan = [{'error': str(e)}]
+                result = 'error'
+            results.append({
+                'name': query['name'],
+                'route': query['route'],
+                'index': query['index'],
+                'result': result,
+                'plan': plan,
+            })
+    return results
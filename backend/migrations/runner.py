@@ -0,0 +1,263 @@
+"""
+迁移执行器
+  - schema_migrations 表记录每个版本的状态：running（执行中，兼作多实例互斥）、applied（已完成）
+  - SchemaOps 提供幂等的结构变更操作（已存在则跳过），新库由 db.create_all() 建好后执行迁移只会登记版本
+  - MySQL 的索引变更使用 InnoDB Online DDL（ALGORITHM=INPLACE, LOCK=NONE），建索引期间表仍可读写；
+    SQLite 没有在线DDL，CREATE INDEX 期间会短暂阻塞写入
+"""
+import importlib
+import pkgutil
+import time
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, text
+from sqlalchemy.exc import IntegrityError
+
+metadata = MetaData()
+
+schema_migrations = Table(
+    'schema_migrations', metadata,
+    Column('version', String(32), primary_key=True),
+    Column('description', String(200)),
+    Column('status', String(20), nullable=False),  # running, applied
+    Column('started_at', DateTime),
+    Column('applied_at', DateTime),
+    Column('duration_ms', Integer),
+)
+
+
+class SchemaOps:
+    """幂等的结构变更操作（迁移模块的 upgrade/downgrade 接收该对象）"""
+
+    def __init__(self, conn, log=print, dry_run=False):
+        self.conn = conn
+        self.dialect = conn.dialect.name
+        self.log = log
+        self.dry_run = dry_run
+        self._quote = conn.dialect.identifier_preparer.quote
+
+    @property
+    def is_mysql(self):
+        return self.dialect in ('mysql', 'mariadb')
+
+    def execute(self, sql):
+        self.log(f"    {'[dry-run] ' if self.dry_run else ''}{sql}")
+        if not self.dry_run:
+            self.conn.execute(text(sql))
+
+    # ==================== 检查 ====================
+
+    def has_table(self, table):
+        return inspect(self.conn).has_table(table)
+
+    def has_column(self, table, column):
+        return any(c['name'] == column for c in inspect(self.conn).get_columns(table))
+
+    def find_index(self, table, name, columns):
+        """按名称或完全相同的列组合查找已有索引（兼容旧脚本以其他名称创建的索引）"""
+        for index in inspect(self.conn).get_indexes(table):
+            if index['name'] == name or list(index['column_names']) == list(columns):
+                return index['name']
+        return None
+
+    # ==================== 变更 ====================
+
+    def add_column(self, column):
+        """
+        按模型定义添加字段（已存在则跳过）
+
+        Args:
+            column: 模型表上的 Column，如 FixedAsset.__table__.c.rent_price
+        """
+        table = column.table.name
+        if self.has_column(table, column.name):
+            self.log(f"    跳过字段 {table}.{column.name}（已存在）")
+            return
+        sql = f'ALTER TABLE {self._quote(table)} ADD COLUMN {self._quote(column.name)} {column.type.compile(dialect=self.conn.dialect)}'
+        default = column.default.arg if column.default is not None and column.default.is_scalar else None
+        if isinstance(default, bool):
+            sql += f' DEFAULT {int(default)}'
+        elif isinstance(default, (int, float)):
+            sql += f' DEFAULT {default}'
+        elif isinstance(default, str):
+            sql += " DEFAULT '{}'".format(default.replace("'", "''"))
+        self.execute(sql)
+
+    def create_table(self, table):
+        """
+        按模型定义建表（含模型上声明的索引，已存在则跳过）
+
+        Args:
+            table: 模型的 Table，如 NotificationOutbox.__table__
+        """
+        if self.has_table(table.name):
+            self.log(f"    跳过建表 {table.name}（已存在）")
+            return
+        self.log(f"    {'[dry-run] ' if self.dry_run else ''}CREATE TABLE {self._quote(table.name)}")
+        if not self.dry_run:
+            table.create(self.conn)
+
+    def drop_table(self, table):
+        if not self.has_table(table.name):
+            self.log(f"    跳过删除表 {table.name}（不存在）")
+            return
+        self.log(f"    {'[dry-run] ' if self.dry_run else ''}DROP TABLE {self._quote(table.name)}")
+        if not self.dry_run:
+            table.drop(self.conn)
+
+    def create_index(self, table, name, columns, unique=False):
+        """在线创建索引（同名或同列组合的索引已存在则跳过）"""
+        existing = self.find_index(table, name, columns)
+        if existing:
+            self.log(f"    跳过索引 {name}（已存在: {existing}）")
+            return
+        column_sql = ', '.join(self._quote(c) for c in columns)
+        kind = 'UNIQUE INDEX' if unique else 'INDEX'
+        if self.is_mysql:
+            self.execute(f'ALTER TABLE {self._quote(table)} ADD {kind} {self._quote(name)} ({column_sql}), '
+                         f'ALGORITHM=INPLACE, LOCK=NONE')
+        else:
+            self.execute(f'CREATE {kind} {self._quote(name)} ON {self._quote(table)} ({column_sql})')
+
+    def drop_index(self, table, name):
+        if not any(index['name'] == name for index in inspect(self.conn).get_indexes(table)):
+            self.log(f"    跳过删除索引 {name}（不存在）")
+            return
+        if self.is_mysql:
+            self.execute(f'ALTER TABLE {self._quote(table)} DROP INDEX {self._quote(name)}, ALGORITHM=INPLACE, LOCK=NONE')
+        else:
+            self.execute(f'DROP INDEX {self._quote(name)}')
+
+
+def load_migrations():
+    """按版本号顺序加载 migrations/versions 下的迁移模块（模块名 v<版本>_<说明>）"""
+    from migrations import versions
+
+    migrations = []
+    for module_info in pkgutil.iter_modules(versions.__path__):
+        if not module_info.name.startswith('v'):
+            continue
+        module = importlib.import_module(f'migrations.versions.{module_info.name}')
+        migrations.append(module)
+    migrations.sort(key=lambda m: m.VERSION)
+    versions_seen = [m.VERSION for m in migrations]
+    if len(set(versions_seen)) != len(versions_seen):
+        raise RuntimeError(f'迁移版本号重复: {versions_seen}')
+    return migrations
+
+
+class MigrationRunner:
+    """按版本顺序执行迁移"""
+
+    def __init__(self, engine, log=print):
+        self.engine = engine
+        self.log = log
+        self.migrations = load_migrations()
+
+    def ensure_table(self):
+        metadata.create_all(self.engine, checkfirst=True)
+
+    def recorded(self):
+        """{version: row}"""
+        self.ensure_table()
+        with self.engine.connect() as conn:
+            return {row.version: row for row in conn.execute(schema_migrations.select())}
+
+    def status(self):
+        recorded = self.recorded()
+        return [{
+            'version': m.VERSION,
+            'description': m.DESCRIPTION,
+            'status': recorded[m.VERSION].status if m.VERSION in recorded else 'pending',
+            'applied_at': recorded[m.VERSION].applied_at if m.VERSION in recorded else None,
+            'duration_ms': recorded[m.VERSION].duration_ms if m.VERSION in recorded else None,
+        } for m in self.migrations]
+
+    def _claim(self, migration):
+        """写入 running 记录；主键冲突说明其他实例正在执行或已执行"""
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(schema_migrations.insert().values(
+                    version=migration.VERSION, description=migration.DESCRIPTION,
+                    status='running', started_at=datetime.utcnow()
+                ))
+            return True
+        except IntegrityError:
+            return False
+
+    def upgrade(self, target=None, dry_run=False):
+        """
+        执行待执行的迁移
+
+        Args:
+            target: 执行到该版本为止（含），None 表示全部
+            dry_run: 只打印将要执行的SQL
+
+        Returns:
+            本次执行的版本列表
+        """
+        recorded = self.recorded()
+        pending = [m for m in self.migrations
+                   if m.VERSION not in recorded and (target is None or m.VERSION <= target)]
+        running = [v for v, row in recorded.items() if row.status == 'running']
+        if running:
+            self.log(f"⚠️  版本 {', '.join(running)} 正在由其他实例执行（若进程已退出请先执行 unlock）")
+            return []
+        if not pending:
+            self.log("数据库结构已是最新版本")
+            return []
+
+        done = []
+        for migration in pending:
+            self.log(f"▶ {migration.VERSION} {migration.DESCRIPTION}")
+            if dry_run:
+                with self.engine.connect() as conn:
+                    migration.upgrade(SchemaOps(conn, self.log, dry_run=True))
+                continue
+            if not self._claim(migration):
+                self.log(f"⚠️  {migration.VERSION} 已被其他实例执行，停止")
+                break
+
+            started = time.perf_counter()
+            try:
+                with self.engine.begin() as conn:
+                    migration.upgrade(SchemaOps(conn, self.log))
+            except Exception:
+                with self.engine.begin() as conn:
+                    conn.execute(schema_migrations.delete().where(schema_migrations.c.version == migration.VERSION))
+                raise
+
+            duration_ms = int((time.perf_counter() - started) * 1000)
+            with self.engine.begin() as conn:
+                conn.execute(schema_migrations.update().where(schema_migrations.c.version == migration.VERSION).values(
+                    status='applied', applied_at=datetime.utcnow(), duration_ms=duration_ms
+                ))
+            self.log(f"✅ {migration.VERSION} 完成（{duration_ms}ms）")
+            done.append(migration.VERSION)
+        return done
+
+    def downgrade(self, target, dry_run=False):
+        """回滚版本号大于 target 的已执行迁移（倒序）"""
+        recorded = self.recorded()
+        applied = [m for m in reversed(self.migrations)
+                   if m.VERSION > target and m.VERSION in recorded and recorded[m.VERSION].status == 'applied']
+        done = []
+        for migration in applied:
+            self.log(f"◀ {migration.VERSION} {migration.DESCRIPTION}")
+            if dry_run:
+                with self.engine.connect() as conn:
+                    migration.downgrade(SchemaOps(conn, self.log, dry_run=True))
+                continue
+            with self.engine.begin() as conn:
+                migration.downgrade(SchemaOps(conn, self.log))
+                conn.execute(schema_migrations.delete().where(schema_migrations.c.version == migration.VERSION))
+            done.append(migration.VERSION)
+        return done
+
+    def unlock(self, version):
+        """清除异常退出遗留的 running 记录"""
+        with self.engine.begin() as conn:
+            result = conn.execute(schema_migrations.delete().where(
+                (schema_migrations.c.version == version) & (schema_migrations.c.status == 'running')
+            ))
+        return result.rowcount > 0
@@ -0,0 +1,493 @@
+"""
+分块、并行、可续传的表数据复制
+用于在数据库实例之间迁移数据（如从自建MySQL迁到云托管MySQL）：
+
+  - 按主键做 keyset 分块读取（WHERE pk > 上一块末尾 ORDER BY pk LIMIT n），MySQL 使用服务端游标流式读取，
+    不在源库上长时间持有整表读取，内存占用只与块大小有关
+  - 每块用 executemany 批量写入目标库，并在同一事务中更新检查点（_table_copy_checkpoints 表），
+    中断后重新执行会从最后提交的块之后继续
+  - 多个表由多个worker并行复制（每个worker独立连接，目标会话关闭外键检查）
+  - 复制完成后比较两侧行数，并按主键顺序流式计算行内容校验和
+  - 无主键的表无法续传：中断后整表重新复制
+
+支持 MySQL（pymysql）与 SQLite（本地演练）；跨类型复制时需先在目标库建表（--skip-schema）
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime, time as dt_time, timedelta
+from decimal import Decimal
+from urllib.parse import quote_plus
+
+CHECKPOINT_TABLE = '_table_copy_checkpoints'
+
+
+class CopyError(Exception):
+    """复制过程中的可预期错误（配置、表结构不一致等）"""
+
+
+# ==================== 连接 ====================
+
+class Endpoint:
+    """源库/目标库连接信息"""
+
+    def __init__(self, url):
+        from sqlalchemy.engine import make_url
+
+        self.url = make_url(url)
+        backend = self.url.get_backend_name()
+        if backend not in ('mysql', 'sqlite'):
+            raise CopyError(f'不支持的数据库类型: {backend}')
+        self.dialect = backend
+        self.placeholder = '%s' if backend == 'mysql' else '?'
+
+    @classmethod
+    def from_env(cls, prefix):
+        """
+        读取环境变量：{prefix}_DATABASE_URL，或 {prefix}_DB_HOST/PORT/USER/PASSWORD/NAME
+
+        Returns:
+            Endpoint；未配置时返回 None
+        """
+        url = os.getenv(f'{prefix}_DATABASE_URL')
+        if url:
+            return cls(url)
+        host = os.getenv(f'{prefix}_DB_HOST')
+        if not host:
+            return None
+        user = quote_plus(os.getenv(f'{prefix}_DB_USER', 'root'))
+        password = quote_plus(os.getenv(f'{prefix}_DB_PASSWORD', ''))
+        port = os.getenv(f'{prefix}_DB_PORT', '3306')
+        name = os.getenv(f'{prefix}_DB_NAME', 'timevalue')
+        return cls(f'mysql+pymysql://{user}:{password}@{host}:{port}/{name}?charset=utf8mb4')
+
+    def display(self):
+        return self.url.render_as_string(hide_password=True)
+
+    def connect(self, streaming=False, with_database=True):
+        """
+        Args:
+            streaming: MySQL 使用服务端游标（SSCursor），结果逐行从服务器读取
+            with_database: 为 False 时不选择数据库（用于创建数据库）
+        """
+        if self.dialect == 'sqlite':
+            return sqlite3.connect(self.url.database, timeout=30, check_same_thread=False)
+
+        import pymysql
+        import pymysql.cursors
+
+        return pymysql.connect(
+            host=self.url.host,
+            port=self.url.port or 3306,
+            user=self.url.username,
+            password=self.url.password or '',
+            database=self.url.database if with_database else None,
+            charset=self.url.query.get('charset', 'utf8mb4'),
+            cursorclass=pymysql.cursors.SSCursor if streaming else pymysql.cursors.Cursor,
+            autocommit=False,
+            read_timeout=600,
+            write_timeout=600,
+        )
+
+    @staticmethod
+    def quote(name):
+        return f'`{name}`'
+
+    # ==================== 元数据 ====================
+
+    def list_tables(self, conn):
+        cursor = conn.cursor()
+        if self.dialect == 'sqlite':
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name")
+        else:
+            cursor.execute("SELECT TABLE_NAME FROM information_schema.TABLES "
+                           "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_TYPE = 'BASE TABLE' ORDER BY TABLE_NAME")
+        tables = [row[0] for row in cursor.fetchall()]
+        cursor.close()
+        return [t for t in tables if t != CHECKPOINT_TABLE]
+
+    def columns(self, conn, table):
+        """(列名列表, 主键列列表)"""
+        cursor = conn.cursor()
+        if self.dialect == 'sqlite':
+            cursor.execute(f'PRAGMA table_info({self.quote(table)})')
+            rows = cursor.fetchall()
+            columns = [row[1] for row in rows]
+            primary_key = [row[1] for row in sorted((r for r in rows if r[5]), key=lambda r: r[5])]
+        else:
+            cursor.execute("SELECT COLUMN_NAME FROM information_schema.COLUMNS "
+                           "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND GENERATION_EXPRESSION = '' "
+                           "ORDER BY ORDINAL_POSITION", (table,))
+            columns = [row[0] for row in cursor.fetchall()]
+            cursor.execute("SELECT COLUMN_NAME FROM information_schema.KEY_COLUMN_USAGE "
+                           "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND CONSTRAINT_NAME = 'PRIMARY' "
+                           "ORDER BY ORDINAL_POSITION", (table,))
+            primary_key = [row[0] for row in cursor.fetchall()]
+        cursor.close()
+        return columns, primary_key
+
+    def create_statements(self, conn, table):
+        """建表（及SQLite索引）语句，均带 IF NOT EXISTS"""
+        cursor = conn.cursor()
+        if self.dialect == 'sqlite':
+            cursor.execute("SELECT type, sql FROM sqlite_master WHERE tbl_name = ? AND sql IS NOT NULL "
+                           "ORDER BY CASE type WHEN 'table' THEN 0 ELSE 1 END", (table,))
+            statements = []
+            for kind, sql in cursor.fetchall():
+                keyword = 'CREATE TABLE' if kind == 'table' else ('CREATE UNIQUE INDEX' if sql.upper().startswith('CREATE UNIQUE') else 'CREATE INDEX')
+                statements.append(sql.replace(keyword, f'{keyword} IF NOT EXISTS', 1))
+        else:
+            cursor.execute(f'SHOW CREATE TABLE {self.quote(table)}')
+            statements = [cursor.fetchone()[1].replace('CREATE TABLE', 'CREATE TABLE IF NOT EXISTS', 1)]
+        cursor.close()
+        return statements
+
+    def estimate_rows(self, conn, table):
+        """用于调度的行数估计（MySQL取统计信息，不扫描表）"""
+        cursor = conn.cursor()
+        if self.dialect == 'sqlite':
+            cursor.execute(f'SELECT COUNT(*) FROM {self.quote(table)}')
+        else:
+            cursor.execute("SELECT TABLE_ROWS FROM information_schema.TABLES "
+                           "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s", (table,))
+        row = cursor.fetchone()
+        cursor.close()
+        return int(row[0] or 0) if row else 0
+
+    def count(self, conn, table):
+        cursor = conn.cursor()
+        cursor.execute(f'SELECT COUNT(*) FROM {self.quote(table)}')
+        value = cursor.fetchone()[0]
+        cursor.close()
+        return value
+
+    def prepare_write_session(self, conn):
+        cursor = conn.cursor()
+        if self.dialect == 'mysql':
+            cursor.execute('SET FOREIGN_KEY_CHECKS=0')
+            cursor.execute('SET UNIQUE_CHECKS=0')
+        else:
+            cursor.execute('PRAGMA foreign_keys=OFF')
+        cursor.close()
+
+
+# ==================== 读取 ====================
+
+def iter_chunks(endpoint, conn, table, columns, primary_key, chunk_size, start_key=None):
+    """
+    按主键顺序分块读取
+
+    Yields:
+        (rows, last_key)；无主键时整表按所有列排序流式读取，last_key 为 None
+    """
+    q = endpoint.quote
+    column_sql = ', '.join(q(c) for c in columns)
+    if not primary_key:
+        cursor = conn.cursor()
+        cursor.execute(f'SELECT {column_sql} FROM {q(table)} ORDER BY {column_sql}')
+        try:
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield rows, None
+        finally:
+            cursor.close()
+        return
+
+    key_indexes = [columns.index(c) for c in primary_key]
+    key_sql = ', '.join(q(c) for c in primary_key)
+    placeholders = ', '.join([endpoint.placeholder] * len(primary_key))
+    condition = f'{q(primary_key[0])} > {endpoint.placeholder}' if len(primary_key) == 1 else f'({key_sql}) > ({placeholders})'
+    last_key = start_key
+    while True:
+        cursor = conn.cursor()
+        if last_key is None:
+            cursor.execute(f'SELECT {column_sql} FROM {q(table)} ORDER BY {key_sql} LIMIT {int(chunk_size)}')
+        else:
+            cursor.execute(f'SELECT {column_sql} FROM {q(table)} WHERE {condition} ORDER BY {key_sql} LIMIT {int(chunk_size)}',
+                           tuple(last_key))
+        rows = []
+        while True:
+            batch = cursor.fetchmany(1000)
+            if not batch:
+                break
+            rows.extend(batch)
+        cursor.close()
+        if endpoint.dialect == 'mysql':
+            conn.commit()  # 结束本块的一致性读快照，避免长事务
+        if not rows:
+            return
+        last_key = [rows[-1][i] for i in key_indexes]
+        yield rows, last_key
+        if len(rows) < chunk_size:
+            return
+
+
+# ==================== 校验和 ====================
+
+def _normalize(value):
+    """跨驱动统一值的表示（Decimal/float、日期、bytes）"""
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return str(int(value))
+    if isinstance(value, int):
+        return str(value)
+    if isinstance(value, (float, Decimal)):
+        normalized = Decimal(str(value)).normalize()
+        return format(normalized, 'f')
+    if isinstance(value, datetime):
+        return value.isoformat(sep=' ')
+    if isinstance(value, (date, dt_time)):
+        return value.isoformat()
+    if isinstance(value, timedelta):
+        return str(value.total_seconds())
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return bytes(value).hex()
+    return str(value)
+
+
+def table_checksum(endpoint, conn, table, columns, primary_key, chunk_size):
+    """(行数, 行内容按主键顺序的MD5)"""
+    digest = hashlib.md5()
+    rows_total = 0
+    for rows, _ in iter_chunks(endpoint, conn, table, columns, primary_key, chunk_size):
+        for row in rows:
+            digest.update('\x1f'.join(_normalize(v) for v in row).encode('utf-8'))
+            digest.update(b'\x1e')
+        rows_total += len(rows)
+    return rows_total, digest.hexdigest()
+
+
+# ==================== 复制 ====================
+
+class TableCopier:
+    """表数据复制引擎"""
+
+    def __init__(self, source, target, chunk_size=5000, workers=4, create_schema=True,
+                 truncate=False, log=print):
+        """
+        Args:
+            source / target: Endpoint
+            chunk_size: 每块行数（每块一个目标库事务）
+            workers: 并行复制的表数量
+            create_schema: 目标表不存在时按源库建表语句创建（仅同类型数据库）
+            truncate: 忽略检查点，清空目标表后重新复制
+        """
+        if create_schema and source.dialect != target.dialect:
+            raise CopyError('跨数据库类型复制时请先在目标库建表，并使用 --skip-schema')
+        self.source = source
+        self.target = target
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.create_schema = create_schema
+        self.truncate = truncate
+        self.log = log
+        self._log_lock = threading.Lock()
+
+    def _print(self, message):
+        with self._log_lock:
+            self.log(message)
+
+    # ==================== 检查点 ====================
+
+    def ensure_checkpoint_table(self, conn):
+        cursor = conn.cursor()
+        cursor.execute(f'CREATE TABLE IF NOT EXISTS {CHECKPOINT_TABLE} ('
+                       'table_name VARCHAR(128) PRIMARY KEY, last_key TEXT, rows_copied BIGINT NOT NULL, '
+                       'status VARCHAR(20) NOT NULL, updated_at VARCHAR(32))')
+        conn.commit()
+        cursor.close()
+
+    def load_checkpoints(self):
+        conn = self.target.connect()
+        try:
+            self.ensure_checkpoint_table(conn)
+            cursor = conn.cursor()
+            cursor.execute(f'SELECT table_name, last_key, rows_copied, status FROM {CHECKPOINT_TABLE}')
+            checkpoints = {
+                row[0]: {'last_key': json.loads(row[1]) if row[1] else None, 'rows_copied': row[2], 'status': row[3]}
+                for row in cursor.fetchall()
+            }
+            cursor.close()
+            return checkpoints
+        finally:
+            conn.close()
+
+    def _save_checkpoint(self, cursor, table, last_key, rows_copied, status):
+        p = self.target.placeholder
+        cursor.execute(
+            f'REPLACE INTO {CHECKPOINT_TABLE} (table_name, last_key, rows_copied, status, updated_at) '
+            f'VALUES ({p}, {p}, {p}, {p}, {p})',
+            (table, json.dumps(last_key, default=str) if last_key is not None else None,
+             rows_copied, status, datetime.utcnow().isoformat())
+        )
+
+    # ==================== 单表 ====================
+
+    def copy_table(self, table, checkpoint=None):
+        """
+        复制单个表（从检查点继续）
+
+        Returns:
+            {'table', 'rows', 'resumed_from', 'seconds', 'status'}
+        """
+        started = time.perf_counter()
+        source_conn = self.source.connect(streaming=True)
+        meta_conn = self.source.connect()
+        target_conn = self.target.connect()
+        try:
+            columns, primary_key = self.source.columns(meta_conn, table)
+            self.target.prepare_write_session(target_conn)
+            cursor = target_conn.cursor()
+
+            if self.create_schema:
+                for statement in self.source.create_statements(meta_conn, table):
+                    cursor.execute(statement)
+                target_conn.commit()
+
+            if checkpoint and checkpoint['status'] == 'done' and not self.truncate:
+                return {'table': table, 'rows': checkpoint['rows_copied'], 'resumed_from': checkpoint['rows_copied'],
+                        'seconds': 0.0, 'status': 'skipped'}
+
+            start_key = None
+            rows_copied = 0
+            resumable = bool(primary_key) and checkpoint is not None and not self.truncate
+            if resumable:
+                start_key = checkpoint['last_key']
+                rows_copied = checkpoint['rows_copied']
+                self._print(f"  ↻ {table}: 从检查点继续（已复制 {rows_copied} 行）")
+            else:
+                if self.target.count(target_conn, table):
+                    if not (self.truncate or checkpoint is not None):
+                        raise CopyError(f'目标表 {table} 非空且没有检查点，使用 --truncate 清空后重新复制')
+                    cursor.execute(f'DELETE FROM {self.target.quote(table)}')
+                if not primary_key:
+                    self._print(f"  ⚠️  {table}: 无主键，无法分块续传，整表流式复制")
+            resumed_from = rows_copied
+
+            q = self.target.quote
+            insert_sql = (f"INSERT INTO {q(table)} ({', '.join(q(c) for c in columns)}) "
+                          f"VALUES ({', '.join([self.target.placeholder] * len(columns))})")
+            for rows, last_key in iter_chunks(self.source, source_conn, table, columns, primary_key,
+                                              self.chunk_size, start_key):
+                cursor.executemany(insert_sql, rows)
+                rows_copied += len(rows)
+                if primary_key:
+                    # 数据与检查点在同一事务提交，中断后不会重复或遗漏
+                    self._save_checkpoint(cursor, table, last_key, rows_copied, 'copying')
+                    target_conn.commit()
+
+            self._save_checkpoint(cursor, table, None, rows_copied, 'done')
+            target_conn.commit()
+            cursor.close()
+            return {'table': table, 'rows': rows_copied, 'resumed_from': resumed_from,
+                    'seconds': round(time.perf_counter() - started, 2), 'status': 'copied'}
+        except Exception:
+            target_conn.rollback()
+            raise
+        finally:
+            source_conn.close()
+            meta_conn.close()
+            target_conn.close()
+
+    def verify_table(self, table):
+        """比较行数与校验和"""
+        source_conn = self.source.connect(streaming=True)
+        meta_conn = self.source.connect()
+        target_conn = self.target.connect(streaming=True)
+        try:
+            columns, primary_key = self.source.columns(meta_conn, table)
+            source_rows, source_sum = table_checksum(self.source, source_conn, table, columns, primary_key, self.chunk_size)
+            target_rows, target_sum = table_checksum(self.target, target_conn, table, columns, primary_key, self.chunk_size)
+            return {
+                'table': table,
+                'source_rows': source_rows,
+                'target_rows': target_rows,
+                'checksum_match': source_sum == target_sum,
+                'ok': source_rows == target_rows and source_sum == target_sum,
+            }
+        finally:
+            source_conn.close()
+            meta_conn.close()
+            target_conn.close()
+
+    # ==================== 全部表 ====================
+
+    def resolve_tables(self, include=None, exclude=None):
+        """待复制的表，按估计行数从大到小排列（大表先开始，缩短总耗时）"""
+        conn = self.source.connect()
+        try:
+            tables = self.source.list_tables(conn)
+            if include:
+                missing = set(include) - set(tables)
+                if missing:
+                    raise CopyError(f"源库不存在的表: {', '.join(sorted(missing))}")
+                tables = [t for t in tables if t in include]
+            if exclude:
+                tables = [t for t in tables if t not in exclude]
+            sizes = {t: self.source.estimate_rows(conn, t) for t in tables}
+        finally:
+            conn.close()
+        return sorted(tables, key=lambda t: sizes[t], reverse=True)
+
+    def _run_parallel(self, tables, func):
+        results, errors = [], {}
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='table_copy') as pool:
+            futures = {pool.submit(func, table): table for table in tables}
+            for future in as_completed(futures):
+                table = futures[future]
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    errors[table] = str(e)
+                    self._print(f"  ❌ {table}: {e}")
+        return results, errors
+
+    def copy_all(self, tables):
+        """
+        并行复制
+
+        Returns:
+            (结果列表, {表名: 错误信息})
+        """
+        checkpoints = {} if self.truncate else self.load_checkpoints()
+
+        def run(table):
+            result = self.copy_table(table, checkpoints.get(table))
+            if result['status'] == 'copied':
+                rate = (result['rows'] - result['resumed_from']) / result['seconds'] if result['seconds'] else 0
+                self._print(f"  ✅ {table}: {result['rows']} 行  {result['seconds']}s  ({rate:.0f} 行/秒)")
+            else:
+                self._print(f"  ⏭  {table}: 已完成，跳过")
+            return result
+
+        return self._run_parallel(tables, run)
+
+    def verify_all(self, tables):
+        def run(table):
+            result = self.verify_table(table)
+            icon = '✅' if result['ok'] else '❌'
+            self._print(f"  {icon} {table}: 源 {result['source_rows']} 行 / 目标 {result['target_rows']} 行  "
+                        f"校验和{'一致' if result['checksum_match'] else '不一致'}")
+            return result
+
+        return self._run_parallel(tables, run)
+
+    def create_database(self, charset='utf8mb4', collation='utf8mb4_unicode_ci'):
+        """目标为MySQL时创建数据库（不存在时）"""
+        if self.target.dialect != 'mysql':
+            return
+        conn = self.target.connect(with_database=False)
+        try:
+            cursor = conn.cursor()
+            cursor.execute(f'CREATE DATABASE IF NOT EXISTS {self.target.quote(self.target.url.database)} '
+                           f'CHARACTER SET {charset} COLLATE {collation}')
+            cursor.close()
+        finally:
+            conn.close()
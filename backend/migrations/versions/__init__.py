@@ -0,0 +1,9 @@
+"""
+迁移版本目录
+新增迁移时按 v<四位版本号>_<说明>.py 命名，模块中定义：
+  VERSION       版本号字符串，如 '0003'
+  DESCRIPTION   说明
+  upgrade(ops)  升级（ops 为 migrations.runner.SchemaOps，操作需幂等）
+  downgrade(ops)回滚
+同时在对应模型中声明相同的字段/索引，保证新库 db.create_all() 的结果与迁移后一致
+"""
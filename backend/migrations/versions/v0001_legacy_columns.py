@@ -0,0 +1,32 @@
+"""
+基线：补齐旧的一次性迁移脚本添加的字段
+  - migrate_asset_type.py          categories.asset_type
+  - add_rent_fields.py             fixed_assets 出租字段
+  - add_dispose_fields.py          fixed_assets 租金/售出/处置字段
+  - migrate_add_wechat_fields.py   users 微信字段
+已执行过旧脚本的库只会登记版本
+"""
+VERSION = '0001'
+DESCRIPTION = '补齐旧迁移脚本添加的字段'
+
+
+def upgrade(ops):
+    from models.category import Category
+    from models.fixed_asset import FixedAsset
+    from models.user import User
+
+    ops.add_column(Category.__table__.c.asset_type)
+
+    for name in ('rent_price', 'rent_deposit', 'rent_start_date', 'rent_end_date', 'rent_due_day',
+                 'tenant_name', 'tenant_phone', 'sell_price', 'dispose_date', 'dispose_note'):
+        ops.add_column(FixedAsset.__table__.c[name])
+
+    for name in ('wechat_openid', 'wechat_unionid', 'wechat_nickname', 'wechat_avatar'):
+        ops.add_column(User.__table__.c[name])
+    ops.create_index('users', 'ix_users_wechat_openid', ['wechat_openid'], unique=True)
+    ops.create_index('users', 'ix_users_wechat_unionid', ['wechat_unionid'])
+
+
+def downgrade(ops):
+    # 字段仍由模型使用，回滚只取消版本登记，不删除数据
+    ops.log('    基线字段不删除')
@@ -0,0 +1,29 @@
+"""
+热点查询的复合索引
+  - projects / ai_reports (user_id, created_at)：用户列表按创建时间倒序
+  - asset_incomes (asset_id, status, income_date)：按状态和日期区间汇总收入
+  - maintenance_reminders (user_id, is_active, next_reminder_date)：到期提醒
+  - asset_maintenances (asset_id, status, next_maintenance_date)：待办维护
+执行后可用 `python migrate.py verify` 检查热点查询的执行计划
+"""
+VERSION = '0002'
+DESCRIPTION = '热点查询复合索引'
+
+INDEXES = [
+    ('projects', 'ix_projects_user_created', ['user_id', 'created_at']),
+    ('ai_reports', 'ix_ai_reports_user_created', ['user_id', 'created_at']),
+    ('asset_incomes', 'ix_asset_incomes_asset_status_date', ['asset_id', 'status', 'income_date']),
+    ('maintenance_reminders', 'ix_maintenance_reminders_user_active_next', ['user_id', 'is_active', 'next_reminder_date']),
+    ('asset_maintenances', 'ix_asset_maintenances_asset_status_next', ['asset_id', 'status', 'next_maintenance_date']),
+]
+
+
+def upgrade(ops):
+    for table, name, columns in INDEXES:
+        ops.create_index(table, name, columns)
+
+
+def downgrade(ops):
+    # MySQL 若已用复合索引代替外键列的自动索引，删除时会报 1553，需要先为外键列单独建索引
+    for table, name, _ in reversed(INDEXES):
+        ops.drop_index(table, name)
@@ -0,0 +1,29 @@
+"""
+提醒扫描
+  - notification_outbox：扫描任务生成的待发送通知（dedupe_key 唯一，重复扫描不重复生成）
+  - projects (user_id, end_time)：虚拟资产到期提醒
+  - asset_expenses (user_id, next_due_date)：周期性费用到期提醒
+"""
+VERSION = '0003'
+DESCRIPTION = '通知发件箱与提醒扫描索引'
+
+INDEXES = [
+    ('projects', 'ix_projects_user_end', ['user_id', 'end_time']),
+    ('asset_expenses', 'ix_asset_expenses_user_next_due', ['user_id', 'next_due_date']),
+]
+
+
+def upgrade(ops):
+    from models.notification_outbox import NotificationOutbox
+
+    ops.create_table(NotificationOutbox.__table__)
+    for table, name, columns in INDEXES:
+        ops.create_index(table, name, columns)
+
+
+def downgrade(ops):
+    from models.notification_outbox import NotificationOutbox
+
+    for table, name, _ in reversed(INDEXES):
+        ops.drop_index(table, name)
+    ops.drop_table(NotificationOutbox.__table__)
@@ -0,0 +1,22 @@
+"""
+按用户 JOIN 资产子表
+  - fixed_assets (user_id, status)：收入、维护概览和维护日历改为 JOIN fixed_assets.user_id，
+    不再先取出全部资产拼 IN (asset_ids)；索引含主键，JOIN 时无需回表（SQLite 外键列本身没有索引）
+"""
+VERSION = '0004'
+DESCRIPTION = '资产按用户JOIN索引'
+
+INDEXES = [
+    ('fixed_assets', 'ix_fixed_assets_user_status', ['user_id', 'status']),
+]
+
+
+def upgrade(ops):
+    for table, name, columns in INDEXES:
+        ops.create_index(table, name, columns)
+
+
+def downgrade(ops):
+    # MySQL 若已用该索引代替 user_id 外键的自动索引，删除时会报 1553，需要先为外键列单独建索引
+    for table, name, _ in reversed(INDEXES):
+        ops.drop_index(table, name)
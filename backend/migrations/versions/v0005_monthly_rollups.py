@@ -0,0 +1,28 @@
+"""
+月度收入/费用汇总表
+  - monthly_income_rollup：按（用户、资产、收入类型、月份）汇总已收款收入
+  - monthly_expense_rollup：按（用户、资产、费用类型、月份）汇总资产费用
+建表后在同一事务内从明细填充一次；之后由 ORM 事件增量维护，可用 python rebuild_rollups.py 重建
+"""
+VERSION = '0005'
+DESCRIPTION = '月度收入费用汇总表'
+
+
+def upgrade(ops):
+    from models.monthly_rollup import MonthlyExpenseRollup, MonthlyIncomeRollup
+    from services.rollup_service import RollupRebuilder
+
+    ops.create_table(MonthlyIncomeRollup.__table__)
+    ops.create_table(MonthlyExpenseRollup.__table__)
+    if ops.dry_run:
+        ops.log('    [dry-run] 从收入、费用明细填充月度汇总')
+        return
+    stats = RollupRebuilder(batch_size=2000, connection=ops.conn).run()
+    ops.log(f"    填充月度汇总：收入 {stats['income_rows']} 行，费用 {stats['expense_rows']} 行")
+
+
+def downgrade(ops):
+    from models.monthly_rollup import MonthlyExpenseRollup, MonthlyIncomeRollup
+
+    ops.drop_table(MonthlyExpenseRollup.__table__)
+    ops.drop_table(MonthlyIncomeRollup.__table__)
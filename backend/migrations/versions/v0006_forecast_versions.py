@@ -0,0 +1,18 @@
+"""
+资产预测数据版本表
+  - forecast_versions：按用户记录项目、固定资产、维护记录的写入版本，各worker据此判断进程内的预测缓存是否过期
+"""
+VERSION = '0006'
+DESCRIPTION = '资产预测数据版本表'
+
+
+def upgrade(ops):
+    from models.forecast_version import ForecastVersion
+
+    ops.create_table(ForecastVersion.__table__)
+
+
+def downgrade(ops):
+    from models.forecast_version import ForecastVersion
+
+    ops.drop_table(ForecastVersion.__table__)
@@ -0,0 +1,298 @@
+"""
+智谱AI GLM 本地模拟服务
+模拟 /api/paas/v4/chat/completions 接口，用于在不调用 open.bigmodel.cn 的情况下压测报告工作流
+
+支持：
+  - 可配置的响应延迟（固定延迟 + 随机抖动）
+  - 流式输出（stream=true 时按SSE格式分块返回）
+  - 按比例注入 429 速率限制错误
+  - 按提示词关键字返回预置内容（可通过JSON文件覆盖）
+
+使用方法：
+  python mock_glm_server.py --port 8765 --latency 0.8 --jitter 0.2 --rate-429 0.05
+  然后设置环境变量 ZHIPU_BASE_URL=http://127.0.0.1:8765/api/paas/v4/
+"""
+import argparse
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+CHAT_COMPLETIONS_PATH = '/api/paas/v4/chat/completions'
+
+# 预置内容：按提示词中出现的关键字匹配（先匹配先返回）
+DEFAULT_CANNED_CONTENT = [
+    ('overall_assessment', json.dumps({
+        "overall_assessment": "良好",
+        "asset_balance": "固定资产与虚拟资产配置比例基本合理，未出现明显的过度集中。",
+        "synergy_effect": "两类资产形成一定互补，整体健康度处于中上水平。",
+        "key_strengths": ["资产结构稳定", "折旧节奏可控", "订阅类资产利用率较高"],
+        "key_weaknesses": ["部分资产收益偏低", "存在闲置设备", "虚拟资产续费集中"],
+        "risk_alerts": ["有项目即将过期但剩余价值较高"],
+        "optimization_suggestions": ["清理闲置资产", "错峰续费订阅服务", "提升出租资产收益"]
+    }, ensure_ascii=False)),
+    ('executive_summary', json.dumps({
+        "executive_summary": "本期资产整体运行平稳，固定资产折旧节奏正常，虚拟资产利用率较高，建议关注即将过期项目并优化闲置资产。",
+        "overall_rating": "B",
+        "severity_level": "中",
+        "key_findings": ["资产总值稳定", "折旧率处于合理区间", "虚拟资产利用率较高", "存在闲置资产", "部分项目即将过期"],
+        "actionable_insights": ["闲置资产可考虑出租", "续费前评估使用频率", "关注高价值资产维护"],
+        "priority_actions": ["本周内处理即将过期的项目", "本月内评估闲置资产处置方案", "下季度复盘订阅服务"],
+        "risk_level": "中"
+    }, ensure_ascii=False)),
+]
+
+DEFAULT_FALLBACK_CONTENT = '本期资产运行平稳，建议持续关注资产利用率与到期情况。'
+
+
+class MockGlmState:
+    """模拟服务运行参数与统计"""
+
+    def __init__(self, latency=0.5, jitter=0.0, rate_429=0.0, stream_chunk_size=16,
+                 stream_chunk_delay=0.01, canned_content=None, fallback_content=None, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_429 = rate_429
+        self.stream_chunk_size = stream_chunk_size
+        self.stream_chunk_delay = stream_chunk_delay
+        self.canned_content = canned_content or DEFAULT_CANNED_CONTENT
+        self.fallback_content = fallback_content or DEFAULT_FALLBACK_CONTENT
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {'requests': 0, 'completed': 0, 'rate_limited': 0, 'streamed': 0}
+
+    def incr(self, key):
+        with self.lock:
+            self.stats[key] += 1
+
+    def should_rate_limit(self):
+        with self.lock:
+            return self.rate_429 > 0 and self.random.random() < self.rate_429
+
+    def next_delay(self):
+        with self.lock:
+            jitter = self.random.uniform(-self.jitter, self.jitter) if self.jitter else 0
+        return max(0.0, self.latency + jitter)
+
+    def pick_content(self, prompt):
+        for keyword, content in self.canned_content:
+            if keyword in prompt:
+                return content
+        return self.fallback_content
+
+
+def load_canned_content(path):
+    """
+    从JSON文件加载预置内容
+
+    文件格式：{"关键字": "返回内容" 或 JSON对象, ...}，键 "*" 表示默认内容
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        raw = json.load(f)
+
+    fallback = None
+    canned = []
+    for keyword, content in raw.items():
+        if not isinstance(content, str):
+            content = json.dumps(content, ensure_ascii=False)
+        if keyword == '*':
+            fallback = content
+        else:
+            canned.append((keyword, content))
+    return canned, fallback
+
+
+class MockGlmHandler(BaseHTTPRequestHandler):
+    """chat/completions 请求处理"""
+
+    server_version = 'MockGLM/1.0'
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        # 压测时关闭默认访问日志
+        pass
+
+    @property
+    def state(self):
+        return self.server.mock_state
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == '/stats':
+            with self.state.lock:
+                stats = dict(self.state.stats)
+            return self._send_json(200, stats)
+        self._send_json(404, {'error': {'code': '404', 'message': 'Not Found'}})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        raw_body = self.rfile.read(length) if length else b''
+
+        if self.path.rstrip('/') != CHAT_COMPLETIONS_PATH:
+            return self._send_json(404, {'error': {'code': '404', 'message': 'Not Found'}})
+
+        self.state.incr('requests')
+
+        if not self.headers.get('Authorization', '').startswith('Bearer '):
+            return self._send_json(401, {'error': {'code': '1000', 'message': '身份验证失败'}})
+
+        try:
+            payload = json.loads(raw_body or b'{}')
+        except ValueError:
+            return self._send_json(400, {'error': {'code': '1210', 'message': '请求体不是合法的JSON'}})
+
+        if self.state.should_rate_limit():
+            self.state.incr('rate_limited')
+            return self._send_json(429, {'error': {'code': '1302', 'message': '您当前使用该API的并发数过高'}})
+
+        messages = payload.get('messages') or []
+        prompt = '\n'.join(str(m.get('content', '')) for m in messages if isinstance(m, dict))
+        content = self.state.pick_content(prompt)
+        model = payload.get('model', 'glm-4-flash')
+        completion_id = f'mock-{uuid.uuid4().hex[:16]}'
+
+        time.sleep(self.state.next_delay())
+
+        if payload.get('stream'):
+            self._stream_response(completion_id, model, content)
+            self.state.incr('streamed')
+        else:
+            self._send_json(200, {
+                'id': completion_id,
+                'created': int(time.time()),
+                'model': model,
+                'choices': [{
+                    'index': 0,
+                    'finish_reason': 'stop',
+                    'message': {'role': 'assistant', 'content': content}
+                }],
+                'usage': {
+                    'prompt_tokens': len(prompt),
+                    'completion_tokens': len(content),
+                    'total_tokens': len(prompt) + len(content)
+                }
+            })
+        self.state.incr('completed')
+
+    def _stream_response(self, completion_id, model, content):
+        """按SSE格式分块返回"""
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream; charset=utf-8')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+
+        size = max(1, self.state.stream_chunk_size)
+        for start in range(0, len(content), size):
+            chunk = {
+                'id': completion_id,
+                'created': int(time.time()),
+                'model': model,
+                'choices': [{'index': 0, 'delta': {'role': 'assistant', 'content': content[start:start + size]}}]
+            }
+            self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode('utf-8'))
+            self.wfile.flush()
+            if self.state.stream_chunk_delay:
+                time.sleep(self.state.stream_chunk_delay)
+
+        final = {
+            'id': completion_id,
+            'created': int(time.time()),
+            'model': model,
+            'choices': [{'index': 0, 'finish_reason': 'stop', 'delta': {'role': 'assistant', 'content': ''}}]
+        }
+        self.wfile.write(f"data: {json.dumps(final, ensure_ascii=False)}\n\n".encode('utf-8'))
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+        self.close_connection = True
+
+
+def create_mock_server(host='127.0.0.1', port=8765, **state_options):
+    """
+    创建模拟服务（未启动）
+
+    Returns:
+        ThreadingHTTPServer实例，server.mock_state 为运行参数与统计
+    """
+    server = ThreadingHTTPServer((host, port), MockGlmHandler)
+    server.daemon_threads = True
+    server.mock_state = MockGlmState(**state_options)
+    return server
+
+
+def start_mock_server_in_thread(host='127.0.0.1', port=0, **state_options):
+    """
+    在后台线程启动模拟服务（port=0 时自动分配端口）
+
+    Returns:
+        (server, base_url)
+    """
+    server = create_mock_server(host, port, **state_options)
+    thread = threading.Thread(target=server.serve_forever, name='mock_glm', daemon=True)
+    thread.start()
+    bound_host, bound_port = server.server_address[:2]
+    return server, f'http://{bound_host}:{bound_port}/api/paas/v4/'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='智谱AI GLM 本地模拟服务')
+    parser.add_argument('--host', default=os.getenv('MOCK_GLM_HOST', '127.0.0.1'))
+    parser.add_argument('--port', type=int, default=int(os.getenv('MOCK_GLM_PORT', 8765)))
+    parser.add_argument('--latency', type=float, default=float(os.getenv('MOCK_GLM_LATENCY', 0.5)),
+                        help='每次响应的基础延迟（秒）')
+    parser.add_argument('--jitter', type=float, default=float(os.getenv('MOCK_GLM_JITTER', 0)),
+                        help='延迟随机抖动范围（秒）')
+    parser.add_argument('--rate-429', type=float, default=float(os.getenv('MOCK_GLM_RATE_429', 0)),
+                        help='返回429的概率（0~1）')
+    parser.add_argument('--chunk-size', type=int, default=16, help='流式输出每块字符数')
+    parser.add_argument('--chunk-delay', type=float, default=0.01, help='流式输出每块间隔（秒）')
+    parser.add_argument('--content-file', help='预置内容JSON文件（关键字 -> 内容，"*" 为默认）')
+    parser.add_argument('--seed', type=int, help='随机种子（用于复现429注入）')
+    args = parser.parse_args()
+
+    canned, fallback = (None, None)
+    if args.content_file:
+        canned, fallback = load_canned_content(args.content_file)
+
+    server = create_mock_server(
+        args.host, args.port,
+        latency=args.latency,
+        jitter=args.jitter,
+        rate_429=args.rate_429,
+        stream_chunk_size=args.chunk_size,
+        stream_chunk_delay=args.chunk_delay,
+        canned_content=canned,
+        fallback_content=fallback,
+        seed=args.seed
+    )
+
+    print("=" * 60)
+    print("🤖 智谱AI GLM 模拟服务")
+    print(f"   地址: http://{args.host}:{args.port}{CHAT_COMPLETIONS_PATH}")
+    print(f"   延迟: {args.latency}s ± {args.jitter}s")
+    print(f"   429注入比例: {args.rate_429:.0%}")
+    print(f"   设置 ZHIPU_BASE_URL=http://{args.host}:{args.port}/api/paas/v4/ 即可接入")
+    print("=" * 60)
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 模拟服务已停止")
+        print(f"   统计: {server.mock_state.stats}")
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,212 @@
+"""
+微信公众号接口本地模拟服务
+模拟 access_token、jsapi_ticket、网页授权和用户信息接口，用于在不访问 api.weixin.qq.com 的情况下
+验证凭证缓存（每个进程是否重复换取凭证）和登录流程
+
+支持：
+  - /cgi-bin/token                 校验 appid/secret，按 --expires-in 签发 access_token
+  - /cgi-bin/ticket/getticket      校验 access_token 是否有效（无效返回40001，过期返回42001）
+  - /sns/oauth2/access_token       任意 code 换取 openid
+  - /sns/userinfo                  返回模拟用户信息
+  - /stats                         各接口调用次数（用于断言凭证只被换取一次）
+
+使用方法：
+  python mock_wechat_server.py --port 8766 --expires-in 7200
+  然后设置环境变量 WECHAT_API_BASE=http://127.0.0.1:8766
+"""
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+
+class MockWechatState:
+    """模拟服务运行参数、已签发凭证与统计"""
+
+    def __init__(self, appid='wx_mock_appid', secret='mock_secret', expires_in=7200, latency=0.0):
+        self.appid = appid
+        self.secret = secret
+        self.expires_in = expires_in
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.access_tokens = {}  # token -> 过期时间戳
+        self.stats = {'token': 0, 'ticket': 0, 'oauth': 0, 'userinfo': 0, 'invalid_token': 0}
+
+    def incr(self, key):
+        with self.lock:
+            self.stats[key] += 1
+
+    def issue_access_token(self):
+        token = f'mock_at_{uuid.uuid4().hex}'
+        with self.lock:
+            self.access_tokens[token] = time.time() + self.expires_in
+        return token
+
+    def check_access_token(self, token):
+        """返回错误码：0有效，40001无效，42001过期"""
+        with self.lock:
+            expires_at = self.access_tokens.get(token)
+        if expires_at is None:
+            return 40001
+        if expires_at < time.time():
+            return 42001
+        return 0
+
+    def revoke_all(self):
+        """作废全部已签发的access_token（模拟其他系统重新获取导致旧凭证失效）"""
+        with self.lock:
+            self.access_tokens.clear()
+
+
+class MockWechatHandler(BaseHTTPRequestHandler):
+    """微信接口请求处理"""
+
+    server_version = 'MockWechat/1.0'
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def state(self):
+        return self.server.mock_state
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+
+        if self.state.latency:
+            time.sleep(self.state.latency)
+
+        if parsed.path == '/stats':
+            with self.state.lock:
+                return self._send_json(dict(self.state.stats))
+
+        if parsed.path == '/cgi-bin/token':
+            self.state.incr('token')
+            if params.get('appid') != self.state.appid or params.get('secret') != self.state.secret:
+                return self._send_json({'errcode': 40125, 'errmsg': 'invalid appsecret'})
+            return self._send_json({
+                'access_token': self.state.issue_access_token(),
+                'expires_in': self.state.expires_in
+            })
+
+        if parsed.path == '/cgi-bin/ticket/getticket':
+            self.state.incr('ticket')
+            errcode = self.state.check_access_token(params.get('access_token'))
+            if errcode:
+                self.state.incr('invalid_token')
+                return self._send_json({'errcode': errcode, 'errmsg': 'invalid credential'})
+            return self._send_json({
+                'errcode': 0,
+                'errmsg': 'ok',
+                'ticket': f'mock_ticket_{uuid.uuid4().hex}',
+                'expires_in': self.state.expires_in
+            })
+
+        if parsed.path == '/sns/oauth2/access_token':
+            self.state.incr('oauth')
+            code = params.get('code', '')
+            if not code:
+                return self._send_json({'errcode': 40029, 'errmsg': 'invalid code'})
+            openid = 'mock_' + hashlib.md5(code.encode('utf-8')).hexdigest()[:20]
+            return self._send_json({
+                'access_token': f'mock_web_at_{uuid.uuid4().hex}',
+                'expires_in': 7200,
+                'refresh_token': f'mock_rt_{uuid.uuid4().hex}',
+                'openid': openid,
+                'scope': 'snsapi_userinfo'
+            })
+
+        if parsed.path == '/sns/userinfo':
+            self.state.incr('userinfo')
+            openid = params.get('openid', '')
+            return self._send_json({
+                'openid': openid,
+                'nickname': f'模拟用户{openid[-4:]}',
+                'sex': 0,
+                'headimgurl': '',
+                'privilege': []
+            })
+
+        self._send_json({'errcode': 404, 'errmsg': 'not found'}, status=404)
+
+    def do_POST(self):
+        parsed = urlparse(self.path)
+        if parsed.path == '/revoke':
+            self.state.revoke_all()
+            return self._send_json({'errcode': 0, 'errmsg': 'ok'})
+        self._send_json({'errcode': 404, 'errmsg': 'not found'}, status=404)
+
+
+def create_mock_server(host='127.0.0.1', port=8766, **state_options):
+    """创建模拟服务（未启动），server.mock_state 为运行参数与统计"""
+    server = ThreadingHTTPServer((host, port), MockWechatHandler)
+    server.daemon_threads = True
+    server.mock_state = MockWechatState(**state_options)
+    return server
+
+
+def start_mock_server_in_thread(host='127.0.0.1', port=0, **state_options):
+    """
+    在后台线程启动模拟服务（port=0 时自动分配端口）
+
+    Returns:
+        (server, base_url)
+    """
+    server = create_mock_server(host, port, **state_options)
+    thread = threading.Thread(target=server.serve_forever, name='mock_wechat', daemon=True)
+    thread.start()
+    bound_host, bound_port = server.server_address[:2]
+    return server, f'http://{bound_host}:{bound_port}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='微信公众号接口本地模拟服务')
+    parser.add_argument('--host', default=os.getenv('MOCK_WECHAT_HOST', '127.0.0.1'))
+    parser.add_argument('--port', type=int, default=int(os.getenv('MOCK_WECHAT_PORT', 8766)))
+    parser.add_argument('--appid', default=os.getenv('WECHAT_APPID') or 'wx_mock_appid')
+    parser.add_argument('--secret', default=os.getenv('WECHAT_SECRET') or 'mock_secret')
+    parser.add_argument('--expires-in', type=int, default=7200, help='凭证有效期（秒）')
+    parser.add_argument('--latency', type=float, default=0.0, help='每次响应的延迟（秒）')
+    args = parser.parse_args()
+
+    server = create_mock_server(
+        args.host, args.port,
+        appid=args.appid,
+        secret=args.secret,
+        expires_in=args.expires_in,
+        latency=args.latency
+    )
+
+    print("=" * 60)
+    print("💬 微信公众号接口模拟服务")
+    print(f"   地址: http://{args.host}:{args.port}")
+    print(f"   AppID: {args.appid}  凭证有效期: {args.expires_in}s")
+    print(f"   设置 WECHAT_API_BASE=http://{args.host}:{args.port} 即可接入")
+    print("=" * 60)
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 模拟服务已停止")
+        print(f"   统计: {server.mock_state.stats}")
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
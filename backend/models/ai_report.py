@@ -4,6 +4,9 @@ from datetime import datetime
 class AIReport(db.Model):
     """AI智能报告模型"""
     __tablename__ = 'ai_reports'
+    __table_args__ = (
+        db.Index('ix_ai_reports_user_created', 'user_id', 'created_at'),  # 用户报告列表按创建时间排序
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -4,6 +4,9 @@ from datetime import datetime
 class AssetExpense(db.Model):
     """资产费用记录"""
     __tablename__ = 'asset_expenses'
+    __table_args__ = (
+        db.Index('ix_asset_expenses_user_next_due', 'user_id', 'next_due_date'),  # 周期性费用到期提醒扫描
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     asset_id = db.Column(db.Integer, db.ForeignKey('fixed_assets.id'), nullable=False)
@@ -5,6 +5,9 @@ from sqlalchemy import func
 class AssetIncome(db.Model):
     """资产收入记录模型"""
     __tablename__ = 'asset_incomes'
+    __table_args__ = (
+        db.Index('ix_asset_incomes_asset_status_date', 'asset_id', 'status', 'income_date'),  # 按状态、日期区间汇总收入
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     asset_id = db.Column(db.Integer, db.ForeignKey('fixed_assets.id'), nullable=False)
@@ -129,61 +132,42 @@ class AssetIncome(db.Model):
     
     @classmethod
     def get_asset_total_income(cls, asset_id):
-        """获取资产总收入"""
-        result = db.session.query(
-            func.sum(cls.net_amount).label('total_income'),
-            func.count(cls.id).label('income_count')
-        ).filter_by(asset_id=asset_id, status='received').first()
+        """获取资产总收入（读取月度汇总表）"""
+        from models.monthly_rollup import MonthlyIncomeRollup
+        totals = MonthlyIncomeRollup.get_type_totals(asset_id=asset_id)
+        total_income = sum(row.net_total for row in totals if row.net_total is not None)
         
         return {
-            'total_income': float(result.total_income) if result and result.total_income else 0,
-            'income_count': result.income_count if result else 0
+            'total_income': float(total_income) if total_income else 0,
+            'income_count': int(sum(row.count or 0 for row in totals))
         }
     
     @classmethod
     def get_income_by_type(cls, asset_id):
-        """按类型获取收入统计"""
-        results = db.session.query(
-            cls.income_type,
-            func.sum(cls.net_amount).label('total_amount'),
-            func.count(cls.id).label('count')
-        ).filter_by(asset_id=asset_id, status='received').group_by(cls.income_type).all()
+        """按类型获取收入统计（读取月度汇总表）"""
+        from models.monthly_rollup import MonthlyIncomeRollup
+        results = MonthlyIncomeRollup.get_type_totals(asset_id=asset_id)
         
         return [
             {
                 'income_type': result.income_type,
-                'income_type_text': AssetIncome().get_income_type_text_static(result.income_type),
-                'total_amount': float(result.total_amount) if result.total_amount else 0,
-                'count': result.count or 0
+                'income_type_text': cls.get_income_type_text_static(result.income_type),
+                'total_amount': float(result.net_total) if result.net_total else 0,
+                'count': int(result.count or 0)
             }
             for result in results
         ]
     
     @classmethod
     def get_monthly_income_trend(cls, asset_id, months=12):
-        """获取月度收入趋势"""
-        from sqlalchemy import extract
-        from datetime import datetime, timedelta
+        """获取月度收入趋势（读取月度汇总表，统计含本月在内最近 months 个自然月）"""
+        from models.monthly_rollup import MonthlyIncomeRollup
         
-        start_date = datetime.now() - timedelta(days=months*30)
-        
-        results = db.session.query(
-            extract('year', cls.income_date).label('year'),
-            extract('month', cls.income_date).label('month'),
-            func.sum(cls.net_amount).label('total_amount')
-        ).filter(
-            cls.asset_id == asset_id,
-            cls.status == 'received',
-            cls.income_date >= start_date.date()
-        ).group_by(
-            extract('year', cls.income_date),
-            extract('month', cls.income_date)
-        ).order_by('year', 'month').all()
+        today = date.today()
+        index = today.year * 12 + today.month - 1 - (months - 1)
+        start_date = date(index // 12, index % 12 + 1, 1)
         
         return [
-            {
-                'period': f"{int(result.year)}-{int(result.month):02d}",
-                'amount': float(result.total_amount) if result.total_amount else 0
-            }
-            for result in results
-        ]
\ No newline at end of file
+            {'period': item['period'], 'amount': item['amount']}
+            for item in MonthlyIncomeRollup.get_monthly_trend(asset_id=asset_id, since=start_date)
+        ]
@@ -1,10 +1,15 @@
 from database import db
 from datetime import datetime, date, timedelta
 from sqlalchemy import func
+from sqlalchemy.orm import contains_eager
+from utils.forecast_cache import track_forecast_owner
 
 class AssetMaintenance(db.Model):
     """资产维护记录模型"""
     __tablename__ = 'asset_maintenances'
+    __table_args__ = (
+        db.Index('ix_asset_maintenances_asset_status_next', 'asset_id', 'status', 'next_maintenance_date'),  # 待办维护查询
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     asset_id = db.Column(db.Integer, db.ForeignKey('fixed_assets.id'), nullable=False)
@@ -136,20 +141,51 @@ class AssetMaintenance(db.Model):
         }
     
     @classmethod
-    def get_overdue_maintenances(cls, user_assets_ids):
+    def user_scoped(cls, user_id):
+        """
+        某用户全部资产的维护记录查询（JOIN fixed_assets.user_id）
+        同时预加载资产名称，to_dict() 不再逐条懒加载资产
+        """
+        from models.fixed_asset import FixedAsset
+        return FixedAsset.owned_by(cls.query, cls, user_id).options(
+            contains_eager(cls.asset).load_only(FixedAsset.id, FixedAsset.name)
+        )
+    
+    @classmethod
+    def get_user_maintenance_totals(cls, user_id):
+        """获取用户所有资产已完成维护的次数和总费用"""
+        from models.fixed_asset import FixedAsset
+        query = db.session.query(
+            func.count(cls.id).label('total_count'),
+            func.sum(cls.cost).label('total_cost')
+        )
+        return FixedAsset.owned_by(query, cls, user_id).filter(cls.status == 'completed').first()
+    
+    @classmethod
+    def get_overdue_maintenances(cls, user_id):
         """获取用户所有资产的过期维护"""
-        return cls.query.filter(
-            cls.asset_id.in_(user_assets_ids),
+        return cls.user_scoped(user_id).filter(
             cls.status.in_(['planned', 'in_progress']),
             cls.next_maintenance_date.isnot(None),
             cls.next_maintenance_date < date.today()
         ).order_by(cls.next_maintenance_date).all()
     
     @classmethod
-    def get_maintenance_calendar(cls, user_assets_ids, start_date, end_date):
+    def get_upcoming_maintenances(cls, user_id, days=30):
+        """获取用户所有资产即将到期的维护（明天起 days 天内）"""
+        return cls.user_scoped(user_id).filter(
+            cls.status.in_(['planned', 'in_progress']),
+            cls.next_maintenance_date.isnot(None),
+            cls.next_maintenance_date.between(
+                date.today() + timedelta(days=1),
+                date.today() + timedelta(days=days)
+            )
+        ).order_by(cls.next_maintenance_date).all()
+    
+    @classmethod
+    def get_maintenance_calendar(cls, user_id, start_date, end_date):
         """获取维护日历"""
-        maintenances = cls.query.filter(
-            cls.asset_id.in_(user_assets_ids),
+        maintenances = cls.user_scoped(user_id).filter(
             cls.next_maintenance_date.between(start_date, end_date)
         ).order_by(cls.next_maintenance_date).all()
         
@@ -166,6 +202,9 @@ class AssetMaintenance(db.Model):
 class MaintenanceReminder(db.Model):
     """维护提醒设置模型"""
     __tablename__ = 'maintenance_reminders'
+    __table_args__ = (
+        db.Index('ix_maintenance_reminders_user_active_next', 'user_id', 'is_active', 'next_reminder_date'),  # 到期提醒查询
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     asset_id = db.Column(db.Integer, db.ForeignKey('fixed_assets.id'), nullable=False)
@@ -229,4 +268,17 @@ class MaintenanceReminder(db.Model):
             cls.user_id == user_id,
             cls.is_active == True,
             cls.next_reminder_date <= date.today()
-        ).order_by(cls.next_reminder_date).all()
\ No newline at end of file
+        ).order_by(cls.next_reminder_date).all()
+
+
+def _maintenance_owner(connection, target):
+    """维护记录所属用户（已加载资产时直接读取，否则按资产ID查询）"""
+    asset = target.__dict__.get('asset')
+    if asset is not None and asset.id == target.asset_id:
+        return asset.user_id
+    from models.fixed_asset import FixedAsset
+    return connection.execute(db.select(FixedAsset.user_id).where(FixedAsset.id == target.asset_id)).scalar()
+
+
+# 写入后清除该用户的资产预测缓存
+track_forecast_owner(AssetMaintenance, _maintenance_owner)
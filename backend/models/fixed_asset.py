@@ -1,9 +1,13 @@
 from database import db
 from datetime import datetime, timedelta
 from decimal import Decimal
+from utils.forecast_cache import track_forecast_owner
 
 class FixedAsset(db.Model):
     __tablename__ = 'fixed_assets'
+    __table_args__ = (
+        db.Index('ix_fixed_assets_user_status', 'user_id', 'status'),  # 按用户（及状态）JOIN 子表，索引已含主键
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     asset_code = db.Column(db.String(50), unique=True, nullable=False)  # 资产编号
@@ -193,5 +197,17 @@ class FixedAsset(db.Model):
         
         return data
     
+    @classmethod
+    def owned_by(cls, query, model, user_id):
+        """
+        将资产子表（收入、维护等，需有 asset_id 列）的查询限定为某用户的资产
+        直接 JOIN fixed_assets.user_id，不必先取出全部资产再拼接 IN (asset_ids)
+        """
+        return query.select_from(model).join(cls, cls.id == model.asset_id).filter(cls.user_id == user_id)
+    
     def __repr__(self):
-        return f'<FixedAsset {self.asset_code}: {self.name}>'
\ No newline at end of file
+        return f'<FixedAsset {self.asset_code}: {self.name}>'
+
+
+# 写入后清除该用户的资产预测缓存
+track_forecast_owner(FixedAsset)
@@ -0,0 +1,69 @@
+"""
+资产预测数据版本
+每个用户一行版本号，写入项目、固定资产、维护记录时在同一事务内加1；各worker使用进程内缓存的
+预测数据前先读取版本号（主键查询），版本变化即重新加载，写入提交后所有worker立即生效。
+user_id 为 0 的行是全局版本（清空数据库等批量操作后加1，所有用户的缓存一起失效）
+"""
+from datetime import datetime
+
+from sqlalchemy import select
+
+from database import db
+
+GLOBAL_VERSION_ID = 0
+
+
+class ForecastVersion(db.Model):
+    """用户预测数据版本"""
+    __tablename__ = 'forecast_versions'
+
+    # 派生数据，不建外键：删除用户不受版本行约束
+    user_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+def bump_versions(connection, user_ids):
+    """
+    版本号加1（不存在则插入）
+    MySQL 用 INSERT ... ON DUPLICATE KEY UPDATE，SQLite 用 ON CONFLICT DO UPDATE，并发写同一行也不会冲突
+
+    Args:
+        connection: 与数据写入同一事务的连接
+        user_ids: 用户ID列表（GLOBAL_VERSION_ID 为全局版本）
+    """
+    rows = [{'user_id': user_id, 'version': 1, 'updated_at': datetime.utcnow()} for user_id in sorted(set(user_ids))]
+    if not rows:
+        return
+    table = ForecastVersion.__table__
+
+    dialect = connection.dialect.name
+    if dialect in ('mysql', 'sqlite'):
+        if dialect == 'mysql':
+            from sqlalchemy.dialects.mysql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        stmt = dialect_insert(table).values(rows)
+        incoming = stmt.inserted if dialect == 'mysql' else stmt.excluded
+        changes = {'version': table.c.version + 1, 'updated_at': incoming.updated_at}
+        if dialect == 'mysql':
+            stmt = stmt.on_duplicate_key_update(changes)
+        else:
+            stmt = stmt.on_conflict_do_update(index_elements=['user_id'], set_=changes)
+        connection.execute(stmt)
+        return
+
+    for row in rows:
+        result = connection.execute(table.update().where(table.c.user_id == row['user_id']).values(
+            version=table.c.version + 1, updated_at=row['updated_at']))
+        if result.rowcount == 0:
+            connection.execute(table.insert().values(row))
+
+
+def read_version(user_id):
+    """用户当前的数据版本：(全局版本, 用户版本)，没有记录时为 0"""
+    rows = db.session.execute(select(ForecastVersion.user_id, ForecastVersion.version).where(
+        ForecastVersion.user_id.in_((GLOBAL_VERSION_ID, user_id))
+    )).all()
+    versions = dict(rows)
+    return versions.get(GLOBAL_VERSION_ID, 0), versions.get(user_id, 0)
@@ -0,0 +1,337 @@
+"""
+月度收入/费用汇总表
+按（用户、资产、类型、月份）预先汇总已收款收入和资产费用，趋势和汇总接口直接读取，
+不必每次对明细行按 extract(year)/extract(month) 分组
+
+维护方式：
+  - ORM 插入、修改、删除 AssetIncome / AssetExpense 时由本模块的事件监听增量更新（同一事务内；
+    删除在 before_delete 中处理，此时字段值仍可读取）
+  - 绕过 ORM 的批量写入（批量导入、合成数据）调用 apply_income_rows / apply_expense_rows，
+    或事后执行 python rebuild_rollups.py 重建
+  - 汇总行只增减不删除，计数为 0 的行读取时忽略，重建时清理
+"""
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal, ROUND_HALF_UP
+
+from sqlalchemy import event, func, select
+from sqlalchemy.orm.attributes import get_history
+
+from database import db
+from models.asset_expense import AssetExpense
+from models.asset_income import AssetIncome
+from models.fixed_asset import FixedAsset
+
+
+class MonthlyIncomeRollup(db.Model):
+    """月度收入汇总（只统计已收款 received 的收入）"""
+    __tablename__ = 'monthly_income_rollup'
+    __table_args__ = (
+        db.UniqueConstraint('asset_id', 'income_type', 'month_start', 'user_id', name='uq_monthly_income_rollup_key'),  # 兼作单资产查询索引
+        db.Index('ix_monthly_income_rollup_user_month', 'user_id', 'month_start'),  # 用户月度趋势
+    )
+
+    # 派生数据，不建外键：资产、用户删除不受汇总行约束
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False)
+    asset_id = db.Column(db.Integer, nullable=False)
+    income_type = db.Column(db.String(50), nullable=False)
+    month_start = db.Column(db.Date, nullable=False)  # 月份第一天
+    record_count = db.Column(db.Integer, nullable=False, default=0)  # 收入笔数
+    amount_total = db.Column(db.Numeric(18, 2), nullable=False, default=0)  # 收入金额合计
+    net_total = db.Column(db.Numeric(18, 2), nullable=False, default=0)  # 净收入合计
+    cost_total = db.Column(db.Numeric(18, 2), nullable=False, default=0)  # 成本合计
+    tax_total = db.Column(db.Numeric(18, 2), nullable=False, default=0)  # 税费合计
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    SUM_COLUMNS = ('record_count', 'amount_total', 'net_total', 'cost_total', 'tax_total')
+
+    @classmethod
+    def scoped(cls, user_id=None, asset_id=None, since=None):
+        """某用户或某资产（可限定起始月份）的有效汇总行过滤条件"""
+        conditions = [cls.record_count > 0]
+        if user_id is not None:
+            conditions.append(cls.user_id == user_id)
+        if asset_id is not None:
+            conditions.append(cls.asset_id == asset_id)
+        if since is not None:
+            conditions.append(cls.month_start >= since.replace(day=1))
+        return conditions
+
+    @classmethod
+    def get_monthly_trend(cls, user_id=None, asset_id=None, since=None):
+        """
+        月度净收入趋势
+
+        Args:
+            since: 起始日期（按整月计，含该日期所在月）
+
+        Returns:
+            [{'period': 'YYYY-MM', 'amount', 'count'}]，按月份升序
+        """
+        rows = db.session.query(
+            cls.month_start,
+            func.sum(cls.net_total).label('total_amount'),
+            func.sum(cls.record_count).label('count')
+        ).filter(*cls.scoped(user_id, asset_id, since)).group_by(cls.month_start).order_by(cls.month_start).all()
+        return [
+            {
+                'period': row.month_start.strftime('%Y-%m'),
+                'amount': float(row.total_amount) if row.total_amount else 0,
+                'count': int(row.count or 0)
+            }
+            for row in rows
+        ]
+
+    @classmethod
+    def get_type_totals(cls, user_id=None, asset_id=None):
+        """按收入类型汇总：[(income_type, count, amount, net, cost, tax)]"""
+        return db.session.query(
+            cls.income_type,
+            func.sum(cls.record_count).label('count'),
+            func.sum(cls.amount_total).label('amount_total'),
+            func.sum(cls.net_total).label('net_total'),
+            func.sum(cls.cost_total).label('cost_total'),
+            func.sum(cls.tax_total).label('tax_total')
+        ).filter(*cls.scoped(user_id, asset_id)).group_by(cls.income_type).all()
+
+    @classmethod
+    def get_asset_totals(cls, user_id):
+        """按资产汇总净收入和笔数：{asset_id: (net_total, count)}"""
+        rows = db.session.query(
+            cls.asset_id,
+            func.sum(cls.net_total).label('net_total'),
+            func.sum(cls.record_count).label('count')
+        ).filter(*cls.scoped(user_id)).group_by(cls.asset_id).all()
+        return {row.asset_id: (row.net_total, int(row.count or 0)) for row in rows}
+
+
+class MonthlyExpenseRollup(db.Model):
+    """月度资产费用汇总"""
+    __tablename__ = 'monthly_expense_rollup'
+    __table_args__ = (
+        db.UniqueConstraint('asset_id', 'expense_type', 'month_start', 'user_id', name='uq_monthly_expense_rollup_key'),  # 兼作单资产查询索引
+        db.Index('ix_monthly_expense_rollup_user_month', 'user_id', 'month_start'),  # 用户月度趋势
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False)
+    asset_id = db.Column(db.Integer, nullable=False)
+    expense_type = db.Column(db.String(50), nullable=False)
+    month_start = db.Column(db.Date, nullable=False)  # 月份第一天
+    record_count = db.Column(db.Integer, nullable=False, default=0)  # 费用笔数
+    amount_total = db.Column(db.Numeric(18, 2), nullable=False, default=0)  # 费用金额合计
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    SUM_COLUMNS = ('record_count', 'amount_total')
+
+    @classmethod
+    def get_asset_months(cls, asset_id, user_id):
+        """某资产每月、每类型的费用：[(month_start, expense_type, record_count, amount_total)]"""
+        return db.session.query(
+            cls.month_start, cls.expense_type, cls.record_count, cls.amount_total
+        ).filter(
+            cls.asset_id == asset_id,
+            cls.user_id == user_id,
+            cls.record_count > 0
+        ).order_by(cls.month_start).all()
+
+
+# ==================== 增量更新 ====================
+
+INCOME_KEY = ('user_id', 'asset_id', 'income_type', 'month_start')
+EXPENSE_KEY = ('user_id', 'asset_id', 'expense_type', 'month_start')
+UPSERT_CHUNK_SIZE = 500  # 多行 INSERT 每条语句的行数（SQLite 绑定参数个数有上限）
+
+
+def _decimal(value):
+    """金额统一转为两位小数的 Decimal（ORM 对象上可能是 float，如 calculate_net_amount 的结果）"""
+    if value is None:
+        return Decimal('0')
+    return Decimal(str(value)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+def _income_contribution(values):
+    """收入行对汇总的贡献：(key, {列: 增量})；未收款的收入不计入"""
+    if values.get('status') != 'received' or not values.get('user_id') or not values.get('income_date'):
+        return None
+    key = (values['user_id'], values['asset_id'], values['income_type'], values['income_date'].replace(day=1))
+    return key, {
+        'record_count': 1,
+        'amount_total': _decimal(values.get('amount')),
+        'net_total': _decimal(values.get('net_amount')),
+        'cost_total': _decimal(values.get('cost')),
+        'tax_total': _decimal(values.get('tax_amount')),
+    }
+
+
+def _expense_contribution(values):
+    """费用行对汇总的贡献：(key, {列: 增量})"""
+    if not values.get('user_id') or not values.get('asset_id') or not values.get('expense_date'):
+        return None
+    key = (values['user_id'], values['asset_id'], values['expense_type'], values['expense_date'].replace(day=1))
+    return key, {'record_count': 1, 'amount_total': _decimal(values.get('amount'))}
+
+
+def _accumulate(deltas, contribution, sign):
+    if contribution is None:
+        return
+    key, values = contribution
+    bucket = deltas[key]
+    for column, value in values.items():
+        bucket[column] = bucket.get(column, 0) + sign * value
+
+
+def _upsert(connection, model, key_columns, deltas):
+    """
+    把增量累加到汇总行（不存在则插入）
+    MySQL 用 INSERT ... ON DUPLICATE KEY UPDATE，SQLite 用 ON CONFLICT DO UPDATE，并发写同一行也不会冲突
+    """
+    rows = [dict(zip(key_columns, key), **values) for key, values in deltas.items()
+            if any(values.values())]
+    if not rows:
+        return
+    table = model.__table__
+    now = datetime.utcnow()
+    for row in rows:
+        for column in model.SUM_COLUMNS:
+            row.setdefault(column, 0)
+        row['updated_at'] = now
+
+    dialect = connection.dialect.name
+    if dialect in ('mysql', 'sqlite'):
+        if dialect == 'mysql':
+            from sqlalchemy.dialects.mysql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        for start in range(0, len(rows), UPSERT_CHUNK_SIZE):
+            stmt = dialect_insert(table).values(rows[start:start + UPSERT_CHUNK_SIZE])
+            incoming = stmt.inserted if dialect == 'mysql' else stmt.excluded
+            changes = {column: table.c[column] + incoming[column] for column in model.SUM_COLUMNS}
+            changes['updated_at'] = incoming.updated_at
+            if dialect == 'mysql':
+                stmt = stmt.on_duplicate_key_update(changes)
+            else:
+                stmt = stmt.on_conflict_do_update(index_elements=list(key_columns), set_=changes)
+            connection.execute(stmt)
+        return
+
+    for row in rows:
+        condition = [table.c[column] == row[column] for column in key_columns]
+        result = connection.execute(table.update().where(*condition).values(
+            {column: table.c[column] + row[column] for column in model.SUM_COLUMNS}, updated_at=now))
+        if result.rowcount == 0:
+            connection.execute(table.insert().values(row))
+
+
+def apply_income_rows(connection, rows, user_id=None, sign=1):
+    """
+    把一批收入明细（字典，字段同 AssetIncome）计入或移出汇总，供绕过 ORM 的批量写入调用
+
+    Args:
+        connection: 与明细写入同一事务的连接（db.session.connection()）
+        user_id: 资产所属用户（不传时取每行的 user_id 键）
+        sign: 1 计入，-1 移出
+    """
+    deltas = defaultdict(dict)
+    for row in rows:
+        if user_id is not None:
+            row = dict(row, user_id=user_id)
+        _accumulate(deltas, _income_contribution(row), sign)
+    _upsert(connection, MonthlyIncomeRollup, INCOME_KEY, deltas)
+
+
+def apply_expense_rows(connection, rows, sign=1):
+    """把一批费用明细（字典，字段同 AssetExpense，含 user_id）计入或移出汇总"""
+    deltas = defaultdict(dict)
+    for row in rows:
+        _accumulate(deltas, _expense_contribution(row), sign)
+    _upsert(connection, MonthlyExpenseRollup, EXPENSE_KEY, deltas)
+
+
+def delete_user_rollups(user_id):
+    """删除用户的全部汇总行（删除用户或清空数据时调用）"""
+    MonthlyIncomeRollup.query.filter_by(user_id=user_id).delete(synchronize_session=False)
+    MonthlyExpenseRollup.query.filter_by(user_id=user_id).delete(synchronize_session=False)
+
+
+# ==================== ORM 事件 ====================
+
+INCOME_FIELDS = ('asset_id', 'income_type', 'status', 'income_date', 'amount', 'net_amount', 'cost', 'tax_amount')
+EXPENSE_FIELDS = ('user_id', 'asset_id', 'expense_type', 'expense_date', 'amount')
+
+
+def _current(target, fields):
+    return {field: getattr(target, field) for field in fields}
+
+
+def _previous(target, fields):
+    """本次 flush 之前的字段值（未修改的字段取当前值）"""
+    values = {}
+    for field in fields:
+        history = get_history(target, field)
+        values[field] = history.deleted[0] if history.deleted else getattr(target, field)
+    return values
+
+
+def _asset_owner(connection, target, asset_id):
+    if asset_id is None:
+        return None
+    asset = target.__dict__.get('asset')
+    if asset is not None and asset.id == asset_id:
+        return asset.user_id
+    return connection.execute(select(FixedAsset.user_id).where(FixedAsset.id == asset_id)).scalar()
+
+
+def _income_changes(connection, target, old, new):
+    deltas = defaultdict(dict)
+    if old is not None:
+        old['user_id'] = _asset_owner(connection, target, old['asset_id'])
+        _accumulate(deltas, _income_contribution(old), -1)
+    if new is not None:
+        new['user_id'] = _asset_owner(connection, target, new['asset_id'])
+        _accumulate(deltas, _income_contribution(new), 1)
+    _upsert(connection, MonthlyIncomeRollup, INCOME_KEY, deltas)
+
+
+def _expense_changes(connection, old, new):
+    deltas = defaultdict(dict)
+    if old is not None:
+        _accumulate(deltas, _expense_contribution(old), -1)
+    if new is not None:
+        _accumulate(deltas, _expense_contribution(new), 1)
+    _upsert(connection, MonthlyExpenseRollup, EXPENSE_KEY, deltas)
+
+
+@event.listens_for(AssetIncome, 'after_insert')
+def _income_inserted(mapper, connection, target):
+    _income_changes(connection, target, None, _current(target, INCOME_FIELDS))
+
+
+@event.listens_for(AssetIncome, 'after_update')
+def _income_updated(mapper, connection, target):
+    old, new = _previous(target, INCOME_FIELDS), _current(target, INCOME_FIELDS)
+    if old != new:
+        _income_changes(connection, target, old, new)
+
+
+@event.listens_for(AssetIncome, 'before_delete')
+def _income_deleted(mapper, connection, target):
+    _income_changes(connection, target, _previous(target, INCOME_FIELDS), None)
+
+
+@event.listens_for(AssetExpense, 'after_insert')
+def _expense_inserted(mapper, connection, target):
+    _expense_changes(connection, None, _current(target, EXPENSE_FIELDS))
+
+
+@event.listens_for(AssetExpense, 'after_update')
+def _expense_updated(mapper, connection, target):
+    old, new = _previous(target, EXPENSE_FIELDS), _current(target, EXPENSE_FIELDS)
+    if old != new:
+        _expense_changes(connection, old, new)
+
+
+@event.listens_for(AssetExpense, 'before_delete')
+def _expense_deleted(mapper, connection, target):
+    _expense_changes(connection, _previous(target, EXPENSE_FIELDS), None)
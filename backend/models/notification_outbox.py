@@ -0,0 +1,49 @@
+"""
+通知发件箱模型
+提醒扫描任务（services/notification_scanner.py）生成的待发送通知，由各渠道的发送程序读取后标记状态
+"""
+from database import db
+from datetime import datetime
+
+
+class NotificationOutbox(db.Model):
+    """待发送通知"""
+    __tablename__ = 'notification_outbox'
+    __table_args__ = (
+        db.Index('ix_notification_outbox_status_created', 'status', 'created_at'),  # 发送程序按状态取待发送通知
+        db.Index('ix_notification_outbox_user_created', 'user_id', 'created_at'),  # 用户通知列表
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    notification_type = db.Column(db.String(30), nullable=False)  # rent, asset_expiry, expense, maintenance, depreciation, value_change
+    # 去重键：同一提醒对象的同一期只生成一次，如 rent:<收入ID>:<应收日期>
+    dedupe_key = db.Column(db.String(120), nullable=False, unique=True)
+    ref_id = db.Column(db.Integer)  # 关联记录ID（收入、项目、费用、维护提醒或固定资产）
+    title = db.Column(db.String(200), nullable=False)
+    content = db.Column(db.Text)
+    channels = db.Column(db.String(50))  # 发送渠道，逗号分隔：push,email,sms,wechat
+    due_date = db.Column(db.Date)  # 提醒事项的到期日期
+    status = db.Column(db.String(20), default='pending')  # pending, sent, failed
+    attempts = db.Column(db.Integer, default=0)  # 发送尝试次数
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'notification_type': self.notification_type,
+            'ref_id': self.ref_id,
+            'title': self.title,
+            'content': self.content,
+            'channels': self.channels.split(',') if self.channels else [],
+            'due_date': self.due_date.isoformat() if self.due_date else None,
+            'status': self.status,
+            'attempts': self.attempts,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'sent_at': self.sent_at.isoformat() if self.sent_at else None
+        }
+
+    def __repr__(self):
+        return f'<NotificationOutbox {self.dedupe_key}>'
@@ -1,9 +1,14 @@
 from database import db
 from datetime import datetime
 from utils.crypto import encrypt_credential, decrypt_credential
+from utils.forecast_cache import track_forecast_owner
 
 class Project(db.Model):
     __tablename__ = 'projects'
+    __table_args__ = (
+        db.Index('ix_projects_user_created', 'user_id', 'created_at'),  # 用户项目列表按创建时间排序
+        db.Index('ix_projects_user_end', 'user_id', 'end_time'),  # 到期提醒扫描
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -107,4 +112,8 @@ class Project(db.Model):
         return data
     
     def __repr__(self):
-        return f'<Project {self.name}>'
\ No newline at end of file
+        return f'<Project {self.name}>'
+
+
+# 写入后清除该用户的资产预测缓存
+track_forecast_owner(Project)
@@ -0,0 +1,32 @@
+"""
+微信接口凭证缓存模型
+access_token / jsapi_ticket 保存在数据库中，由所有Gunicorn worker（及多个容器实例）共享
+"""
+from database import db
+from datetime import datetime
+
+
+class WechatCredential(db.Model):
+    """微信接口凭证"""
+    __tablename__ = 'wechat_credentials'
+
+    id = db.Column(db.Integer, primary_key=True)
+    # 凭证名称：access_token / jsapi_ticket
+    name = db.Column(db.String(50), nullable=False)
+    # 所属公众号AppID（更换公众号后旧凭证自动失效）
+    appid = db.Column(db.String(64), nullable=False, default='')
+
+    value = db.Column(db.String(1024))  # 凭证内容
+    expires_at = db.Column(db.DateTime)  # 过期时间（按微信返回的 expires_in 计算）
+
+    # 刷新租约：持有租约的进程负责向微信请求新凭证，其余进程等待或继续使用旧凭证
+    refreshing_until = db.Column(db.DateTime)
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('name', 'appid', name='uq_wechat_credential_name_appid'),
+    )
+
+    def __repr__(self):
+        return f'<WechatCredential {self.name} expires_at={self.expires_at}>'
@@ -0,0 +1,33 @@
+"""
+微信扫码登录会话模型
+PC端展示二维码后轮询扫码状态，手机端扫码授权后确认登录；会话保存在数据库中，
+扫码确认和状态查询可以落在不同的Gunicorn worker上
+"""
+from database import db
+from datetime import datetime
+
+
+class WechatQrcodeSession(db.Model):
+    """扫码登录会话"""
+    __tablename__ = 'wechat_qrcode_sessions'
+
+    ticket = db.Column(db.String(64), primary_key=True)  # 前端生成的登录票据（qrcode_开头）
+    status = db.Column(db.String(20), nullable=False, default='waiting')  # waiting, scanned
+    token = db.Column(db.Text)  # 扫码用户的JWT
+    user_info = db.Column(db.Text)  # JSON格式的用户信息
+    expire_at = db.Column(db.DateTime, nullable=False, index=True)  # 过期时间
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        """转换为扫码状态接口的返回格式"""
+        import json
+
+        return {
+            'status': self.status,
+            'token': self.token,
+            'user': json.loads(self.user_info) if self.user_info else None
+        }
+
+    def __repr__(self):
+        return f'<WechatQrcodeSession {self.ticket}: {self.status}>'
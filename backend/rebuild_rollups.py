@@ -0,0 +1,42 @@
+"""
+月度收入/费用汇总重建入口
+从收入、费用明细重新计算 monthly_income_rollup / monthly_expense_rollup（趋势和汇总接口读取这两张表）
+
+使用方法：
+  python rebuild_rollups.py                  # 全部用户
+  python rebuild_rollups.py --user-id 12
+  python rebuild_rollups.py --batch-size 2000 --dry-run
+
+说明：
+  - 通过 ORM 写入的收入、费用会实时增量更新汇总，通常无需执行
+  - 首次部署（迁移 0005 之后）、直接改库或其他绕过 ORM 的批量写入之后执行一次
+  - 按用户分批替换，可在线执行；可重复执行
+"""
+import argparse
+import sys
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser(description='月度汇总重建')
+    parser.add_argument('--user-id', type=int, help='只重建该用户')
+    parser.add_argument('--batch-size', type=int, default=500, help='每批处理的用户数')
+    parser.add_argument('--dry-run', action='store_true', help='只统计，不写入')
+    args = parser.parse_args()
+
+    from app import create_app
+    from services.rollup_service import RollupRebuilder
+
+    app = create_app()
+    started = time.perf_counter()
+    with app.app_context():
+        stats = RollupRebuilder(batch_size=args.batch_size, dry_run=args.dry_run).run(user_id=args.user_id)
+
+    print(f"[汇总重建]{'（试运行）' if args.dry_run else ''} 用户 {stats['users']}，"
+          f"收入汇总 {stats['income_rows']} 行，费用汇总 {stats['expense_rows']} 行，"
+          f"清理已删除用户 {stats['orphans']} 行，耗时 {time.perf_counter() - started:.2f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,24 +1,14 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
 from models.user import User
 from database import db
 from datetime import datetime
+from utils.identity import get_current_user, require_admin, invalidate_user_identity
+from utils.forecast_cache import invalidate_forecast
 import re
 
 admin_bp = Blueprint('admin', __name__)
 
-def get_current_user():
-    """获取当前用户"""
-    user_id = int(get_jwt_identity())
-    return User.query.get(user_id)
-
-def require_admin():
-    """检查管理员权限装饰器"""
-    user = get_current_user()
-    if not user or not user.is_admin():
-        return jsonify({'code': 403, 'message': '权限不足，需要管理员权限'}), 403
-    return None
-
 def validate_email(email):
     """验证邮箱格式"""
     pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
@@ -260,6 +250,7 @@ def update_user(user_id):
             target_user.is_active = data['is_active']
         
         db.session.commit()
+        invalidate_user_identity(user_id)
         
         return jsonify({
             'code': 200,
@@ -300,6 +291,7 @@ def toggle_user_status(user_id):
         # 切换状态
         target_user.is_active = not target_user.is_active
         db.session.commit()
+        invalidate_user_identity(user_id)
         
         action = '启用' if target_user.is_active else '禁用'
         
@@ -370,19 +362,27 @@ def delete_user(user_id):
         from models.category import Category
         from models.fixed_asset import FixedAsset
         from models.asset_income import AssetIncome
+        from models.asset_expense import AssetExpense
         from models.asset_maintenance import AssetMaintenance, MaintenanceReminder
         from models.ai_report import AIReport
+        from models.monthly_rollup import delete_user_rollups
+        from models.notification_outbox import NotificationOutbox
         
         # 删除该用户的所有固定资产相关数据
         assets = FixedAsset.query.filter_by(user_id=target_user.id).all()
         for asset in assets:
             # 删除资产的收入记录
             AssetIncome.query.filter_by(asset_id=asset.id).delete()
+            # 删除资产的费用记录
+            AssetExpense.query.filter_by(asset_id=asset.id).delete()
             # 删除资产的维护记录
             AssetMaintenance.query.filter_by(asset_id=asset.id).delete()
             # 删除资产的维护提醒
             MaintenanceReminder.query.filter_by(asset_id=asset.id).delete()
         
+        # 删除该用户的月度收入/费用汇总
+        delete_user_rollups(target_user.id)
+        
         # 删除该用户的所有固定资产
         FixedAsset.query.filter_by(user_id=target_user.id).delete()
         
@@ -405,11 +405,16 @@ def delete_user(user_id):
         # 删除该用户的AI报告
         AIReport.query.filter_by(user_id=target_user.id).delete()
         
+        # 删除该用户的通知发件箱记录
+        NotificationOutbox.query.filter_by(user_id=target_user.id).delete()
+        
         username = target_user.username
         
         # 删除用户
         db.session.delete(target_user)
         db.session.commit()
+        invalidate_user_identity(user_id)
+        invalidate_forecast(user_id)
         
         return jsonify({
             'code': 200,
@@ -475,4 +480,43 @@ def get_admin_stats():
         })
         
     except Exception as e:
-        return jsonify({'code': 500, 'message': f'获取统计数据失败：{str(e)}'}), 500
\ No newline at end of file
+        return jsonify({'code': 500, 'message': f'获取统计数据失败：{str(e)}'}), 500
+
+@admin_bp.route('/admin/slow-queries', methods=['GET'])
+@jwt_required()
+def get_slow_queries():
+    """查看当前worker记录的慢查询（最近记录 + 按归一化SQL汇总）"""
+    try:
+        auth_result = require_admin()
+        if auth_result:
+            return auth_result
+        
+        from utils.slow_query import slow_query_log
+        import os
+        limit = min(request.args.get('limit', 50, type=int), 500)
+        
+        return jsonify({
+            'code': 200,
+            'data': {
+                'pid': os.getpid(),
+                'enabled': slow_query_log.enabled,
+                'threshold_ms': slow_query_log.threshold_ms,
+                'summary': slow_query_log.summary(limit),
+                'entries': slow_query_log.entries(limit)
+            }
+        })
+        
+    except Exception as e:
+        return jsonify({'code': 500, 'message': f'获取慢查询失败：{str(e)}'}), 500
+
+@admin_bp.route('/admin/slow-queries', methods=['DELETE'])
+@jwt_required()
+def clear_slow_queries():
+    """清空当前worker记录的慢查询"""
+    auth_result = require_admin()
+    if auth_result:
+        return auth_result
+    
+    from utils.slow_query import slow_query_log
+    slow_query_log.clear()
+    return jsonify({'code': 200, 'message': '慢查询记录已清空'})
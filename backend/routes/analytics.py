@@ -1,5 +1,5 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
 from models.user import User
 from models.project import Project
 from models.fixed_asset import FixedAsset
@@ -9,14 +9,10 @@ from sqlalchemy import func, extract, and_, or_
 from datetime import datetime, timedelta
 import calendar
 from dateutil.relativedelta import relativedelta
+from utils.identity import get_current_user
 
 analytics_bp = Blueprint('analytics', __name__)
 
-def get_current_user():
-    """获取当前用户"""
-    user_id = int(get_jwt_identity())
-    return User.query.get(user_id)
-
 @analytics_bp.route('/analytics/dashboard', methods=['GET'])
 @jwt_required()
 def get_dashboard():
@@ -353,4 +349,80 @@ def get_project_details():
         })
 
     except Exception as e:
-        return jsonify({'code': 500, 'message': f'获取项目明细失败：{str(e)}'}), 500
\ No newline at end of file
+        return jsonify({'code': 500, 'message': f'获取项目明细失败：{str(e)}'}), 500
+@analytics_bp.route('/analytics/valuation', methods=['GET'])
+@jwt_required()
+def get_valuation():
+    """
+    获取任意日期的资产组合估值（时间回溯）
+
+    参数二选一：
+      dates=2025-01-01,2025-06-30            指定日期列表（也可带时间，如 2025-01-01T12:00:00）
+      start_date=&end_date=&period=day|week|month   按周期生成日期序列
+    """
+    try:
+        from services.valuation_service import MAX_POINTS, get_valuation_curve
+
+        user = get_current_user()
+        if not user:
+            return jsonify({'code': 404, 'message': '用户不存在'}), 404
+
+        try:
+            dates_param = request.args.get('dates')
+            if dates_param:
+                points = [datetime.fromisoformat(item.strip()) for item in dates_param.split(',') if item.strip()]
+            else:
+                period = request.args.get('period', 'month')
+                steps = {'day': relativedelta(days=1), 'week': relativedelta(weeks=1), 'month': relativedelta(months=1)}
+                if period not in steps:
+                    return jsonify({'code': 400, 'message': '周期只能是 day、week 或 month'}), 400
+                today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+                start_time = datetime.fromisoformat(request.args['start_date']) if request.args.get('start_date') else today - relativedelta(years=1)
+                end_time = datetime.fromisoformat(request.args['end_date']) if request.args.get('end_date') else today
+                points = []
+                while start_time + steps[period] * len(points) <= end_time and len(points) <= MAX_POINTS:
+                    points.append(start_time + steps[period] * len(points))
+        except ValueError:
+            return jsonify({'code': 400, 'message': '日期格式错误，请使用 YYYY-MM-DD 格式'}), 400
+
+        if not points:
+            return jsonify({'code': 400, 'message': '请提供至少一个日期'}), 400
+        if len(points) > MAX_POINTS:
+            return jsonify({'code': 400, 'message': f'单次最多计算 {MAX_POINTS} 个日期'}), 400
+
+        curve = get_valuation_curve(user.id)
+
+        return jsonify({
+            'code': 200,
+            'data': {
+                'project_count': curve.project_count,
+                'fixed_asset_count': curve.fixed_asset_count,
+                'points': curve.evaluate(points)
+            }
+        })
+
+    except Exception as e:
+        return jsonify({'code': 500, 'message': f'获取估值数据失败：{str(e)}'}), 500
+
+@analytics_bp.route('/analytics/forecast', methods=['GET'])
+@jwt_required()
+def get_forecast_data():
+    """获取未来N个月的资产组合预测（剩余价值、折旧、项目到期、应收租金、计划维护）"""
+    try:
+        from services.forecast_service import DEFAULT_HORIZON_MONTHS, MAX_HORIZON_MONTHS, get_forecast
+
+        user = get_current_user()
+        if not user:
+            return jsonify({'code': 404, 'message': '用户不存在'}), 404
+
+        horizon = request.args.get('months', DEFAULT_HORIZON_MONTHS, type=int)
+        if not 1 <= horizon <= MAX_HORIZON_MONTHS:
+            return jsonify({'code': 400, 'message': f'预测月数需在 1~{MAX_HORIZON_MONTHS} 之间'}), 400
+
+        return jsonify({
+            'code': 200,
+            'data': get_forecast(user.id, horizon=horizon)
+        })
+
+    except Exception as e:
+        return jsonify({'code': 500, 'message': f'获取预测数据失败：{str(e)}'}), 500
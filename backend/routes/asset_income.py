@@ -3,6 +3,7 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from database import db
 from models.asset_income import AssetIncome
 from models.fixed_asset import FixedAsset
+from models.monthly_rollup import MonthlyIncomeRollup
 from datetime import datetime, date
 from sqlalchemy import func, extract, and_
 
@@ -259,6 +260,18 @@ def get_asset_income_analysis(asset_id):
             'total_records': variance_query.total_records if variance_query else 0
         }
         
+        # 已到期未收款的应收租金等（租金计划自动生成，见 services/rent_schedule_service.py）
+        outstanding = db.session.query(
+            func.sum(AssetIncome.expected_amount).label('outstanding_total'),
+            func.count(AssetIncome.id).label('outstanding_records')
+        ).filter(
+            AssetIncome.asset_id == asset_id,
+            AssetIncome.status.in_(['pending', 'overdue']),
+            AssetIncome.expected_date <= date.today()
+        ).first()
+        variance_analysis['outstanding_total'] = float(outstanding.outstanding_total or 0) if outstanding else 0
+        variance_analysis['outstanding_records'] = outstanding.outstanding_records if outstanding else 0
+        
         if variance_analysis['expected_total'] > 0:
             variance = variance_analysis['actual_total'] - variance_analysis['expected_total']
             variance_analysis['variance'] = variance
@@ -268,7 +281,7 @@ def get_asset_income_analysis(asset_id):
             variance_analysis['variance_rate'] = 0
         
         # ROI计算
-        roi_analysis = calculate_asset_roi(asset, total_stats['total_income'])
+        roi_analysis = calculate_asset_roi(asset, total_stats['total_income'], len(monthly_trend))
         
         return jsonify({
             'code': 200,
@@ -285,8 +298,13 @@ def get_asset_income_analysis(asset_id):
     except Exception as e:
         return jsonify({'code': 500, 'message': f'获取收入分析失败: {str(e)}'}), 500
 
-def calculate_asset_roi(asset, total_income):
-    """计算资产投资回报率"""
+def calculate_asset_roi(asset, total_income, income_months):
+    """
+    计算资产投资回报率
+    
+    Args:
+        income_months: 最近12个月中有收入的月数（即 get_monthly_income_trend 的结果条数）
+    """
     try:
         original_value = float(asset.original_value)
         if original_value <= 0:
@@ -309,7 +327,7 @@ def calculate_asset_roi(asset, total_income):
             annual_return = 0
         
         # 回本周期（假设按当前月平均收入计算）
-        monthly_avg = total_income / max(1, len(AssetIncome.get_monthly_income_trend(asset.id, 12)))
+        monthly_avg = total_income / max(1, income_months)
         if monthly_avg > 0:
             payback_months = original_value / monthly_avg
         else:
@@ -327,18 +345,50 @@ def calculate_asset_roi(asset, total_income):
         print(f"ROI计算错误: {e}")
         return None
 
+@asset_income_bp.route('/assets/rent-schedule', methods=['POST'])
+@jwt_required()
+def generate_rent_schedule():
+    """
+    为当前用户出租中的资产生成应收租金记录（幂等，可重复调用）
+
+    请求体（可选）：
+        horizon_months: 向后生成的月数，默认3
+        asset_id: 只处理该资产
+    """
+    try:
+        from services.rent_schedule_service import RentScheduleService
+        
+        current_user_id = int(get_jwt_identity())
+        data = request.get_json(silent=True) or {}
+        horizon_months = int(data.get('horizon_months', 3))
+        if not 0 <= horizon_months <= 36:
+            return jsonify({'code': 400, 'message': 'horizon_months 应在0到36之间'}), 400
+        
+        asset_ids = [int(data['asset_id'])] if data.get('asset_id') else None
+        stats = RentScheduleService(horizon_months=horizon_months).run(user_id=current_user_id, asset_ids=asset_ids)
+        
+        return jsonify({
+            'code': 200,
+            'message': f"租金计划已生成：新增 {stats['created']} 条，更新 {stats['updated']} 条",
+            'data': stats
+        })
+        
+    except (TypeError, ValueError):
+        return jsonify({'code': 400, 'message': '参数格式错误'}), 400
+    except Exception as e:
+        return jsonify({'code': 500, 'message': f'生成租金计划失败: {str(e)}'}), 500
+
 @asset_income_bp.route('/income-overview', methods=['GET'])
 @jwt_required()
 def get_income_overview():
     """获取用户所有资产收入概览"""
     try:
-        current_user_id = get_jwt_identity()
+        current_user_id = int(get_jwt_identity())
         
-        # 获取用户所有资产
-        user_assets = FixedAsset.query.filter_by(user_id=current_user_id).all()
-        asset_ids = [asset.id for asset in user_assets]
+        # 资产数量（只走 fixed_assets 的 user_id 索引，不加载资产对象）
+        asset_count = db.session.query(func.count(FixedAsset.id)).filter(FixedAsset.user_id == current_user_id).scalar() or 0
         
-        if not asset_ids:
+        if not asset_count:
             return jsonify({
                 'code': 200,
                 'message': '获取成功',
@@ -351,55 +401,30 @@ def get_income_overview():
                 }
             })
         
-        # 总收入统计
-        total_query = db.session.query(
-            func.sum(AssetIncome.net_amount).label('total_income'),
-            func.count(AssetIncome.id).label('income_count')
-        ).filter(AssetIncome.asset_id.in_(asset_ids), AssetIncome.status == 'received').first()
+        # 按类型统计和月度趋势读取月度汇总表，总收入和笔数由各类型合计得出
+        type_stats = MonthlyIncomeRollup.get_type_totals(user_id=current_user_id)
+        total_income = sum(stat.net_total for stat in type_stats if stat.net_total is not None)
+        income_count = int(sum(stat.count or 0 for stat in type_stats))
         
-        # 按类型统计
-        type_stats = db.session.query(
-            AssetIncome.income_type,
-            func.sum(AssetIncome.net_amount).label('total_amount'),
-            func.count(AssetIncome.id).label('count')
-        ).filter(
-            AssetIncome.asset_id.in_(asset_ids),
-            AssetIncome.status == 'received'
-        ).group_by(AssetIncome.income_type).all()
-        
-        # 月度趋势
-        monthly_stats = db.session.query(
-            extract('year', AssetIncome.income_date).label('year'),
-            extract('month', AssetIncome.income_date).label('month'),
-            func.sum(AssetIncome.net_amount).label('total_amount')
-        ).filter(
-            AssetIncome.asset_id.in_(asset_ids),
-            AssetIncome.status == 'received'
-        ).group_by(
-            extract('year', AssetIncome.income_date),
-            extract('month', AssetIncome.income_date)
-        ).order_by('year', 'month').all()
+        monthly_trend = MonthlyIncomeRollup.get_monthly_trend(user_id=current_user_id)
         
         return jsonify({
             'code': 200,
             'message': '获取成功',
             'data': {
-                'total_income': float(total_query.total_income) if total_query.total_income else 0,
-                'asset_count': len(user_assets),
-                'income_count': total_query.income_count or 0,
+                'total_income': float(total_income) if total_income else 0,
+                'asset_count': asset_count,
+                'income_count': income_count,
                 'monthly_trend': [
-                    {
-                        'period': f"{int(stat.year)}-{int(stat.month):02d}",
-                        'amount': float(stat.total_amount) if stat.total_amount else 0
-                    }
-                    for stat in monthly_stats
+                    {'period': item['period'], 'amount': item['amount']}
+                    for item in monthly_trend
                 ],
                 'type_distribution': [
                     {
                         'income_type': stat.income_type,
                         'income_type_text': AssetIncome.get_income_type_text_static(stat.income_type),
-                        'total_amount': float(stat.total_amount) if stat.total_amount else 0,
-                        'count': stat.count or 0
+                        'total_amount': float(stat.net_total) if stat.net_total else 0,
+                        'count': int(stat.count or 0)
                     }
                     for stat in type_stats
                 ]
@@ -5,6 +5,7 @@ from models.fixed_asset import FixedAsset
 from models.project import Project
 from models.category import Category
 from models.asset_income import AssetIncome
+from models.monthly_rollup import MonthlyIncomeRollup
 from datetime import datetime, date, timedelta
 from sqlalchemy import func, extract
 import uuid
@@ -330,6 +331,15 @@ def update_asset(asset_id):
         
         db.session.commit()
         
+        # 出租状态或租金设置变化后同步应收租金记录
+        rent_fields = ['status', 'rent_price', 'rent_due_day', 'rent_start_date', 'rent_end_date']
+        if any(field in data for field in rent_fields):
+            try:
+                from services.rent_schedule_service import RentScheduleService
+                RentScheduleService().run(asset_ids=[asset.id])
+            except Exception as e:
+                print(f"[租金计划] 资产 {asset.id} 同步失败: {str(e)}")
+        
         return jsonify({
             'code': 200,
             'message': '更新成功',
@@ -465,7 +475,7 @@ def get_asset_depreciation(asset_id):
 def get_assets_statistics():
     """获取固定资产统计信息"""
     try:
-        current_user_id = get_jwt_identity()
+        current_user_id = int(get_jwt_identity())
         
         # 基本统计
         total_assets = FixedAsset.query.filter_by(user_id=current_user_id).count()
@@ -486,62 +496,40 @@ def get_assets_statistics():
          .group_by(Category.id, Category.name).all()
         
         # 计算总价值和当前价值
-        assets = FixedAsset.query.filter_by(user_id=current_user_id).all()
+        assets = FixedAsset.query.filter_by(user_id=current_user_id).order_by(FixedAsset.id).all()
         total_original_value = sum(float(asset.original_value) for asset in assets)
         total_current_value = sum(asset.calculate_current_depreciation()['current_value'] for asset in assets)
         total_accumulated_depreciation = total_original_value - total_current_value
         
-        # 收益统计
-        income_stats = db.session.query(
-            func.count(AssetIncome.id).label('total_income_records'),
-            func.sum(AssetIncome.amount).label('total_gross_income'),
-            func.sum(AssetIncome.net_amount).label('total_net_income'),
-            func.sum(AssetIncome.cost).label('total_costs'),
-            func.sum(AssetIncome.tax_amount).label('total_taxes')
-        ).join(FixedAsset).filter(
-            FixedAsset.user_id == current_user_id,
-            AssetIncome.status == 'received'
-        ).first()
-        
-        # 按收入类型统计
-        income_type_stats = db.session.query(
-            AssetIncome.income_type,
-            func.count(AssetIncome.id).label('count'),
-            func.sum(AssetIncome.net_amount).label('total_amount')
-        ).join(FixedAsset).filter(
-            FixedAsset.user_id == current_user_id,
-            AssetIncome.status == 'received'
-        ).group_by(AssetIncome.income_type).all()
+        # 收益统计（读取月度汇总表，按收入类型汇总后合计）
+        income_type_stats = MonthlyIncomeRollup.get_type_totals(user_id=current_user_id)
+        income_totals = {
+            column: sum(getattr(item, column) or 0 for item in income_type_stats)
+            for column in ('count', 'amount_total', 'net_total', 'cost_total', 'tax_total')
+        }
         
-        # ROI 分析 - 按资产计算
+        # ROI 分析 - 按资产计算（一次查询取各资产的收入合计）
+        asset_income_totals = MonthlyIncomeRollup.get_asset_totals(current_user_id)
         roi_data = []
         for asset in assets:
-            asset_income = AssetIncome.get_asset_total_income(asset.id)
-            if asset_income['total_income'] > 0:
-                roi = (asset_income['total_income'] / float(asset.original_value)) * 100
+            net_total, income_count = asset_income_totals.get(asset.id, (0, 0))
+            total_income = float(net_total) if net_total else 0
+            if total_income > 0:
+                roi = (total_income / float(asset.original_value)) * 100
                 roi_data.append({
                     'asset_id': asset.id,
                     'asset_name': asset.name,
                     'original_value': float(asset.original_value),
-                    'total_income': asset_income['total_income'],
+                    'total_income': total_income,
                     'roi': round(roi, 2),
-                    'income_count': asset_income['income_count']
+                    'income_count': income_count
                 })
         
-        # 月度收益趋势
-        monthly_income_trend = db.session.query(
-            extract('year', AssetIncome.income_date).label('year'),
-            extract('month', AssetIncome.income_date).label('month'),
-            func.sum(AssetIncome.net_amount).label('total_amount'),
-            func.count(AssetIncome.id).label('count')
-        ).join(FixedAsset).filter(
-            FixedAsset.user_id == current_user_id,
-            AssetIncome.status == 'received',
-            AssetIncome.income_date >= (datetime.now().replace(day=1, month=1) - timedelta(days=365)).date()
-        ).group_by(
-            extract('year', AssetIncome.income_date),
-            extract('month', AssetIncome.income_date)
-        ).order_by('year', 'month').all()
+        # 月度收益趋势（去年1月起）
+        monthly_income_trend = MonthlyIncomeRollup.get_monthly_trend(
+            user_id=current_user_id,
+            since=(datetime.now().replace(day=1, month=1) - timedelta(days=365)).date()
+        )
         
         # 即将完全折旧的资产（剩余月数小于12个月）
         expiring_assets = []
@@ -570,12 +558,12 @@ def get_assets_statistics():
                     'depreciation_rate': round((total_accumulated_depreciation / total_original_value * 100) if total_original_value > 0 else 0, 2)
                 },
                 'income_overview': {
-                    'total_income_records': income_stats.total_income_records if income_stats else 0,
-                    'total_gross_income': float(income_stats.total_gross_income) if income_stats and income_stats.total_gross_income else 0,
-                    'total_net_income': float(income_stats.total_net_income) if income_stats and income_stats.total_net_income else 0,
-                    'total_costs': float(income_stats.total_costs) if income_stats and income_stats.total_costs else 0,
-                    'total_taxes': float(income_stats.total_taxes) if income_stats and income_stats.total_taxes else 0,
-                    'overall_roi': round((float(income_stats.total_net_income) / total_original_value * 100) if income_stats and income_stats.total_net_income and total_original_value > 0 else 0, 2)
+                    'total_income_records': int(income_totals['count']),
+                    'total_gross_income': float(income_totals['amount_total']),
+                    'total_net_income': float(income_totals['net_total']),
+                    'total_costs': float(income_totals['cost_total']),
+                    'total_taxes': float(income_totals['tax_total']),
+                    'overall_roi': round((float(income_totals['net_total']) / total_original_value * 100) if income_totals['net_total'] and total_original_value > 0 else 0, 2)
                 },
                 'status_distribution': [
                     {
@@ -595,17 +583,11 @@ def get_assets_statistics():
                     {
                         'income_type': item.income_type,
                         'income_type_text': AssetIncome.get_income_type_text_static(item.income_type),
-                        'count': item.count,
-                        'total_amount': float(item.total_amount) if item.total_amount else 0
+                        'count': int(item.count or 0),
+                        'total_amount': float(item.net_total) if item.net_total else 0
                     } for item in income_type_stats
                 ],
-                'monthly_income_trend': [
-                    {
-                        'period': f"{int(item.year)}-{int(item.month):02d}",
-                        'amount': float(item.total_amount) if item.total_amount else 0,
-                        'count': item.count
-                    } for item in monthly_income_trend
-                ],
+                'monthly_income_trend': monthly_income_trend,
                 'roi_analysis': roi_data,
                 'top_earning_assets': top_earning_assets,
                 'expiring_assets': expiring_assets
@@ -616,4 +598,64 @@ def get_assets_statistics():
         return jsonify({
             'code': 500,
             'message': f'获取统计信息失败: {str(e)}'
-        }), 500
\ No newline at end of file
+        }), 500
+
+@assets_bp.route('/assets/tco', methods=['GET'])
+@jwt_required()
+def get_assets_tco():
+    """获取全部固定资产的持有成本（TCO）、净回报和回本周期，支持排序和分页"""
+    try:
+        from services.tco_service import SORT_FIELDS, get_user_tco
+        
+        current_user_id = int(get_jwt_identity())
+        
+        sort = request.args.get('sort', 'tco')
+        order = request.args.get('order', 'desc')
+        page = max(request.args.get('page', 1, type=int), 1)
+        per_page = request.args.get('per_page', 20, type=int)
+        # 与 paginate(error_out=False) 一致：非正数按默认20条，单页最多100条
+        per_page = min(per_page, 100) if per_page > 0 else 20
+        if sort not in SORT_FIELDS:
+            return jsonify({
+                'code': 400,
+                'message': f'不支持的排序字段，可选: {", ".join(SORT_FIELDS)}'
+            }), 400
+        if order not in ('asc', 'desc'):
+            return jsonify({'code': 400, 'message': '排序方向只能是 asc 或 desc'}), 400
+        
+        base_date = None
+        base_date_str = request.args.get('base_date')
+        if base_date_str:
+            try:
+                base_date = datetime.strptime(base_date_str, '%Y-%m-%d').date()
+            except ValueError:
+                return jsonify({
+                    'code': 400,
+                    'message': '日期格式错误，请使用 YYYY-MM-DD 格式'
+                }), 400
+        
+        engine = get_user_tco(
+            current_user_id,
+            base_date=base_date,
+            status=request.args.get('status'),
+            category_id=request.args.get('category_id', type=int)
+        )
+        
+        # 全部资产排序后只展开当前页
+        indices = engine.order(sort, descending=(order == 'desc'))[(page - 1) * per_page:page * per_page]
+        
+        return jsonify({
+            'code': 200,
+            'message': '获取成功',
+            'data': engine.rows(indices),
+            'summary': engine.summary(),
+            'total': len(engine.assets),
+            'page': page,
+            'per_page': per_page
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'code': 500,
+            'message': f'获取持有成本失败: {str(e)}'
+        }), 500
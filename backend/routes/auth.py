@@ -3,6 +3,8 @@ from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identi
 from models.user import User
 from database import db
 from services.category_service import initialize_user_categories
+from utils.identity import get_current_user, invalidate_user_identity
+from utils.forecast_cache import invalidate_forecast
 import re
 
 auth_bp = Blueprint('auth', __name__)
@@ -170,7 +172,7 @@ def get_profile():
     """获取用户信息"""
     try:
         user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
+        user = get_current_user()
         
         if not user:
             return jsonify({
@@ -195,7 +197,7 @@ def update_profile():
     """更新用户信息"""
     try:
         user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
+        user = get_current_user()
         
         if not user:
             return jsonify({
@@ -293,7 +295,7 @@ def check_token():
     """验证token有效性"""
     try:
         user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
+        user = get_current_user()
         
         if not user or not user.is_active:
             return jsonify({
@@ -319,7 +321,7 @@ def reset_database():
     """清空数据库（需要密码验证）"""
     try:
         user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
+        user = get_current_user()
         
         if not user:
             return jsonify({
@@ -348,13 +350,19 @@ def reset_database():
         from models.project import Project
         from models.fixed_asset import FixedAsset
         from models.asset_income import AssetIncome
+        from models.asset_expense import AssetExpense
         from models.asset_maintenance import AssetMaintenance, MaintenanceReminder
         from models.ai_report import AIReport
+        from models.monthly_rollup import MonthlyIncomeRollup, MonthlyExpenseRollup
+        from models.notification_outbox import NotificationOutbox
         
         # 删除所有数据（保留用户表）
         db.session.query(MaintenanceReminder).delete()
         db.session.query(AssetMaintenance).delete()
         db.session.query(AssetIncome).delete()
+        db.session.query(AssetExpense).delete()
+        db.session.query(MonthlyIncomeRollup).delete()
+        db.session.query(MonthlyExpenseRollup).delete()
         db.session.query(FixedAsset).delete()
         db.session.query(Project).delete()
         db.session.query(AIReport).delete()
@@ -375,13 +383,15 @@ def reset_database():
             for cat in categories_by_level[level]:
                 db.session.delete(cat)
         
-        # 删除所有非管理员用户
+        # 删除通知发件箱（外键引用用户），再删除所有非管理员用户
+        db.session.query(NotificationOutbox).delete()
         db.session.query(User).filter(User.role != 'admin').delete()
         
         # 重置当前用户的API Token
         user.aliyun_api_token_encrypted = None
         
         db.session.commit()
+        invalidate_forecast()
         
         # 重新创建默认分类
         initialize_user_categories(user.id)
@@ -404,7 +414,7 @@ def deactivate_account():
     """用户注销自己的账户 - 需要输入用户名和密码确认"""
     try:
         user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
+        user = get_current_user()
         
         if not user:
             return jsonify({
@@ -442,19 +452,30 @@ def deactivate_account():
         from models.category import Category
         from models.fixed_asset import FixedAsset
         from models.asset_income import AssetIncome
+        from models.asset_expense import AssetExpense
         from models.asset_maintenance import AssetMaintenance, MaintenanceReminder
         from models.ai_report import AIReport
+        from models.monthly_rollup import delete_user_rollups
+        from models.notification_outbox import NotificationOutbox
         
         # 删除该用户的所有固定资产相关数据
         assets = FixedAsset.query.filter_by(user_id=user.id).all()
         for asset in assets:
             # 删除资产的收入记录
             AssetIncome.query.filter_by(asset_id=asset.id).delete()
+            # 删除资产的费用记录
+            AssetExpense.query.filter_by(asset_id=asset.id).delete()
             # 删除资产的维护记录
             AssetMaintenance.query.filter_by(asset_id=asset.id).delete()
             # 删除资产的维护提醒
             MaintenanceReminder.query.filter_by(asset_id=asset.id).delete()
         
+        # 删除该用户的月度收入/费用汇总
+        delete_user_rollups(user.id)
+        
+        # 删除用户的通知发件箱记录（外键引用用户）
+        NotificationOutbox.query.filter_by(user_id=user.id).delete()
+        
         # 删除该用户的所有固定资产
         FixedAsset.query.filter_by(user_id=user.id).delete()
         
@@ -482,6 +503,8 @@ def deactivate_account():
         # 删除用户
         db.session.delete(user)
         db.session.commit()
+        invalidate_user_identity(user_id)
+        invalidate_forecast(user_id)
         
         return jsonify({
             'code': 200,
@@ -6,6 +6,7 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from database import db
 from models.asset_expense import AssetExpense
 from models.fixed_asset import FixedAsset
+from models.monthly_rollup import MonthlyExpenseRollup
 from datetime import datetime, date
 
 expenses_bp = Blueprint('expenses', __name__)
@@ -185,28 +186,26 @@ def get_expense_summary(asset_id):
         if not asset:
             return jsonify({'code': 404, 'message': '资产不存在'}), 404
         
-        expenses = AssetExpense.query.filter_by(asset_id=asset_id, user_id=user_id).all()
+        # 读取月度费用汇总表，行数与月份、类型数成正比，与费用笔数无关
+        months = MonthlyExpenseRollup.get_asset_months(asset_id, user_id)
         
-        # 按类型统计
+        # 按类型、按年统计
         type_summary = {}
-        for e in expenses:
-            if e.expense_type not in type_summary:
-                type_summary[e.expense_type] = 0
-            type_summary[e.expense_type] += float(e.amount)
-        
-        # 按年统计
         year_summary = {}
-        for e in expenses:
-            year = e.expense_date.year
-            if year not in year_summary:
-                year_summary[year] = 0
-            year_summary[year] += float(e.amount)
+        total_amount = 0
+        total_count = 0
+        for m in months:
+            amount = float(m.amount_total)
+            type_summary[m.expense_type] = type_summary.get(m.expense_type, 0) + amount
+            year_summary[m.month_start.year] = year_summary.get(m.month_start.year, 0) + amount
+            total_amount += amount
+            total_count += m.record_count
         
         return jsonify({
             'code': 200,
             'data': {
-                'total_amount': sum(float(e.amount) for e in expenses),
-                'total_count': len(expenses),
+                'total_amount': total_amount,
+                'total_count': total_count,
                 'by_type': type_summary,
                 'by_year': year_summary
             }
@@ -0,0 +1,94 @@
+"""
+账户数据导出路由
+流式导出当前用户的全部数据（NDJSON 或 CSV 压缩包），实现见 services/export_service.py
+"""
+from flask import Blueprint, Response, current_app, jsonify, request, send_file, stream_with_context
+from flask_jwt_extended import jwt_required, get_jwt_identity
+
+from services.export_service import ExportError, export_filename, export_store, iter_export, resolve_start
+
+exports_bp = Blueprint('exports', __name__)
+
+MIMETYPES = {'ndjson': 'application/x-ndjson', 'csv': 'application/zip'}
+
+
+def _format_arg():
+    fmt = request.args.get('format', 'ndjson').lower()
+    if fmt not in MIMETYPES:
+        raise ExportError(f"不支持的导出格式: {fmt}，可选: {', '.join(MIMETYPES)}")
+    return fmt
+
+
+@exports_bp.route('/export', methods=['GET'])
+@jwt_required()
+def export_account():
+    """
+    流式导出账户数据
+
+    查询参数：
+        format=ndjson|csv   NDJSON（默认）或CSV压缩包
+        entity / offset     续传位置：从该实体的第 offset 行开始（NDJSON 取最后收到的行的 offset+1）
+        prebuilt=1          已有后台生成的文件时直接下载该文件（不支持 entity/offset）
+    """
+    try:
+        fmt = _format_arg()
+        entity = request.args.get('entity')
+        offset = request.args.get('offset', 0)
+        resolve_start(entity, offset)
+    except ExportError as e:
+        return jsonify({'code': 400, 'message': str(e)}), 400
+
+    user_id = int(get_jwt_identity())
+    if request.args.get('prebuilt', '0').lower() in ('1', 'true') and not entity:
+        path = export_store.ready_path(user_id, fmt)
+        if path:
+            return send_file(path, mimetype=MIMETYPES[fmt], as_attachment=True,
+                             download_name=export_filename(user_id, fmt), conditional=True)
+
+    chunks = iter_export(user_id, fmt, entity, offset)
+    response = Response(stream_with_context(chunks), mimetype=MIMETYPES[fmt])
+    response.headers['Content-Disposition'] = f'attachment; filename={export_filename(user_id, fmt)}'
+    response.headers['X-Accel-Buffering'] = 'no'  # nginx 不缓冲，边生成边下发
+    return response
+
+
+@exports_bp.route('/export/prebuild', methods=['POST'])
+@jwt_required()
+def prebuild_export():
+    """在后台生成导出文件，完成后通过 GET /api/export/download 下载"""
+    try:
+        fmt = _format_arg()
+    except ExportError as e:
+        return jsonify({'code': 400, 'message': str(e)}), 400
+
+    status = export_store.submit(current_app._get_current_object(), int(get_jwt_identity()), fmt)
+    return jsonify({'code': 202, 'message': '导出任务已提交，正在后台生成', 'data': status}), 202
+
+
+@exports_bp.route('/export/prebuild', methods=['GET'])
+@jwt_required()
+def prebuild_status():
+    """查询后台导出状态：none / running / ready / failed"""
+    try:
+        fmt = _format_arg()
+    except ExportError as e:
+        return jsonify({'code': 400, 'message': str(e)}), 400
+
+    return jsonify({'code': 200, 'message': '获取成功', 'data': export_store.status(int(get_jwt_identity()), fmt)})
+
+
+@exports_bp.route('/export/download', methods=['GET'])
+@jwt_required()
+def download_export():
+    """下载后台生成的导出文件（支持Range断点续传）"""
+    try:
+        fmt = _format_arg()
+    except ExportError as e:
+        return jsonify({'code': 400, 'message': str(e)}), 400
+
+    user_id = int(get_jwt_identity())
+    path = export_store.ready_path(user_id, fmt)
+    if not path:
+        return jsonify({'code': 404, 'message': '导出文件不存在或已过期，请先提交后台导出'}), 404
+    return send_file(path, mimetype=MIMETYPES[fmt], as_attachment=True,
+                     download_name=export_filename(user_id, fmt), conditional=True)
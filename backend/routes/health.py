@@ -1,70 +1,66 @@
 from flask import Blueprint, jsonify
-from database import db
 from datetime import datetime
 import os
+from services.health_prober import health_prober, get_pool_status
 
 health_bp = Blueprint('health', __name__)
 
+
+def _report_queue_status():
+    """报告生成线程池的排队情况"""
+    from routes.reports import executor
+    return {
+        'max_workers': executor._max_workers,
+        'threads': len(executor._threads),
+        'queued': executor._work_queue.qsize()
+    }
+
+
 @health_bp.route('/health', methods=['GET'])
 def health_check():
     """
     健康检查端点
-    用于Docker健康检查和负载均衡器探测
+    用于Docker健康检查和负载均衡器探测；返回后台探测线程缓存的结果，不直接访问数据库
     """
+    result = health_prober.get_result()
     health_status = {
-        'status': 'healthy',
+        'status': result['status'],
         'timestamp': datetime.utcnow().isoformat(),
         'service': 'timevalue-backend',
         'version': '1.0.0',
-        'checks': {}
-    }
-    
-    # 检查数据库连接
-    try:
-        db.session.execute(db.text('SELECT 1'))
-        health_status['checks']['database'] = {
-            'status': 'up',
-            'message': 'Database connection successful'
-        }
-    except Exception as e:
-        health_status['status'] = 'unhealthy'
-        health_status['checks']['database'] = {
-            'status': 'down',
-            'message': f'Database connection failed: {str(e)}'
-        }
-    
-    # 检查环境变量
-    required_env_vars = ['DB_HOST', 'DB_NAME', 'SECRET_KEY']
-    env_check = all(os.getenv(var) for var in required_env_vars)
-    health_status['checks']['environment'] = {
-        'status': 'up' if env_check else 'down',
-        'message': 'Required environment variables present' if env_check else 'Missing required environment variables'
+        'checked_at': result['checked_at'],
+        'age_seconds': result['age_seconds'],
+        'checks': result['checks']
     }
-    
-    # 返回状态码
-    status_code = 200 if health_status['status'] == 'healthy' else 503
-    
+
+    # 返回状态码（degraded 仍可接收流量）
+    status_code = 503 if result['status'] == 'unhealthy' else 200
+
     return jsonify(health_status), status_code
 
 @health_bp.route('/ready', methods=['GET'])
 def readiness_check():
     """
     就绪检查端点
-    检查服务是否准备好接收流量
+    检查服务是否准备好接收流量，附带连接池占用和报告任务排队情况
     """
-    try:
-        # 检查数据库连接
-        db.session.execute(db.text('SELECT 1'))
-        return jsonify({
-            'status': 'ready',
-            'timestamp': datetime.utcnow().isoformat()
-        }), 200
-    except Exception as e:
-        return jsonify({
-            'status': 'not ready',
-            'timestamp': datetime.utcnow().isoformat(),
-            'error': str(e)
-        }), 503
+    result = health_prober.get_result()
+    database = result['checks']['database']
+    ready = database['status'] == 'up'
+
+    body = {
+        'status': 'ready' if ready else 'not ready',
+        'timestamp': datetime.utcnow().isoformat(),
+        'checked_at': result['checked_at'],
+        'age_seconds': result['age_seconds'],
+        'database': database,
+        'pool': get_pool_status(),
+        'report_queue': _report_queue_status(),
+        'pid': os.getpid()
+    }
+    if not ready:
+        body['error'] = database.get('message')
+    return jsonify(body), 200 if ready else 503
 
 @health_bp.route('/live', methods=['GET'])
 def liveness_check():
@@ -74,5 +70,6 @@ def liveness_check():
     """
     return jsonify({
         'status': 'alive',
-        'timestamp': datetime.utcnow().isoformat()
+        'timestamp': datetime.utcnow().isoformat(),
+        'prober_running': health_prober.thread_alive
     }), 200
@@ -0,0 +1,62 @@
+"""
+批量导入路由
+上传CSV/XLSX一次导入大量虚拟资产、固定资产或收入记录，实现见 services/bulk_import_service.py
+"""
+from flask import Blueprint, Response, jsonify, request
+from flask_jwt_extended import jwt_required, get_jwt_identity
+
+from services.bulk_import_service import BulkImporter, BulkImportError, import_file, template_csv
+
+imports_bp = Blueprint('imports', __name__)
+
+
+@imports_bp.route('/imports/<kind>', methods=['POST'])
+@jwt_required()
+def bulk_import(kind):
+    """
+    批量导入
+
+    表单字段：
+        file: CSV或XLSX文件（第一行为表头，模板见 GET /api/imports/<kind>/template）
+    查询参数：
+        dry_run=1            只校验不写入
+        create_categories=1  分类名称不存在时自动创建
+    """
+    if kind not in BulkImporter.KINDS:
+        return jsonify({'code': 404, 'message': f'不支持的导入类型: {kind}'}), 404
+
+    upload = request.files.get('file')
+    if upload is None or not upload.filename:
+        return jsonify({'code': 400, 'message': '请上传文件'}), 400
+
+    try:
+        result = import_file(
+            upload.stream, upload.filename, int(get_jwt_identity()), kind,
+            dry_run=request.args.get('dry_run', '0').lower() in ('1', 'true'),
+            create_categories=request.args.get('create_categories', '0').lower() in ('1', 'true')
+        )
+    except BulkImportError as e:
+        return jsonify({'code': 400, 'message': str(e)}), 400
+    except Exception as e:
+        print(f"[批量导入] 失败: {str(e)}")
+        return jsonify({'code': 500, 'message': f'导入失败: {str(e)}'}), 500
+
+    message = '校验完成' if result['dry_run'] else '导入完成'
+    return jsonify({
+        'code': 200,
+        'message': f"{message}：成功 {result['imported']} 行，失败 {result['failed']} 行",
+        'data': result
+    })
+
+
+@imports_bp.route('/imports/<kind>/template', methods=['GET'])
+@jwt_required()
+def import_template(kind):
+    """下载导入模板（CSV表头）"""
+    try:
+        content = template_csv(kind)
+    except BulkImportError as e:
+        return jsonify({'code': 404, 'message': str(e)}), 404
+    return Response(content, mimetype='text/csv', headers={
+        'Content-Disposition': f'attachment; filename={kind}_template.csv'
+    })
@@ -226,49 +226,16 @@ def get_asset_maintenance_stats(asset_id):
 def get_maintenance_overview():
     """获取用户所有资产维护概览"""
     try:
-        current_user_id = get_jwt_identity()
+        current_user_id = int(get_jwt_identity())
         
-        # 获取用户所有资产
-        user_assets = FixedAsset.query.filter_by(user_id=current_user_id).all()
-        asset_ids = [asset.id for asset in user_assets]
-        
-        if not asset_ids:
-            return jsonify({
-                'code': 200,
-                'message': '获取成功',
-                'data': {
-                    'total_maintenance_cost': 0,
-                    'total_maintenance_count': 0,
-                    'overdue_count': 0,
-                    'upcoming_count': 0,
-                    'overdue_maintenances': [],
-                    'upcoming_maintenances': []
-                }
-            })
-        
-        # 总维护统计
-        from sqlalchemy import func
-        total_stats = db.session.query(
-            func.count(AssetMaintenance.id).label('total_count'),
-            func.sum(AssetMaintenance.cost).label('total_cost')
-        ).filter(
-            AssetMaintenance.asset_id.in_(asset_ids),
-            AssetMaintenance.status == 'completed'
-        ).first()
+        # 各查询都按 fixed_assets.user_id JOIN，查询数固定，与资产数量无关
+        total_stats = AssetMaintenance.get_user_maintenance_totals(current_user_id)
         
         # 过期维护
-        overdue_maintenances = AssetMaintenance.get_overdue_maintenances(asset_ids)
+        overdue_maintenances = AssetMaintenance.get_overdue_maintenances(current_user_id)
         
         # 即将到期的维护（30天内）
-        upcoming_maintenances = AssetMaintenance.query.filter(
-            AssetMaintenance.asset_id.in_(asset_ids),
-            AssetMaintenance.status.in_(['planned', 'in_progress']),
-            AssetMaintenance.next_maintenance_date.isnot(None),
-            AssetMaintenance.next_maintenance_date.between(
-                date.today() + timedelta(days=1),
-                date.today() + timedelta(days=30)
-            )
-        ).order_by(AssetMaintenance.next_maintenance_date).all()
+        upcoming_maintenances = AssetMaintenance.get_upcoming_maintenances(current_user_id, days=30)
         
         return jsonify({
             'code': 200,
@@ -291,7 +258,7 @@ def get_maintenance_overview():
 def get_maintenance_calendar():
     """获取维护日历"""
     try:
-        current_user_id = get_jwt_identity()
+        current_user_id = int(get_jwt_identity())
         
         # 获取查询参数
         start_date_str = request.args.get('start_date', (date.today() - timedelta(days=30)).isoformat())
@@ -303,18 +270,7 @@ def get_maintenance_calendar():
         except ValueError:
             return jsonify({'code': 400, 'message': '日期格式错误'}), 400
         
-        # 获取用户所有资产
-        user_assets = FixedAsset.query.filter_by(user_id=current_user_id).all()
-        asset_ids = [asset.id for asset in user_assets]
-        
-        if not asset_ids:
-            return jsonify({
-                'code': 200,
-                'message': '获取成功',
-                'data': {}
-            })
-        
-        calendar_data = AssetMaintenance.get_maintenance_calendar(asset_ids, start_date, end_date)
+        calendar_data = AssetMaintenance.get_maintenance_calendar(current_user_id, start_date, end_date)
         
         return jsonify({
             'code': 200,
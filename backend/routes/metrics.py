@@ -0,0 +1,18 @@
+from flask import Blueprint, Response, request, jsonify
+import os
+from utils.metrics import registry
+
+metrics_bp = Blueprint('metrics', __name__)
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def metrics():
+    """
+    Prometheus指标抓取端点
+    设置 METRICS_TOKEN 后需携带 Authorization: Bearer <token>
+    """
+    token = os.getenv('METRICS_TOKEN')
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return jsonify({'code': 401, 'message': '未授权'}), 401
+
+    registry.flush()
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
@@ -1,22 +1,18 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
 from models.nginx_config import NginxConfig
 from models.user import User
 from database import db
 from datetime import datetime
+from utils.identity import get_current_user
 import os
 import subprocess
 
 nginx_bp = Blueprint('nginx', __name__)
 
-def get_current_user():
-    """获取当前用户"""
-    user_id = get_jwt_identity()
-    return User.query.get(user_id)
-
 def is_admin(user):
     """检查是否为管理员"""
-    return user and user.is_admin
+    return user is not None and user.is_admin()
 
 def reload_nginx():
     """重载Nginx配置"""
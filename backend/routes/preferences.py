@@ -5,6 +5,7 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from database import db
 from models.user import User
+from utils.identity import get_current_user
 
 preferences_bp = Blueprint('preferences', __name__)
 
@@ -37,7 +38,7 @@ def get_preferences():
     """获取用户偏好设置"""
     try:
         user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
+        user = get_current_user()
         
         if not user:
             return jsonify({'code': 404, 'message': '用户不存在'}), 404
@@ -75,7 +76,7 @@ def update_preferences():
     """更新用户偏好设置"""
     try:
         user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
+        user = get_current_user()
         
         if not user:
             return jsonify({'code': 404, 'message': '用户不存在'}), 404
@@ -124,7 +125,7 @@ def update_ai_model():
     """快捷更新AI模型"""
     try:
         user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
+        user = get_current_user()
         
         if not user:
             return jsonify({'code': 404, 'message': '用户不存在'}), 404
@@ -156,7 +157,7 @@ def update_api_key():
     """更新自定义API Key"""
     try:
         user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
+        user = get_current_user()
         
         if not user:
             return jsonify({'code': 404, 'message': '用户不存在'}), 404
@@ -190,7 +191,7 @@ def test_api_key():
     """测试API Key是否有效"""
     try:
         user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
+        user = get_current_user()
         
         if not user:
             return jsonify({'code': 404, 'message': '用户不存在'}), 404
@@ -207,9 +208,10 @@ def test_api_key():
         
         # 尝试调用智谱AI进行测试
         import requests
+        from config.ai import ZhipuConfig
         try:
             resp = requests.post(
-                'https://open.bigmodel.cn/api/paas/v4/chat/completions',
+                ZhipuConfig.get_chat_completions_url(),
                 headers={
                     'Authorization': f'Bearer {api_key}',
                     'Content-Type': 'application/json'
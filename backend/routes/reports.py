@@ -1,145 +1,106 @@
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask import Blueprint, request, jsonify, Response, stream_with_context, current_app
+from flask_jwt_extended import jwt_required
 from models.user import User
 from models.ai_report import AIReport
 from database import db
 from datetime import datetime, timedelta, date
-from services.zhipu_service import ZhipuAiService
 import json
 import threading
 import asyncio
 from concurrent.futures import ThreadPoolExecutor
-from workflows.service import get_workflow_service
+from utils.identity import get_current_user
 
 reports_bp = Blueprint('reports', __name__)
 
 # 创建线程池用于并发生成报告（最多5个并发任务）
 executor = ThreadPoolExecutor(max_workers=5, thread_name_prefix='report_gen')
 
-def _generate_report_async(report_id, user_id, api_key, model, report_type, start_date, end_date, focus_areas=None):
-    """异步生成报告的后台任务（使用LangGraph工作流）"""
-    # 使用Flask应用上下文
-    from flask import current_app
-    from app import create_app
+def _generate_report_async(app, report_id, user_id, api_key, model, report_type, start_date, end_date, focus_areas=None):
+    """异步生成报告的后台任务（使用LangGraph工作流），复用提交任务时的应用实例"""
+    with app.app_context():
+        run_report_task(report_id, user_id, api_key, model, report_type, start_date, end_date, focus_areas)
+
+
+def run_report_task(report_id, user_id, api_key, model, report_type, start_date, end_date,
+                    focus_areas=None, data_context=None):
+    """
+    执行报告生成工作流并更新报告状态（需在应用上下文中调用）
     
-    # 创建应用上下文
-    app = create_app()
+    Args:
+        data_context: 预加载的数据上下文（批量生成报告时传入），None时由工作流自行加载
     
-    with app.app_context():
+    Returns:
+        bool: 报告是否生成成功
+    """
+    try:
+        print(f"\n{'='*80}")
+        print(f"[LangGraph工作流] 开始处理 - 报告ID: {report_id}")
+        print(f"- 用户ID: {user_id}")
+        print(f"- 报告类型: {report_type}")
+        print(f"- 时间范围: {start_date} 至 {end_date}")
+        print(f"- 模型: {model}")
+        print(f"- 线程: {threading.current_thread().name}")
+        print(f"{'='*80}\n")
+        
+        # 构建工作流任务上下文
+        task_context = {
+            "report_id": report_id,
+            "user_id": user_id,
+            "api_key": api_key,
+            "model": model,
+            "report_type": report_type,
+            "start_date": start_date,
+            "end_date": end_date,
+            "focus_areas": focus_areas or [],
+            "enable_ai_insights": False  # 禁用AI预分析以节省API调用
+        }
+        
+        # 获取工作流服务并执行（工作流依赖较重，首次生成报告时才加载）
+        from workflows.service import get_workflow_service
+        workflow_service = get_workflow_service()
+        
+        # 在新的事件循环中执行异步工作流
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
         try:
-            print(f"\n{'='*80}")
-            print(f"[LangGraph工作流] 开始处理 - 报告ID: {report_id}")
-            print(f"- 用户ID: {user_id}")
-            print(f"- 报告类型: {report_type}")
-            print(f"- 时间范围: {start_date} 至 {end_date}")
-            print(f"- 模型: {model}")
-            print(f"- 线程: {threading.current_thread().name}")
-            print(f"{'='*80}\n")
-            
-            # 构建工作流任务上下文
-            task_context = {
-                "report_id": report_id,
-                "user_id": user_id,
-                "api_key": api_key,
-                "model": model,
-                "report_type": report_type,
-                "start_date": start_date,
-                "end_date": end_date,
-                "focus_areas": focus_areas or [],
-                "enable_ai_insights": False  # 禁用AI预分析以节省API调用
-            }
-            
-            # 获取工作流服务并执行
-            workflow_service = get_workflow_service()
-            
-            # 在新的事件循环中执行异步工作流
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            try:
-                final_state = loop.run_until_complete(
-                    workflow_service.execute_workflow(task_context)
-                )
-            finally:
-                loop.close()
-            
-            # 从final_state中提取报告内容
-            content = final_state.get('report_content')
-            
-            # 检查执行路径最后一个节点是否是失败节点
-            execution_path = final_state.get('execution_path', [])
-            last_node = execution_path[-1]['node'] if execution_path else None
+            final_state = loop.run_until_complete(
+                workflow_service.execute_workflow(task_context, data_context=data_context)
+            )
+        finally:
+            loop.close()
+        
+        # 从final_state中提取报告内容
+        content = final_state.get('report_content')
+        
+        # 检查执行路径最后一个节点是否是失败节点
+        execution_path = final_state.get('execution_path', [])
+        last_node = execution_path[-1]['node'] if execution_path else None
+        
+        # 如果最后一个节点是handle_failure，说明工作流失败了
+        if last_node == 'handle_failure':
+            # 确保error_message存在
+            if not final_state.get('error_message'):
+                final_state['error_message'] = '报告生成失败，已达最大重试次数'
             
-            # 如果最后一个节点是handle_failure，说明工作流失败了
-            if last_node == 'handle_failure':
-                # 确保error_message存在
-                if not final_state.get('error_message'):
-                    final_state['error_message'] = '报告生成失败，已达最大重试次数'
-                
-                error_msg = final_state['error_message']
-                print(f"\n[LangGraph工作流] ❌ 失败 - 报告ID: {report_id}")
-                print(f"- 错误: {error_msg}\n")
-                
-                # 注意：handle_failure_node已经保存了状态和工作流轨迹，不需要重复保存
-                return
-            
-            # 检查是否有错误或内容为空
-            if final_state.get('error_message') or not content:
-                error_msg = final_state.get('error_message', '报告生成失败')
-                print(f"\n[LangGraph工作流] ❌ 失败 - 报告ID: {report_id}")
-                print(f"- 错误: {error_msg}\n")
-                
-                # 更新报告状态为失败
-                report = AIReport.query.get(report_id)
-                if report:
-                    report.status = 'failed'
-                    report.error_message = error_msg
-                    # 保存工作流轨迹（即使失败也保存）
-                    if final_state.get('execution_path'):
-                        report.execution_path = json.dumps(final_state['execution_path'], ensure_ascii=False)
-                    if final_state.get('agent_decisions') or final_state.get('quality_score'):
-                        report.workflow_metadata = json.dumps({
-                            "agent_decisions": final_state.get('agent_decisions', []),
-                            "quality_score": final_state.get('quality_score'),
-                            "retry_count": final_state.get('retry_count', 0),
-                            "start_time": final_state.get('start_time'),
-                            "end_time": final_state.get('end_time'),
-                            "error_message": error_msg
-                        }, ensure_ascii=False)
-                    db.session.commit()
-                return
+            error_msg = final_state['error_message']
+            print(f"\n[LangGraph工作流] ❌ 失败 - 报告ID: {report_id}")
+            print(f"- 错误: {error_msg}\n")
             
-            # 解析内容提取摘要
-            try:
-                content_json = json.loads(content)
-                # 新格式：executive_summary 是对象
-                if 'executive_summary' in content_json:
-                    exec_summary = content_json['executive_summary']
-                    if isinstance(exec_summary, dict):
-                        # 提取content字段作为摘要
-                        summary = exec_summary.get('content', exec_summary.get('title', '报告已生成'))
-                    else:
-                        summary = str(exec_summary)
-                # 旧格式：period_summary 是字符串
-                elif 'period_summary' in content_json:
-                    summary = str(content_json['period_summary'])
-                else:
-                    summary = "报告已生成"
-                
-                # 确保summary是字符串，限制长度
-                summary = str(summary)[:500] if summary else "报告已生成"
-            except Exception as e:
-                print(f"[摘要提取失败] {e}")
-                summary = "报告已生成"
+            # 注意：handle_failure_node已经保存了状态和工作流轨迹，不需要重复保存
+            return False
+        
+        # 检查是否有错误或内容为空
+        if final_state.get('error_message') or not content:
+            error_msg = final_state.get('error_message', '报告生成失败')
+            print(f"\n[LangGraph工作流] ❌ 失败 - 报告ID: {report_id}")
+            print(f"- 错误: {error_msg}\n")
             
-            # 更新报告状态
+            # 更新报告状态为失败
             report = AIReport.query.get(report_id)
             if report:
-                report.content = content
-                report.summary = summary
-                report.status = 'completed'
-                report.generated_at = datetime.utcnow()
-                
-                # 保存工作流轨迹数据（这部分应该已经在save_report_node中保存了，但为了确保兼容性再保存一次）
+                report.status = 'failed'
+                report.error_message = error_msg
+                # 保存工作流轨迹（即使失败也保存）
                 if final_state.get('execution_path'):
                     report.execution_path = json.dumps(final_state['execution_path'], ensure_ascii=False)
                 if final_state.get('agent_decisions') or final_state.get('quality_score'):
@@ -147,43 +108,89 @@ def _generate_report_async(report_id, user_id, api_key, model, report_type, star
                         "agent_decisions": final_state.get('agent_decisions', []),
                         "quality_score": final_state.get('quality_score'),
                         "retry_count": final_state.get('retry_count', 0),
+                        "data_context": final_state['data_context'].to_trace() if final_state.get('data_context') else None,
                         "start_time": final_state.get('start_time'),
-                        "end_time": final_state.get('end_time')
+                        "end_time": final_state.get('end_time'),
+                        "error_message": error_msg
                     }, ensure_ascii=False)
-                
                 db.session.commit()
-                
-                print(f"\n[LangGraph工作流] ✅ 成功 - 报告ID: {report_id}")
-                print(f"- 摘要: {summary[:50]}...")
-                print(f"- 生成时间: {report.generated_at}")
-                print(f"- 工作流节点数: {len(final_state.get('execution_path', []))}\n")
+            return False
+        
+        # 解析内容提取摘要
+        try:
+            content_json = json.loads(content)
+            # 新格式：executive_summary 是对象
+            if 'executive_summary' in content_json:
+                exec_summary = content_json['executive_summary']
+                if isinstance(exec_summary, dict):
+                    # 提取content字段作为摘要
+                    summary = exec_summary.get('content', exec_summary.get('title', '报告已生成'))
+                else:
+                    summary = str(exec_summary)
+            # 旧格式：period_summary 是字符串
+            elif 'period_summary' in content_json:
+                summary = str(content_json['period_summary'])
             else:
-                print(f"\n[LangGraph工作流] ⚠️ 报告不存在 - 报告ID: {report_id}\n")
-                
+                summary = "报告已生成"
+            
+            # 确保summary是字符串，限制长度
+            summary = str(summary)[:500] if summary else "报告已生成"
         except Exception as e:
-            # 处理错误
-            import traceback
-            error_details = traceback.format_exc()
+            print(f"[摘要提取失败] {e}")
+            summary = "报告已生成"
+        
+        # 更新报告状态
+        report = AIReport.query.get(report_id)
+        if report:
+            report.content = content
+            report.summary = summary
+            report.status = 'completed'
+            report.generated_at = datetime.utcnow()
             
-            print(f"\n[LangGraph工作流] ❌ 失败 - 报告ID: {report_id}")
-            print(f"- 错误类型: {type(e).__name__}")
-            print(f"- 错误信息: {str(e)}")
-            print(f"- 详细堆栈:\n{error_details}")
-            print("=" * 50 + "\n")
+            # 保存工作流轨迹数据（这部分应该已经在save_report_node中保存了，但为了确保兼容性再保存一次）
+            if final_state.get('execution_path'):
+                report.execution_path = json.dumps(final_state['execution_path'], ensure_ascii=False)
+            if final_state.get('agent_decisions') or final_state.get('quality_score'):
+                report.workflow_metadata = json.dumps({
+                    "agent_decisions": final_state.get('agent_decisions', []),
+                    "quality_score": final_state.get('quality_score'),
+                    "retry_count": final_state.get('retry_count', 0),
+                    "data_context": final_state['data_context'].to_trace() if final_state.get('data_context') else None,
+                    "start_time": final_state.get('start_time'),
+                    "end_time": final_state.get('end_time')
+                }, ensure_ascii=False)
             
-            try:
-                report = AIReport.query.get(report_id)
-                if report:
-                    report.status = 'failed'
-                    report.error_message = str(e)
-                    db.session.commit()
-            except Exception as db_error:
-                print(f"[LangGraph工作流] 数据库更新失败: {str(db_error)}")
-
-def get_current_user():
-    """获取当前用户"""
-    user_id = get_jwt_identity()
-    return User.query.get(int(user_id))
+            db.session.commit()
+            
+            print(f"\n[LangGraph工作流] ✅ 成功 - 报告ID: {report_id}")
+            print(f"- 摘要: {summary[:50]}...")
+            print(f"- 生成时间: {report.generated_at}")
+            print(f"- 工作流节点数: {len(final_state.get('execution_path', []))}\n")
+            return True
+        else:
+            print(f"\n[LangGraph工作流] ⚠️ 报告不存在 - 报告ID: {report_id}\n")
+            return False
+            
+    except Exception as e:
+        # 处理错误
+        import traceback
+        error_details = traceback.format_exc()
+        
+        print(f"\n[LangGraph工作流] ❌ 失败 - 报告ID: {report_id}")
+        print(f"- 错误类型: {type(e).__name__}")
+        print(f"- 错误信息: {str(e)}")
+        print(f"- 详细堆栈:\n{error_details}")
+        print("=" * 50 + "\n")
+        
+        try:
+            report = AIReport.query.get(report_id)
+            if report:
+                report.status = 'failed'
+                report.error_message = str(e)
+                db.session.commit()
+        except Exception as db_error:
+            print(f"[LangGraph工作流] 数据库更新失败: {str(db_error)}")
+        return False
 
 @reports_bp.route('/reports/token', methods=['POST'])
 @jwt_required()
@@ -414,6 +421,7 @@ def generate_report():
         # 提交异步任务到线程池
         executor.submit(
             _generate_report_async,
+            current_app._get_current_object(),
             report.id,
             user.id,
             api_key,
@@ -527,6 +535,65 @@ def get_report(report_id):
             'message': f'获取报告失败：{str(e)}'
         }), 500
 
+@reports_bp.route('/reports/<int:report_id>/content', methods=['GET'])
+@jwt_required()
+def stream_report_content(report_id):
+    """
+    流式输出报告HTML
+    
+    有数据快照的报告按预编译模板边渲染边输出，不在内存中拼接整份报告；
+    旧报告直接输出已保存的内容
+    """
+    try:
+        user = get_current_user()
+        if not user:
+            return jsonify({
+                'success': False,
+                'message': '用户不存在'
+            }), 404
+        
+        report = AIReport.query.get(report_id)
+        
+        if not report:
+            return jsonify({
+                'success': False,
+                'message': '报告不存在'
+            }), 404
+        
+        # 权限检查
+        if report.user_id != user.id:
+            return jsonify({
+                'success': False,
+                'message': '无权访问此报告'
+            }), 403
+        
+        if report.status != 'completed':
+            return jsonify({
+                'success': False,
+                'message': '报告尚未生成完成'
+            }), 400
+        
+        if report.data_snapshot:
+            from workflows.report_renderer import stream_report
+            
+            data = json.loads(report.data_snapshot)
+            chunks = stream_report(data, {
+                'report_type': report.report_type,
+                'start_date': report.start_date,
+                'end_date': report.end_date,
+                'generated_at': report.generated_at
+            })
+        else:
+            chunks = iter([report.content or ''])
+        
+        return Response(stream_with_context(chunks), mimetype='text/html')
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'获取报告内容失败：{str(e)}'
+        }), 500
+
 @reports_bp.route('/reports/<int:report_id>', methods=['DELETE'])
 @jwt_required()
 def delete_report(report_id):
@@ -626,6 +693,7 @@ def get_report_stats():
 def get_workflow_visualization():
     """获取工作流可视化数据"""
     try:
+        from workflows.service import get_workflow_service
         workflow_service = get_workflow_service()
         visualization_data = workflow_service.get_workflow_visualization()
         
@@ -2,18 +2,22 @@
 微信公众号相关接口
 包括：微信登录、JSSDK配置、扫码登录等
 """
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from flask_jwt_extended import create_access_token
-import requests
 import time
 import hashlib
 import random
 import string
 import os
+import sys
+import json
+import threading
 from datetime import datetime, timedelta
 from database import db
 from models.user import User
 from utils.response import APIResponse
+from services.wechat_credential_service import wechat_credential_cache
+from services.qrcode_session_service import qrcode_session_store
 
 wechat_bp = Blueprint('wechat', __name__)
 
@@ -22,39 +26,74 @@ WECHAT_APPID = os.getenv('WECHAT_APPID', '')
 WECHAT_SECRET = os.getenv('WECHAT_SECRET', '')
 WECHAT_TOKEN = os.getenv('WECHAT_TOKEN', '')  # 用于验证服务器配置
 
-# 微信API地址
-WECHAT_API_BASE = 'https://api.weixin.qq.com'
+# 微信API地址（可通过 WECHAT_API_BASE 指向本地模拟服务 mock_wechat_server.py）
+WECHAT_API_BASE = os.getenv('WECHAT_API_BASE', 'https://api.weixin.qq.com').rstrip('/')
 WECHAT_ACCESS_TOKEN_URL = f'{WECHAT_API_BASE}/cgi-bin/token'
-WECHAT_OAUTH_URL = 'https://api.weixin.qq.com/sns/oauth2/access_token'
-WECHAT_USER_INFO_URL = 'https://api.weixin.qq.com/sns/userinfo'
+WECHAT_OAUTH_URL = f'{WECHAT_API_BASE}/sns/oauth2/access_token'
+WECHAT_USER_INFO_URL = f'{WECHAT_API_BASE}/sns/userinfo'
 WECHAT_JSAPI_TICKET_URL = f'{WECHAT_API_BASE}/cgi-bin/ticket/getticket'
 
-# 扫码登录状态存储（简单实现，生产环境应使用Redis）
-qrcode_sessions = {}
+# access_token 无效或过期的错误码
+WECHAT_INVALID_TOKEN_ERRCODES = (40001, 40014, 42001)
+
+# 扫码状态长轮询/SSE的最长等待时间（秒），需小于Nginx/Gunicorn的超时时间
+QRCODE_MAX_WAIT = 25
+QRCODE_SSE_HEARTBEAT = 15
+
+# 挂起等待会一直占用请求线程：gevent worker 下不限制；sync/gthread worker 每个进程最多
+# QRCODE_MAX_WAITERS 个请求同时等待，名额占满时立即返回当前状态，客户端按 poll_after 秒后再查询
+QRCODE_MAX_WAITERS = int(os.getenv('QRCODE_MAX_WAITERS', 1))
+QRCODE_POLL_INTERVAL = 2
+_qrcode_waiters = threading.BoundedSemaphore(max(QRCODE_MAX_WAITERS, 0))
+
+
+def _cooperative_worker():
+    """是否运行在 gevent 协程 worker 中（gunicorn.conf.py 在 gevent 模式下已打补丁）"""
+    monkey = sys.modules.get('gevent.monkey')
+    return monkey is not None and monkey.is_module_patched('socket')
+
+
+def _acquire_wait_slot():
+    """
+    申请一个挂起等待名额
+    
+    Returns:
+        释放函数；没有空闲名额时返回None
+    """
+    if _cooperative_worker():
+        return lambda: None
+    if _qrcode_waiters.acquire(blocking=False):
+        return _qrcode_waiters.release
+    return None
 
 def generate_random_string(length=16):
     """生成随机字符串"""
     return ''.join(random.choices(string.ascii_letters + string.digits, k=length))
 
 
+def _fetch_access_token():
+    """向微信请求新的access_token，返回 (access_token, expires_in)"""
+    import requests
+    
+    response = requests.get(WECHAT_ACCESS_TOKEN_URL, params={
+        'grant_type': 'client_credential',
+        'appid': WECHAT_APPID,
+        'secret': WECHAT_SECRET
+    }, timeout=10)
+    
+    data = response.json()
+    if 'access_token' not in data:
+        raise RuntimeError(f"获取access_token失败: {data}")
+    return data['access_token'], data.get('expires_in', 7200)
+
+
 def get_access_token():
     """
     获取微信access_token（普通接口调用凭证）
-    注意：这个token应该缓存2小时，避免频繁请求
+    凭证在所有worker间共享缓存，按微信返回的有效期提前刷新
     """
     try:
-        response = requests.get(WECHAT_ACCESS_TOKEN_URL, params={
-            'grant_type': 'client_credential',
-            'appid': WECHAT_APPID,
-            'secret': WECHAT_SECRET
-        }, timeout=10)
-        
-        data = response.json()
-        if 'access_token' in data:
-            return data['access_token']
-        else:
-            print(f"获取access_token失败: {data}")
-            return None
+        return wechat_credential_cache.get('access_token', WECHAT_APPID, _fetch_access_token)
     except Exception as e:
         print(f"获取access_token异常: {e}")
         return None
@@ -63,20 +102,30 @@ def get_access_token():
 def get_jsapi_ticket(access_token):
     """
     获取jsapi_ticket（用于JS-SDK签名）
-    注意：这个ticket应该缓存2小时
+    凭证在所有worker间共享缓存；access_token 被微信判定无效时作废并重新获取一次
     """
+    def fetch_ticket():
+        import requests
+        
+        token = access_token
+        for attempt in range(2):
+            response = requests.get(WECHAT_JSAPI_TICKET_URL, params={
+                'access_token': token,
+                'type': 'jsapi'
+            }, timeout=10)
+            
+            data = response.json()
+            if data.get('errcode') == 0:
+                return data['ticket'], data.get('expires_in', 7200)
+            if data.get('errcode') in WECHAT_INVALID_TOKEN_ERRCODES and attempt == 0:
+                wechat_credential_cache.invalidate('access_token', WECHAT_APPID, token)
+                token = get_access_token()
+                if token:
+                    continue
+            raise RuntimeError(f"获取jsapi_ticket失败: {data}")
+    
     try:
-        response = requests.get(WECHAT_JSAPI_TICKET_URL, params={
-            'access_token': access_token,
-            'type': 'jsapi'
-        }, timeout=10)
-        
-        data = response.json()
-        if data.get('errcode') == 0:
-            return data['ticket']
-        else:
-            print(f"获取jsapi_ticket失败: {data}")
-            return None
+        return wechat_credential_cache.get('jsapi_ticket', WECHAT_APPID, fetch_ticket)
     except Exception as e:
         print(f"获取jsapi_ticket异常: {e}")
         return None
@@ -94,12 +143,12 @@ def get_jssdk_config():
         if not url:
             return APIResponse.error('缺少url参数')
         
-        # 1. 获取access_token（生产环境应该缓存）
+        # 1. 获取access_token（共享缓存）
         access_token = get_access_token()
         if not access_token:
             return APIResponse.error('获取access_token失败')
         
-        # 2. 获取jsapi_ticket（生产环境应该缓存）
+        # 2. 获取jsapi_ticket（共享缓存）
         jsapi_ticket = get_jsapi_ticket(access_token)
         if not jsapi_ticket:
             return APIResponse.error('获取jsapi_ticket失败')
@@ -132,6 +181,8 @@ def wechat_login():
     微信登录接口
     前端通过微信授权获取code后，调用此接口换取token和用户信息
     """
+    import requests
+    
     try:
         data = request.get_json()
         code = data.get('code')
@@ -278,35 +329,81 @@ def wechat_verify():
 def get_qrcode_status():
     """
     查询扫码登录状态
-    用于前端轮询检查用户是否已扫码登录
+    用于前端轮询检查用户是否已扫码登录；传入 wait=秒数 时为长轮询，
+    状态变化或超时后才返回（最长 QRCODE_MAX_WAIT 秒）。
+    返回的 poll_after 为客户端下次查询前应等待的秒数（未能挂起等待时为 QRCODE_POLL_INTERVAL）
     """
     try:
         ticket = request.args.get('ticket')
         if not ticket:
             return APIResponse.error('缺少ticket参数', 400)
+        if not qrcode_session_store.is_valid_ticket(ticket):
+            return APIResponse.error('无效的ticket', 400)
+        
+        wait = min(max(request.args.get('wait', 0, type=float), 0), QRCODE_MAX_WAIT)
+        release = _acquire_wait_slot() if wait else None
+        if release:
+            try:
+                session = qrcode_session_store.wait_for_change(ticket, wait)
+            finally:
+                release()
+        else:
+            session = qrcode_session_store.get_or_create(ticket)
         
-        # 检查扫码状态
-        session = qrcode_sessions.get(ticket)
-        if not session:
-            return APIResponse.error('二维码不存在或已过期', 404)
-        
-        # 检查是否过期（5分钟）
-        if datetime.now() > session['expire_time']:
-            del qrcode_sessions[ticket]
+        if session['status'] == 'expired':
             return APIResponse.error('二维码已过期', 410)
         
-        # 返回状态
-        return APIResponse.success({
-            'status': session['status'],
-            'token': session.get('token'),
-            'user': session.get('user')
-        })
+        return APIResponse.success({**session, 'poll_after': 0 if release else QRCODE_POLL_INTERVAL})
         
     except Exception as e:
         print(f'查询扫码状态失败: {str(e)}')
         return APIResponse.error(f'查询失败: {str(e)}', 500)
 
 
+@wechat_bp.route('/wechat/qrcode-events', methods=['GET'])
+def qrcode_events():
+    """
+    扫码登录状态推送（Server-Sent Events）
+    连接建立后立即推送当前状态，状态变化时再次推送；扫码成功或二维码过期后结束，
+    单个连接最长 QRCODE_MAX_WAIT 秒，浏览器 EventSource 会自动重连。
+    没有挂起等待名额时只推送当前状态后结束，浏览器 QRCODE_POLL_INTERVAL 秒后重连
+    """
+    ticket = request.args.get('ticket')
+    if not ticket or not qrcode_session_store.is_valid_ticket(ticket):
+        return APIResponse.error('无效的ticket', 400)
+    
+    def generate():
+        deadline = time.monotonic() + QRCODE_MAX_WAIT
+        session = qrcode_session_store.get_or_create(ticket)
+        yield f"retry: {QRCODE_POLL_INTERVAL * 1000}\n"
+        yield f"event: status\ndata: {json.dumps(session, ensure_ascii=False)}\n\n"
+        
+        release = _acquire_wait_slot() if session['status'] == 'waiting' else None
+        if not release:
+            return
+        try:
+            while session['status'] == 'waiting':
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                status = session['status']
+                session = qrcode_session_store.wait_for_change(
+                    ticket, min(QRCODE_SSE_HEARTBEAT, remaining), known_status=status
+                )
+                if session['status'] == status:
+                    yield ": keep-alive\n\n"
+                else:
+                    yield f"event: status\ndata: {json.dumps(session, ensure_ascii=False)}\n\n"
+        finally:
+            release()
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
 @wechat_bp.route('/wechat/qrcode-confirm', methods=['POST'])
 def confirm_qrcode():
     """
@@ -319,6 +416,8 @@ def confirm_qrcode():
         
         if not ticket or not token:
             return APIResponse.error('缺少参数', 400)
+        if not qrcode_session_store.is_valid_ticket(ticket):
+            return APIResponse.error('无效的ticket', 400)
         
         # 获取用户信息
         from flask_jwt_extended import decode_token
@@ -329,16 +428,15 @@ def confirm_qrcode():
         if not user:
             return APIResponse.error('用户不存在', 404)
         
-        # 更新扫码状态
-        if ticket in qrcode_sessions:
-            qrcode_sessions[ticket]['status'] = 'scanned'
-            qrcode_sessions[ticket]['token'] = token
-            qrcode_sessions[ticket]['user'] = {
-                'id': user.id,
-                'username': user.username,
-                'wechat_nickname': user.wechat_nickname,
-                'wechat_avatar': user.wechat_avatar
-            }
+        # 更新扫码状态（所有worker共享，等待中的长轮询会被唤醒）
+        session = qrcode_session_store.confirm(ticket, token, {
+            'id': user.id,
+            'username': user.username,
+            'wechat_nickname': user.wechat_nickname,
+            'wechat_avatar': user.wechat_avatar
+        })
+        if session['status'] == 'expired':
+            return APIResponse.error('二维码已过期', 410)
         
         return APIResponse.success({'message': '扫码成功'})
         
@@ -0,0 +1,65 @@
+"""
+提醒批量扫描入口
+扫描全部用户的收租、资产到期、费用、维护、折旧和价值变动提醒，写入通知发件箱（notification_outbox），
+适合由 cron 或云托管定时触发器每天调用（建议在 run_rent_schedule.py 之后执行）
+
+使用方法：
+  python run_notification_scan.py
+  python run_notification_scan.py --types rent maintenance --batch-size 2000
+  python run_notification_scan.py --shard-index 0 --shard-count 4
+  python run_notification_scan.py --dry-run
+
+crontab 示例（每天 08:00）：
+  0 8 * * *  cd /app && python run_notification_scan.py
+
+说明：
+  - 同一提醒（如同一笔租金的同一应收日）只会写入一次，重复执行或中断后重跑不会重复通知
+  - 多实例并行时通过 --shard-index/--shard-count 按用户ID取模划分，互不重叠
+"""
+import argparse
+import sys
+import time
+from datetime import date, datetime
+
+
+def main():
+    from services.notification_scanner import NOTIFICATION_TYPES
+
+    parser = argparse.ArgumentParser(description='提醒批量扫描')
+    parser.add_argument('--date', help='基准日期 YYYY-MM-DD（默认今天）')
+    parser.add_argument('--types', nargs='+', choices=NOTIFICATION_TYPES, help='只扫描这些提醒类型')
+    parser.add_argument('--batch-size', type=int, default=1000, help='每批扫描的用户数')
+    parser.add_argument('--shard-index', type=int, default=0, help='当前分片序号（从0开始）')
+    parser.add_argument('--shard-count', type=int, default=1, help='分片总数')
+    parser.add_argument('--limit', type=int, help='最多扫描的用户数（调试用）')
+    parser.add_argument('--dry-run', action='store_true', help='只统计，不写入发件箱')
+    args = parser.parse_args()
+
+    today = datetime.strptime(args.date, '%Y-%m-%d').date() if args.date else date.today()
+
+    from app import create_app
+    from services.notification_scanner import NotificationScanner
+
+    app = create_app()
+    started = time.perf_counter()
+    with app.app_context():
+        scanner = NotificationScanner(
+            today=today,
+            batch_size=args.batch_size,
+            shard_index=args.shard_index,
+            shard_count=args.shard_count,
+            types=args.types,
+            limit=args.limit,
+            dry_run=args.dry_run
+        )
+        stats = scanner.run()
+
+    by_type = '，'.join(f"{t} {stats[f'created_{t}']}" for t in scanner.types)
+    print(f"[提醒扫描] {today}{'（试运行）' if args.dry_run else ''} 扫描用户 {stats['users']}，"
+          f"候选 {stats['candidates']}，已通知过 {stats['duplicates']}，新增 {stats['created']}（{by_type}），"
+          f"耗时 {time.perf_counter() - started:.2f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
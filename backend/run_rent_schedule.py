@@ -0,0 +1,55 @@
+"""
+租金计划批量生成入口
+为所有出租中的固定资产生成每期应收租金记录（未收款），适合由 cron 或云托管定时触发器每天调用
+
+使用方法：
+  python run_rent_schedule.py                       # 全部用户，生成到未来3个月
+  python run_rent_schedule.py --horizon-months 12
+  python run_rent_schedule.py --user-id 12 --dry-run
+
+crontab 示例（每天 01:00）：
+  0 1 * * *  cd /app && python run_rent_schedule.py
+
+说明：
+  - 重复执行是幂等的，只补齐缺少的期次、同步租金变更、清理停租后多余的未收款记录
+  - 应收日期已过仍未收款的自动记录标记为 overdue
+"""
+import argparse
+import sys
+import time
+from datetime import date, datetime
+
+
+def main():
+    parser = argparse.ArgumentParser(description='租金计划批量生成')
+    parser.add_argument('--date', help='基准日期 YYYY-MM-DD（默认今天）')
+    parser.add_argument('--horizon-months', type=int, default=3, help='向后生成的月数')
+    parser.add_argument('--user-id', type=int, help='只处理该用户的资产')
+    parser.add_argument('--batch-size', type=int, default=500, help='每批处理的资产数')
+    parser.add_argument('--dry-run', action='store_true', help='只统计，不写入')
+    args = parser.parse_args()
+
+    today = datetime.strptime(args.date, '%Y-%m-%d').date() if args.date else date.today()
+
+    from app import create_app
+    from services.rent_schedule_service import RentScheduleService
+
+    app = create_app()
+    started = time.perf_counter()
+    with app.app_context():
+        service = RentScheduleService(
+            today=today,
+            horizon_months=args.horizon_months,
+            batch_size=args.batch_size,
+            dry_run=args.dry_run
+        )
+        stats = service.run(user_id=args.user_id)
+
+    print(f"[租金计划] {today}{'（试运行）' if args.dry_run else ''} 出租资产 {stats['assets']} 个，"
+          f"新增 {stats['created']}，更新 {stats['updated']}，补齐预期金额 {stats['backfilled']}，"
+          f"删除 {stats['removed']}，耗时 {time.perf_counter() - started:.2f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,84 @@
+"""
+定期报告批量生成入口
+为开启周报/月报的用户生成上一周期的报告，适合由 cron 或云托管定时触发器调用
+
+使用方法：
+  python run_scheduled_reports.py --type monthly
+  python run_scheduled_reports.py --type weekly --shard-index 0 --shard-count 4 --concurrency 3
+  python run_scheduled_reports.py --type auto          # 周一生成周报，每月1日生成月报
+
+crontab 示例（每周一 02:00 周报、每月1日 03:00 月报）：
+  0 2 * * 1  cd /app && python run_scheduled_reports.py --type weekly
+  0 3 1 * *  cd /app && python run_scheduled_reports.py --type monthly
+
+说明：
+  - 同一周期已完成的报告会跳过，重复执行或中断后重跑只处理未完成的用户
+  - 多实例并行时通过 --shard-index/--shard-count 按用户ID取模划分，互不重叠
+"""
+import argparse
+import sys
+from datetime import date, datetime
+
+
+def resolve_report_types(report_type, today):
+    """解析需要生成的报告类型（auto 按日期判断）"""
+    if report_type != 'auto':
+        return [report_type]
+    types = []
+    if today.weekday() == 0:
+        types.append('weekly')
+    if today.day == 1:
+        types.append('monthly')
+    return types
+
+
+def main():
+    parser = argparse.ArgumentParser(description='定期报告批量生成')
+    parser.add_argument('--type', dest='report_type', choices=['weekly', 'monthly', 'auto'], default='auto',
+                        help='报告类型（auto：周一生成周报，每月1日生成月报）')
+    parser.add_argument('--date', help='基准日期 YYYY-MM-DD（默认今天），生成其上一周期的报告')
+    parser.add_argument('--shard-index', type=int, default=0, help='当前分片序号（从0开始）')
+    parser.add_argument('--shard-count', type=int, default=1, help='分片总数')
+    parser.add_argument('--batch-size', type=int, default=50, help='每批扫描的用户数')
+    parser.add_argument('--concurrency', type=int, default=3, help='同时生成的报告数')
+    parser.add_argument('--stale-minutes', type=int, default=60,
+                        help='生成中的报告超过该分钟数未更新视为中断，重新生成')
+    parser.add_argument('--retry-failed', action='store_true', help='重新生成本周期失败的报告')
+    parser.add_argument('--limit', type=int, help='最多处理的用户数（调试用）')
+    parser.add_argument('--dry-run', action='store_true', help='只统计待生成的用户，不创建报告')
+    args = parser.parse_args()
+
+    today = datetime.strptime(args.date, '%Y-%m-%d').date() if args.date else date.today()
+    report_types = resolve_report_types(args.report_type, today)
+    if not report_types:
+        print(f"[定期报告] {today} 无需生成定期报告")
+        return 0
+
+    from app import create_app
+    from services.scheduled_report_service import ScheduledReportService
+
+    app = create_app()
+    failed = 0
+    with app.app_context():
+        for report_type in report_types:
+            service = ScheduledReportService(
+                app,
+                report_type,
+                today=today,
+                shard_index=args.shard_index,
+                shard_count=args.shard_count,
+                batch_size=args.batch_size,
+                concurrency=args.concurrency,
+                stale_minutes=args.stale_minutes,
+                retry_failed=args.retry_failed,
+                limit=args.limit,
+                dry_run=args.dry_run
+            )
+            stats = service.run()
+            failed += stats['failed']
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
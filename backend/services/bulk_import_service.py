@@ -0,0 +1,489 @@
+"""
+批量导入服务
+从CSV/XLSX流式读取虚拟资产（项目）、固定资产、收入记录，按批校验并批量写入：
+
+  - 文件逐行解析（CSV按行读取，XLSX使用openpyxl只读模式），不整表载入内存
+  - 表头支持中文或字段名（见 *_COLUMNS），分类按名称匹配，整次导入只查询一次分类表
+  - 每批（chunk_size行）用一条 INSERT ... executemany 写入并提交，单行错误不影响其他行
+  - 返回每行的错误明细（行号从表头之后的第一行数据记为2，与表格软件中的行号一致）
+
+注意：批量写入不经过ORM对象，折旧、净收入等派生字段在这里按模型相同的公式计算
+"""
+import csv
+import io
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+from functools import lru_cache
+
+from database import db
+from models.asset_income import AssetIncome
+from models.category import Category
+from models.fixed_asset import FixedAsset
+from models.monthly_rollup import apply_income_rows
+from models.project import Project
+from utils.forecast_cache import invalidate_forecast
+from utils.crypto import encrypt_credential
+from utils.validator import Validator
+
+
+class BulkImportError(Exception):
+    """文件无法解析（格式不支持、缺少必需列等）"""
+
+
+# 字段 -> 可接受的表头名称
+PROJECT_COLUMNS = {
+    'name': ['name', '名称', '项目名称'],
+    'category': ['category', '分类', '分类名称'],
+    'total_amount': ['total_amount', '金额', '总金额'],
+    'start_time': ['start_time', '开始时间', '开始日期'],
+    'end_time': ['end_time', '结束时间', '结束日期', '到期时间'],
+    'purchase_time': ['purchase_time', '购买时间'],
+    'purpose': ['purpose', '用途', '购买目的'],
+    'account_username': ['account_username', '账号'],
+    'account_password': ['account_password', '密码'],
+}
+
+ASSET_COLUMNS = {
+    'asset_code': ['asset_code', '资产编号'],
+    'name': ['name', '名称', '资产名称'],
+    'category': ['category', '分类', '分类名称'],
+    'original_value': ['original_value', '原值'],
+    'purchase_date': ['purchase_date', '购买日期'],
+    'useful_life_years': ['useful_life_years', '使用年限'],
+    'depreciation_start_date': ['depreciation_start_date', '折旧开始日期'],
+    'residual_rate': ['residual_rate', '残值率'],
+    'status': ['status', '状态'],
+    'location': ['location', '位置', '所在位置'],
+    'responsible_person': ['responsible_person', '责任人'],
+    'description': ['description', '描述'],
+}
+
+INCOME_COLUMNS = {
+    'asset_code': ['asset_code', '资产编号'],
+    'income_type': ['income_type', '收入类型'],
+    'amount': ['amount', '金额', '收入金额'],
+    'income_date': ['income_date', '收入日期', '日期'],
+    'status': ['status', '状态'],
+    'cost': ['cost', '成本'],
+    'tax_rate': ['tax_rate', '税率'],
+    'payer': ['payer', '付款方'],
+    'payment_method': ['payment_method', '支付方式'],
+    'description': ['description', '描述'],
+}
+
+ASSET_STATUSES = ['in_use', 'rent', 'sell', 'idle', 'maintenance', 'disposed']
+INCOME_TYPES = ['rent', 'license', 'dividend', 'sale', 'other']
+INCOME_STATUSES = ['pending', 'received', 'overdue', 'cancelled', 'partial']
+
+DATE_FORMATS = ['%Y-%m-%d', '%Y/%m/%d', '%Y-%m-%d %H:%M:%S', '%Y/%m/%d %H:%M:%S', '%Y-%m-%d %H:%M']
+
+
+# ==================== 文件解析 ====================
+
+def iter_file_rows(stream, filename):
+    """
+    逐行读取上传文件
+
+    Args:
+        stream: 二进制文件对象
+        filename: 文件名（按扩展名判断格式）
+
+    Yields:
+        (表头列表, 行值列表)，第一次产出前校验表头
+    """
+    lower = (filename or '').lower()
+    if lower.endswith('.csv'):
+        text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+        reader = csv.reader(text)
+        header = next(reader, None)
+        if not header:
+            raise BulkImportError('文件为空')
+        for values in reader:
+            yield header, values
+    elif lower.endswith('.xlsx'):
+        try:
+            from openpyxl import load_workbook
+        except ImportError:
+            raise BulkImportError('解析xlsx需要安装openpyxl（pip install openpyxl），或另存为CSV后导入')
+        workbook = load_workbook(stream, read_only=True, data_only=True)
+        try:
+            rows = workbook.worksheets[0].iter_rows(values_only=True)
+            header = next(rows, None)
+            if not header:
+                raise BulkImportError('文件为空')
+            header = ['' if v is None else str(v) for v in header]
+            for values in rows:
+                yield header, list(values)
+        finally:
+            workbook.close()
+    else:
+        raise BulkImportError('仅支持 .csv 或 .xlsx 文件')
+
+
+def _map_header(header, columns):
+    """表头 -> {字段: 列序号}"""
+    normalized = [str(h).strip().lower() for h in header]
+    mapping = {}
+    for field, aliases in columns.items():
+        for alias in aliases:
+            if alias.lower() in normalized:
+                mapping[field] = normalized.index(alias.lower())
+                break
+    return mapping
+
+
+def _cell(values, mapping, field):
+    index = mapping.get(field)
+    if index is None or index >= len(values):
+        return None
+    value = values[index]
+    if isinstance(value, str):
+        value = value.strip()
+        return value or None
+    return value
+
+
+@lru_cache(maxsize=4096)
+def _parse_date_text(text):
+    """按 DATE_FORMATS 依次尝试解析（同一文件中日期大量重复，结果缓存）"""
+    for fmt in DATE_FORMATS:
+        valid, _, parsed = Validator.validate_date(text, fmt)
+        if valid:
+            return parsed
+    return None
+
+
+def _parse_date(value, field_name, errors, with_time=False):
+    if value is None:
+        errors.append(f'{field_name}不能为空')
+        return None
+    if isinstance(value, datetime):
+        return value if with_time else value.date()
+    if isinstance(value, date):
+        return datetime.combine(value, datetime.min.time()) if with_time else value
+    parsed = _parse_date_text(str(value))
+    if parsed is not None:
+        return parsed if with_time else parsed.date()
+    errors.append(f'{field_name}格式不正确，应为YYYY-MM-DD')
+    return None
+
+
+def _parse_amount(value, field_name, errors, min_value=0, required=True):
+    if value is None:
+        if required:
+            errors.append(f'{field_name}不能为空')
+        return None
+    valid, message = Validator.validate_amount(value, min_value=min_value)
+    if not valid:
+        errors.append(f'{field_name}{message}')
+        return None
+    return Decimal(str(value))
+
+
+def _check(result, errors):
+    valid, message = result
+    if not valid:
+        errors.append(message)
+    return valid
+
+
+# ==================== 导入 ====================
+
+class BulkImporter:
+    """单次导入（一个用户、一种数据）"""
+
+    KINDS = ('projects', 'assets', 'incomes')
+
+    def __init__(self, user_id, kind, chunk_size=2000, create_categories=False, dry_run=False, max_errors=1000):
+        """
+        Args:
+            user_id: 数据归属用户
+            kind: projects / assets / incomes
+            chunk_size: 每批校验并写入的行数（每批一个事务）
+            create_categories: 分类名称不存在时自动创建
+            dry_run: 只校验不写入
+            max_errors: 错误明细最多保留的行数（统计数不受限制）
+        """
+        if kind not in self.KINDS:
+            raise BulkImportError(f'不支持的导入类型: {kind}')
+        self.user_id = int(user_id)
+        self.kind = kind
+        self.chunk_size = chunk_size
+        self.create_categories = create_categories
+        self.dry_run = dry_run
+        self.max_errors = max_errors
+        self.columns = {'projects': PROJECT_COLUMNS, 'assets': ASSET_COLUMNS, 'incomes': INCOME_COLUMNS}[kind]
+        self.model = {'projects': Project, 'assets': FixedAsset, 'incomes': AssetIncome}[kind]
+        self.stats = {'total': 0, 'imported': 0, 'failed': 0, 'created_categories': 0}
+        self.errors = []
+        self._categories = None
+        self._asset_ids = None
+        self._seen_codes = set()
+        self._now = datetime.utcnow()
+
+    # ==================== 查找表 ====================
+
+    def _load_categories(self):
+        asset_type = 'virtual' if self.kind == 'projects' else 'fixed'
+        rows = db.session.query(Category.id, Category.name, Category.asset_type).filter_by(user_id=self.user_id).all()
+        self._categories = {}
+        self._category_ids = {row.id for row in rows}
+        # 同名分类优先匹配对应资产类型
+        for row in sorted(rows, key=lambda r: r.asset_type == asset_type):
+            self._categories[row.name] = row.id
+
+    def resolve_category(self, value, errors):
+        if self._categories is None:
+            self._load_categories()
+        if value is None:
+            errors.append('分类不能为空')
+            return None
+        if isinstance(value, (int, float)) or str(value).isdigit():
+            if int(value) in self._category_ids:
+                return int(value)
+        name = str(value)
+        if name in self._categories:
+            return self._categories[name]
+        if not self.create_categories:
+            errors.append(f'分类不存在: {name}')
+            return None
+        if self.dry_run:
+            return 0
+        category = Category(name=name[:50], asset_type='virtual' if self.kind == 'projects' else 'fixed',
+                            user_id=self.user_id)
+        db.session.add(category)
+        db.session.flush()
+        self._categories[name] = category.id
+        self._category_ids.add(category.id)
+        self.stats['created_categories'] += 1
+        return category.id
+
+    def resolve_asset(self, code, errors):
+        if self._asset_ids is None:
+            self._asset_ids = dict(db.session.query(FixedAsset.asset_code, FixedAsset.id).filter_by(user_id=self.user_id).all())
+        if code is None:
+            errors.append('资产编号不能为空')
+            return None
+        asset_id = self._asset_ids.get(str(code))
+        if asset_id is None:
+            errors.append(f'资产不存在: {code}')
+        return asset_id
+
+    # ==================== 行转换 ====================
+
+    def build_project(self, get):
+        errors = []
+        name = get('name')
+        if _check(Validator.validate_required(name, '项目名称'), errors):
+            _check(Validator.validate_length(str(name), '项目名称', max_length=100), errors)
+        total_amount = _parse_amount(get('total_amount'), '总金额', errors)
+        if total_amount is not None and total_amount <= 0:
+            errors.append('总金额必须大于0')
+        start_time = _parse_date(get('start_time'), '开始时间', errors, with_time=True)
+        end_time = _parse_date(get('end_time'), '结束时间', errors, with_time=True)
+        if start_time and end_time and start_time >= end_time:
+            errors.append('开始时间必须早于结束时间')
+        purchase_time = _parse_date(get('purchase_time'), '购买时间', errors, with_time=True) if get('purchase_time') else None
+        category_id = self.resolve_category(get('category'), errors)
+        if errors:
+            return None, errors
+        password = get('account_password')
+        return {
+            'name': str(name),
+            'total_amount': total_amount,
+            'start_time': start_time,
+            'end_time': end_time,
+            'purchase_time': purchase_time,
+            'purpose': str(get('purpose') or '')[:500],
+            'account_username': str(get('account_username'))[:100] if get('account_username') else None,
+            'account_password': encrypt_credential(str(password)[:200]) if password else None,
+            'category_id': category_id,
+            'user_id': self.user_id,
+            'created_at': self._now,
+            'updated_at': self._now,
+        }, errors
+
+    def build_asset(self, get):
+        errors = []
+        name = get('name')
+        if _check(Validator.validate_required(name, '资产名称'), errors):
+            _check(Validator.validate_length(str(name), '资产名称', max_length=100), errors)
+        original_value = _parse_amount(get('original_value'), '原值', errors)
+        purchase_date = _parse_date(get('purchase_date'), '购买日期', errors)
+        depreciation_start_date = (_parse_date(get('depreciation_start_date'), '折旧开始日期', errors)
+                                   if get('depreciation_start_date') else purchase_date)
+        useful_life = get('useful_life_years')
+        try:
+            useful_life = int(float(useful_life))
+            if useful_life <= 0:
+                raise ValueError
+        except (TypeError, ValueError):
+            errors.append('使用年限必须为正整数')
+            useful_life = None
+        residual_rate = _parse_amount(get('residual_rate'), '残值率', errors, required=False)
+        residual_rate = Decimal('5') if residual_rate is None else residual_rate
+        if residual_rate >= 100:
+            errors.append('残值率必须小于100')
+        status = get('status') or 'in_use'
+        _check(Validator.validate_enum(status, '状态', ASSET_STATUSES), errors)
+
+        asset_code = get('asset_code')
+        if asset_code is not None:
+            asset_code = str(asset_code)
+            if asset_code in self._seen_codes:
+                errors.append(f'资产编号在文件中重复: {asset_code}')
+        category_id = self.resolve_category(get('category'), errors)
+        if errors:
+            return None, errors
+
+        if asset_code is None:
+            asset_code = f"FA{self._now.strftime('%Y%m%d')}{uuid.uuid4().hex[:6].upper()}"
+        self._seen_codes.add(asset_code)
+        # 与 FixedAsset.calculate_depreciation_data 相同的直线法公式
+        depreciable = original_value - original_value * residual_rate / 100
+        return {
+            'asset_code': asset_code,
+            'name': str(name),
+            'description': str(get('description') or ''),
+            'category_id': category_id,
+            'original_value': original_value,
+            'current_value': original_value,
+            'accumulated_depreciation': 0,
+            'residual_rate': residual_rate,
+            'purchase_date': purchase_date,
+            'useful_life_years': useful_life,
+            'depreciation_start_date': depreciation_start_date,
+            'depreciation_method': 'straight_line',
+            'annual_depreciation_rate': round((100 - residual_rate) / useful_life, 2),
+            'monthly_depreciation': round(depreciable / (useful_life * 12), 2),
+            'status': status,
+            'location': str(get('location') or ''),
+            'responsible_person': str(get('responsible_person') or ''),
+            'user_id': self.user_id,
+            'created_at': self._now,
+            'updated_at': self._now,
+        }, errors
+
+    def build_income(self, get):
+        errors = []
+        asset_id = self.resolve_asset(get('asset_code'), errors)
+        income_type = get('income_type') or 'rent'
+        _check(Validator.validate_enum(income_type, '收入类型', INCOME_TYPES), errors)
+        amount = _parse_amount(get('amount'), '金额', errors)
+        income_date = _parse_date(get('income_date'), '收入日期', errors)
+        status = get('status') or 'received'
+        _check(Validator.validate_enum(status, '状态', INCOME_STATUSES), errors)
+        cost = _parse_amount(get('cost'), '成本', errors, required=False) or Decimal('0')
+        tax_rate = _parse_amount(get('tax_rate'), '税率', errors, required=False) or Decimal('0')
+        if errors:
+            return None, errors
+        # 与 AssetIncome.calculate_net_amount 相同
+        tax_amount = amount * tax_rate / 100
+        return {
+            'asset_id': asset_id,
+            'income_type': income_type,
+            'amount': amount,
+            'cost': cost,
+            'tax_rate': tax_rate,
+            'tax_amount': round(tax_amount, 2),
+            'net_amount': round(amount - cost - tax_amount, 2),
+            'income_date': income_date,
+            'actual_date': income_date if status == 'received' else None,
+            'status': status,
+            'payer': str(get('payer') or ''),
+            'payment_method': str(get('payment_method') or 'bank_transfer'),
+            'description': str(get('description') or ''),
+            'created_at': self._now,
+            'updated_at': self._now,
+        }, errors
+
+    # ==================== 执行 ====================
+
+    def _record_error(self, row_number, messages):
+        self.stats['failed'] += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'row': row_number, 'errors': messages})
+
+    def _flush(self, batch):
+        """写入一批有效行（资产编号与库中已有编号冲突的行记为错误）"""
+        if self.kind == 'assets' and batch:
+            codes = [row['asset_code'] for _, row in batch]
+            taken = {code for (code,) in db.session.query(FixedAsset.asset_code).filter(FixedAsset.asset_code.in_(codes))}
+            if taken:
+                for row_number, row in batch:
+                    if row['asset_code'] in taken:
+                        self._record_error(row_number, [f"资产编号已存在: {row['asset_code']}"])
+                batch = [(n, row) for n, row in batch if row['asset_code'] not in taken]
+        if batch and not self.dry_run:
+            rows = [row for _, row in batch]
+            db.session.execute(self.model.__table__.insert(), rows)
+            if self.kind == 'incomes':
+                # Core 批量插入不触发 ORM 事件，同一事务内把已收款收入计入月度汇总
+                apply_income_rows(db.session.connection(), rows, user_id=self.user_id)
+        if not self.dry_run:
+            db.session.commit()
+            if batch and self.kind != 'incomes':
+                # Core 批量插入不触发 ORM 事件，提交后清除该用户的预测缓存
+                invalidate_forecast(self.user_id)
+        self.stats['imported'] += len(batch)
+
+    def run(self, rows):
+        """
+        Args:
+            rows: iter_file_rows 的结果
+
+        Returns:
+            {'kind', 'dry_run', 'total', 'imported', 'failed', 'created_categories', 'errors', 'errors_truncated'}
+        """
+        build = {'projects': self.build_project, 'assets': self.build_asset, 'incomes': self.build_income}[self.kind]
+        mapping = None
+        batch = []
+        try:
+            for row_number, (header, values) in enumerate(rows, start=2):
+                if mapping is None:
+                    mapping = _map_header(header, self.columns)
+                    required = {'projects': ['name', 'total_amount', 'start_time', 'end_time', 'category'],
+                                'assets': ['name', 'category', 'original_value', 'purchase_date', 'useful_life_years'],
+                                'incomes': ['asset_code', 'amount', 'income_date']}[self.kind]
+                    missing = [self.columns[f][1] for f in required if f not in mapping]
+                    if missing:
+                        raise BulkImportError(f"缺少必需列: {', '.join(missing)}")
+                if not any(v not in (None, '') for v in values):
+                    continue  # 空行
+                self.stats['total'] += 1
+                row, errors = build(lambda field: _cell(values, mapping, field))
+                if errors:
+                    self._record_error(row_number, errors)
+                    continue
+                batch.append((row_number, row))
+                if len(batch) >= self.chunk_size:
+                    self._flush(batch)
+                    batch = []
+            if mapping is None:
+                raise BulkImportError('文件为空')
+            self._flush(batch)
+        except Exception:
+            db.session.rollback()
+            raise
+
+        return {
+            'kind': self.kind,
+            'dry_run': self.dry_run,
+            **self.stats,
+            'errors': self.errors,
+            'errors_truncated': self.stats['failed'] > len(self.errors),
+        }
+
+
+def import_file(stream, filename, user_id, kind, **options):
+    """解析并导入文件，参数见 BulkImporter"""
+    return BulkImporter(user_id, kind, **options).run(iter_file_rows(stream, filename))
+
+
+def template_csv(kind):
+    """导入模板（中文表头）"""
+    columns = {'projects': PROJECT_COLUMNS, 'assets': ASSET_COLUMNS, 'incomes': INCOME_COLUMNS}.get(kind)
+    if columns is None:
+        raise BulkImportError(f'不支持的导入类型: {kind}')
+    return '\ufeff' + ','.join(aliases[1] for aliases in columns.values()) + '\n'
@@ -0,0 +1,362 @@
+"""
+账户数据导出服务
+按实体类型依次流式导出一个用户的全部数据，格式为 NDJSON 或 CSV 压缩包（每个实体一个CSV）：
+
+  - 每个实体按主键顺序用 yield_per 游标分批读取，生成器逐块产出，内存占用与数据量无关
+  - 支持从 (实体, 偏移) 续传：NDJSON 每行带 entity/offset，中断后用最后收到的行的 offset+1 继续
+  - 可在后台预先生成导出文件（ExportStore），生成完成后直接以文件下载（支持Range断点续传）
+
+NDJSON 行格式：
+  {"entity": "meta", ...}                                  第一行，导出信息
+  {"entity": "projects", "offset": 0, "data": {...}}      数据行，offset 为该实体内的序号
+  {"entity": "end", "counts": {...}}                      最后一行，出现即表示导出完整
+
+注意：续传按偏移定位，导出期间删除记录会使后续偏移前移；新增记录（主键更大）不影响已导出部分
+"""
+import csv
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from decimal import Decimal
+
+from sqlalchemy import select
+
+from database import db
+from models.ai_report import AIReport
+from models.asset_expense import AssetExpense
+from models.asset_income import AssetIncome
+from models.asset_maintenance import AssetMaintenance, MaintenanceReminder
+from models.category import Category
+from models.fixed_asset import FixedAsset
+from models.project import Project
+from utils.crypto import decrypt_credential
+
+EXPORT_VERSION = 1
+FORMATS = {'ndjson': 'ndjson', 'csv': 'zip'}  # 导出格式 -> 文件扩展名
+
+# 实体名称 -> 模型（按导出顺序：被引用的实体在前）
+ENTITIES = {
+    'categories': Category,
+    'projects': Project,
+    'assets': FixedAsset,
+    'incomes': AssetIncome,
+    'expenses': AssetExpense,
+    'maintenances': AssetMaintenance,
+    'reminders': MaintenanceReminder,
+    'reports': AIReport,
+}
+
+# 收入、维护记录没有 user_id 列，通过所属固定资产归属用户
+ASSET_SCOPED = ('incomes', 'maintenances')
+
+
+class ExportError(Exception):
+    """导出参数无效（未知实体、格式等）"""
+
+
+# ==================== 读取 ====================
+
+def _entity_statement(entity, user_id):
+    table = ENTITIES[entity].__table__
+    if entity in ASSET_SCOPED:
+        owned_assets = select(FixedAsset.id).where(FixedAsset.user_id == user_id)
+        condition = table.c.asset_id.in_(owned_assets)
+    else:
+        condition = table.c.user_id == user_id
+    return select(table).where(condition).order_by(table.c.id)
+
+
+def _serialize_value(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def entity_columns(entity):
+    return [column.name for column in ENTITIES[entity].__table__.columns]
+
+
+def iter_entity_rows(user_id, entity, offset=0, batch_size=1000):
+    """
+    按主键顺序逐行产出某实体的记录（字典，值已转为可JSON序列化的类型）
+
+    Args:
+        offset: 跳过该实体的前 offset 行
+        batch_size: yield_per 每批从游标取出的行数
+    """
+    stmt = _entity_statement(entity, user_id)
+    if offset:
+        stmt = stmt.offset(offset)
+    result = db.session.execute(stmt.execution_options(yield_per=batch_size))
+    try:
+        for row in result.mappings():
+            data = {key: _serialize_value(value) for key, value in row.items()}
+            if entity == 'projects' and data.get('account_password'):
+                data['account_password'] = decrypt_credential(data['account_password'])  # 与项目详情接口一致
+            yield data
+    finally:
+        result.close()
+
+
+def resolve_start(entity=None, offset=0):
+    """校验续传位置，返回需要导出的实体列表和首个实体的偏移"""
+    names = list(ENTITIES)
+    if entity in (None, ''):
+        return names, 0
+    if entity not in ENTITIES:
+        raise ExportError(f"未知的实体类型: {entity}，可选: {', '.join(names)}")
+    try:
+        offset = int(offset or 0)
+    except (TypeError, ValueError):
+        raise ExportError('offset必须是非负整数')
+    if offset < 0:
+        raise ExportError('offset必须是非负整数')
+    return names[names.index(entity):], offset
+
+
+# ==================== 格式 ====================
+
+def iter_ndjson(user_id, entity=None, offset=0, batch_size=1000, chunk_bytes=64 * 1024):
+    """
+    NDJSON 导出生成器，按约 chunk_bytes 合并输出，减少 WSGI 写入次数
+
+    Args:
+        entity / offset: 续传位置（从该实体的第 offset 行开始）
+    """
+    entities, first_offset = resolve_start(entity, offset)
+    counts = {}
+    buffer = []
+    size = 0
+
+    def line(obj):
+        return (json.dumps(obj, ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8')
+
+    yield line({
+        'entity': 'meta',
+        'version': EXPORT_VERSION,
+        'user_id': user_id,
+        'exported_at': datetime.utcnow().isoformat(),
+        'entities': entities,
+        'resume': {'entity': entities[0], 'offset': first_offset},
+    })
+
+    for index, name in enumerate(entities):
+        start = first_offset if index == 0 else 0
+        position = start
+        for data in iter_entity_rows(user_id, name, start, batch_size):
+            encoded = line({'entity': name, 'offset': position, 'data': data})
+            buffer.append(encoded)
+            size += len(encoded)
+            position += 1
+            if size >= chunk_bytes:
+                yield b''.join(buffer)
+                buffer, size = [], 0
+        counts[name] = position - start
+
+    buffer.append(line({'entity': 'end', 'counts': counts}))
+    yield b''.join(buffer)
+
+
+class _ZipSink(io.RawIOBase):
+    """只追加、不可回退的输出缓冲，zipfile 检测到不可seek时改用数据描述符写法，可边压缩边输出"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def iter_csv_zip(user_id, entity=None, offset=0, batch_size=1000):
+    """
+    CSV压缩包导出生成器：每个实体一个 <entity>.csv（UTF-8 BOM，Excel可直接打开）
+
+    续传时从 entity 开始生成新的压缩包，该实体的CSV从第 offset 行开始
+    """
+    entities, first_offset = resolve_start(entity, offset)
+    sink = _ZipSink()
+    archive = zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED)
+    counts = {}
+
+    for index, name in enumerate(entities):
+        start = first_offset if index == 0 else 0
+        columns = entity_columns(name)
+        with archive.open(f'{name}.csv', 'w', force_zip64=True) as raw:
+            text = io.TextIOWrapper(raw, encoding='utf-8-sig', newline='', write_through=False)
+            writer = csv.writer(text)
+            writer.writerow(columns)
+            rows = 0
+            for data in iter_entity_rows(user_id, name, start, batch_size):
+                writer.writerow([data.get(column) for column in columns])
+                rows += 1
+                if rows % batch_size == 0:
+                    text.flush()
+                    chunk = sink.drain()
+                    if chunk:
+                        yield chunk
+            text.flush()
+            text.detach()
+        counts[name] = rows
+        chunk = sink.drain()
+        if chunk:
+            yield chunk
+
+    archive.writestr('manifest.json', json.dumps({
+        'version': EXPORT_VERSION,
+        'user_id': user_id,
+        'exported_at': datetime.utcnow().isoformat(),
+        'resume': {'entity': entities[0], 'offset': first_offset},
+        'counts': counts,
+    }, ensure_ascii=False, indent=2))
+    archive.close()
+    yield sink.drain()
+
+
+def iter_export(user_id, fmt, entity=None, offset=0, batch_size=1000):
+    if fmt == 'ndjson':
+        return iter_ndjson(user_id, entity, offset, batch_size)
+    if fmt == 'csv':
+        return iter_csv_zip(user_id, entity, offset, batch_size)
+    raise ExportError(f"不支持的导出格式: {fmt}，可选: {', '.join(FORMATS)}")
+
+
+def export_filename(user_id, fmt):
+    return f"timevalue_export_{user_id}_{datetime.now().strftime('%Y%m%d')}.{FORMATS[fmt]}"
+
+
+# ==================== 后台预生成 ====================
+
+class ExportStore:
+    """
+    后台预生成导出文件
+
+    文件先写入 .part 再原子改名，进程重启后已生成的文件仍可下载；
+    生成状态（running/failed）只保存在当前进程内。
+    导出内容包含解密后的账号密码，目录权限为 0700、文件权限为 0600，仅运行服务的系统用户可读
+    """
+
+    def __init__(self, directory=None, max_age=86400, workers=2):
+        """
+        Args:
+            directory: 导出文件目录，默认系统临时目录下的 timevalue_exports
+            max_age: 已生成文件的有效期（秒），过期后视为不存在并删除
+            workers: 同时生成的导出任务数
+        """
+        self.directory = directory or os.path.join(tempfile.gettempdir(), 'timevalue_exports')
+        self.max_age = max_age
+        self.workers = workers
+        self._executor = None
+        self._jobs = {}  # (user_id, fmt) -> {'state', 'started_at', 'error'}
+        self._lock = threading.Lock()
+
+    def path(self, user_id, fmt):
+        return os.path.join(self.directory, f'user_{user_id}.{FORMATS[fmt]}')
+
+    def ready_path(self, user_id, fmt):
+        """已生成且未过期的文件路径，否则返回None"""
+        path = self.path(user_id, fmt)
+        try:
+            built_at = os.path.getmtime(path)
+        except OSError:
+            return None
+        if time.time() - built_at > self.max_age:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        return path
+
+    def status(self, user_id, fmt):
+        with self._lock:
+            job = dict(self._jobs.get((user_id, fmt)) or {})
+        if job.get('state') == 'running':
+            return {'format': fmt, 'state': 'running', 'started_at': job['started_at']}
+        path = self.ready_path(user_id, fmt)
+        if path:
+            return {
+                'format': fmt,
+                'state': 'ready',
+                'size': os.path.getsize(path),
+                'built_at': datetime.utcfromtimestamp(os.path.getmtime(path)).isoformat(),
+                'expires_in': int(self.max_age - (time.time() - os.path.getmtime(path))),
+            }
+        if job.get('state') == 'failed':
+            return {'format': fmt, 'state': 'failed', 'error': job.get('error')}
+        return {'format': fmt, 'state': 'none'}
+
+    def submit(self, app, user_id, fmt):
+        """提交后台生成任务（同一用户同一格式正在生成时不重复提交）"""
+        if fmt not in FORMATS:
+            raise ExportError(f"不支持的导出格式: {fmt}，可选: {', '.join(FORMATS)}")
+        with self._lock:
+            job = self._jobs.get((user_id, fmt))
+            if not (job and job['state'] == 'running'):
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='export')
+                self._jobs[(user_id, fmt)] = {'state': 'running', 'started_at': datetime.utcnow().isoformat()}
+                self._executor.submit(self._build, app, user_id, fmt)
+        return self.status(user_id, fmt)
+
+    def _ensure_directory(self):
+        """创建导出目录并收紧为 0700（目录属于其他用户时 chmod 失败，不会写入）"""
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        os.chmod(self.directory, 0o700)
+
+    def _build(self, app, user_id, fmt):
+        path = self.path(user_id, fmt)
+        part = f'{path}.{os.getpid()}.part'
+        started = time.perf_counter()
+        try:
+            self._ensure_directory()
+            with app.app_context():
+                try:
+                    fd = os.open(part, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+                    with os.fdopen(fd, 'wb') as f:
+                        for chunk in iter_export(user_id, fmt):
+                            f.write(chunk)
+                finally:
+                    db.session.remove()
+            os.replace(part, path)
+            with self._lock:
+                self._jobs.pop((user_id, fmt), None)
+            print(f"[导出] 用户 {user_id} 的 {fmt} 导出已生成: {os.path.getsize(path)} 字节，"
+                  f"耗时 {time.perf_counter() - started:.1f}s")
+        except Exception as e:
+            with self._lock:
+                self._jobs[(user_id, fmt)] = {'state': 'failed', 'error': str(e)}
+            try:
+                os.remove(part)
+            except OSError:
+                pass
+            print(f"[导出] 用户 {user_id} 的 {fmt} 导出生成失败: {str(e)}")
+
+
+export_store = ExportStore(
+    directory=os.getenv('EXPORT_DIR') or None,
+    max_age=int(float(os.getenv('EXPORT_MAX_AGE_HOURS', 24)) * 3600),
+    workers=int(os.getenv('EXPORT_WORKERS', 2))
+)
@@ -0,0 +1,275 @@
+"""
+资产前瞻预测服务
+按月预测用户资产组合未来 N 个月的剩余价值、折旧、项目消耗与到期、应收租金和计划维护支出：
+
+  - 每个用户三条查询（项目、固定资产、维护记录），加载后整理为排序数组，
+    各月数值在 NumPy 上整列计算，不逐资产、逐月循环
+  - 剩余价值、折旧和项目消耗复用估值时间轴（services.valuation_service.ValuationCurve），
+    口径与 Project.calculate_values / calculate_current_depreciation 一致
+  - 应收租金：出租中且设置了月租金的资产，按租金计划（services.rent_schedule_service）的期次，
+    租期内每月一期；本月收租日已过的不计入
+  - 计划维护：计划中/进行中的维护按维护日期计入（已过期的计入本月）；
+    设置了维护间隔的例行维护，按每个（资产, 维护类型）最近一次已完成记录的下次维护日期和间隔
+    滚动预测，费用取该次费用（该资产、类型已有计划中记录的不再滚动预测）
+
+缓存：加载整理后的数组按用户缓存在进程内（utils.forecast_cache，FORECAST_CACHE_TTL 秒，设为0关闭），
+使用前校验数据版本（forecast_versions 表），通过 ORM 写入项目、固定资产、维护记录提交后所有worker立即失效；
+绕过 ORM 的批量写入后调用 invalidate_forecast()。
+本模块依赖 NumPy，只在预测接口和报告生成中按需导入
+"""
+import calendar
+from datetime import date, datetime
+
+import numpy as np
+from sqlalchemy import and_, or_, select
+
+from database import db
+from models.asset_maintenance import AssetMaintenance
+from models.fixed_asset import FixedAsset
+from models.project import Project
+from services.valuation_service import FIXED_ASSET_COLUMNS, PROJECT_COLUMNS, ValuationCurve, day_number
+from models.forecast_version import read_version
+from utils.forecast_cache import forecast_cache
+
+DEFAULT_HORIZON_MONTHS = 12
+MAX_HORIZON_MONTHS = 60
+OPEN_MAINTENANCE_STATUSES = ('planned', 'in_progress')
+
+
+def _add_months(year, month, months):
+    index = year * 12 + month - 1 + months
+    return index // 12, index % 12 + 1
+
+
+def _month_index(value):
+    return value.year * 12 + value.month - 1
+
+
+def _life_end(start, months):
+    """折旧满 months 个月的日期（calculate_current_depreciation 的已折旧月数达到 months 的第一天）"""
+    year, month = _add_months(start.year, start.month, months)
+    if start.day <= calendar.monthrange(year, month)[1]:
+        return date(year, month, start.day)
+    year, month = _add_months(year, month, 1)
+    return date(year, month, 1)
+
+
+def _rent_last_month(start, end):
+    """租期内最后一期所在月份序号（同 rent_occurrences：每期起始日不晚于租期结束日）"""
+    months = _month_index(end) - _month_index(start)
+    year, month = _add_months(start.year, start.month, months)
+    if min(start.day, calendar.monthrange(year, month)[1]) > end.day:
+        months -= 1
+    return _month_index(start) + months
+
+
+def _window_counts(sorted_values, boundaries):
+    """各区间 [boundaries[i], boundaries[i+1]) 内的个数"""
+    return np.diff(np.searchsorted(sorted_values, boundaries, side='left'))
+
+
+def _window_sums(sorted_values, prefix, boundaries):
+    """各区间内对应值之和（prefix 为按 sorted_values 顺序的前缀和，首项为0）"""
+    return np.diff(prefix[np.searchsorted(sorted_values, boundaries, side='left')])
+
+
+class PortfolioForecast:
+    """用户资产组合的预测数据（加载一次，可按任意基准日和预测月数计算）"""
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.curve = ValuationCurve(user_id)
+
+    # ==================== 加载 ====================
+
+    def build(self):
+        """加载项目、固定资产和维护记录并整理为数组，返回 self"""
+        projects = db.session.execute(
+            select(*PROJECT_COLUMNS).where(Project.user_id == self.user_id)
+        ).all()
+        assets = db.session.execute(select(
+            *FIXED_ASSET_COLUMNS, FixedAsset.status, FixedAsset.rent_price,
+            FixedAsset.rent_due_day, FixedAsset.rent_start_date, FixedAsset.rent_end_date
+        ).where(FixedAsset.user_id == self.user_id)).all()
+        query = select(
+            AssetMaintenance.asset_id, AssetMaintenance.maintenance_type, AssetMaintenance.status,
+            AssetMaintenance.maintenance_date, AssetMaintenance.next_maintenance_date,
+            AssetMaintenance.maintenance_interval, AssetMaintenance.cost
+        )
+        maintenances = db.session.execute(FixedAsset.owned_by(query, AssetMaintenance, self.user_id).where(or_(
+            AssetMaintenance.status.in_(OPEN_MAINTENANCE_STATUSES),
+            and_(
+                AssetMaintenance.status == 'completed',
+                AssetMaintenance.maintenance_interval > 0,
+                AssetMaintenance.next_maintenance_date.isnot(None)
+            )
+        ))).all()
+
+        self.curve.build_from_rows(projects, assets)
+        self._build_expiry(projects, assets)
+        self._build_rent(assets)
+        self._build_maintenance(maintenances)
+        return self
+
+    def _build_expiry(self, projects, assets):
+        ends = np.array([day_number(p.end_time) for p in projects], dtype=float)
+        order = np.argsort(ends, kind='stable')
+        self.project_ends = ends[order]
+        amounts = np.array([float(p.total_amount or 0) for p in projects], dtype=float)[order]
+        self.project_end_amounts = np.concatenate(([0.0], np.cumsum(amounts)))
+
+        life_ends = [
+            _life_end(a.depreciation_start_date, int(a.useful_life_years) * 12).toordinal()
+            for a in assets if a.depreciation_start_date and a.useful_life_years
+        ]
+        self.life_ends = np.sort(np.array(life_ends, dtype=np.int64))
+
+    def _build_rent(self, assets):
+        rented = [
+            a for a in assets
+            if a.status == 'rent' and a.rent_price and a.rent_price > 0 and a.rent_start_date
+        ]
+        self.rent_amount = np.array([float(a.rent_price) for a in rented], dtype=float)
+        self.rent_first_month = np.array([_month_index(a.rent_start_date) for a in rented], dtype=np.int64)
+        # 长期出租（无结束日期）视为一直出租
+        self.rent_last_month = np.array([
+            _rent_last_month(a.rent_start_date, a.rent_end_date) if a.rent_end_date else np.iinfo(np.int64).max
+            for a in rented
+        ], dtype=np.int64)
+        self.rent_due_day = np.array([min(max(int(a.rent_due_day or 1), 1), 31) for a in rented], dtype=np.int64)
+        self.rent_start_day = np.array([a.rent_start_date.day for a in rented], dtype=np.int64)
+
+    def _build_maintenance(self, maintenances):
+        planned = [m for m in maintenances if m.status in OPEN_MAINTENANCE_STATUSES]
+        self.planned_dates = np.array([m.maintenance_date.toordinal() for m in planned], dtype=np.int64)
+        self.planned_costs = np.array([float(m.cost or 0) for m in planned], dtype=float)
+
+        # 每个（资产, 维护类型）取最近一次已完成的例行维护；已有计划中记录的不再滚动预测
+        scheduled = {(m.asset_id, m.maintenance_type) for m in planned}
+        latest = {}
+        for m in maintenances:
+            key = (m.asset_id, m.maintenance_type)
+            if m.status != 'completed' or key in scheduled:
+                continue
+            if key not in latest or m.maintenance_date >= latest[key].maintenance_date:
+                latest[key] = m
+        recurring = list(latest.values())
+        self.recurring_next = np.array([m.next_maintenance_date.toordinal() for m in recurring], dtype=np.int64)
+        self.recurring_interval = np.array([int(m.maintenance_interval) for m in recurring], dtype=np.int64)
+        self.recurring_costs = np.array([float(m.cost or 0) for m in recurring], dtype=float)
+
+    # ==================== 计算 ====================
+
+    def _month_starts(self, today, horizon):
+        """预测区间边界：今天、之后每月1日（共 horizon + 1 个）"""
+        starts = [today]
+        for i in range(1, horizon + 1):
+            year, month = _add_months(today.year, today.month, i)
+            starts.append(date(year, month, 1))
+        return starts
+
+    def _scheduled_rent(self, today, horizon):
+        months = _month_index(today) + np.arange(horizon)
+        active = (self.rent_first_month[:, None] <= months) & (months <= self.rent_last_month[:, None])
+
+        # 本月：收租日已过的不计入（首期收租日早于租期开始日时在开始日收取）
+        due_day = np.minimum(self.rent_due_day, calendar.monthrange(today.year, today.month)[1])
+        due_day = np.where(self.rent_first_month == months[0], np.maximum(due_day, self.rent_start_day), due_day)
+        active[:, 0] &= due_day >= today.day
+        return self.rent_amount @ active
+
+    def _maintenance_spend(self, boundaries):
+        # 计划中的维护：已过期的计入第一个区间
+        planned_dates = np.maximum(self.planned_dates, boundaries[0])
+        period = np.searchsorted(boundaries, planned_dates, side='right') - 1
+        in_horizon = period < len(boundaries) - 1
+        spend = np.bincount(
+            period[in_horizon], weights=self.planned_costs[in_horizon], minlength=len(boundaries) - 1
+        ).astype(float)
+
+        # 例行维护：从下次维护日期（已过期的从今天）起按间隔滚动，统计每个区间内的次数
+        first = np.maximum(self.recurring_next, boundaries[0])[:, None]
+        interval = self.recurring_interval[:, None]
+        occurred = np.maximum(-((first - boundaries[None, :]) // interval), 0)  # [first, boundary) 内的次数
+        spend += self.recurring_costs @ np.diff(occurred, axis=1)
+        return spend
+
+    def project(self, today=None, horizon=DEFAULT_HORIZON_MONTHS):
+        """
+        计算预测结果
+
+        Args:
+            today: 基准日期（默认今天）
+            horizon: 预测月数（含本月）
+
+        Returns:
+            {'start_date', 'horizon_months', 'current', 'months': [...], 'summary': {...}}
+        """
+        today = today or date.today()
+        starts = self._month_starts(today, horizon)
+        points = [datetime(d.year, d.month, d.day) for d in starts]
+        ordinals = np.array([d.toordinal() for d in starts], dtype=np.int64)
+
+        used_cost, depreciation = self.curve.values(points)
+        remaining_value = np.maximum(self.curve.project_total - used_cost, 0)
+        current_value = self.curve.fixed_original_total - depreciation
+
+        day_points = np.array([day_number(p) for p in points], dtype=float)
+        expiring_count = _window_counts(self.project_ends, day_points)
+        expiring_value = _window_sums(self.project_ends, self.project_end_amounts, day_points)
+        life_ending = _window_counts(self.life_ends, ordinals)
+        rent = self._scheduled_rent(today, horizon)
+        maintenance = self._maintenance_spend(ordinals)
+
+        months = []
+        for i in range(horizon):
+            months.append({
+                'month': starts[i].strftime('%Y-%m'),
+                'project_remaining_value': round(float(remaining_value[i + 1]), 2),
+                'fixed_current_value': round(float(current_value[i + 1]), 2),
+                'total_remaining_value': round(float(remaining_value[i + 1] + current_value[i + 1]), 2),
+                'project_consumption': round(float(used_cost[i + 1] - used_cost[i]), 2),
+                'depreciation': round(float(depreciation[i + 1] - depreciation[i]), 2),
+                'expiring_projects': int(expiring_count[i]),
+                'expiring_project_amount': round(float(expiring_value[i]), 2),
+                'life_ending_assets': int(life_ending[i]),
+                'scheduled_rent': round(float(rent[i]), 2),
+                'planned_maintenance': round(float(maintenance[i]), 2),
+                'net_cash_flow': round(float(rent[i] - maintenance[i]), 2)
+            })
+
+        return {
+            'start_date': today.isoformat(),
+            'horizon_months': horizon,
+            'current': {
+                'project_remaining_value': round(float(remaining_value[0]), 2),
+                'fixed_current_value': round(float(current_value[0]), 2),
+                'total_remaining_value': round(float(remaining_value[0] + current_value[0]), 2)
+            },
+            'months': months,
+            'summary': {
+                'end_total_remaining_value': round(float(remaining_value[-1] + current_value[-1]), 2),
+                'value_change': round(float(remaining_value[-1] + current_value[-1] - remaining_value[0] - current_value[0]), 2),
+                'project_consumption': round(float(used_cost[-1] - used_cost[0]), 2),
+                'depreciation': round(float(depreciation[-1] - depreciation[0]), 2),
+                'expiring_projects': int(expiring_count.sum()),
+                'expiring_project_amount': round(float(expiring_value.sum()), 2),
+                'life_ending_assets': int(life_ending.sum()),
+                'scheduled_rent': round(float(rent.sum()), 2),
+                'planned_maintenance': round(float(maintenance.sum()), 2),
+                'net_cash_flow': round(float(rent.sum() - maintenance.sum()), 2)
+            }
+        }
+
+
+# ==================== 缓存 ====================
+
+def get_forecast(user_id, today=None, horizon=DEFAULT_HORIZON_MONTHS):
+    """获取用户资产组合预测（命中缓存时只查询一次数据版本）"""
+    # 先读版本再加载数据：加载期间有写入提交时版本已变化，下次请求会重新加载
+    version = read_version(user_id)
+    forecast = forecast_cache.get(user_id, version)
+    if forecast is None:
+        forecast = PortfolioForecast(user_id).build()
+        forecast_cache.set(user_id, version, forecast)
+    return forecast.project(today=today, horizon=horizon)
@@ -0,0 +1,201 @@
+"""
+后台健康探测
+容器探针会高频访问 /health、/ready，且每个worker都会被探测；若每次探测都执行 SELECT 1，
+会产生持续的数据库往返和连接池占用。本服务在每个worker进程内启动一个后台线程，
+按固定间隔检查数据库、大模型接口连通性和磁盘空间，探测接口直接返回缓存结果及其时效：
+
+  - 线程在进程收到第一个探测请求时启动（preload_app 时 fork 出的 worker 会各自重新启动）
+  - 缓存结果超过 max_age 秒未更新（如探测线程异常退出）时，探测接口同步执行一次检查
+  - 数据库不可用为 unhealthy；大模型接口不可达或磁盘空间不足为 degraded，不影响流量接入
+"""
+import os
+import shutil
+import socket
+import threading
+import time
+from datetime import datetime
+from urllib.parse import urlparse
+
+from sqlalchemy import text
+
+from config.ai import ZhipuConfig
+from database import db
+
+
+class HealthProber:
+    """worker进程内的后台健康探测"""
+
+    def __init__(self, interval=15, llm_timeout=3, disk_path=None, disk_min_free_mb=500):
+        """
+        Args:
+            interval: 探测间隔（秒）
+            llm_timeout: 大模型接口TCP连通性检查超时（秒）
+            disk_path: 检查剩余空间的目录，默认临时目录（报告导出、上传文件所在）
+            disk_min_free_mb: 剩余空间低于该值（MB）时判定为 degraded
+        """
+        self.interval = interval
+        self.max_age = interval * 3
+        self.llm_timeout = llm_timeout
+        self.disk_path = disk_path or '/tmp'
+        self.disk_min_free_mb = disk_min_free_mb
+        self.app = None
+        self._result = None
+        self._checked_at = None
+        self._checked_monotonic = None
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self.stats = {'probes': 0, 'inline_probes': 0}
+
+    def init_app(self, app):
+        self.app = app
+
+    # ==================== 各项检查 ====================
+
+    def check_database(self):
+        started = time.perf_counter()
+        try:
+            with db.engine.connect() as conn:
+                conn.execute(text('SELECT 1'))
+            return {
+                'status': 'up',
+                'message': 'Database connection successful',
+                'latency_ms': round((time.perf_counter() - started) * 1000, 1)
+            }
+        except Exception as e:
+            return {'status': 'down', 'message': f'Database connection failed: {str(e)}'}
+
+    def check_llm(self):
+        """大模型接口连通性（只建立TCP连接，不消耗调用额度）"""
+        parsed = urlparse(ZhipuConfig.get_base_url())
+        port = parsed.port or (443 if parsed.scheme == 'https' else 80)
+        started = time.perf_counter()
+        try:
+            with socket.create_connection((parsed.hostname, port), timeout=self.llm_timeout):
+                pass
+            return {
+                'status': 'up',
+                'message': f'{parsed.hostname}:{port} reachable',
+                'latency_ms': round((time.perf_counter() - started) * 1000, 1)
+            }
+        except OSError as e:
+            return {'status': 'down', 'message': f'{parsed.hostname}:{port} unreachable: {str(e)}'}
+
+    def check_disk(self):
+        try:
+            usage = shutil.disk_usage(self.disk_path)
+        except OSError as e:
+            return {'status': 'down', 'message': f'Disk check failed: {str(e)}'}
+        free_mb = usage.free // (1024 * 1024)
+        return {
+            'status': 'up' if free_mb >= self.disk_min_free_mb else 'down',
+            'path': self.disk_path,
+            'free_mb': free_mb,
+            'used_percent': round(usage.used / usage.total * 100, 1) if usage.total else None
+        }
+
+    @staticmethod
+    def check_environment():
+        required_env_vars = ['DB_HOST', 'DB_NAME', 'SECRET_KEY']
+        env_check = all(os.getenv(var) for var in required_env_vars)
+        return {
+            'status': 'up' if env_check else 'down',
+            'message': 'Required environment variables present' if env_check else 'Missing required environment variables'
+        }
+
+    def probe(self):
+        """执行一次完整检查并更新缓存"""
+        with self.app.app_context():
+            checks = {
+                'database': self.check_database(),
+                'llm': self.check_llm(),
+                'disk': self.check_disk(),
+                'environment': self.check_environment()
+            }
+
+        if checks['database']['status'] != 'up':
+            status = 'unhealthy'
+        elif checks['llm']['status'] != 'up' or checks['disk']['status'] != 'up':
+            status = 'degraded'
+        else:
+            status = 'healthy'
+
+        with self._lock:
+            self._result = {'status': status, 'checks': checks}
+            self._checked_at = datetime.utcnow()
+            self._checked_monotonic = time.monotonic()
+            self.stats['probes'] += 1
+
+    # ==================== 后台线程 ====================
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.probe()
+            except Exception as e:
+                print(f"[健康探测] 检查失败: {str(e)}")
+
+    def ensure_started(self):
+        """当前进程的探测线程未运行时启动（fork后的子进程需要重新启动）"""
+        pid = os.getpid()
+        if self._pid == pid and self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == pid and self._thread is not None and self._thread.is_alive():
+                return
+            if self._pid != pid:
+                self._result = None
+            self._pid = pid
+            self._thread = threading.Thread(target=self._run, name='health_prober', daemon=True)
+            self._thread.start()
+
+    def get_result(self):
+        """
+        获取缓存的检查结果
+
+        Returns:
+            {'status', 'checks', 'checked_at', 'age_seconds'}
+        """
+        self.ensure_started()
+        if self._result is None or time.monotonic() - self._checked_monotonic > self.max_age:
+            self.stats['inline_probes'] += 1
+            self.probe()
+
+        with self._lock:
+            return {
+                **self._result,
+                'checked_at': self._checked_at.isoformat(),
+                'age_seconds': round(time.monotonic() - self._checked_monotonic, 1)
+            }
+
+    @property
+    def thread_alive(self):
+        return self._pid == os.getpid() and self._thread is not None and self._thread.is_alive()
+
+
+def get_pool_status():
+    """连接池占用情况（SQLite等无连接池上限的引擎只返回类型）"""
+    pool = db.engine.pool
+    status = {'class': type(pool).__name__}
+    if not hasattr(pool, 'checkedout'):
+        return status
+
+    checked_out = pool.checkedout()
+    capacity = pool.size() + max(getattr(pool, '_max_overflow', 0), 0)
+    status.update({
+        'size': pool.size(),
+        'checked_out': checked_out,
+        'checked_in': pool.checkedin(),
+        'overflow': pool.overflow(),
+        'capacity': capacity,
+        'saturation': round(checked_out / capacity, 2) if capacity else None
+    })
+    return status
+
+
+health_prober = HealthProber(
+    interval=float(os.getenv('HEALTH_PROBE_INTERVAL', 15)),
+    disk_path=os.getenv('HEALTH_DISK_PATH') or None,
+    disk_min_free_mb=int(os.getenv('HEALTH_DISK_MIN_FREE_MB', 500))
+)
@@ -0,0 +1,388 @@
+"""
+提醒批量扫描服务
+按用户ID键集分批扫描全部用户，评估各类提醒并批量写入通知发件箱（notification_outbox）：
+
+  - 每批用户只查询一次通知设置（LEFT JOIN，未创建设置的用户按字段默认值处理）
+  - 每类提醒每批一条按 user_id IN (...) + 日期区间的索引范围查询，按各用户的提前天数在内存中过滤
+  - 按 dedupe_key 与发件箱已有记录去重后一条 INSERT executemany 写入，每批一个事务；
+    重复执行或多实例并行（按用户ID取模分片）不会重复生成
+  - 内存占用只与单批用户的数据量有关，与总用户数无关
+
+提醒类型：
+  rent          收租提醒：未收款的租金在 rent_reminder_days 天内到期（租金记录见 rent_schedule_service）
+  asset_expiry  资产到期：虚拟资产在 asset_expiry_days 天内到期
+  expense       费用提醒：周期性费用在 expense_reminder_days 天内到期
+  maintenance   维护提醒：启用的维护提醒进入提前提醒期（advance_days）或已到期
+  depreciation  折旧提醒：固定资产近期完成折旧
+  value_change  价值变动：固定资产净值较原值的降幅每跨过一次 value_change_threshold% 提醒一次
+"""
+import calendar
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from database import db
+from models.asset_expense import AssetExpense
+from models.asset_income import AssetIncome
+from models.asset_maintenance import MaintenanceReminder
+from models.fixed_asset import FixedAsset
+from models.notification_outbox import NotificationOutbox
+from models.notification_settings import UserNotificationSettings
+from models.project import Project
+from models.user import User
+
+NOTIFICATION_TYPES = ('rent', 'asset_expiry', 'expense', 'maintenance', 'depreciation', 'value_change')
+CHANNELS = ('push', 'email', 'sms', 'wechat')
+
+# 读取的通知设置字段（未创建设置时取模型默认值）
+SETTING_FIELDS = [
+    'push_enabled', 'email_enabled', 'sms_enabled', 'wechat_enabled',
+    'rent_reminder_enabled', 'rent_reminder_days',
+    'asset_expiry_enabled', 'asset_expiry_days',
+    'expense_reminder_enabled', 'expense_reminder_days',
+    'depreciation_enabled', 'value_change_enabled', 'value_change_threshold',
+]
+SETTING_DEFAULTS = {
+    field: UserNotificationSettings.__table__.c[field].default.arg for field in SETTING_FIELDS
+}
+
+MAX_MAINTENANCE_ADVANCE_DAYS = 90  # 维护提醒提前天数的查询上限
+DEPRECIATION_LOOKBACK_DAYS = 30  # 只提醒最近该天数内完成折旧的资产，避免首次运行时对早已折旧完的资产集中提醒
+KEY_CHUNK_SIZE = 500  # 去重查询 IN 列表的长度
+
+
+def _months_between(start_date, base_date):
+    """与 FixedAsset.calculate_current_depreciation 相同的已折旧月数算法"""
+    months = (base_date.year - start_date.year) * 12 + (base_date.month - start_date.month)
+    if base_date.day < start_date.day:
+        months -= 1
+    return max(0, months)
+
+
+def _add_months(day, months):
+    index = day.year * 12 + day.month - 1 + months
+    year, month = index // 12, index % 12 + 1
+    return date(year, month, min(day.day, calendar.monthrange(year, month)[1]))
+
+
+class NotificationScanner:
+    """提醒批量扫描服务类"""
+
+    def __init__(self, today=None, batch_size=1000, shard_index=0, shard_count=1,
+                 types=None, limit=None, dry_run=False):
+        """
+        Args:
+            today: 基准日期（默认今天）
+            batch_size: 每批扫描的用户数（每批一个事务）
+            shard_index / shard_count: 多实例并行时按用户ID取模分片
+            types: 只扫描这些提醒类型（默认全部）
+            limit: 最多扫描的用户数（调试用）
+            dry_run: 只统计，不写入发件箱
+        """
+        if not 0 <= shard_index < shard_count:
+            raise ValueError('分片序号必须在 [0, 分片数) 范围内')
+        unknown = set(types or ()) - set(NOTIFICATION_TYPES)
+        if unknown:
+            raise ValueError(f"不支持的提醒类型: {', '.join(sorted(unknown))}")
+
+        self.today = today or date.today()
+        self.batch_size = batch_size
+        self.shard_index = shard_index
+        self.shard_count = shard_count
+        self.types = list(types or NOTIFICATION_TYPES)
+        self.limit = limit
+        self.dry_run = dry_run
+        self.stats = {'users': 0, 'candidates': 0, 'duplicates': 0, 'created': 0,
+                      **{f'created_{t}': 0 for t in self.types}}
+
+    # ==================== 用户与设置 ====================
+
+    def iter_user_batches(self):
+        """按用户ID键集分页，每批返回 {user_id: 设置字典}（已排除没有开启任何通知渠道的用户）"""
+        columns = [getattr(UserNotificationSettings, field) for field in SETTING_FIELDS]
+        last_id = 0
+        remaining = self.limit
+        while remaining is None or remaining > 0:
+            size = self.batch_size if remaining is None else min(self.batch_size, remaining)
+            query = select(User.id, UserNotificationSettings.id.label('settings_id'), *columns).outerjoin(
+                UserNotificationSettings, UserNotificationSettings.user_id == User.id
+            ).where(User.id > last_id, User.is_active.is_(True))
+            if self.shard_count > 1:
+                query = query.where(User.id % self.shard_count == self.shard_index)
+
+            rows = db.session.execute(query.order_by(User.id).limit(size)).all()
+            if not rows:
+                return
+            last_id = rows[-1].id
+            if remaining is not None:
+                remaining -= len(rows)
+            self.stats['users'] += len(rows)
+
+            batch = {}
+            for row in rows:
+                settings = {
+                    field: (getattr(row, field) if row.settings_id is not None and getattr(row, field) is not None
+                            else SETTING_DEFAULTS[field])
+                    for field in SETTING_FIELDS
+                }
+                settings['user_id'] = row.id
+                settings['channels'] = ','.join(c for c in CHANNELS if settings[f'{c}_enabled'])
+                if settings['channels']:
+                    batch[row.id] = settings
+            yield batch
+
+    @staticmethod
+    def _enabled(batch, flag):
+        return [user_id for user_id, settings in batch.items() if settings[flag]]
+
+    def _candidate(self, settings, notification_type, key, ref_id, title, content, due_date):
+        return {
+            'user_id': settings['user_id'],
+            'notification_type': notification_type,
+            'dedupe_key': key,
+            'ref_id': ref_id,
+            'title': title[:200],
+            'content': content,
+            'channels': settings['channels'],
+            'due_date': due_date,
+        }
+
+    # ==================== 各类提醒 ====================
+
+    def scan_rent(self, batch):
+        user_ids = self._enabled(batch, 'rent_reminder_enabled')
+        if not user_ids:
+            return []
+        max_days = max(batch[u]['rent_reminder_days'] or 0 for u in user_ids)
+        rows = db.session.execute(
+            select(
+                AssetIncome.id, AssetIncome.amount, AssetIncome.expected_amount, AssetIncome.income_date,
+                AssetIncome.expected_date, FixedAsset.user_id, FixedAsset.name
+            ).join(FixedAsset, FixedAsset.id == AssetIncome.asset_id).where(
+                FixedAsset.user_id.in_(user_ids),
+                AssetIncome.income_type == 'rent',
+                AssetIncome.status == 'pending',
+                AssetIncome.income_date.between(self.today, self.today + timedelta(days=max_days))
+            )
+        ).all()
+        candidates = []
+        for row in rows:
+            settings = batch[row.user_id]
+            due = row.expected_date or row.income_date
+            days = (due - self.today).days
+            if not 0 <= days <= (settings['rent_reminder_days'] or 0):
+                continue
+            amount = float(row.expected_amount or row.amount)
+            when = '今天' if days == 0 else f'{days}天后（{due.isoformat()}）'
+            candidates.append(self._candidate(
+                settings, 'rent', f'rent:{row.id}:{due.isoformat()}', row.id,
+                f'收租提醒：{row.name}', f'{row.name} 的租金 ¥{amount:,.2f} {when}到期', due
+            ))
+        return candidates
+
+    def scan_asset_expiry(self, batch):
+        user_ids = self._enabled(batch, 'asset_expiry_enabled')
+        if not user_ids:
+            return []
+        max_days = max(batch[u]['asset_expiry_days'] or 0 for u in user_ids)
+        start = datetime.combine(self.today, datetime.min.time())
+        rows = db.session.execute(
+            select(Project.id, Project.user_id, Project.name, Project.end_time).where(
+                Project.user_id.in_(user_ids),
+                Project.end_time >= start,
+                Project.end_time < start + timedelta(days=max_days + 1)
+            )
+        ).all()
+        candidates = []
+        for row in rows:
+            settings = batch[row.user_id]
+            due = row.end_time.date()
+            days = (due - self.today).days
+            if days > (settings['asset_expiry_days'] or 0):
+                continue
+            when = '今天' if days == 0 else f'{days}天后（{due.isoformat()}）'
+            candidates.append(self._candidate(
+                settings, 'asset_expiry', f'asset_expiry:{row.id}:{due.isoformat()}', row.id,
+                f'资产到期提醒：{row.name}', f'{row.name} 将于{when}到期', due
+            ))
+        return candidates
+
+    def scan_expense(self, batch):
+        user_ids = self._enabled(batch, 'expense_reminder_enabled')
+        if not user_ids:
+            return []
+        max_days = max(batch[u]['expense_reminder_days'] or 0 for u in user_ids)
+        rows = db.session.execute(
+            select(
+                AssetExpense.id, AssetExpense.user_id, AssetExpense.expense_name, AssetExpense.amount,
+                AssetExpense.next_due_date
+            ).where(
+                AssetExpense.user_id.in_(user_ids),
+                AssetExpense.next_due_date.between(self.today, self.today + timedelta(days=max_days)),
+                AssetExpense.is_recurring.is_(True)
+            )
+        ).all()
+        candidates = []
+        for row in rows:
+            settings = batch[row.user_id]
+            days = (row.next_due_date - self.today).days
+            if days > (settings['expense_reminder_days'] or 0):
+                continue
+            when = '今天' if days == 0 else f'{days}天后（{row.next_due_date.isoformat()}）'
+            candidates.append(self._candidate(
+                settings, 'expense', f'expense:{row.id}:{row.next_due_date.isoformat()}', row.id,
+                f'费用提醒：{row.expense_name}', f'{row.expense_name} ¥{float(row.amount):,.2f} 将于{when}到期',
+                row.next_due_date
+            ))
+        return candidates
+
+    def scan_maintenance(self, batch):
+        user_ids = list(batch)
+        if not user_ids:
+            return []
+        rows = db.session.execute(
+            select(
+                MaintenanceReminder.id, MaintenanceReminder.user_id, MaintenanceReminder.name,
+                MaintenanceReminder.advance_days, MaintenanceReminder.next_reminder_date, FixedAsset.name.label('asset_name')
+            ).join(FixedAsset, FixedAsset.id == MaintenanceReminder.asset_id).where(
+                MaintenanceReminder.user_id.in_(user_ids),
+                MaintenanceReminder.is_active.is_(True),
+                MaintenanceReminder.next_reminder_date <= self.today + timedelta(days=MAX_MAINTENANCE_ADVANCE_DAYS)
+            )
+        ).all()
+        candidates = []
+        for row in rows:
+            days = (row.next_reminder_date - self.today).days
+            if days > min(row.advance_days or 0, MAX_MAINTENANCE_ADVANCE_DAYS):
+                continue
+            if days < 0:
+                when = f'已过期{-days}天（{row.next_reminder_date.isoformat()}）'
+            else:
+                when = '今天到期' if days == 0 else f'{days}天后到期（{row.next_reminder_date.isoformat()}）'
+            candidates.append(self._candidate(
+                batch[row.user_id], 'maintenance', f'maintenance:{row.id}:{row.next_reminder_date.isoformat()}',
+                row.id, f'维护提醒：{row.name}', f'{row.asset_name} 的维护「{row.name}」{when}', row.next_reminder_date
+            ))
+        return candidates
+
+    def scan_asset_values(self, batch):
+        """折旧完成与价值变动共用一次固定资产查询"""
+        depreciation_users = set(self._enabled(batch, 'depreciation_enabled')) if 'depreciation' in self.types else set()
+        value_users = set(self._enabled(batch, 'value_change_enabled')) if 'value_change' in self.types else set()
+        user_ids = list(depreciation_users | value_users)
+        if not user_ids:
+            return []
+        rows = db.session.execute(
+            select(
+                FixedAsset.id, FixedAsset.user_id, FixedAsset.name, FixedAsset.original_value,
+                FixedAsset.residual_rate, FixedAsset.useful_life_years, FixedAsset.monthly_depreciation,
+                FixedAsset.depreciation_start_date
+            ).where(
+                FixedAsset.user_id.in_(user_ids),
+                FixedAsset.status != 'disposed',
+                FixedAsset.depreciation_start_date <= self.today
+            )
+        ).all()
+        candidates = []
+        for row in rows:
+            original = float(row.original_value or 0)
+            if original <= 0 or not row.useful_life_years:
+                continue
+            settings = batch[row.user_id]
+            total_months = row.useful_life_years * 12
+            months = min(_months_between(row.depreciation_start_date, self.today), total_months)
+            residual = original * float(row.residual_rate or 0) / 100
+            current = max(original - float(row.monthly_depreciation or 0) * months, residual)
+
+            if row.user_id in depreciation_users and months >= total_months:
+                finished = _add_months(row.depreciation_start_date, total_months)
+                if (self.today - finished).days <= DEPRECIATION_LOOKBACK_DAYS:
+                    candidates.append(self._candidate(
+                        settings, 'depreciation', f'depreciation:{row.id}', row.id, f'折旧提醒：{row.name}',
+                        f'{row.name} 已于 {finished.isoformat()} 折旧完毕，当前净值 ¥{current:,.2f}', finished
+                    ))
+
+            threshold = settings['value_change_threshold'] or 0
+            if row.user_id in value_users and threshold > 0:
+                drop = (original - current) / original * 100
+                step = int(drop // threshold)
+                if step >= 1:
+                    candidates.append(self._candidate(
+                        settings, 'value_change', f'value_change:{row.id}:{threshold}:{step}', row.id,
+                        f'价值变动提醒：{row.name}',
+                        f'{row.name} 当前净值 ¥{current:,.2f}，较原值 ¥{original:,.2f} 下降 {drop:.1f}%', self.today
+                    ))
+        return candidates
+
+    # ==================== 写入 ====================
+
+    def _existing_keys(self, keys):
+        existing = set()
+        for start in range(0, len(keys), KEY_CHUNK_SIZE):
+            chunk = keys[start:start + KEY_CHUNK_SIZE]
+            existing.update(db.session.execute(
+                select(NotificationOutbox.dedupe_key).where(NotificationOutbox.dedupe_key.in_(chunk))
+            ).scalars())
+        return existing
+
+    def _emit(self, candidates):
+        """去重后批量写入发件箱"""
+        self.stats['candidates'] += len(candidates)
+        if not candidates:
+            return
+        unique = {c['dedupe_key']: c for c in candidates}
+        existing = self._existing_keys(list(unique))
+        rows = [c for key, c in unique.items() if key not in existing]
+        self.stats['duplicates'] += len(candidates) - len(rows)
+        if not rows:
+            return
+
+        if not self.dry_run:
+            now = datetime.utcnow()
+            for row in rows:
+                row.update(status='pending', attempts=0, created_at=now)
+            table = NotificationOutbox.__table__
+            try:
+                db.session.execute(table.insert(), rows)
+                db.session.commit()
+            except IntegrityError:
+                # 其他实例同时写入了部分通知：重新去重后写入剩余部分
+                db.session.rollback()
+                existing = self._existing_keys([row['dedupe_key'] for row in rows])
+                self.stats['duplicates'] += len(existing)
+                rows = [row for row in rows if row['dedupe_key'] not in existing]
+                if rows:
+                    db.session.execute(table.insert(), rows)
+                    db.session.commit()
+
+        self.stats['created'] += len(rows)
+        for row in rows:
+            self.stats[f"created_{row['notification_type']}"] += 1
+
+    def run(self):
+        """
+        扫描全部用户并写入发件箱
+
+        Returns:
+            统计信息 {'users', 'candidates', 'duplicates', 'created', 'created_<类型>'...}
+        """
+        scanners = [
+            ('rent', self.scan_rent),
+            ('asset_expiry', self.scan_asset_expiry),
+            ('expense', self.scan_expense),
+            ('maintenance', self.scan_maintenance),
+        ]
+        try:
+            for batch in self.iter_user_batches():
+                candidates = []
+                for notification_type, scan in scanners:
+                    if notification_type in self.types:
+                        candidates.extend(scan(batch))
+                if 'depreciation' in self.types or 'value_change' in self.types:
+                    candidates.extend(self.scan_asset_values(batch))
+                self._emit(candidates)
+        except Exception:
+            db.session.rollback()
+            raise
+        return dict(self.stats)
@@ -0,0 +1,184 @@
+"""
+扫码登录会话存储
+会话保存在数据库表 wechat_qrcode_sessions 中，所有Gunicorn worker共享：
+
+  - 会话在首次查询状态（或手机端先确认）时创建，有效期 ttl_seconds，过期记录定期清理
+  - 支持长轮询：状态查询可等待状态变化后再返回，减少前端请求次数；
+    同一进程内确认登录会立即唤醒等待中的请求，跨进程则按 poll_interval 轮询数据库
+"""
+import json
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, insert, update, delete
+from sqlalchemy.exc import IntegrityError
+
+from database import db
+from models.wechat_qrcode_session import WechatQrcodeSession
+
+# 前端生成的票据格式：qrcode_{时间戳}_{随机串}
+TICKET_PATTERN = re.compile(r'qrcode_[A-Za-z0-9_]{1,57}')
+
+
+class QrcodeSessionStore:
+    """扫码登录会话存储"""
+
+    def __init__(self, ttl_seconds=300, poll_interval=0.5, purge_interval=60):
+        """
+        Args:
+            ttl_seconds: 二维码有效期（秒），与前端二维码过期时间一致
+            poll_interval: 长轮询时读取数据库的间隔（秒）
+            purge_interval: 清理过期会话的最小间隔（秒）
+        """
+        self.ttl_seconds = ttl_seconds
+        self.poll_interval = poll_interval
+        self.purge_interval = purge_interval
+        self._events = {}
+        self._events_lock = threading.Lock()
+        self._last_purge = 0.0
+
+    @property
+    def _table(self):
+        return WechatQrcodeSession.__table__
+
+    @staticmethod
+    def is_valid_ticket(ticket):
+        return bool(ticket) and TICKET_PATTERN.fullmatch(ticket) is not None
+
+    def _to_dict(self, row, now):
+        if row.expire_at < now:
+            return {'status': 'expired', 'token': None, 'user': None}
+        return {
+            'status': row.status,
+            'token': row.token,
+            'user': json.loads(row.user_info) if row.user_info else None
+        }
+
+    def _select(self, ticket):
+        table = self._table
+        with db.engine.begin() as conn:
+            return conn.execute(
+                select(table.c.status, table.c.token, table.c.user_info, table.c.expire_at)
+                .where(table.c.ticket == ticket)
+            ).first()
+
+    def _create(self, ticket, now, **values):
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(insert(self._table).values(
+                    ticket=ticket,
+                    status=values.pop('status', 'waiting'),
+                    expire_at=now + timedelta(seconds=self.ttl_seconds),
+                    created_at=now,
+                    updated_at=now,
+                    **values
+                ))
+            return True
+        except IntegrityError:
+            return False  # 其他进程已创建
+
+    # ==================== 对外接口 ====================
+
+    def get_or_create(self, ticket):
+        """
+        查询会话状态，不存在时创建等待扫码的会话
+
+        Returns:
+            {'status': waiting/scanned/expired, 'token': ..., 'user': ...}
+        """
+        self.purge_expired()
+        now = datetime.utcnow()
+        row = self._select(ticket)
+        if row is None:
+            self._create(ticket, now)
+            row = self._select(ticket)
+        return self._to_dict(row, now)
+
+    def confirm(self, ticket, token, user):
+        """
+        手机端扫码授权后确认登录
+
+        Returns:
+            确认后的会话状态；二维码已过期时 status 为 expired
+        """
+        now = datetime.utcnow()
+        user_info = json.dumps(user, ensure_ascii=False)
+        table = self._table
+
+        with db.engine.begin() as conn:
+            result = conn.execute(
+                update(table)
+                .where(table.c.ticket == ticket, table.c.expire_at >= now)
+                .values(status='scanned', token=token, user_info=user_info, updated_at=now)
+            )
+        if result.rowcount == 0 and self._select(ticket) is None:
+            # 手机端先于PC端首次查询完成扫码
+            self._create(ticket, now, status='scanned', token=token, user_info=user_info)
+
+        self._notify(ticket)
+        return self._to_dict(self._select(ticket), now)
+
+    def wait_for_change(self, ticket, timeout, known_status='waiting'):
+        """
+        长轮询：等待会话状态不再是 known_status 或超时
+
+        Returns:
+            最新的会话状态
+        """
+        session = self.get_or_create(ticket)
+        deadline = time.monotonic() + timeout
+        event = self._subscribe(ticket)
+        try:
+            while session['status'] == known_status and time.monotonic() < deadline:
+                event.wait(min(self.poll_interval, max(0.0, deadline - time.monotonic())))
+                event.clear()
+                row = self._select(ticket)
+                session = self._to_dict(row, datetime.utcnow()) if row else {'status': 'expired', 'token': None, 'user': None}
+        finally:
+            self._unsubscribe(ticket)
+        return session
+
+    def purge_expired(self, force=False):
+        """
+        清理过期会话
+
+        过期后再保留一个有效期，期间重复查询仍返回 expired，而不是重新创建会话
+        """
+        now_monotonic = time.monotonic()
+        if not force and now_monotonic - self._last_purge < self.purge_interval:
+            return 0
+        self._last_purge = now_monotonic
+
+        table = self._table
+        with db.engine.begin() as conn:
+            result = conn.execute(
+                delete(table).where(table.c.expire_at < datetime.utcnow() - timedelta(seconds=self.ttl_seconds))
+            )
+        return result.rowcount
+
+    # ==================== 进程内唤醒 ====================
+
+    def _subscribe(self, ticket):
+        with self._events_lock:
+            event, waiters = self._events.get(ticket, (threading.Event(), 0))
+            self._events[ticket] = (event, waiters + 1)
+            return event
+
+    def _unsubscribe(self, ticket):
+        with self._events_lock:
+            event, waiters = self._events.get(ticket, (None, 0))
+            if waiters <= 1:
+                self._events.pop(ticket, None)
+            else:
+                self._events[ticket] = (event, waiters - 1)
+
+    def _notify(self, ticket):
+        with self._events_lock:
+            entry = self._events.get(ticket)
+        if entry:
+            entry[0].set()
+
+
+qrcode_session_store = QrcodeSessionStore()
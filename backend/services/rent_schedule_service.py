@@ -0,0 +1,272 @@
+"""
+租金计划服务
+根据固定资产的租金设置（rent_price / rent_due_day / rent_start_date / rent_end_date）
+批量生成每期应收租金的收入记录，收入分析中的预期vs实际对比即可直接使用 expected_amount：
+
+  - 按资产ID分批扫描出租中的资产，批内一次查询已有租金收入，整批计算应收期次后
+    用一条 INSERT 和一条 UPDATE executemany 写入（每批一个事务），不逐条读写ORM对象
+  - 幂等：按（资产, 应收月份）匹配已有的租金收入，重复执行不会产生重复记录；
+    租金或收租日调整后同步更新尚未收款的自动生成记录，租期缩短或停租后删除多余的未收款记录
+  - 手工录入的租金收入（含已收款）不会被覆盖，只在缺少 expected_amount 时补齐预期金额
+
+收租日：每月 rent_due_day 日（超过当月天数取月末）；租期按开始日逐月划分，每期一条记录
+"""
+import calendar
+from datetime import date, datetime
+
+from sqlalchemy import and_, bindparam, select
+
+from database import db
+from models.asset_income import AssetIncome
+from models.fixed_asset import FixedAsset
+
+# 自动生成的租金记录在 notes 中带此标记，只有带标记且未收款的记录会被更新或删除
+SCHEDULE_NOTE = '租金计划自动生成'
+OPEN_STATUSES = ('pending', 'overdue')
+
+
+def _add_months(year, month, months):
+    index = year * 12 + month - 1 + months
+    return index // 12, index % 12 + 1
+
+
+def _due_date(year, month, due_day):
+    return date(year, month, min(max(int(due_day or 1), 1), calendar.monthrange(year, month)[1]))
+
+
+def rent_occurrences(start_date, end_date, due_day, until):
+    """
+    计算租期内每期应收日期
+
+    租期从 rent_start_date 起按月划分，每个起始日不晚于租期结束（及生成截止日）的租期收取一期，
+    应收日为该期所在月的收租日；首期收租日早于租期开始日时在开始日收取
+
+    Args:
+        start_date: 租期开始日期
+        end_date: 租期结束日期（None为长期出租）
+        due_day: 每月收租日
+        until: 生成截止日期（起始日晚于该日期的租期不生成）
+
+    Returns:
+        [date, ...] 按时间顺序，每个月一期
+    """
+    last = min(end_date, until) if end_date else until
+    if start_date is None:
+        return []
+
+    dates = []
+    months = 0
+    while True:
+        year, month = _add_months(start_date.year, start_date.month, months)
+        period_start = date(year, month, min(start_date.day, calendar.monthrange(year, month)[1]))
+        if period_start > last:
+            return dates
+        due = _due_date(year, month, due_day)
+        dates.append(max(due, start_date) if months == 0 else due)
+        months += 1
+
+
+class RentScheduleService:
+    """租金计划批量生成服务"""
+
+    def __init__(self, today=None, horizon_months=3, batch_size=500, dry_run=False):
+        """
+        Args:
+            today: 基准日期（默认今天），应收日期早于该日期且未收款的记录标记为 overdue
+            horizon_months: 向后生成的月数（长期出租或租期很长时只生成到 today + horizon_months）
+            batch_size: 每批处理的资产数（每批一个事务）
+            dry_run: 只统计，不写入
+        """
+        self.today = today or date.today()
+        self.horizon_months = horizon_months
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        year, month = _add_months(self.today.year, self.today.month, horizon_months)
+        self.until = date(year, month, calendar.monthrange(year, month)[1])
+        self.stats = {'assets': 0, 'created': 0, 'updated': 0, 'backfilled': 0, 'removed': 0}
+
+    # ==================== 扫描 ====================
+
+    def _iter_asset_batches(self, user_id=None, asset_ids=None):
+        """按资产ID游标分批读取出租中的资产（只取计算需要的列）"""
+        query = select(
+            FixedAsset.id, FixedAsset.rent_price, FixedAsset.rent_due_day,
+            FixedAsset.rent_start_date, FixedAsset.rent_end_date
+        ).where(
+            FixedAsset.status == 'rent',
+            FixedAsset.rent_price > 0,
+            FixedAsset.rent_start_date.isnot(None)
+        )
+        if user_id is not None:
+            query = query.where(FixedAsset.user_id == user_id)
+        if asset_ids is not None:
+            query = query.where(FixedAsset.id.in_(list(asset_ids)))
+
+        last_id = 0
+        while True:
+            batch = db.session.execute(
+                query.where(FixedAsset.id > last_id).order_by(FixedAsset.id).limit(self.batch_size)
+            ).all()
+            if not batch:
+                return
+            yield batch
+            last_id = batch[-1].id
+
+    def _load_existing(self, asset_ids):
+        """批内所有租金收入，按（资产ID, 年, 月）分组"""
+        rows = db.session.execute(
+            select(
+                AssetIncome.id, AssetIncome.asset_id, AssetIncome.amount, AssetIncome.expected_amount,
+                AssetIncome.expected_date, AssetIncome.income_date, AssetIncome.status, AssetIncome.notes
+            ).where(AssetIncome.asset_id.in_(asset_ids), AssetIncome.income_type == 'rent')
+        ).all()
+        existing = {}
+        for row in rows:
+            day = row.expected_date or row.income_date
+            existing.setdefault((row.asset_id, day.year, day.month), []).append(row)
+        return existing
+
+    # ==================== 计算 ====================
+
+    def _plan_batch(self, assets):
+        """计算一批资产需要新增、更新、补齐预期金额和删除的记录"""
+        existing = self._load_existing([asset.id for asset in assets])
+        now = datetime.utcnow()
+        inserts, updates, backfills, removals = [], [], [], []
+        expected_keys = set()
+
+        for asset in assets:
+            rent = float(asset.rent_price)
+            for due in rent_occurrences(asset.rent_start_date, asset.rent_end_date, asset.rent_due_day, self.until):
+                key = (asset.id, due.year, due.month)
+                expected_keys.add(key)
+                status = 'overdue' if due < self.today else 'pending'
+                rows = existing.get(key)
+                if not rows:
+                    inserts.append({
+                        'asset_id': asset.id,
+                        'income_type': 'rent',
+                        'amount': rent,
+                        'expected_amount': rent,
+                        'cost': 0,
+                        'tax_rate': 0,
+                        'tax_amount': 0,
+                        'net_amount': rent,
+                        'income_date': due,
+                        'expected_date': due,
+                        'description': f'{due.year}年{due.month}月租金',
+                        'notes': SCHEDULE_NOTE,
+                        'is_recurring': True,
+                        'recurring_frequency': 'monthly',
+                        'status': status,
+                        'created_at': now,
+                        'updated_at': now,
+                    })
+                    continue
+                for row in rows:
+                    if row.notes == SCHEDULE_NOTE and row.status in OPEN_STATUSES:
+                        # 已到期的期次保留原金额和应收日，只更新逾期状态；租金调整只影响今天及以后的期次
+                        amount, day = (float(row.amount), row.expected_date) if due < self.today else (rent, due)
+                        if (float(row.amount) != amount or float(row.expected_amount or 0) != amount
+                                or row.expected_date != day or row.status != status):
+                            updates.append({'_id': row.id, '_amount': amount, '_date': day,
+                                            '_status': status, '_updated_at': now})
+                    elif row.expected_amount is None:
+                        backfills.append({'_id': row.id, '_amount': rent,
+                                          '_date': row.expected_date or due, '_updated_at': now})
+
+        # 租期调整后不再属于计划的未收款自动记录（生成截止日之后的记录只在超出租期时删除，
+        # 避免较短的 horizon_months 删掉按较长周期生成的记录）
+        by_id = {asset.id: asset for asset in assets}
+        for key, rows in existing.items():
+            if key in expected_keys:
+                continue
+            asset = by_id[key[0]]
+            for row in rows:
+                if row.notes != SCHEDULE_NOTE or row.status not in OPEN_STATUSES:
+                    continue
+                day = row.expected_date or row.income_date
+                if day <= self.until or (asset.rent_end_date and day > asset.rent_end_date):
+                    removals.append(row.id)
+                elif float(row.amount) != float(asset.rent_price):
+                    updates.append({'_id': row.id, '_amount': float(asset.rent_price), '_date': day,
+                                    '_status': row.status, '_updated_at': now})
+
+        return inserts, updates, backfills, removals
+
+    # ==================== 写入 ====================
+
+    def _apply(self, inserts, updates, backfills, removals):
+        table = AssetIncome.__table__
+        if inserts:
+            db.session.execute(table.insert(), inserts)
+        # 绑定参数名不能与 SET 的列名相同，统一加 _ 前缀
+        if updates:
+            db.session.execute(
+                table.update().where(table.c.id == bindparam('_id')).values(
+                    amount=bindparam('_amount'), expected_amount=bindparam('_amount'),
+                    net_amount=bindparam('_amount'), income_date=bindparam('_date'),
+                    expected_date=bindparam('_date'), status=bindparam('_status'),
+                    updated_at=bindparam('_updated_at')
+                ),
+                updates
+            )
+        if backfills:
+            db.session.execute(
+                table.update().where(table.c.id == bindparam('_id')).values(
+                    expected_amount=bindparam('_amount'), expected_date=bindparam('_date'),
+                    updated_at=bindparam('_updated_at')
+                ),
+                backfills
+            )
+        if removals:
+            db.session.execute(table.delete().where(table.c.id.in_(removals)))
+
+    def _remove_stopped(self, user_id=None, asset_ids=None):
+        """已停租（状态不再是出租中）的资产：删除今天及以后的未收款自动记录"""
+        stopped = select(FixedAsset.id).where(FixedAsset.status != 'rent')
+        if user_id is not None:
+            stopped = stopped.where(FixedAsset.user_id == user_id)
+        if asset_ids is not None:
+            stopped = stopped.where(FixedAsset.id.in_(list(asset_ids)))
+        condition = and_(
+            AssetIncome.asset_id.in_(stopped),
+            AssetIncome.income_type == 'rent',
+            AssetIncome.notes == SCHEDULE_NOTE,
+            AssetIncome.status.in_(OPEN_STATUSES),
+            AssetIncome.expected_date >= self.today
+        )
+        if self.dry_run:
+            return db.session.query(AssetIncome.id).filter(condition).count()
+        return db.session.execute(AssetIncome.__table__.delete().where(condition)).rowcount
+
+    def run(self, user_id=None, asset_ids=None):
+        """
+        生成租金计划
+
+        Args:
+            user_id: 只处理该用户的资产（None为全部用户）
+            asset_ids: 只处理这些资产（如资产租金设置修改后）
+
+        Returns:
+            {'assets', 'created', 'updated', 'backfilled', 'removed'}
+        """
+        try:
+            for assets in self._iter_asset_batches(user_id, asset_ids):
+                inserts, updates, backfills, removals = self._plan_batch(assets)
+                if not self.dry_run:
+                    self._apply(inserts, updates, backfills, removals)
+                    db.session.commit()
+                self.stats['assets'] += len(assets)
+                self.stats['created'] += len(inserts)
+                self.stats['updated'] += len(updates)
+                self.stats['backfilled'] += len(backfills)
+                self.stats['removed'] += len(removals)
+
+            self.stats['removed'] += self._remove_stopped(user_id, asset_ids)
+            if not self.dry_run:
+                db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return dict(self.stats)
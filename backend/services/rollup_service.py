@@ -0,0 +1,134 @@
+"""
+月度汇总重建服务
+从收入、费用明细重新计算 monthly_income_rollup / monthly_expense_rollup：
+
+  - 按用户ID分批（keyset），每批两条 GROUP BY 查询算出汇总行，删除该批用户的旧汇总行后
+    用 executemany 写入（每批一个事务），重建期间其他用户的趋势接口不受影响
+  - 迁移 0005 建表后用迁移连接执行一次首次填充；之后用于绕过 ORM 的批量写入之后，
+    或怀疑增量汇总与明细不一致时（python rebuild_rollups.py）
+"""
+from datetime import date
+
+from sqlalchemy import extract, func, select
+
+from database import db
+from models.asset_expense import AssetExpense
+from models.asset_income import AssetIncome
+from models.fixed_asset import FixedAsset
+from models.monthly_rollup import MonthlyExpenseRollup, MonthlyIncomeRollup
+from models.user import User
+
+
+class RollupRebuilder:
+    """月度汇总重建"""
+
+    def __init__(self, batch_size=500, dry_run=False, connection=None):
+        """
+        Args:
+            batch_size: 每批处理的用户数
+            dry_run: 只计算不写入
+            connection: 使用指定连接（如迁移的事务连接，由调用方提交）；默认使用 db.session 并逐批提交
+        """
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.connection = connection
+        self._execute = connection.execute if connection is not None else db.session.execute
+        self.stats = {'users': 0, 'income_rows': 0, 'expense_rows': 0, 'orphans': 0}
+
+    def _iter_user_batches(self, user_id=None):
+        if user_id is not None:
+            yield [user_id]
+            return
+        last_id = 0
+        while True:
+            ids = self._execute(
+                select(User.id).where(User.id > last_id).order_by(User.id).limit(self.batch_size)
+            ).scalars().all()
+            if not ids:
+                return
+            yield ids
+            last_id = ids[-1]
+
+    def _income_rows(self, user_ids):
+        year = extract('year', AssetIncome.income_date)
+        month = extract('month', AssetIncome.income_date)
+        results = self._execute(select(
+            FixedAsset.user_id, AssetIncome.asset_id, AssetIncome.income_type, year, month,
+            func.count(AssetIncome.id), func.sum(AssetIncome.amount), func.sum(AssetIncome.net_amount),
+            func.sum(AssetIncome.cost), func.sum(AssetIncome.tax_amount)
+        ).join(FixedAsset, FixedAsset.id == AssetIncome.asset_id).where(
+            FixedAsset.user_id.in_(user_ids),
+            AssetIncome.status == 'received'
+        ).group_by(FixedAsset.user_id, AssetIncome.asset_id, AssetIncome.income_type, year, month)).all()
+        return [
+            {
+                'user_id': r[0], 'asset_id': r[1], 'income_type': r[2], 'month_start': date(int(r[3]), int(r[4]), 1),
+                'record_count': r[5], 'amount_total': r[6] or 0, 'net_total': r[7] or 0,
+                'cost_total': r[8] or 0, 'tax_total': r[9] or 0
+            }
+            for r in results
+        ]
+
+    def _expense_rows(self, user_ids):
+        year = extract('year', AssetExpense.expense_date)
+        month = extract('month', AssetExpense.expense_date)
+        results = self._execute(select(
+            AssetExpense.user_id, AssetExpense.asset_id, AssetExpense.expense_type, year, month,
+            func.count(AssetExpense.id), func.sum(AssetExpense.amount)
+        ).where(
+            AssetExpense.user_id.in_(user_ids)
+        ).group_by(AssetExpense.user_id, AssetExpense.asset_id, AssetExpense.expense_type, year, month)).all()
+        return [
+            {
+                'user_id': r[0], 'asset_id': r[1], 'expense_type': r[2], 'month_start': date(int(r[3]), int(r[4]), 1),
+                'record_count': r[5], 'amount_total': r[6] or 0
+            }
+            for r in results
+        ]
+
+    def _replace(self, model, user_ids, rows):
+        self._execute(model.__table__.delete().where(model.__table__.c.user_id.in_(user_ids)))
+        if rows:
+            self._execute(model.__table__.insert(), rows)
+
+    def _commit(self):
+        if self.connection is None:
+            db.session.commit()
+
+    def run(self, user_id=None):
+        """
+        Args:
+            user_id: 只重建该用户（默认全部用户，并清理已删除用户的汇总行）
+
+        Returns:
+            {'users', 'income_rows', 'expense_rows', 'orphans'}
+        """
+        try:
+            for user_ids in self._iter_user_batches(user_id):
+                income_rows = self._income_rows(user_ids)
+                expense_rows = self._expense_rows(user_ids)
+                if not self.dry_run:
+                    self._replace(MonthlyIncomeRollup, user_ids, income_rows)
+                    self._replace(MonthlyExpenseRollup, user_ids, expense_rows)
+                    self._commit()
+                self.stats['users'] += len(user_ids)
+                self.stats['income_rows'] += len(income_rows)
+                self.stats['expense_rows'] += len(expense_rows)
+
+            if user_id is None and not self.dry_run:
+                for model in (MonthlyIncomeRollup, MonthlyExpenseRollup):
+                    table = model.__table__
+                    self.stats['orphans'] += self._execute(
+                        table.delete().where(table.c.user_id.not_in(select(User.id)))
+                    ).rowcount
+                self._commit()
+        except Exception:
+            if self.connection is None:
+                db.session.rollback()
+            raise
+        return self.stats
+
+
+def rebuild_rollups(user_id=None, batch_size=500):
+    """重建月度汇总（批量写入明细之后调用）"""
+    return RollupRebuilder(batch_size=batch_size).run(user_id=user_id)
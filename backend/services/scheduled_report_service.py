@@ -0,0 +1,248 @@
+"""
+定期报告批量生成服务
+为开启周报/月报的用户批量生成上一周期的报告：
+按用户ID分片、分批扫描，批内预加载数据上下文，线程池限制并发，
+依据已有报告记录实现幂等与中断续跑
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import or_
+
+from database import db
+from models.user import User
+from models.ai_report import AIReport
+from models.notification_settings import UserNotificationSettings
+
+
+# 报告类型 -> 通知设置开关字段
+REPORT_SETTING_FIELDS = {
+    'weekly': 'weekly_report_enabled',
+    'monthly': 'monthly_report_enabled',
+}
+
+
+def get_previous_period(report_type, today=None):
+    """
+    计算定期报告覆盖的上一周期
+
+    周报为上一个完整的ISO周（周一至周日），月报为上一个自然月；
+    标题格式与手动生成报告一致
+
+    Returns:
+        (start_date, end_date, title)
+    """
+    today = today or date.today()
+
+    if report_type == 'weekly':
+        start_date = today - timedelta(days=today.weekday() + 7)
+        end_date = start_date + timedelta(days=6)
+        year, week, _ = start_date.isocalendar()
+        title = f"资产周报 ({year}年第{week}周: {start_date.strftime('%Y年%m月%d日')} - {end_date.strftime('%m月%d日')})"
+    elif report_type == 'monthly':
+        end_date = date(today.year, today.month, 1) - timedelta(days=1)
+        start_date = date(end_date.year, end_date.month, 1)
+        title = f"资产月报 ({start_date.year}年{start_date.month}月)"
+    else:
+        raise ValueError(f'不支持的定期报告类型: {report_type}')
+
+    return start_date, end_date, title
+
+
+class ScheduledReportService:
+    """定期报告批量生成服务类"""
+
+    def __init__(self, app, report_type, today=None, shard_index=0, shard_count=1,
+                 batch_size=50, concurrency=3, stale_minutes=60, retry_failed=False,
+                 limit=None, dry_run=False):
+        if report_type not in REPORT_SETTING_FIELDS:
+            raise ValueError(f'不支持的定期报告类型: {report_type}')
+        if not 0 <= shard_index < shard_count:
+            raise ValueError('分片序号必须在 [0, 分片数) 范围内')
+
+        self.app = app
+        self.report_type = report_type
+        self.start_date, self.end_date, self.title = get_previous_period(report_type, today)
+        self.shard_index = shard_index
+        self.shard_count = shard_count
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.stale_minutes = stale_minutes
+        self.retry_failed = retry_failed
+        self.limit = limit
+        self.dry_run = dry_run
+        self.stats = {
+            'scanned': 0,
+            'created': 0,
+            'resumed': 0,
+            'skipped_completed': 0,
+            'skipped_in_progress': 0,
+            'skipped_failed': 0,
+            'succeeded': 0,
+            'failed': 0,
+        }
+
+    # ==================== 用户扫描 ====================
+
+    def _opted_in_filter(self):
+        """
+        开启定期报告的用户条件
+
+        未创建通知设置的用户按字段默认值处理（月报默认开启，周报默认关闭）
+        """
+        field = REPORT_SETTING_FIELDS[self.report_type]
+        column = getattr(UserNotificationSettings, field)
+        if getattr(UserNotificationSettings.__table__.c, field).default.arg:
+            return or_(UserNotificationSettings.id.is_(None), column.is_(True))
+        return column.is_(True)
+
+    def iter_user_batches(self):
+        """按用户ID键集分页，逐批返回本分片内需要生成报告的用户"""
+        last_id = 0
+        remaining = self.limit
+        while remaining is None or remaining > 0:
+            size = self.batch_size if remaining is None else min(self.batch_size, remaining)
+            query = User.query.outerjoin(
+                UserNotificationSettings, UserNotificationSettings.user_id == User.id
+            ).filter(
+                User.id > last_id,
+                User.is_active.is_(True),
+                User.zhipu_api_key_encrypted.isnot(None),
+                self._opted_in_filter()
+            )
+            if self.shard_count > 1:
+                query = query.filter(User.id % self.shard_count == self.shard_index)
+
+            rows = query.order_by(User.id).limit(size).all()
+            if not rows:
+                return
+            last_id = rows[-1].id
+            if remaining is not None:
+                remaining -= len(rows)
+            yield rows
+
+    # ==================== 续跑判断 ====================
+
+    def _existing_reports(self, user_ids):
+        """批量查询本周期已有的报告（每个用户取最新一条）"""
+        reports = AIReport.query.filter(
+            AIReport.user_id.in_(user_ids),
+            AIReport.report_type == self.report_type,
+            AIReport.start_date == self.start_date,
+            AIReport.end_date == self.end_date
+        ).order_by(AIReport.id).all()
+        return {report.user_id: report for report in reports}
+
+    def _plan_batch(self, rows):
+        """
+        确定本批需要执行的报告任务
+
+        已完成的跳过；生成中且超过 stale_minutes 未更新的视为上次运行中断，复用原记录重新生成；
+        失败的仅在 retry_failed 时重新生成；没有记录的新建报告
+
+        Returns:
+            [(report_id, user_id, api_key, model)]
+        """
+        existing = self._existing_reports([row.id for row in rows])
+        stale_before = datetime.utcnow() - timedelta(minutes=self.stale_minutes)
+        jobs = []
+
+        for row in rows:
+            report = existing.get(row.id)
+            if report is not None:
+                if report.status == 'completed':
+                    self.stats['skipped_completed'] += 1
+                    continue
+                if report.status == 'generating' and (report.updated_at or report.created_at) > stale_before:
+                    self.stats['skipped_in_progress'] += 1
+                    continue
+                if report.status == 'failed' and not self.retry_failed:
+                    self.stats['skipped_failed'] += 1
+                    continue
+
+            api_key = row.get_ai_api_key()
+            if not api_key:
+                continue
+
+            if self.dry_run:
+                jobs.append((report.id if report else None, row.id, api_key, row.zhipu_model or 'glm-4-flash'))
+                continue
+
+            if report is None:
+                report = AIReport(
+                    user_id=row.id,
+                    report_type=self.report_type,
+                    title=self.title,
+                    start_date=self.start_date,
+                    end_date=self.end_date,
+                    status='generating'
+                )
+                db.session.add(report)
+                self.stats['created'] += 1
+            else:
+                report.status = 'generating'
+                report.error_message = None
+                self.stats['resumed'] += 1
+            db.session.flush()
+            jobs.append((report.id, row.id, api_key, row.zhipu_model or 'glm-4-flash'))
+
+        db.session.commit()
+        return jobs
+
+    # ==================== 执行 ====================
+
+    def _run_job(self, job, data_context):
+        from routes.reports import run_report_task
+
+        report_id, user_id, api_key, model = job
+        with self.app.app_context():
+            try:
+                return run_report_task(
+                    report_id, user_id, api_key, model, self.report_type,
+                    self.start_date, self.end_date, data_context=data_context
+                )
+            finally:
+                db.session.remove()
+
+    def run(self):
+        """
+        执行批量生成
+
+        Returns:
+            统计信息字典
+        """
+        from workflows.data_context import preload_data_contexts
+
+        began = time.perf_counter()
+        print(f"[定期报告] {self.title} | 分片 {self.shard_index}/{self.shard_count} | "
+              f"批大小 {self.batch_size} | 并发 {self.concurrency}{' | 预演' if self.dry_run else ''}")
+
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='scheduled_report') as pool:
+            for batch_no, rows in enumerate(self.iter_user_batches(), start=1):
+                self.stats['scanned'] += len(rows)
+                first_id, last_id = rows[0].id, rows[-1].id
+                jobs = self._plan_batch(rows)
+                print(f"[定期报告] 第{batch_no}批: 用户 {len(rows)} 个，待生成 {len(jobs)} 份 "
+                      f"(用户ID {first_id} ~ {last_id})")
+                if not jobs or self.dry_run:
+                    continue
+
+                # 批内一次性预加载全部用户的资产数据，各任务共享
+                data_contexts = preload_data_contexts(
+                    [job[1] for job in jobs], periods=[(self.start_date, self.end_date)]
+                )
+                db.session.remove()
+
+                futures = [pool.submit(self._run_job, job, data_contexts[job[1]]) for job in jobs]
+                for future in futures:
+                    try:
+                        succeeded = future.result()
+                    except Exception as e:
+                        print(f"[定期报告] 任务异常: {str(e)}")
+                        succeeded = False
+                    self.stats['succeeded' if succeeded else 'failed'] += 1
+
+        self.stats['elapsed_seconds'] = round(time.perf_counter() - began, 2)
+        print(f"[定期报告] 完成: {self.stats}")
+        return self.stats
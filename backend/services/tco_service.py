@@ -0,0 +1,273 @@
+"""
+资产持有成本（TCO）服务
+一次计算用户全部固定资产的持有成本与回报，替代逐资产调用收入分析、费用汇总、维护统计和折旧接口：
+
+  - 四条查询：资产折旧参数、按资产汇总的收入（月度收入汇总表）、费用（月度费用汇总表）
+    和已完成维护费用（按资产 GROUP BY），与资产数、明细笔数无关
+  - 折旧、持有成本、净回报和回本周期在 NumPy 数组上整列计算，折旧规则与
+    FixedAsset.calculate_current_depreciation 一致
+
+口径：
+  - 净收入：已收款收入的 net_amount 合计（已扣除成本和税费）
+  - 运营成本：费用合计 + 已完成维护费用合计
+  - 持有成本(TCO)：累计折旧 + 运营成本
+  - 净回报：净收入 - 持有成本；回报率 = 净回报 / 原值
+  - 只统计基准日之前的收支：维护按维护日期，收入、费用按月汇总（基准日所在月整月计入）
+  - 回本周期：按最近12个自然月的月均现金流（净收入 - 运营成本），收回尚未收回的原值还需的月数；
+    已收回为 0，现金流不为正时无法回本（None）
+"""
+from datetime import date
+
+import numpy as np
+from sqlalchemy import case, func, select
+
+from database import db
+from models.asset_maintenance import AssetMaintenance
+from models.category import Category
+from models.fixed_asset import FixedAsset
+from models.monthly_rollup import MonthlyExpenseRollup, MonthlyIncomeRollup
+
+TRAILING_MONTHS = 12  # 回本周期按最近12个自然月的月均现金流估算
+
+# 可排序字段（/assets/tco?sort=）
+SORT_FIELDS = (
+    'tco', 'net_return', 'roi', 'running_cost', 'depreciation', 'net_income',
+    'payback_months', 'monthly_cost', 'original_value', 'current_value'
+)
+
+
+def _months_between(start_year, start_month, start_day, base_date):
+    """整月数（与 calculate_current_depreciation 相同：基准日的日数小于开始日的日数时少算一个月）"""
+    months = (base_date.year - start_year) * 12 + (base_date.month - start_month)
+    return months - (base_date.day < start_day)
+
+
+def _date_parts(dates):
+    return (
+        np.array([d.year for d in dates], dtype=np.int64),
+        np.array([d.month for d in dates], dtype=np.int64),
+        np.array([d.day for d in dates], dtype=np.int64)
+    )
+
+
+def _column(rows, index, dtype=float):
+    return np.array([row[index] or 0 for row in rows], dtype=dtype)
+
+
+class AssetTcoEngine:
+    """用户全部固定资产的持有成本计算"""
+
+    def __init__(self, user_id, base_date=None):
+        """
+        Args:
+            user_id: 用户ID
+            base_date: 计算基准日期（默认今天）
+        """
+        self.user_id = user_id
+        self.base_date = base_date or date.today()
+        year, month = divmod(self.base_date.year * 12 + self.base_date.month - 1 - (TRAILING_MONTHS - 1), 12)
+        self.trailing_since = date(year, month + 1, 1)
+        self.assets = []
+        self.metrics = {}
+
+    # ==================== 查询 ====================
+
+    def _load_assets(self, status=None, category_id=None):
+        query = select(
+            FixedAsset.id, FixedAsset.name, FixedAsset.asset_code, FixedAsset.status,
+            Category.name, FixedAsset.original_value, FixedAsset.residual_rate,
+            FixedAsset.useful_life_years, FixedAsset.monthly_depreciation,
+            FixedAsset.depreciation_start_date, FixedAsset.purchase_date
+        ).outerjoin(Category, Category.id == FixedAsset.category_id).where(FixedAsset.user_id == self.user_id)
+        if status:
+            query = query.where(FixedAsset.status == status)
+        if category_id:
+            query = query.where(FixedAsset.category_id == category_id)
+        return db.session.execute(query.order_by(FixedAsset.id)).all()
+
+    def _income_totals(self):
+        """{asset_id: (净收入合计, 最近12个月净收入, 收入笔数)}"""
+        rollup = MonthlyIncomeRollup
+        rows = db.session.execute(select(
+            rollup.asset_id,
+            func.sum(rollup.net_total),
+            func.sum(case((rollup.month_start >= self.trailing_since, rollup.net_total), else_=0)),
+            func.sum(rollup.record_count)
+        ).where(
+            rollup.user_id == self.user_id,
+            rollup.month_start <= self.base_date
+        ).group_by(rollup.asset_id)).all()
+        return {row[0]: row[1:] for row in rows}
+
+    def _expense_totals(self):
+        """{asset_id: (费用合计, 最近12个月费用)}"""
+        rollup = MonthlyExpenseRollup
+        rows = db.session.execute(select(
+            rollup.asset_id,
+            func.sum(rollup.amount_total),
+            func.sum(case((rollup.month_start >= self.trailing_since, rollup.amount_total), else_=0))
+        ).where(
+            rollup.user_id == self.user_id,
+            rollup.month_start <= self.base_date
+        ).group_by(rollup.asset_id)).all()
+        return {row[0]: row[1:] for row in rows}
+
+    def _maintenance_totals(self):
+        """{asset_id: (已完成维护费用合计, 最近12个月维护费用)}"""
+        query = select(
+            AssetMaintenance.asset_id,
+            func.sum(AssetMaintenance.cost),
+            func.sum(case((AssetMaintenance.maintenance_date >= self.trailing_since, AssetMaintenance.cost), else_=0))
+        )
+        query = FixedAsset.owned_by(query, AssetMaintenance, self.user_id).where(
+            AssetMaintenance.status == 'completed',
+            AssetMaintenance.maintenance_date <= self.base_date
+        ).group_by(AssetMaintenance.asset_id)
+        return {row[0]: row[1:] for row in db.session.execute(query).all()}
+
+    # ==================== 计算 ====================
+
+    def run(self, status=None, category_id=None):
+        """加载并计算，返回 self"""
+        self.assets = self._load_assets(status, category_id)
+        incomes = self._income_totals() if self.assets else {}
+        expenses = self._expense_totals() if self.assets else {}
+        maintenances = self._maintenance_totals() if self.assets else {}
+
+        zero = (0, 0, 0)
+        income = [incomes.get(row[0], zero) for row in self.assets]
+        expense = [expenses.get(row[0], zero) for row in self.assets]
+        maintenance = [maintenances.get(row[0], zero) for row in self.assets]
+
+        original_value = _column(self.assets, 5)
+        residual_value = original_value * (_column(self.assets, 6) / 100)
+        total_months = _column(self.assets, 7, np.int64) * 12
+        monthly_depreciation = _column(self.assets, 8)
+
+        # 折旧（整列计算，规则同 calculate_current_depreciation）
+        start_year, start_month, start_day = _date_parts([row[9] for row in self.assets])
+        started = np.array([self.base_date >= row[9] for row in self.assets], dtype=bool)
+        months_depreciated = np.where(
+            started,
+            np.clip(_months_between(start_year, start_month, start_day, self.base_date), 0, total_months),
+            0
+        )
+        depreciation = np.minimum(monthly_depreciation * months_depreciated, original_value - residual_value)
+        depreciation = np.where(started, depreciation, 0.0)
+        current_value = np.where(started, np.maximum(original_value - depreciation, residual_value), original_value)
+
+        purchase_year, purchase_month, purchase_day = _date_parts([row[10] for row in self.assets])
+        holding_months = np.maximum(_months_between(purchase_year, purchase_month, purchase_day, self.base_date), 0)
+
+        # 收入、运营成本
+        net_income = _column(income, 0)
+        running_cost = _column(expense, 0) + _column(maintenance, 0)
+        trailing_cash_flow = _column(income, 1) - _column(expense, 1) - _column(maintenance, 1)
+
+        tco = depreciation + running_cost
+        net_return = net_income - tco
+        has_value = original_value > 0
+        roi = np.divide(net_return * 100, original_value, out=np.zeros_like(net_return), where=has_value)
+        monthly_cost = tco / np.maximum(holding_months, 1)
+
+        # 回本周期：已收回为0，月均现金流不为正时无法回本（NaN）
+        unrecovered = original_value - (net_income - running_cost)
+        monthly_cash_flow = trailing_cash_flow / TRAILING_MONTHS
+        payback_months = np.full(len(self.assets), np.nan)
+        np.divide(unrecovered, monthly_cash_flow, out=payback_months, where=monthly_cash_flow > 0)
+        payback_months[unrecovered <= 0] = 0
+
+        self.metrics = {
+            'original_value': original_value,
+            'current_value': current_value,
+            'depreciation': depreciation,
+            'remaining_life_months': np.maximum(total_months - months_depreciated, 0),
+            'holding_months': holding_months,
+            'net_income': net_income,
+            'income_count': _column(income, 2, np.int64),
+            'expense_cost': _column(expense, 0),
+            'maintenance_cost': _column(maintenance, 0),
+            'running_cost': running_cost,
+            'tco': tco,
+            'monthly_cost': monthly_cost,
+            'net_return': net_return,
+            'roi': roi,
+            'monthly_cash_flow': monthly_cash_flow,
+            'payback_months': payback_months
+        }
+        return self
+
+    # ==================== 输出 ====================
+
+    def order(self, sort='tco', descending=True):
+        """按指标排序的行下标（相同值保持资产ID顺序，无法回本的排在最后）"""
+        key = self.metrics[sort]
+        key = -key if descending else key
+        return np.argsort(np.where(np.isnan(key), np.inf, key), kind='stable')
+
+    def rows(self, indices=None):
+        """资产明细（indices 为行下标，默认全部按资产ID顺序）"""
+        if indices is None:
+            indices = np.arange(len(self.assets))
+        indices = np.asarray(indices, dtype=np.int64)
+        columns = {
+            name: (np.round(values[indices], 2) if values.dtype.kind == 'f' else values[indices]).tolist()
+            for name, values in self.metrics.items()
+        }
+        payback = columns['payback_months']
+        result = []
+        for position, index in enumerate(indices.tolist()):
+            asset = self.assets[index]
+            item = {
+                'asset_id': asset[0],
+                'asset_name': asset[1],
+                'asset_code': asset[2],
+                'status': asset[3],
+                'category_name': asset[4]
+            }
+            for name, values in columns.items():
+                item[name] = values[position]
+            item['payback_months'] = None if np.isnan(payback[position]) else round(payback[position], 1)
+            result.append(item)
+        return result
+
+    def summary(self):
+        """全部资产合计"""
+        m = self.metrics
+        if not self.assets:
+            return {
+                'asset_count': 0, 'total_original_value': 0, 'total_current_value': 0,
+                'total_depreciation': 0, 'total_net_income': 0, 'total_running_cost': 0,
+                'total_tco': 0, 'total_net_return': 0, 'roi': 0, 'monthly_cash_flow': 0,
+                'payback_months': None, 'unrecoverable_count': 0
+            }
+        totals = {name: float(m[name].sum()) for name in (
+            'original_value', 'current_value', 'depreciation', 'net_income',
+            'running_cost', 'tco', 'net_return', 'monthly_cash_flow'
+        )}
+        unrecovered = totals['original_value'] - (totals['net_income'] - totals['running_cost'])
+        if unrecovered <= 0:
+            payback_months = 0
+        elif totals['monthly_cash_flow'] > 0:
+            payback_months = round(unrecovered / totals['monthly_cash_flow'], 1)
+        else:
+            payback_months = None
+        return {
+            'asset_count': len(self.assets),
+            'total_original_value': round(totals['original_value'], 2),
+            'total_current_value': round(totals['current_value'], 2),
+            'total_depreciation': round(totals['depreciation'], 2),
+            'total_net_income': round(totals['net_income'], 2),
+            'total_running_cost': round(totals['running_cost'], 2),
+            'total_tco': round(totals['tco'], 2),
+            'total_net_return': round(totals['net_return'], 2),
+            'roi': round(totals['net_return'] / totals['original_value'] * 100, 2) if totals['original_value'] > 0 else 0,
+            'monthly_cash_flow': round(totals['monthly_cash_flow'], 2),
+            'payback_months': payback_months,
+            'unrecoverable_count': int(np.isnan(m['payback_months']).sum())
+        }
+
+
+def get_user_tco(user_id, base_date=None, status=None, category_id=None):
+    """计算用户全部固定资产的持有成本（返回已计算的 AssetTcoEngine）"""
+    return AssetTcoEngine(user_id, base_date=base_date).run(status=status, category_id=category_id)
@@ -0,0 +1,197 @@
+"""
+资产估值时间轴服务
+计算用户资产组合在任意日期的价值：虚拟资产（项目）的已消耗成本和剩余价值、固定资产的累计折旧和账面价值
+
+  - 项目在 start_time ~ end_time 之间按天线性消耗，合计值是以各项目起止时间为拐点的分段线性函数；
+    把起止时间分别排序并计算斜率、斜率×时间的前缀和，任一时间点用两次二分查找即可求值
+  - 固定资产按月计提折旧（与 FixedAsset.calculate_current_depreciation 相同：
+    基准日的日数小于折旧开始日的日数时少算一个月），合计值是按月的阶梯函数；
+    按折旧开始日的日数（1~31）分组后，每组在"月序号"坐标上同样是分段线性函数，用同样的前缀和求值
+  - 每个用户只查询两次（项目、固定资产），拐点数组建好后所有日期一次向量化求值，
+    365 个点的日曲线与单个点的耗时基本相同
+
+口径与 Project.calculate_values / calculate_current_depreciation 一致，按用户当前持有的全部资产计算
+"""
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import select
+
+from database import db
+from models.fixed_asset import FixedAsset
+from models.project import Project
+
+EPOCH = datetime(1970, 1, 1)
+MAX_POINTS = 1000  # 单次请求最多计算的日期数
+
+PROJECT_COLUMNS = (Project.total_amount, Project.start_time, Project.end_time)
+FIXED_ASSET_COLUMNS = (
+    FixedAsset.original_value, FixedAsset.residual_rate, FixedAsset.useful_life_years,
+    FixedAsset.monthly_depreciation, FixedAsset.depreciation_start_date
+)
+
+
+def day_number(value):
+    """datetime -> 距 EPOCH 的天数（浮点）"""
+    return (value - EPOCH).total_seconds() / 86400
+
+
+def _month_index(year, month):
+    return year * 12 + month - 1
+
+
+class _RampSum:
+    """
+    一组斜坡函数之和：f_i(x) = slope_i * clip(x - start_i, 0, end_i - start_i)
+
+    起点、终点分别排序并计算前缀和，f(x) = Σ已开始(slope·x - slope·start) - Σ已结束(slope·x - slope·end)
+    """
+
+    def __init__(self, starts, ends, slopes):
+        starts = np.asarray(starts, dtype=float)
+        ends = np.asarray(ends, dtype=float)
+        slopes = np.asarray(slopes, dtype=float)
+
+        start_order = np.argsort(starts, kind='stable')
+        end_order = np.argsort(ends, kind='stable')
+        self.starts = starts[start_order]
+        self.ends = ends[end_order]
+        self.start_slope = np.concatenate(([0.0], np.cumsum(slopes[start_order])))
+        self.start_offset = np.concatenate(([0.0], np.cumsum(slopes[start_order] * self.starts)))
+        self.end_slope = np.concatenate(([0.0], np.cumsum(slopes[end_order])))
+        self.end_offset = np.concatenate(([0.0], np.cumsum(slopes[end_order] * self.ends)))
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __call__(self, x):
+        x = np.asarray(x, dtype=float)
+        started = np.searchsorted(self.starts, x, side='right')
+        ended = np.searchsorted(self.ends, x, side='right')
+        return (self.start_slope[started] * x - self.start_offset[started]) - \
+               (self.end_slope[ended] * x - self.end_offset[ended])
+
+
+class ValuationCurve:
+    """用户资产组合的估值拐点（构建一次，可对任意多个日期求值）"""
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.project_count = 0
+        self.project_total = 0.0
+        self.fixed_asset_count = 0
+        self.fixed_original_total = 0.0
+        self._consumption = None
+        self._depreciation = {}  # 折旧开始日的日数 -> _RampSum（月序号坐标）
+
+    def build(self):
+        """加载项目和固定资产并建立拐点数组，返回 self"""
+        projects = db.session.execute(select(*PROJECT_COLUMNS).where(Project.user_id == self.user_id)).all()
+        assets = db.session.execute(select(*FIXED_ASSET_COLUMNS).where(FixedAsset.user_id == self.user_id)).all()
+        return self.build_from_rows(projects, assets)
+
+    def build_from_rows(self, projects, assets):
+        """用已查询的行建立拐点数组（行需包含 PROJECT_COLUMNS / FIXED_ASSET_COLUMNS 中的列），返回 self"""
+        self._build_projects(projects)
+        self._build_fixed_assets(assets)
+        return self
+
+    def _build_projects(self, projects):
+        self.project_count = len(projects)
+        amounts = np.array([float(p.total_amount or 0) for p in projects], dtype=float)
+        self.project_total = float(amounts.sum())
+
+        # 总时长不为正的项目单位成本为0，不产生消耗（同 calculate_values）
+        starts = np.array([day_number(p.start_time) for p in projects], dtype=float)
+        ends = np.array([day_number(p.end_time) for p in projects], dtype=float)
+        valid = ends > starts
+        self._consumption = _RampSum(
+            starts[valid], ends[valid], amounts[valid] / (ends[valid] - starts[valid])
+        )
+
+    def _build_fixed_assets(self, assets):
+        self.fixed_asset_count = len(assets)
+        self.fixed_original_total = float(sum(float(a.original_value or 0) for a in assets))
+
+        groups = {}
+        for a in assets:
+            monthly = float(a.monthly_depreciation or 0)
+            total_months = int(a.useful_life_years or 0) * 12
+            if monthly <= 0 or total_months <= 0 or a.depreciation_start_date is None:
+                continue
+            original_value = float(a.original_value or 0)
+            residual_value = original_value * (float(a.residual_rate or 0) / 100)
+            # 累计折旧 = min(月折旧额 × min(已折旧月数, 总月数), 原值 - 残值)
+            limit = min(monthly * total_months, original_value - residual_value)
+            if limit <= 0:
+                continue
+            start = a.depreciation_start_date
+            first = _month_index(start.year, start.month)
+            group = groups.setdefault(start.day, ([], [], []))
+            group[0].append(first)
+            group[1].append(first + limit / monthly)
+            group[2].append(monthly)
+
+        self._depreciation = {day: _RampSum(*group) for day, group in groups.items()}
+
+    def values(self, points):
+        """
+        各时间点的项目已消耗成本和固定资产累计折旧（未取整的数组）
+
+        Args:
+            points: datetime 列表（项目按该时刻计算消耗，固定资产按其日期计算折旧）
+
+        Returns:
+            (used_cost, depreciation)
+        """
+        used_cost = self._consumption(np.array([day_number(p) for p in points], dtype=float))
+
+        months = np.array([_month_index(p.year, p.month) for p in points], dtype=float)
+        days = np.array([p.day for p in points], dtype=np.int64)
+        depreciation = np.zeros(len(points), dtype=float)
+        for start_day, ramp in self._depreciation.items():
+            # 当月还没到折旧开始日的日数时，少算一个月
+            depreciation += ramp(months - (days < start_day))
+        return used_cost, depreciation
+
+    def evaluate(self, points):
+        """
+        计算各时间点的组合价值
+
+        Args:
+            points: datetime 列表
+
+        Returns:
+            [{'date', 'project_total_amount', 'project_used_cost', 'project_remaining_value',
+              'fixed_original_value', 'fixed_accumulated_depreciation', 'fixed_current_value',
+              'total_remaining_value'}]
+        """
+        if not points:
+            return []
+
+        used_cost, depreciation = self.values(points)
+        remaining_value = np.maximum(self.project_total - used_cost, 0)
+        current_value = self.fixed_original_total - depreciation
+
+        return [
+            {
+                'date': point.date().isoformat() if point.time() == datetime.min.time() else point.isoformat(),
+                'project_total_amount': round(self.project_total, 2),
+                'project_used_cost': round(used, 2),
+                'project_remaining_value': round(remaining, 2),
+                'fixed_original_value': round(self.fixed_original_total, 2),
+                'fixed_accumulated_depreciation': round(depreciated, 2),
+                'fixed_current_value': round(current, 2),
+                'total_remaining_value': round(remaining + current, 2)
+            }
+            for point, used, remaining, depreciated, current in zip(
+                points, used_cost.tolist(), remaining_value.tolist(),
+                depreciation.tolist(), current_value.tolist()
+            )
+        ]
+
+
+def get_valuation_curve(user_id):
+    """建立用户的估值拐点"""
+    return ValuationCurve(user_id).build()
+
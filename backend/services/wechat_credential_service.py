@@ -0,0 +1,210 @@
+"""
+微信接口凭证共享缓存
+access_token / jsapi_ticket 有效期2小时且每日调用次数有限，多个Gunicorn worker各自请求会互相顶替、
+很快耗尽配额。本服务将凭证缓存在数据库中供所有进程共享：
+
+  - 进程内缓存：凭证未进入刷新窗口前直接返回，不访问数据库
+  - 单飞刷新：同一进程内用线程锁，跨进程用数据库租约（条件UPDATE，MySQL/SQLite均适用），
+    同一时刻只有一个请求向微信换取新凭证
+  - 提前刷新：距过期不足 refresh_margin 秒即开始刷新，刷新期间其他请求继续使用旧凭证
+  - 主动失效：微信返回凭证无效时，只作废该值本身，避免误删其他进程刚刷新的新凭证
+"""
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update, insert, or_
+from sqlalchemy.exc import IntegrityError
+
+from database import db
+from models.wechat_credential import WechatCredential
+
+
+class WechatCredentialCache:
+    """微信接口凭证缓存"""
+
+    def __init__(self, refresh_margin=300, lease_seconds=15, wait_timeout=10, poll_interval=0.1):
+        """
+        Args:
+            refresh_margin: 距过期不足该秒数时开始刷新
+            lease_seconds: 刷新租约时长（持有者崩溃后租约到期可被其他进程接管）
+            wait_timeout: 凭证已过期且他人正在刷新时的最长等待秒数
+            poll_interval: 等待刷新结果的轮询间隔
+        """
+        self.refresh_margin = refresh_margin
+        self.lease_seconds = lease_seconds
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self._entries = {}
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        self.stats = {'local_hits': 0, 'shared_hits': 0, 'refreshes': 0, 'waits': 0}
+
+    @property
+    def _table(self):
+        return WechatCredential.__table__
+
+    def _lock_for(self, key):
+        with self._locks_guard:
+            if key not in self._locks:
+                self._locks[key] = threading.Lock()
+            return self._locks[key]
+
+    def _is_fresh(self, value, expires_at, now):
+        return bool(value) and expires_at is not None and expires_at - timedelta(seconds=self.refresh_margin) > now
+
+    # ==================== 数据库读写 ====================
+
+    def _load(self, name, appid):
+        """读取共享凭证（不存在时创建空记录，供后续加租约）"""
+        table = self._table
+        with db.engine.begin() as conn:
+            row = conn.execute(
+                select(table.c.value, table.c.expires_at, table.c.refreshing_until)
+                .where(table.c.name == name, table.c.appid == appid)
+            ).first()
+        if row is not None:
+            return row
+
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(insert(table).values(name=name, appid=appid, updated_at=datetime.utcnow()))
+        except IntegrityError:
+            pass  # 其他进程已创建
+        return None
+
+    def _acquire_lease(self, name, appid, now):
+        """
+        尝试获取刷新租约，成功返回True
+
+        条件中同时校验凭证仍处于刷新窗口，避免读到旧记录的进程在他人刚刷新完成后重复刷新
+        """
+        table = self._table
+        with db.engine.begin() as conn:
+            result = conn.execute(
+                update(table)
+                .where(
+                    table.c.name == name,
+                    table.c.appid == appid,
+                    or_(table.c.refreshing_until.is_(None), table.c.refreshing_until < now),
+                    or_(
+                        table.c.value.is_(None),
+                        table.c.expires_at.is_(None),
+                        table.c.expires_at <= now + timedelta(seconds=self.refresh_margin)
+                    )
+                )
+                .values(refreshing_until=now + timedelta(seconds=self.lease_seconds))
+            )
+        return result.rowcount == 1
+
+    def _store(self, name, appid, value, expires_at):
+        """保存新凭证并释放租约"""
+        table = self._table
+        with db.engine.begin() as conn:
+            conn.execute(
+                update(table)
+                .where(table.c.name == name, table.c.appid == appid)
+                .values(value=value, expires_at=expires_at, refreshing_until=None, updated_at=datetime.utcnow())
+            )
+
+    def _release_lease(self, name, appid):
+        table = self._table
+        with db.engine.begin() as conn:
+            conn.execute(
+                update(table)
+                .where(table.c.name == name, table.c.appid == appid)
+                .values(refreshing_until=None)
+            )
+
+    # ==================== 对外接口 ====================
+
+    def get(self, name, appid, fetcher):
+        """
+        获取凭证
+
+        Args:
+            name: 凭证名称（access_token / jsapi_ticket）
+            appid: 公众号AppID
+            fetcher: 向微信换取新凭证的函数，返回 (value, expires_in)，失败时抛出异常
+
+        Returns:
+            凭证内容；凭证已过期且刷新失败时返回None
+        """
+        key = (name, appid)
+        entry = self._entries.get(key)
+        if entry and self._is_fresh(entry[0], entry[1], datetime.utcnow()):
+            self.stats['local_hits'] += 1
+            return entry[0]
+
+        # 同一进程内只放一个线程去访问数据库/微信
+        with self._lock_for(key):
+            entry = self._entries.get(key)
+            if entry and self._is_fresh(entry[0], entry[1], datetime.utcnow()):
+                self.stats['local_hits'] += 1
+                return entry[0]
+            return self._get_shared(key, fetcher)
+
+    def _get_shared(self, key, fetcher):
+        name, appid = key
+        now = datetime.utcnow()
+        deadline = time.monotonic() + self.wait_timeout
+
+        row = self._load(name, appid)
+        while True:
+            if row is not None and self._is_fresh(row.value, row.expires_at, now):
+                self.stats['shared_hits'] += 1
+                self._entries[key] = (row.value, row.expires_at)
+                return row.value
+
+            if self._acquire_lease(name, appid, now):
+                try:
+                    value, expires_in = fetcher()
+                except Exception:
+                    self._release_lease(name, appid)
+                    raise
+                expires_at = datetime.utcnow() + timedelta(seconds=int(expires_in))
+                self._store(name, appid, value, expires_at)
+                self._entries[key] = (value, expires_at)
+                self.stats['refreshes'] += 1
+                return value
+
+            # 未拿到租约：其他进程已刷新完成或正在刷新
+            row = self._load(name, appid)
+            if row is not None and self._is_fresh(row.value, row.expires_at, now):
+                continue
+            # 正在刷新：旧凭证尚未过期则继续使用，否则等待刷新结果
+            if row is not None and row.value and row.expires_at and row.expires_at > now:
+                self._entries[key] = (row.value, row.expires_at)
+                return row.value
+
+            if time.monotonic() > deadline:
+                return None
+            self.stats['waits'] += 1
+            time.sleep(self.poll_interval)
+            now = datetime.utcnow()
+            row = self._load(name, appid)
+
+    def invalidate(self, name, appid, value):
+        """
+        作废指定凭证（微信返回 access_token 无效/过期时调用）
+
+        只作废与 value 相同的凭证，其他进程已刷新的新凭证不受影响
+        """
+        key = (name, appid)
+        entry = self._entries.get(key)
+        if entry and entry[0] == value:
+            self._entries.pop(key, None)
+
+        table = self._table
+        with db.engine.begin() as conn:
+            conn.execute(
+                update(table)
+                .where(table.c.name == name, table.c.appid == appid, table.c.value == value)
+                .values(expires_at=datetime.utcnow())
+            )
+
+
+wechat_credential_cache = WechatCredentialCache(
+    refresh_margin=int(os.getenv('WECHAT_TOKEN_REFRESH_MARGIN', 300))
+)
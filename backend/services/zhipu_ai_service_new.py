@@ -6,6 +6,7 @@
 import json
 import re
 from zai import ZhipuAiClient
+from config.ai import ZhipuConfig
 from prompts.asset_analysis_prompts import (
     get_system_prompt,
     get_asset_analysis_prompt,
@@ -28,7 +29,7 @@ class ZhipuAIService:
             api_key: 智谱AI API Key
             model: 模型名称,默认 glm-4-flash (免费且高速)
         """
-        self.client = ZhipuAiClient(api_key=api_key)
+        self.client = ZhipuAiClient(api_key=api_key, base_url=ZhipuConfig.get_base_url())
         self.model = model
         print(f"✓ 智谱AI服务初始化成功 - 模型: {model}")
     
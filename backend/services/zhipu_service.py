@@ -8,6 +8,8 @@ import json
 import requests
 from datetime import datetime, timedelta
 from decimal import Decimal
+from config.ai import ZhipuConfig
+from utils.metrics import observe_llm_call
 from config.report_prompts import (
     get_weekly_report_prompt,
     get_monthly_report_prompt,
@@ -27,7 +29,7 @@ class ZhipuAiService:
         """
         self.api_token = api_token
         self.model = model
-        self.base_url = "https://open.bigmodel.cn/api/paas/v4/"
+        self.base_url = ZhipuConfig.get_base_url()
         print(f"✓ 智谱AI服务初始化成功 - 模型: {model}")
     
     def _call_api(self, prompt, max_tokens=None, retry_count=3, retry_delay=2):
@@ -78,12 +80,18 @@ class ZhipuAiService:
                     "Content-Type": "application/json"
                 }
                 
-                response = requests.post(
-                    f"{self.base_url}chat/completions",
-                    headers=headers,
-                    json=api_params,
-                    timeout=300  # 增加到5分钟超时，适应长报告生成
-                )
+                started = time.perf_counter()
+                try:
+                    response = requests.post(
+                        f"{self.base_url}chat/completions",
+                        headers=headers,
+                        json=api_params,
+                        timeout=300  # 增加到5分钟超时，适应长报告生成
+                    )
+                except requests.exceptions.RequestException:
+                    observe_llm_call(self.model, 'error', time.perf_counter() - started)
+                    raise
+                observe_llm_call(self.model, str(response.status_code), time.perf_counter() - started)
                 
                 response.raise_for_status()  # 检查HTTP错误
             
@@ -4,16 +4,16 @@
 """
 import os
 import base64
-from cryptography.fernet import Fernet
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 
 # 从环境变量获取加密密钥，若无则生成固定派生密钥
 _ENCRYPTION_KEY = os.getenv('ENCRYPTION_KEY')
 
 def _get_fernet():
-    """获取 Fernet 实例"""
+    """获取 Fernet 实例（cryptography 加载较慢，首次加解密时才导入）"""
     global _ENCRYPTION_KEY
+    from cryptography.fernet import Fernet
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
     
     if _ENCRYPTION_KEY:
         # 使用环境变量中的密钥
@@ -82,6 +82,7 @@ def generate_encryption_key() -> str:
     Returns:
         可用于 ENCRYPTION_KEY 环境变量的密钥字符串
     """
+    from cryptography.fernet import Fernet
     return Fernet.generate_key().decode('utf-8')
 
 
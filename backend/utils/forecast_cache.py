@@ -0,0 +1,121 @@
+"""
+资产前瞻预测缓存
+services.forecast_service 加载整理后的预测数据按用户缓存在进程内（FORECAST_CACHE_TTL 秒，设为0关闭），
+缓存项记录加载时的数据版本（models.forecast_version），使用前按主键读取当前版本，不一致即重新加载：
+
+  - 项目、固定资产、维护记录模型导入时通过 track_forecast_owner() 注册 ORM 事件，
+    写入时在同一事务内把该用户的版本号加1（每个事务每个用户一次），提交后所有worker立即生效
+  - 绕过 ORM 的批量写入之后调用 invalidate_forecast()，单独提交一次版本号更新
+  - 本模块不依赖 NumPy，模型和路由可在启动时直接导入；预测计算在首次请求时才加载
+"""
+import os
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from database import db
+from models.forecast_version import GLOBAL_VERSION_ID, bump_versions
+
+
+class ForecastCache:
+    """用户预测数据的进程内缓存（按数据版本校验）"""
+
+    def __init__(self, ttl=300, max_entries=1000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id, version):
+        if self.ttl <= 0:
+            return None
+        entry = self._entries.get(user_id)
+        if entry is None or entry[0] < time.monotonic() or entry[1] != version:
+            return None
+        return entry[2]
+
+    def set(self, user_id, version, forecast):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._entries.clear()
+            self._entries[user_id] = (time.monotonic() + self.ttl, version, forecast)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+forecast_cache = ForecastCache(ttl=float(os.getenv('FORECAST_CACHE_TTL', 300)))
+
+
+def invalidate_forecast(user_id=None):
+    """
+    使用户的预测缓存失效（user_id 为 None 时全部失效），用于绕过 ORM 的批量写入提交之后
+
+    清除当前进程的缓存，并单独提交一次版本号更新，使其他worker的缓存也失效
+    """
+    if user_id is None:
+        forecast_cache.clear()
+    else:
+        forecast_cache.invalidate(user_id)
+    try:
+        with db.engine.begin() as connection:
+            bump_versions(connection, [GLOBAL_VERSION_ID if user_id is None else int(user_id)])
+    except Exception as e:
+        print(f"[资产预测] 更新数据版本失败: {str(e)}")
+
+
+# ==================== 写入后失效 ====================
+
+_PENDING_KEY = 'forecast_invalidate_user_ids'
+
+
+def _mark_user(connection, target, user_id):
+    if user_id is None:
+        return
+    user_id = int(user_id)  # 部分路由直接使用 JWT 中的字符串身份赋值
+    forecast_cache.invalidate(user_id)
+    session = object_session(target)
+    pending = session.info.setdefault(_PENDING_KEY, set()) if session is not None else set()
+    if user_id not in pending:
+        # 与数据写入同一事务，回滚时版本号一起回滚
+        bump_versions(connection, [user_id])
+        pending.add(user_id)
+
+
+def _owner_user_id(connection, target):
+    return target.user_id
+
+
+def track_forecast_owner(model, owner=_owner_user_id):
+    """
+    注册模型写入后的缓存失效
+
+    Args:
+        model: ORM 模型
+        owner: (connection, target) -> 所属用户ID，默认读取 target.user_id
+    """
+    def _changed(mapper, connection, target):
+        _mark_user(connection, target, owner(connection, target))
+
+    for event_name in ('after_insert', 'after_update', 'after_delete'):
+        event.listen(model, event_name, _changed)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_committed(session):
+    for user_id in session.info.pop(_PENDING_KEY, ()):
+        forecast_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_pending(session):
+    session.info.pop(_PENDING_KEY, None)
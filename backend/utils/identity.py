@@ -0,0 +1,126 @@
+"""
+当前登录用户解析
+各蓝图统一通过本模块获取当前用户，避免同一请求内重复查询用户表：
+
+  - get_current_user(): 每个请求只查询一次，结果保存在 flask.g 中
+  - get_current_identity(): 只需要角色/启用状态时使用（如管理员权限校验），
+    优先读取进程内短时缓存（IDENTITY_CACHE_TTL 秒，设为0关闭），命中时不访问数据库
+  - 管理员修改角色/状态或删除用户后调用 invalidate_user_identity() 清除缓存；
+    缓存为进程内缓存，其他worker最多在 TTL 秒后生效
+"""
+import os
+import threading
+import time
+
+from flask import g, jsonify
+
+from database import db
+from models.user import User
+from utils.response import get_current_user_id
+
+
+class IdentityCache:
+    """用户角色/启用状态的进程内短时缓存"""
+
+    def __init__(self, ttl=30, max_entries=10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        if self.ttl <= 0:
+            return None
+        entry = self._entries.get(user_id)
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        return entry[1]
+
+    def set(self, user):
+        if self.ttl <= 0 or user is None:
+            return
+        identity = {'id': user.id, 'role': user.role, 'is_active': user.is_active}
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._entries.clear()
+            self._entries[user.id] = (time.monotonic() + self.ttl, identity)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+identity_cache = IdentityCache(ttl=float(os.getenv('IDENTITY_CACHE_TTL', 30)))
+
+
+def get_current_user():
+    """
+    获取当前登录用户（同一请求内只查询一次）
+
+    Returns:
+        User对象；JWT无效或用户不存在时返回None
+    """
+    if '_current_user' not in g:
+        try:
+            user_id = get_current_user_id()
+        except ValueError:
+            user_id = None
+        user = db.session.get(User, user_id) if user_id is not None else None
+        g._current_user = user
+        identity_cache.set(user)
+    return g._current_user
+
+
+def get_current_identity():
+    """
+    获取当前用户的角色与启用状态
+
+    Returns:
+        {'id', 'role', 'is_active'}；用户不存在时返回None
+    """
+    user = g.get('_current_user')
+    if user is not None:
+        return {'id': user.id, 'role': user.role, 'is_active': user.is_active}
+
+    try:
+        user_id = get_current_user_id()
+    except ValueError:
+        return None
+    identity = identity_cache.get(user_id)
+    if identity is not None:
+        return identity
+
+    user = get_current_user()
+    if user is None:
+        return None
+    return {'id': user.id, 'role': user.role, 'is_active': user.is_active}
+
+
+def is_current_user_admin():
+    """当前用户是否为管理员"""
+    identity = get_current_identity()
+    return bool(identity) and identity['role'] == 'admin'
+
+
+def require_admin():
+    """
+    检查管理员权限
+
+    Returns:
+        无权限时返回403响应，否则返回None
+    """
+    if not is_current_user_admin():
+        return jsonify({'code': 403, 'message': '权限不足，需要管理员权限'}), 403
+    return None
+
+
+def invalidate_user_identity(user_id):
+    """用户角色/状态变更或删除后清除缓存"""
+    identity_cache.invalidate(user_id)
+    user = g.get('_current_user')
+    if user is not None and user.id == user_id:
+        g.pop('_current_user')
@@ -0,0 +1,447 @@
+"""
+运行指标采集（Prometheus文本格式）
+不依赖 prometheus_client，指标保存在进程内存中：
+
+  - HTTP：按蓝图/路由/方法/状态码统计请求数与耗时直方图
+  - SQL：通过SQLAlchemy事件统计每个请求的SQL条数与耗时，以及连接池取连接的等待时间
+  - 报告：每个工作流节点耗时、整体任务耗时；大模型接口调用耗时
+
+多进程聚合：设置 METRICS_MULTIPROC_DIR 后，每个worker定期（及被抓取时）把自己的指标快照写入
+该目录下的 <pid>.json，/api/metrics 合并所有快照后输出；计数器与直方图求和，
+仪表盘（连接池占用等）按 pid 标签分别输出，只输出仍在运行的进程。Gunicorn启动时清空该目录；
+worker退出（max_requests 回收等）后由 child_exit 钩子把其计数器与直方图并入 archive.json 并删除快照。
+"""
+import atexit
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+from flask import g, request
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SQL_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+LONG_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+MULTIPROC_DIR = os.getenv('METRICS_MULTIPROC_DIR') or os.getenv('PROMETHEUS_MULTIPROC_DIR')
+FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', 5))
+
+
+def _label_key(labels):
+    return json.dumps(labels, sort_keys=True, ensure_ascii=False)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels, extra=None):
+    items = list(labels.items()) + list((extra or {}).items())
+    if not items:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in items) + '}'
+
+
+class Metric:
+    """指标基类：按标签组合保存数值"""
+
+    type = None
+
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def snapshot(self):
+        with self._lock:
+            return json.loads(json.dumps(self._values))
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    @staticmethod
+    def merge(values, other):
+        for key, value in other.items():
+            values[key] = values.get(key, 0) + value
+
+    def render(self, values):
+        lines = []
+        for key, value in sorted(values.items()):
+            lines.append(f'{self.name}_total{_format_labels(json.loads(key))} {value}')
+        return lines
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name, documentation, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry['buckets'][index] += 1
+                    break
+            entry['sum'] += value
+            entry['count'] += 1
+
+    @staticmethod
+    def merge(values, other):
+        for key, entry in other.items():
+            target = values.get(key)
+            if target is None:
+                values[key] = {'buckets': list(entry['buckets']), 'sum': entry['sum'], 'count': entry['count']}
+                continue
+            target['buckets'] = [a + b for a, b in zip(target['buckets'], entry['buckets'])]
+            target['sum'] += entry['sum']
+            target['count'] += entry['count']
+
+    def render(self, values):
+        lines = []
+        for key, entry in sorted(values.items()):
+            labels = json.loads(key)
+            cumulative = 0
+            for bound, count in zip(self.buckets, entry['buckets']):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{_format_labels(labels, {"le": bound})} {cumulative}')
+            lines.append(f'{self.name}_bucket{_format_labels(labels, {"le": "+Inf"})} {entry["count"]}')
+            lines.append(f'{self.name}_sum{_format_labels(labels)} {round(entry["sum"], 6)}')
+            lines.append(f'{self.name}_count{_format_labels(labels)} {entry["count"]}')
+        return lines
+
+
+class Gauge(Metric):
+    """仪表盘：抓取时由回调函数计算当前值（每个进程各自输出，带pid标签）"""
+
+    type = 'gauge'
+
+    def __init__(self, name, documentation, collect):
+        super().__init__(name, documentation)
+        self.collect = collect
+
+    def snapshot(self):
+        try:
+            values = self.collect() or {}
+        except Exception:
+            values = {}
+        return {_label_key({**labels, 'pid': str(os.getpid())}): value for labels, value in values}
+
+    @staticmethod
+    def merge(values, other):
+        values.update(other)
+
+    def render(self, values):
+        return [f'{self.name}{_format_labels(json.loads(key))} {value}' for key, value in sorted(values.items())]
+
+
+class MetricsRegistry:
+    """指标注册表与多进程快照"""
+
+    def __init__(self, multiproc_dir=None, flush_interval=5):
+        self.multiproc_dir = multiproc_dir
+        self.flush_interval = flush_interval
+        self._metrics = {}
+        self._flusher_pid = None
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation):
+        return self.register(Counter(name, documentation))
+
+    def histogram(self, name, documentation, buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, buckets))
+
+    def gauge(self, name, documentation, collect):
+        return self.register(Gauge(name, documentation, collect))
+
+    def snapshot(self):
+        return {name: metric.snapshot() for name, metric in self._metrics.items()}
+
+    # ==================== 多进程快照 ====================
+
+    ARCHIVE_NAME = 'archive.json'  # 已退出进程的计数器与直方图合计
+
+    def _snapshot_path(self, pid):
+        return os.path.join(self.multiproc_dir, f'{pid}.json')
+
+    @staticmethod
+    def _write_json(path, data):
+        """先写临时文件再改名，避免读到半个文件"""
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _read_json(path):
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+
+    @staticmethod
+    def _pid_alive(pid):
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        return True
+
+    def flush(self):
+        """写入当前进程的快照"""
+        if not self.multiproc_dir:
+            return
+        os.makedirs(self.multiproc_dir, exist_ok=True)
+        self._write_json(self._snapshot_path(os.getpid()), self.snapshot())
+
+    def mark_process_dead(self, pid):
+        """
+        进程退出后清理其快照（Gunicorn child_exit 钩子在master中调用）
+
+        仪表盘数据直接丢弃；计数器与直方图并入 archive.json，保证合计值不因worker回收而回退
+        """
+        if not self.multiproc_dir:
+            return
+        path = self._snapshot_path(pid)
+        try:
+            snapshot = self._read_json(path)
+        except (OSError, ValueError):
+            snapshot = None
+        if snapshot:
+            archive_path = os.path.join(self.multiproc_dir, self.ARCHIVE_NAME)
+            try:
+                archive = self._read_json(archive_path)
+            except (OSError, ValueError):
+                archive = {}
+            for name, values in snapshot.items():
+                metric = self._metrics.get(name)
+                if metric is not None and metric.type != 'gauge':
+                    metric.merge(archive.setdefault(name, {}), values)
+            self._write_json(archive_path, archive)
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"[指标] 写入快照失败: {str(e)}")
+
+    def ensure_flusher(self):
+        """当前进程的快照线程未运行时启动（fork后的worker需要重新启动）"""
+        if not self.multiproc_dir or self._flusher_pid == os.getpid():
+            return
+        self._flusher_pid = os.getpid()
+        threading.Thread(target=self._flush_loop, name='metrics_flusher', daemon=True).start()
+        atexit.register(self.flush)
+
+    def collect(self):
+        """合并所有进程的快照；未启用多进程时只返回当前进程"""
+        merged = {name: {} for name in self._metrics}
+        snapshots = [self.snapshot()]
+        if self.multiproc_dir and os.path.isdir(self.multiproc_dir):
+            own = f'{os.getpid()}.json'
+            for filename in os.listdir(self.multiproc_dir):
+                if not filename.endswith('.json') or filename == own:
+                    continue
+                try:
+                    snapshot = self._read_json(os.path.join(self.multiproc_dir, filename))
+                except (OSError, ValueError):
+                    continue  # 正在写入或已损坏的快照跳过
+                pid = filename[:-len('.json')]
+                if pid.isdigit() and not self._pid_alive(int(pid)):
+                    # 已退出但未经 child_exit 清理的进程：仪表盘不再输出
+                    snapshot = {
+                        name: values for name, values in snapshot.items()
+                        if getattr(self._metrics.get(name), 'type', None) != 'gauge'
+                    }
+                snapshots.append(snapshot)
+
+        for snapshot in snapshots:
+            for name, values in snapshot.items():
+                metric = self._metrics.get(name)
+                if metric is not None:
+                    metric.merge(merged[name], values)
+        return merged
+
+    def render(self):
+        """输出Prometheus文本格式"""
+        merged = self.collect()
+        lines = []
+        for name, metric in self._metrics.items():
+            lines.append(f'# HELP {name} {metric.documentation}')
+            lines.append(f'# TYPE {name} {metric.type}')
+            lines.extend(metric.render(merged[name]))
+        return '\n'.join(lines) + '\n'
+
+    def clear_multiproc_dir(self):
+        """清空快照目录（Gunicorn启动时调用，避免累加上次运行的数据）"""
+        if not self.multiproc_dir or not os.path.isdir(self.multiproc_dir):
+            return
+        for filename in os.listdir(self.multiproc_dir):
+            if filename.endswith('.json') or filename.endswith('.tmp'):
+                os.remove(os.path.join(self.multiproc_dir, filename))
+
+
+registry = MetricsRegistry(MULTIPROC_DIR, FLUSH_INTERVAL)
+
+# ==================== 指标定义 ====================
+
+http_requests = registry.counter(
+    'http_requests', 'HTTP requests by blueprint, route, method and status code')
+http_request_duration = registry.histogram(
+    'http_request_duration_seconds', 'HTTP request latency by blueprint and route')
+sql_statements = registry.counter(
+    'db_sql_statements', 'SQL statements executed, by route')
+sql_statements_per_request = registry.histogram(
+    'db_sql_statements_per_request', 'SQL statements executed per HTTP request', SQL_COUNT_BUCKETS)
+sql_time_per_request = registry.histogram(
+    'db_sql_seconds_per_request', 'Total SQL execution time per HTTP request')
+pool_checkout_wait = registry.histogram(
+    'db_pool_checkout_seconds', 'Time spent acquiring a connection from the pool')
+report_node_duration = registry.histogram(
+    'report_workflow_node_seconds', 'Report workflow node duration', LONG_BUCKETS)
+report_job_duration = registry.histogram(
+    'report_job_seconds', 'Report generation job duration by final status', LONG_BUCKETS)
+llm_request_duration = registry.histogram(
+    'llm_request_seconds', 'LLM API call latency by model and outcome', LONG_BUCKETS)
+
+
+_engine = None
+
+
+def _pool_gauges():
+    if _engine is None:
+        return []
+    pool = _engine.pool
+    if not hasattr(pool, 'checkedout'):
+        return []
+    return [({'state': 'checked_out'}, pool.checkedout()), ({'state': 'size'}, pool.size())]
+
+
+registry.gauge('db_pool_connections', 'Connection pool size and checked-out connections per worker', _pool_gauges)
+
+
+# ==================== 采集接入 ====================
+
+def _route_labels():
+    rule = request.url_rule.rule if request.url_rule is not None else '<unmatched>'
+    return {'blueprint': request.blueprint or '', 'route': rule, 'method': request.method}
+
+
+def _before_request():
+    registry.ensure_flusher()
+    g._metrics_started = time.perf_counter()
+    g._metrics_sql_count = 0
+    g._metrics_sql_seconds = 0.0
+
+
+def _after_request(response):
+    started = g.pop('_metrics_started', None)
+    if started is None:
+        return response
+    labels = _route_labels()
+    http_requests.inc(**labels, status=str(response.status_code))
+    http_request_duration.observe(time.perf_counter() - started, **labels)
+
+    sql_count = g.pop('_metrics_sql_count', 0)
+    sql_statements_per_request.observe(sql_count, route=labels['route'])
+    sql_time_per_request.observe(g.pop('_metrics_sql_seconds', 0.0), route=labels['route'])
+    if sql_count:
+        sql_statements.inc(sql_count, route=labels['route'])
+    return response
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('_metrics_query_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get('_metrics_query_started')
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    try:
+        if '_metrics_sql_count' in g:
+            g._metrics_sql_count += 1
+            g._metrics_sql_seconds += elapsed
+    except RuntimeError:
+        pass  # 不在请求/应用上下文中（后台线程）
+
+
+def _instrument_pool(pool):
+    """
+    统计连接池取连接耗时：把连接池替换为计时子类
+    （engine.dispose() 重建连接池时沿用同一个类，计时不会丢失）
+    """
+    base = type(pool)
+    if getattr(base, '_metrics_timed', False):
+        return
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return base.connect(self)
+        finally:
+            pool_checkout_wait.observe(time.perf_counter() - started)
+
+    pool.__class__ = type(f'Timed{base.__name__}', (base,), {'connect': connect, '_metrics_timed': True})
+
+
+def init_metrics(app):
+    """注册请求钩子与SQLAlchemy事件"""
+    from sqlalchemy import event
+    from database import db
+    global _engine
+
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+
+    with app.app_context():
+        engine = _engine = db.engine
+        if not event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+            event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+        _instrument_pool(engine.pool)
+
+
+def observe_report_workflow(state):
+    """记录报告工作流各节点耗时与整体耗时（根据 execution_path 中各节点完成时间戳计算）"""
+    start = state.get('start_time')
+    if not start:
+        return
+    previous = datetime.fromisoformat(start)
+    for step in state.get('execution_path', []):
+        timestamp = datetime.fromisoformat(step['timestamp'])
+        report_node_duration.observe((timestamp - previous).total_seconds(), node=step['node'])
+        previous = timestamp
+
+    end = state.get('end_time')
+    finished = datetime.fromisoformat(end) if end else datetime.utcnow()
+    status = 'failed' if state.get('error_message') else 'completed'
+    report_job_duration.observe((finished - datetime.fromisoformat(start)).total_seconds(), status=status)
+
+
+def observe_llm_call(model, outcome, seconds):
+    """记录一次大模型接口调用（outcome 为HTTP状态码或 error）"""
+    llm_request_duration.observe(seconds, model=model, outcome=outcome)
@@ -0,0 +1,218 @@
+"""
+慢查询记录
+通过SQLAlchemy事件统计每条SQL的执行耗时，超过阈值的语句记录到进程内环形缓冲区：
+
+  - 归一化SQL（字面量替换为 ?，IN列表折叠），同一类语句汇总次数与耗时
+  - 记录参数（截断）、发起请求的路由（后台线程记录线程名）
+  - 自动采集执行计划：MySQL 使用 EXPLAIN，SQLite 使用 EXPLAIN QUERY PLAN；
+    直接在DBAPI游标上执行，不触发SQLAlchemy事件；同一类语句在 explain_ttl 秒内只采集一次
+
+管理员通过 GET /api/admin/slow-queries 查看（每个worker各自记录）。
+"""
+import os
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from flask import has_request_context, request
+
+_STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\bIN\s*\((?:\s*(?:\?|%s|:\w+)\s*,?)+\)', re.IGNORECASE)
+_PLACEHOLDER = re.compile(r'%s|:\w+|\?')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_sql(statement):
+    """归一化SQL：去掉字面量和参数差异，用于归类同一类语句"""
+    sql = _WHITESPACE.sub(' ', statement).strip()
+    sql = _STRING_LITERAL.sub('?', sql)
+    sql = _PLACEHOLDER.sub('?', sql)
+    sql = _NUMBER_LITERAL.sub('?', sql)
+    return _IN_LIST.sub('IN (...)', sql)
+
+
+def _truncate_parameters(parameters, max_items=20, max_length=100):
+    if parameters is None:
+        return None
+    if isinstance(parameters, dict):
+        items = list(parameters.items())[:max_items]
+        return {key: _truncate_value(value, max_length) for key, value in items}
+    if isinstance(parameters, (list, tuple)):
+        return [_truncate_value(value, max_length) for value in list(parameters)[:max_items]]
+    return _truncate_value(parameters, max_length)
+
+
+def _truncate_value(value, max_length):
+    if value is None or isinstance(value, (int, float, bool)):
+        return value
+    text = str(value)
+    return text if len(text) <= max_length else text[:max_length] + '...'
+
+
+class SlowQueryLog:
+    """慢查询环形缓冲区"""
+
+    def __init__(self, threshold_ms=200, capacity=200, explain=True, explain_ttl=300):
+        """
+        Args:
+            threshold_ms: 慢查询阈值（毫秒），小于0时不记录
+            capacity: 缓冲区保留的最近慢查询条数
+            explain: 是否自动采集执行计划
+            explain_ttl: 同一类语句重复采集执行计划的最小间隔（秒）
+        """
+        self.threshold_ms = threshold_ms
+        self.explain = explain
+        self.explain_ttl = explain_ttl
+        self._entries = deque(maxlen=capacity)
+        self._summary = {}
+        self._explained = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.threshold_ms >= 0
+
+    # ==================== SQLAlchemy事件 ====================
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('_slow_query_started', []).append(time.perf_counter())
+
+    def after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get('_slow_query_started')
+        if not started:
+            return
+        elapsed_ms = (time.perf_counter() - started.pop()) * 1000
+        if elapsed_ms < self.threshold_ms:
+            return
+        try:
+            self.record(conn, cursor, statement, parameters, executemany, elapsed_ms,
+                        streaming=self._is_streaming(context))
+        except Exception as e:
+            print(f"[慢查询] 记录失败: {str(e)}")
+
+    @staticmethod
+    def _is_streaming(context):
+        """流式读取（服务端游标）的语句：结果集尚未读完，同一连接上不能再执行 EXPLAIN"""
+        options = getattr(context, 'execution_options', None) or {}
+        return bool(options.get('stream_results') or options.get('yield_per'))
+
+    # ==================== 记录 ====================
+
+    def _origin(self):
+        if has_request_context():
+            rule = request.url_rule.rule if request.url_rule is not None else request.path
+            return f'{request.method} {rule}'
+        return f'thread:{threading.current_thread().name}'
+
+    def record(self, conn, cursor, statement, parameters, executemany, elapsed_ms, streaming=False):
+        fingerprint = normalize_sql(statement)
+        entry = {
+            'time': datetime.utcnow().isoformat(),
+            'duration_ms': round(elapsed_ms, 2),
+            'route': self._origin(),
+            'sql': fingerprint,
+            'statement': statement if len(statement) <= 2000 else statement[:2000] + '...',
+            'parameters': _truncate_parameters(parameters[0] if executemany and parameters else parameters),
+            'executemany': executemany,
+            'dialect': conn.dialect.name,
+            'plan': None
+        }
+        # 流式读取时在同一连接上执行 EXPLAIN 会读空未取完的结果集（如 pymysql SSCursor），跳过
+        if self.explain and not executemany and not streaming and self._should_explain(fingerprint):
+            entry['plan'] = self._explain(conn, cursor, statement, parameters)
+
+        with self._lock:
+            self._entries.append(entry)
+            stats = self._summary.setdefault(fingerprint, {
+                'sql': fingerprint, 'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'routes': set()
+            })
+            stats['count'] += 1
+            stats['total_ms'] += elapsed_ms
+            stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+            stats['routes'].add(entry['route'])
+            if entry['plan'] is not None:
+                stats['plan'] = entry['plan']
+
+        print(f"[慢查询] {entry['duration_ms']}ms {entry['route']} {fingerprint[:200]}")
+
+    def _should_explain(self, fingerprint):
+        now = time.monotonic()
+        with self._lock:
+            last = self._explained.get(fingerprint)
+            if last is not None and now - last < self.explain_ttl:
+                return False
+            self._explained[fingerprint] = now
+            return True
+
+    @staticmethod
+    def _explain(conn, cursor, statement, parameters):
+        """在DBAPI层执行 EXPLAIN（只针对查询语句）"""
+        if not statement.lstrip().upper().startswith('SELECT'):
+            return None
+        dialect = conn.dialect.name
+        if dialect == 'sqlite':
+            prefix = 'EXPLAIN QUERY PLAN '
+        elif dialect in ('mysql', 'mariadb'):
+            prefix = 'EXPLAIN '
+        else:
+            return None
+
+        explain_cursor = cursor.connection.cursor()
+        try:
+            explain_cursor.execute(prefix + statement, parameters or ())
+            columns = [column[0] for column in explain_cursor.description or []]
+            return [dict(zip(columns, row)) for row in explain_cursor.fetchall()]
+        except Exception as e:
+            return [{'error': str(e)}]
+        finally:
+            explain_cursor.close()
+
+    # ==================== 查询 ====================
+
+    def entries(self, limit=50):
+        with self._lock:
+            return list(self._entries)[-limit:][::-1]
+
+    def summary(self, limit=20):
+        with self._lock:
+            rows = [
+                {
+                    **stats,
+                    'total_ms': round(stats['total_ms'], 2),
+                    'max_ms': round(stats['max_ms'], 2),
+                    'avg_ms': round(stats['total_ms'] / stats['count'], 2),
+                    'routes': sorted(stats['routes'])
+                }
+                for stats in self._summary.values()
+            ]
+        return sorted(rows, key=lambda row: row['total_ms'], reverse=True)[:limit]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._summary.clear()
+            self._explained.clear()
+
+
+slow_query_log = SlowQueryLog(
+    threshold_ms=float(os.getenv('SLOW_QUERY_THRESHOLD_MS', 200)),
+    capacity=int(os.getenv('SLOW_QUERY_BUFFER_SIZE', 200)),
+    explain=os.getenv('SLOW_QUERY_EXPLAIN', '1').lower() in ('1', 'true', 'yes')
+)
+
+
+def init_slow_query_log(app):
+    """注册SQLAlchemy事件（阈值小于0时不启用）"""
+    if not slow_query_log.enabled:
+        return
+    from sqlalchemy import event
+    from database import db
+
+    with app.app_context():
+        engine = db.engine
+        if not event.contains(engine, 'before_cursor_execute', slow_query_log.before_cursor_execute):
+            event.listen(engine, 'before_cursor_execute', slow_query_log.before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', slow_query_log.after_cursor_execute)
@@ -0,0 +1,231 @@
+"""
+报告工作流运行期数据上下文
+每次工作流运行只加载一次用户的固定资产和虚拟资产（预加载分类），并缓存派生计算结果，
+供各节点共享读取，同时统计本次运行执行的SQL语句数
+"""
+import threading
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import joinedload
+
+from database import db
+
+# 当前线程正在统计SQL的数据上下文（每个报告任务在独立线程中执行）
+_local = threading.local()
+_instrumented_engines = set()
+_instrument_lock = threading.Lock()
+
+
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    data_context = getattr(_local, 'data_context', None)
+    if data_context is not None:
+        data_context.query_count += 1
+
+
+def _instrument_engine(engine):
+    """为数据库引擎注册SQL计数监听（每个引擎只注册一次）"""
+    with _instrument_lock:
+        if id(engine) in _instrumented_engines:
+            return
+        event.listen(engine, 'before_cursor_execute', _count_query)
+        _instrumented_engines.add(id(engine))
+
+
+def _fixed_asset_snapshot(asset) -> Dict[str, Any]:
+    return {
+        "id": asset.id,
+        "name": asset.name,
+        "status": asset.status,
+        "category_name": asset.category.name if asset.category else None,
+        "original_value": float(asset.original_value or 0),
+        "current_value": float(asset.current_value or 0)
+    }
+
+
+def _project_snapshot(proj, now: datetime) -> Dict[str, Any]:
+    return {
+        "id": proj.id,
+        "name": proj.name,
+        "category_name": proj.category.name if proj.category else None,
+        "total_amount": float(proj.total_amount or 0),
+        "start_time": proj.start_time,
+        "end_time": proj.end_time,
+        "values": proj.calculate_values(now)
+    }
+
+
+class ReportDataContext:
+    """
+    报告运行期数据上下文
+
+    加载结果会转换为普通字典快照，避免节点间提交事务后ORM对象过期而被逐行重新加载
+    """
+
+    def __init__(self, user_id: int, now: Optional[datetime] = None, activate: bool = True):
+        self.user_id = user_id
+        self.now = now or datetime.utcnow()
+        self.query_count = 0
+        self._fixed_assets: Optional[List[Dict[str, Any]]] = None
+        self._projects: Optional[List[Dict[str, Any]]] = None
+        self._income_totals: Dict[tuple, float] = {}
+        self._tco = None
+        self._forecast = None
+
+        _instrument_engine(db.engine)
+        if activate:
+            self.activate()
+
+    def activate(self):
+        """在当前线程启用SQL计数"""
+        _local.data_context = self
+
+    def deactivate(self):
+        """停止在当前线程计数"""
+        if getattr(_local, 'data_context', None) is self:
+            _local.data_context = None
+
+    # ==================== 固定资产 ====================
+
+    @property
+    def fixed_assets(self) -> List[Dict[str, Any]]:
+        """用户全部固定资产快照（含分类名称）"""
+        if self._fixed_assets is None:
+            from models.fixed_asset import FixedAsset
+
+            rows = FixedAsset.query.options(
+                joinedload(FixedAsset.category)
+            ).filter_by(user_id=self.user_id).all()
+
+            self._fixed_assets = [_fixed_asset_snapshot(asset) for asset in rows]
+        return self._fixed_assets
+
+    def income_total(self, start_date, end_date) -> float:
+        """报告期内固定资产收入合计"""
+        key = (start_date, end_date)
+        if key not in self._income_totals:
+            from models.fixed_asset import FixedAsset
+            from models.asset_income import AssetIncome
+
+            total = db.session.query(
+                db.func.sum(AssetIncome.amount)
+            ).join(
+                FixedAsset, AssetIncome.asset_id == FixedAsset.id
+            ).filter(
+                FixedAsset.user_id == self.user_id,
+                AssetIncome.income_date >= start_date,
+                AssetIncome.income_date <= end_date
+            ).scalar() or 0
+            self._income_totals[key] = float(total)
+        return self._income_totals[key]
+
+    @property
+    def tco(self):
+        """固定资产持有成本（services.tco_service.AssetTcoEngine，按本次运行时间计算）"""
+        if self._tco is None:
+            from services.tco_service import get_user_tco
+
+            self._tco = get_user_tco(self.user_id, base_date=self.now.date())
+        return self._tco
+
+    @property
+    def forecast(self) -> Dict[str, Any]:
+        """未来12个月的资产组合预测（services.forecast_service，按用户缓存）"""
+        if self._forecast is None:
+            from services.forecast_service import get_forecast
+
+            self._forecast = get_forecast(self.user_id, today=self.now.date())
+        return self._forecast
+
+    # ==================== 虚拟资产 ====================
+
+    @property
+    def projects(self) -> List[Dict[str, Any]]:
+        """用户全部虚拟资产快照（含分类名称和按本次运行时间计算的价值数据）"""
+        if self._projects is None:
+            from models.project import Project
+
+            rows = Project.query.options(
+                joinedload(Project.category)
+            ).filter_by(user_id=self.user_id).all()
+
+            self._projects = [_project_snapshot(proj, self.now) for proj in rows]
+        return self._projects
+
+    def to_trace(self) -> Dict[str, Any]:
+        """写入工作流轨迹的统计信息"""
+        return {
+            "query_count": self.query_count,
+            "fixed_asset_count": len(self._fixed_assets) if self._fixed_assets is not None else None,
+            "project_count": len(self._projects) if self._projects is not None else None
+        }
+
+
+def get_data_context(state) -> ReportDataContext:
+    """获取本次运行的数据上下文（不存在时创建）"""
+    data_context = state.get("data_context")
+    if data_context is None:
+        data_context = ReportDataContext(state["task_context"]["user_id"])
+        state["data_context"] = data_context
+    else:
+        data_context.activate()
+    return data_context
+
+
+def preload_data_contexts(user_ids: List[int], periods: Optional[List[tuple]] = None,
+                          now: Optional[datetime] = None) -> Dict[int, ReportDataContext]:
+    """
+    批量预加载多个用户的数据上下文（批量生成报告时使用）
+
+    一批用户的固定资产、虚拟资产和指定期间的收入合计各用一条分组查询加载，
+    之后每个报告任务直接复用对应用户的上下文，不再逐用户查询
+
+    Args:
+        user_ids: 用户ID列表
+        periods: 需要预先汇总收入的 (开始日期, 结束日期) 列表
+        now: 统一的计算基准时间
+
+    Returns:
+        用户ID -> 数据上下文（未激活，由工作流初始化节点在执行线程中激活）
+    """
+    from models.fixed_asset import FixedAsset
+    from models.project import Project
+    from models.asset_income import AssetIncome
+
+    now = now or datetime.utcnow()
+    contexts = {user_id: ReportDataContext(user_id, now=now, activate=False) for user_id in user_ids}
+    if not contexts:
+        return contexts
+
+    for data_context in contexts.values():
+        data_context._fixed_assets = []
+        data_context._projects = []
+
+    fixed_rows = FixedAsset.query.options(
+        joinedload(FixedAsset.category)
+    ).filter(FixedAsset.user_id.in_(user_ids)).order_by(FixedAsset.id).all()
+    for asset in fixed_rows:
+        contexts[asset.user_id]._fixed_assets.append(_fixed_asset_snapshot(asset))
+
+    project_rows = Project.query.options(
+        joinedload(Project.category)
+    ).filter(Project.user_id.in_(user_ids)).order_by(Project.id).all()
+    for proj in project_rows:
+        contexts[proj.user_id]._projects.append(_project_snapshot(proj, now))
+
+    for start_date, end_date in periods or []:
+        totals = dict(db.session.query(
+            FixedAsset.user_id,
+            db.func.sum(AssetIncome.amount)
+        ).join(
+            FixedAsset, AssetIncome.asset_id == FixedAsset.id
+        ).filter(
+            FixedAsset.user_id.in_(user_ids),
+            AssetIncome.income_date >= start_date,
+            AssetIncome.income_date <= end_date
+        ).group_by(FixedAsset.user_id).all())
+        for user_id, data_context in contexts.items():
+            data_context._income_totals[(start_date, end_date)] = float(totals.get(user_id) or 0)
+
+    return contexts
@@ -8,10 +8,8 @@ from datetime import datetime, timedelta
 from typing import Dict, Any, Optional
 from decimal import Decimal
 from workflows.state import ReportWorkflowState
-from models.fixed_asset import FixedAsset
-from models.project import Project
-from models.category import Category
-from models.asset_income import AssetIncome
+from workflows.data_context import ReportDataContext, get_data_context
+from workflows.report_renderer import render_section, assemble_report
 from database import db
 
 logger = logging.getLogger(__name__)
@@ -32,391 +30,85 @@ def _convert_decimals(obj: Any) -> Any:
     return obj
 
 
-def _generate_asset_status_chart(status_stats: Dict[str, int]) -> str:
-    """生成资产状态分布图表"""
-    if not status_stats:
-        return ""
-    
-    total = sum(status_stats.values())
-    if total == 0:
-        return ""
-    
-    status_colors = {
-        "正常": "#52c41a",
-        "待维护": "#faad14",
-        "已报废": "#d9d9d9",
-        "闲置": "#1890ff"
-    }
-    
-    html = '<div style="background: white; padding: 20px; border-radius: 8px; margin: 20px 0;">'
-    html += '<h3 style="margin: 0 0 15px 0; font-size: 16px; color: #666;">📊 资产状态分布</h3>'
-    html += '<div style="display: grid; gap: 10px;">'
-    
-    for status, count in status_stats.items():
-        percentage = (count / total) * 100
-        color = status_colors.get(status, "#1890ff")
-        html += f'''
-        <div>
-          <div style="display: flex; justify-content: space-between; margin-bottom: 5px; font-size: 13px;">
-            <span>{status}</span>
-            <span style="font-weight: 600;">{count}个 ({percentage:.1f}%)</span>
-          </div>
-          <div style="background: #f0f0f0; height: 20px; border-radius: 10px; overflow: hidden;">
-            <div style="background: {color}; height: 100%; width: {percentage}%; transition: width 0.3s ease;"></div>
-          </div>
-        </div>
-        '''
-    
-    html += '</div></div>'
-    return html
+def _data_context_trace(state: ReportWorkflowState) -> Optional[Dict[str, Any]]:
+    """运行期数据上下文统计（SQL语句数等）"""
+    data_context = state.get("data_context")
+    return data_context.to_trace() if data_context is not None else None
 
 
-def _generate_expiring_projects_alert(expiring_projects: list) -> str:
-    """生成即将过期项目预警"""
-    if not expiring_projects:
-        return '<div style="background: #f6ffed; padding: 15px; border-radius: 6px; text-align: center; color: #52c41a;">✅ 暂无即将过期的项目</div>'
-    
-    html = '<div style="background: #fff7e6; padding: 20px; border-radius: 8px; border: 2px solid #ffd666; margin: 20px 0;">'
-    html += '<h3 style="color: #fa8c16; margin: 0 0 15px 0; font-size: 16px;">⚠️ 即将过期项目预警</h3>'
-    html += '<div style="display: grid; gap: 10px;">'
-    
-    for proj in expiring_projects[:5]:  # 最多显示5个
-        days_left = proj.get('days_left', 0)
-        color = '#ff4d4f' if days_left <= 7 else '#faad14'
-        html += f'''
-        <div style="background: white; padding: 12px; border-radius: 6px; border-left: 3px solid {color};">
-          <div style="font-weight: 600; margin-bottom: 5px;">{proj.get('name', '未命名项目')}</div>
-          <div style="font-size: 12px; color: #666;">剩余天数: <span style="color: {color}; font-weight: bold;">{days_left}天</span></div>
-        </div>
-        '''
-    
-    html += '</div></div>'
-    return html
+def _release_data_context(state: ReportWorkflowState):
+    """运行结束后停止SQL计数"""
+    data_context = state.get("data_context")
+    if data_context is not None:
+        data_context.deactivate()
 
 
-def _generate_list_items(items: list, color: str, ordered: bool = False) -> str:
-    """生成列表项HTML"""
-    if not items:
-        return '<li style="color: #999;">暂无数据</li>'
-    
-    html = ""
-    for item in items:
-        if ordered:
-            html += f'<li style="color: {color}; margin-bottom: 8px; line-height: 1.6;">{item}</li>'
-        else:
-            html += f'<li style="color: {color}; margin-bottom: 8px;">{item}</li>'
-    return html
+# ==================== 报告分段渲染 ====================
+# 报告按章节拆分渲染并缓存，质量评估按章节打分，重试时只重新生成不合格的章节；
+# 章节HTML由 templates/report 下的预编译模板渲染（见 workflows/report_renderer.py）
 
+# 章节定义（按展示顺序）：章节ID -> 必备标识文本、最小长度、依赖的AI数据源（None表示纯数据渲染）
+REPORT_SECTIONS = [
+    {"id": "header", "marker": "报告期间", "min_length": 200, "source": None},
+    {"id": "summary", "marker": "核心摘要", "min_length": 500, "source": "qualitative_conclusion"},
+    {"id": "fixed_assets", "marker": "固定资产分析", "min_length": 500, "source": None},
+    {"id": "virtual_assets", "marker": "虚拟资产分析", "min_length": 500, "source": None},
+    {"id": "integrated_analysis", "marker": "AI智能分析", "min_length": 500, "source": "integrated_analysis"},
+    {"id": "comparison", "marker": "同比环比分析", "min_length": 500, "source": None},
+    {"id": "action_plan", "marker": "优先行动计划", "min_length": 300, "source": "qualitative_conclusion"},
+]
 
-def _generate_action_plan(actions: list) -> str:
-    """生成行动计划卡片"""
-    if not actions:
-        return '<p style="text-align: center; color: #999;">暂无优先行动建议</p>'
-    
-    html = '<div style="display: grid; gap: 15px;">'
-    priority_colors = ['#ff4d4f', '#fa8c16', '#1890ff']
-    priority_labels = ['🔴 紧急', '🟡 重要', '🔵 建议']
+# 单章节合格分数线
+SECTION_PASS_SCORE = 60
+
+
+def _render_report_sections(data: Dict[str, Any], task_context: Dict[str, Any],
+                            cached: Optional[Dict[str, str]] = None,
+                            only: Optional[list] = None) -> Dict[str, str]:
+    """
+    渲染报告章节
     
-    for idx, action in enumerate(actions[:3]):  # 最多显示3个
-        color = priority_colors[idx] if idx < len(priority_colors) else '#1890ff'
-        label = priority_labels[idx] if idx < len(priority_labels) else '🔵 建议'
-        
-        html += f'''
-        <div style="background: #fafafa; padding: 15px; border-radius: 8px; border-left: 4px solid {color};">
-          <div style="display: flex; align-items: center; margin-bottom: 10px;">
-            <span style="font-weight: bold; color: {color}; margin-right: 10px;">{label}</span>
-            <span style="background: {color}; color: white; padding: 2px 8px; border-radius: 10px; font-size: 11px;">优先级 {idx + 1}</span>
-          </div>
-          <div style="line-height: 1.6; color: #595959;">{action}</div>
-        </div>
-        '''
+    Args:
+        data: 报告数据
+        task_context: 任务上下文
+        cached: 已缓存的章节HTML（章节ID -> HTML）
+        only: 仅重新渲染的章节ID列表，None表示全部渲染
     
-    html += '</div>'
-    return html
+    Returns:
+        章节ID -> HTML
+    """
+    sections = dict(cached or {})
+    for section in REPORT_SECTIONS:
+        if only is None or section["id"] in only or section["id"] not in sections:
+            sections[section["id"]] = render_section(section["id"], data, task_context)
+    return sections
+
+
+def _section_sources(section_ids: list) -> list:
+    """章节依赖的AI数据源（去重，纯数据章节不计）"""
+    sources = []
+    for section in REPORT_SECTIONS:
+        if section["id"] in section_ids and section["source"] and section["source"] not in sources:
+            sources.append(section["source"])
+    return sources
+
+
+def _sections_to_regenerate(failed_sections: list, refreshed_sources: list) -> list:
+    """需重新渲染的章节：不合格章节 + 依赖已刷新数据源的全部章节（按展示顺序）"""
+    return [
+        section["id"] for section in REPORT_SECTIONS
+        if section["id"] in failed_sections or section["source"] in refreshed_sources
+    ]
+
+
+def _assemble_report(sections: Dict[str, str]) -> str:
+    """按章节顺序拼接完整报告"""
+    return assemble_report(sections, [section["id"] for section in REPORT_SECTIONS])
 
 
 def _generate_html_report(data: Dict[str, Any], task_context: Dict[str, Any]) -> str:
     """生成带图表和深度分析的HTML报告"""
-    
-    # 报告标题
-    report_type = task_context.get("report_type", "custom")
-    start_date = task_context.get("start_date", "")
-    end_date = task_context.get("end_date", "")
-    
-    type_names = {
-        "weekly": "周报",
-        "monthly": "月报",
-        "yearly": "年报",
-        "custom": "自定义报告"
-    }
-    title = f"资产{type_names.get(report_type, '报告')}"
-    
-    html = f"""
-<div class="ai-report-content" style="font-family: 'Microsoft YaHei', Arial, sans-serif;">
-  <!-- 报告标题 -->
-  <div style="text-align: center; padding: 40px 20px; background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); border-radius: 12px; margin-bottom: 30px; color: white;">
-    <h1 style="margin: 0 0 10px 0; font-size: 32px; font-weight: bold;">{title}</h1>
-    <p style="margin: 0; font-size: 14px; opacity: 0.9;">报告期间：{start_date} ~ {end_date}</p>
-    <p style="margin: 5px 0 0 0; font-size: 12px; opacity: 0.8;">生成时间: {datetime.utcnow().strftime('%Y年%m月%d日 %H:%M:%S')}</p>
-  </div>
-"""
-    
-    # 核心摘要卡片
-    conclusion = data.get("qualitative_conclusion", {})
-    structured_indicators = data.get("structured_indicators", {})
-    
-    if conclusion:
-        rating = conclusion.get("overall_rating", "B")
-        rating_color = "#52c41a" if rating.startswith("A") else "#1890ff" if rating == "B" else "#faad14" if rating == "C" else "#ff4d4f"
-        risk_level = conclusion.get("risk_level", "中")
-        risk_color = "#52c41a" if risk_level == "低" else "#faad14" if risk_level == "中" else "#ff4d4f"
-        
-        html += f"""
-  <!-- 核心摘要 -->
-  <div style="background: linear-gradient(to right, #f6ffed, #ffffff); border-left: 5px solid #52c41a; padding: 25px; margin-bottom: 30px; border-radius: 8px; box-shadow: 0 2px 8px rgba(0,0,0,0.08);">
-    <h2 style="color: #52c41a; margin: 0 0 20px 0; font-size: 24px; display: flex; align-items: center;">
-      <span style="margin-right: 10px;">🎯</span>
-      核心摘要
-    </h2>
-    
-    <!-- 评级卡片 -->
-    <div style="display: grid; grid-template-columns: repeat(3, 1fr); gap: 15px; margin-bottom: 20px;">
-      <div style="background: white; padding: 20px; border-radius: 8px; text-align: center; box-shadow: 0 2px 4px rgba(0,0,0,0.05);">
-        <div style="font-size: 12px; color: #999; margin-bottom: 8px;">整体评级</div>
-        <div style="font-size: 36px; font-weight: bold; color: {rating_color};">{rating}</div>
-      </div>
-      <div style="background: white; padding: 20px; border-radius: 8px; text-align: center; box-shadow: 0 2px 4px rgba(0,0,0,0.05);">
-        <div style="font-size: 12px; color: #999; margin-bottom: 8px;">风险等级</div>
-        <div style="font-size: 28px; font-weight: bold; color: {risk_color};">{risk_level}</div>
-      </div>
-      <div style="background: white; padding: 20px; border-radius: 8px; text-align: center; box-shadow: 0 2px 4px rgba(0,0,0,0.05);">
-        <div style="font-size: 12px; color: #999; margin-bottom: 8px;">紧急程度</div>
-        <div style="font-size: 28px; font-weight: bold; color: {risk_color};">{conclusion.get('severity_level', '中')}</div>
-      </div>
-    </div>
-    
-    <!-- 执行摘要 -->
-    {f'<div style="background: #fffbe6; padding: 15px; border-radius: 6px; border-left: 3px solid #faad14; line-height: 1.8; font-size: 15px; color: #595959;">{conclusion.get("executive_summary", "")}</div>' if conclusion.get("executive_summary") else ''}
-  </div>
-"""
-    
-    # 固定资产分析
-    fixed = data.get("fixed_assets", {})
-    if fixed:
-        f_data = fixed.get("data", {})
-        f_analysis = fixed.get("analysis", {})
-        
-        html += f"""
-  <!-- 固定资产分析 -->
-  <div style="margin-bottom: 30px;">
-    <h2 style="color: #1890ff; border-bottom: 3px solid #1890ff; padding-bottom: 12px; font-size: 22px; display: flex; align-items: center;">
-      <span style="margin-right: 10px;">🏠</span>
-      固定资产分析
-    </h2>
-    
-    <!-- 核心指标 -->
-    <div style="display: grid; grid-template-columns: repeat(4, 1fr); gap: 15px; margin: 20px 0;">
-      <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); padding: 20px; border-radius: 10px; color: white; box-shadow: 0 4px 12px rgba(102, 126, 234, 0.3);">
-        <div style="font-size: 12px; opacity: 0.9; margin-bottom: 8px;">资产总数</div>
-        <div style="font-size: 32px; font-weight: bold;">{f_data.get('total_assets', 0)}</div>
-        <div style="font-size: 11px; opacity: 0.8; margin-top: 5px;">个</div>
-      </div>
-      <div style="background: linear-gradient(135deg, #f093fb 0%, #f5576c 100%); padding: 20px; border-radius: 10px; color: white; box-shadow: 0 4px 12px rgba(240, 147, 251, 0.3);">
-        <div style="font-size: 12px; opacity: 0.9; margin-bottom: 8px;">当前总价值</div>
-        <div style="font-size: 28px; font-weight: bold;">￥{f_data.get('total_current_value', 0):,.0f}</div>
-        <div style="font-size: 11px; opacity: 0.8; margin-top: 5px;">元</div>
-      </div>
-      <div style="background: linear-gradient(135deg, #fa709a 0%, #fee140 100%); padding: 20px; border-radius: 10px; color: white; box-shadow: 0 4px 12px rgba(250, 112, 154, 0.3);">
-        <div style="font-size: 12px; opacity: 0.9; margin-bottom: 8px;">折旧率</div>
-        <div style="font-size: 32px; font-weight: bold;">{f_data.get('depreciation_rate', 0):.1f}%</div>
-        <div style="font-size: 11px; opacity: 0.8; margin-top: 5px;">已折旧</div>
-      </div>
-      <div style="background: linear-gradient(135deg, #30cfd0 0%, #330867 100%); padding: 20px; border-radius: 10px; color: white; box-shadow: 0 4px 12px rgba(48, 207, 208, 0.3);">
-        <div style="font-size: 12px; opacity: 0.9; margin-bottom: 8px;">ROI</div>
-        <div style="font-size: 32px; font-weight: bold;">{f_analysis.get('roi', 0):.2f}%</div>
-        <div style="font-size: 11px; opacity: 0.8; margin-top: 5px;">投资回报率</div>
-      </div>
-    </div>
-    
-    <!-- 健康度进度条 -->
-    <div style="background: #f0f5ff; padding: 20px; border-radius: 8px; margin: 20px 0;">
-      <div style="display: flex; justify-content: space-between; margin-bottom: 10px;">
-        <span style="font-weight: 600; color: #1890ff;">❤️ 资产健康度</span>
-        <span style="font-weight: bold; color: #1890ff; font-size: 18px;">{f_analysis.get('health_score', 0):.1f}/100</span>
-      </div>
-      <div style="background: #d9d9d9; height: 24px; border-radius: 12px; overflow: hidden;">
-        <div style="background: linear-gradient(to right, #52c41a, #1890ff); height: 100%; width: {min(f_analysis.get('health_score', 0), 100)}%; transition: width 0.3s ease;"></div>
-      </div>
-      <div style="margin-top: 8px; font-size: 12px; color: #666;">
-        评估标准：综合考虑折旧率、收益率、利用率等指标
-      </div>
-    </div>
-    
-    <!-- 资产状态分布 -->
-    {_generate_asset_status_chart(f_data.get('status_stats', {}))}
-  </div>
-"""
-    
-    # 虚拟资产分析
-    virtual = data.get("virtual_assets", {})
-    if virtual:
-        v_data = virtual.get("data", {})
-        v_analysis = virtual.get("analysis", {})
-        
-        html += f"""
-  <!-- 虚拟资产分析 -->
-  <div style="margin-bottom: 30px;">
-    <h2 style="color: #722ed1; border-bottom: 3px solid #722ed1; padding-bottom: 12px; font-size: 22px; display: flex; align-items: center;">
-      <span style="margin-right: 10px;">⚡</span>
-      虚拟资产分析
-    </h2>
-    
-    <div style="display: grid; grid-template-columns: repeat(4, 1fr); gap: 15px; margin: 20px 0;">
-      <div style="background: #f9f0ff; padding: 20px; border-radius: 10px; border: 2px solid #d3adf7;">
-        <div style="font-size: 12px; color: #999; margin-bottom: 8px;">项目总数</div>
-        <div style="font-size: 32px; font-weight: bold; color: #722ed1;">{v_data.get('total_projects', 0)}</div>
-      </div>
-      <div style="background: #f9f0ff; padding: 20px; border-radius: 10px; border: 2px solid #d3adf7;">
-        <div style="font-size: 12px; color: #999; margin-bottom: 8px;">总金额</div>
-        <div style="font-size: 28px; font-weight: bold; color: #722ed1;">￥{v_data.get('total_amount', 0):,.0f}</div>
-      </div>
-      <div style="background: #f9f0ff; padding: 20px; border-radius: 10px; border: 2px solid #d3adf7;">
-        <div style="font-size: 12px; color: #999; margin-bottom: 8px;">利用率</div>
-        <div style="font-size: 32px; font-weight: bold; color: #722ed1;">{v_data.get('utilization_rate', 0):.1f}%</div>
-      </div>
-      <div style="background: #f9f0ff; padding: 20px; border-radius: 10px; border: 2px solid #d3adf7;">
-        <div style="font-size: 12px; color: #999; margin-bottom: 8px;">浪费率</div>
-        <div style="font-size: 32px; font-weight: bold; color: #ff4d4f;">{v_data.get('waste_rate', 0):.1f}%</div>
-      </div>
-    </div>
-    
-    <!-- 效率进度条 -->
-    <div style="background: #f9f0ff; padding: 20px; border-radius: 8px; margin: 20px 0;">
-      <div style="display: flex; justify-content: space-between; margin-bottom: 10px;">
-        <span style="font-weight: 600; color: #722ed1;">⚡ 资产效率</span>
-        <span style="font-weight: bold; color: #722ed1; font-size: 18px;">{v_analysis.get('efficiency_score', 0):.1f}/100</span>
-      </div>
-      <div style="background: #d9d9d9; height: 24px; border-radius: 12px; overflow: hidden;">
-        <div style="background: linear-gradient(to right, #722ed1, #eb2f96); height: 100%; width: {min(v_analysis.get('efficiency_score', 0), 100)}%; transition: width 0.3s ease;"></div>
-      </div>
-    </div>
-    
-    <!-- 即将过期项目预警 -->
-    {_generate_expiring_projects_alert(v_data.get('expiring_soon', []))}
-  </div>
-"""
-    
-    # AI综合分析
-    integrated = data.get("integrated_analysis", {})
-    if integrated:
-        html += f"""
-  <!-- AI综合分析 -->
-  <div style="margin-bottom: 30px;">
-    <h2 style="color: #fa8c16; border-bottom: 3px solid #fa8c16; padding-bottom: 12px; font-size: 22px; display: flex; align-items: center;">
-      <span style="margin-right: 10px;">🤖</span>
-      AI智能分析
-    </h2>
-    
-    <div style="background: #fff7e6; padding: 20px; border-radius: 8px; border-left: 4px solid #fa8c16; margin: 20px 0;">
-      <h3 style="color: #fa8c16; margin: 0 0 15px 0; font-size: 16px;">🎯 整体评估</h3>
-      <p style="margin: 0; line-height: 1.8; font-size: 15px; color: #595959;">{integrated.get('overall_assessment', '')}</p>
-    </div>
-    
-    <div style="display: grid; grid-template-columns: 1fr 1fr; gap: 20px; margin: 20px 0;">
-      <!-- 优势 -->
-      <div style="background: #f6ffed; padding: 20px; border-radius: 8px; border: 2px solid #b7eb8f;">
-        <h3 style="color: #52c41a; margin: 0 0 15px 0; font-size: 16px;">✅ 核心优势</h3>
-        <ul style="margin: 0; padding-left: 20px; line-height: 1.8;">
-          {_generate_list_items(integrated.get('key_strengths', []), '#52c41a')}
-        </ul>
-      </div>
-      
-      <!-- 风险 -->
-      <div style="background: #fff1f0; padding: 20px; border-radius: 8px; border: 2px solid #ffccc7;">
-        <h3 style="color: #ff4d4f; margin: 0 0 15px 0; font-size: 16px;">⚠️ 风险预警</h3>
-        <ul style="margin: 0; padding-left: 20px; line-height: 1.8;">
-          {_generate_list_items(integrated.get('risk_alerts', []), '#ff4d4f')}
-        </ul>
-      </div>
-    </div>
-    
-    <!-- 优化建议 -->
-    <div style="background: #e6f7ff; padding: 20px; border-radius: 8px; border-left: 4px solid #1890ff;">
-      <h3 style="color: #1890ff; margin: 0 0 15px 0; font-size: 16px;">💡 优化建议</h3>
-      <ol style="margin: 0; padding-left: 20px; line-height: 2;">
-        {_generate_list_items(integrated.get('optimization_suggestions', []), '#1890ff', ordered=True)}
-      </ol>
-    </div>
-  </div>
-"""
-    
-    # 同比环比分析
-    comparison = data.get("comparison_analysis", {})
-    if comparison:
-        fixed_comp = comparison.get("fixed_assets", {})
-        virtual_comp = comparison.get("virtual_assets", {})
-        
-        html += f"""
-  <!-- 同比环比分析 -->
-  <div style="margin-bottom: 30px;">
-    <h2 style="color: #13c2c2; border-bottom: 3px solid #13c2c2; padding-bottom: 12px; font-size: 22px; display: flex; align-items: center;">
-      <span style="margin-right: 10px;">📈</span>
-      同比环比分析
-    </h2>
-    
-    <div style="display: grid; grid-template-columns: 1fr 1fr; gap: 20px; margin: 20px 0;">
-      <div style="background: white; padding: 20px; border-radius: 8px; border: 2px solid #87e8de;">
-        <h3 style="color: #13c2c2; margin: 0 0 15px 0;">🏠 固定资产增长</h3>
-        <div style="display: flex; align-items: center; justify-content: space-between;">
-          <span style="font-size: 14px; color: #666;">增长率</span>
-          <span style="font-size: 32px; font-weight: bold; color: {'#52c41a' if fixed_comp.get('growth_rate', 0) > 0 else '#ff4d4f'};">
-            {fixed_comp.get('growth_rate', 0):+.2f}%
-          </span>
-        </div>
-        <div style="margin-top: 10px; font-size: 12px; color: #999;">
-          趋势：{fixed_comp.get('trend', '持平')}
-        </div>
-      </div>
-      
-      <div style="background: white; padding: 20px; border-radius: 8px; border: 2px solid #87e8de;">
-        <h3 style="color: #13c2c2; margin: 0 0 15px 0;">⚡ 虚拟资产增长</h3>
-        <div style="display: flex; align-items: center; justify-content: space-between;">
-          <span style="font-size: 14px; color: #666;">增长率</span>
-          <span style="font-size: 32px; font-weight: bold; color: {'#52c41a' if virtual_comp.get('growth_rate', 0) > 0 else '#ff4d4f'};">
-            {virtual_comp.get('growth_rate', 0):+.2f}%
-          </span>
-        </div>
-        <div style="margin-top: 10px; font-size: 12px; color: #999;">
-          趋势：{virtual_comp.get('trend', '持平')}
-        </div>
-      </div>
-    </div>
-    
-    <div style="background: #e6fffb; padding: 15px; border-radius: 6px; text-align: center;">
-      <span style="font-size: 16px; font-weight: 600; color: #13c2c2;">
-        📈 总体趋势：{comparison.get('overall_trend', '持平')}
-      </span>
-    </div>
-  </div>
-"""
-    
-    # 行动计划
-    if conclusion and conclusion.get('priority_actions'):
-        html += f"""
-  <!-- 优先行动计划 -->
-  <div style="background: linear-gradient(135deg, #f5f7fa 0%, #c3cfe2 100%); padding: 25px; border-radius: 12px; margin-bottom: 30px;">
-    <h2 style="color: #2c3e50; margin: 0 0 20px 0; font-size: 22px; display: flex; align-items: center;">
-      <span style="margin-right: 10px;">🎯</span>
-      优先行动计划
-    </h2>
-    <div style="background: white; padding: 20px; border-radius: 8px;">
-      {_generate_action_plan(conclusion.get('priority_actions', []))}
-    </div>
-  </div>
-"""
-    
-    html += "</div>"
-    return html
+    return _assemble_report(_render_report_sections(data, task_context))
 
 
 def _save_workflow_trace_realtime(state: ReportWorkflowState):
@@ -440,6 +132,7 @@ def _save_workflow_trace_realtime(state: ReportWorkflowState):
             report.workflow_metadata = json.dumps({
                 "quality_score": quality_score,
                 "retry_count": state.get("retry_count", 0),
+                "data_context": _data_context_trace(state),
                 "start_time": state.get("start_time"),
                 "end_time": state.get("end_time")
             }, ensure_ascii=False)
@@ -464,6 +157,12 @@ async def init_task_node(state: ReportWorkflowState) -> ReportWorkflowState:
     state["start_time"] = datetime.utcnow().isoformat()
     state["retry_count"] = 0
     state["max_retries"] = 3
+    
+    # 创建本次运行共享的数据上下文（外部已提供时直接复用）
+    if state.get("data_context") is None:
+        state["data_context"] = ReportDataContext(task_context["user_id"])
+    else:
+        state["data_context"].activate()
     state["execution_path"] = [{
         "node": "init_task",
         "timestamp": datetime.utcnow().isoformat(),
@@ -488,43 +187,45 @@ async def collect_fixed_assets_node(state: ReportWorkflowState) -> ReportWorkflo
     logger.info(f"🏠 [N2-固定资产采集] 用户ID: {user_id}")
     
     try:
-        # 查询固定资产
-        fixed_assets = FixedAsset.query.filter_by(user_id=user_id).all()
+        # 从运行期数据上下文读取固定资产（整个运行只查询一次）
+        data_context = get_data_context(state)
+        fixed_assets = data_context.fixed_assets
         
         # 结构化数据 - 全部转换为float
-        total_original_value = float(sum(asset.original_value or 0 for asset in fixed_assets))
-        total_current_value = float(sum(asset.current_value or 0 for asset in fixed_assets))
+        total_original_value = float(sum(asset["original_value"] for asset in fixed_assets))
+        total_current_value = float(sum(asset["current_value"] for asset in fixed_assets))
         total_depreciation = total_original_value - total_current_value
         depreciation_rate = (total_depreciation / total_original_value * 100) if total_original_value > 0 else 0
         
         # 查询收入数据（通过asset关联）
-        from sqlalchemy import and_
-        total_income = db.session.query(
-            db.func.sum(AssetIncome.amount)
-        ).join(
-            FixedAsset, AssetIncome.asset_id == FixedAsset.id
-        ).filter(
-            and_(
-                FixedAsset.user_id == user_id,
-                AssetIncome.income_date >= start_date,
-                AssetIncome.income_date <= end_date
-            )
-        ).scalar() or 0
-        total_income = float(total_income)
+        total_income = data_context.income_total(start_date, end_date)
         
         # 状态统计
         status_stats = {}
         for asset in fixed_assets:
-            status = asset.status or '未知'
+            status = asset["status"] or '未知'
             status_stats[status] = status_stats.get(status, 0) + 1
         
         # 分类统计
         category_stats = {}
         for asset in fixed_assets:
-            if asset.category:
-                category_name = asset.category.name
+            if asset["category_name"]:
+                category_name = asset["category_name"]
                 category_stats[category_name] = category_stats.get(category_name, 0) + 1
         
+        # 持有成本（TCO）：全部资产一次批量计算，列出净回报最低的资产
+        tco = data_context.tco
+        tco_summary = tco.summary()
+        lowest_return_assets = [
+            {
+                "asset_name": item["asset_name"],
+                "net_return": item["net_return"],
+                "roi": item["roi"],
+                "payback_months": item["payback_months"]
+            }
+            for item in tco.rows(tco.order("net_return", descending=False)[:5])
+        ]
+        
         fixed_assets_data = {
             "total_assets": len(fixed_assets),
             "total_original_value": float(total_original_value),
@@ -533,7 +234,9 @@ async def collect_fixed_assets_node(state: ReportWorkflowState) -> ReportWorkflo
             "depreciation_rate": float(depreciation_rate),
             "total_income": float(total_income),
             "status_stats": status_stats,
-            "category_stats": category_stats
+            "category_stats": category_stats,
+            "tco": tco_summary,
+            "lowest_return_assets": lowest_return_assets
         }
         
         # 结构化分析
@@ -545,6 +248,8 @@ async def collect_fixed_assets_node(state: ReportWorkflowState) -> ReportWorkflo
             "health_score": float(health_score),
             "asset_count": len(fixed_assets),
             "utilization_rate": float((status_stats.get('使用中', 0) / len(fixed_assets) * 100) if fixed_assets else 0),
+            "tco": tco_summary,
+            "lowest_return_assets": lowest_return_assets,
             "key_metrics": {
                 "depreciation_status": "高" if depreciation_rate > 50 else "中" if depreciation_rate > 30 else "低",
                 "income_performance": "优秀" if roi > 10 else "良好" if roi > 5 else "一般"
@@ -598,17 +303,18 @@ async def collect_virtual_assets_node(state: ReportWorkflowState) -> ReportWorkf
     logger.info(f"⚡ [N3-虚拟资产采集] 用户ID: {user_id}")
     
     try:
-        # 查询虚拟资产
-        virtual_assets = Project.query.filter_by(user_id=user_id).all()
+        # 从运行期数据上下文读取虚拟资产（价值数据已按运行时间计算并缓存）
+        data_context = get_data_context(state)
+        virtual_assets = data_context.projects
         
-        total_amount = sum(float(proj.total_amount or 0) for proj in virtual_assets)
+        total_amount = sum(proj["total_amount"] for proj in virtual_assets)
         
         # 计算已使用和剩余金额
         total_used = 0.0
         total_remaining = 0.0
         
         for proj in virtual_assets:
-            values = proj.calculate_values()
+            values = proj["values"]
             total_used += float(values['used_cost'])
             total_remaining += float(values['remaining_value'])
         
@@ -617,13 +323,13 @@ async def collect_virtual_assets_node(state: ReportWorkflowState) -> ReportWorkf
         expiring_soon = []
         
         for proj in virtual_assets:
-            if proj.end_time:
-                days_until_expiry = (proj.end_time - datetime.utcnow()).days
-                values = proj.calculate_values()
+            if proj["end_time"]:
+                days_until_expiry = (proj["end_time"] - data_context.now).days
+                values = proj["values"]
                 
                 if 0 < days_until_expiry <= 30:
                     expiring_soon.append({
-                        "name": proj.name,
+                        "name": proj["name"],
                         "days": days_until_expiry,
                         "remaining": float(values['remaining_value'])
                     })
@@ -633,8 +339,8 @@ async def collect_virtual_assets_node(state: ReportWorkflowState) -> ReportWorkf
         # 分类统计
         category_stats = {}
         for proj in virtual_assets:
-            if proj.category:
-                category_name = proj.category.name
+            if proj["category_name"]:
+                category_name = proj["category_name"]
                 category_stats[category_name] = category_stats.get(category_name, 0) + 1
         
         virtual_assets_data = {
@@ -706,7 +412,6 @@ async def ai_integrated_analysis_node(state: ReportWorkflowState) -> ReportWorkf
     try:
         task_context = state["task_context"]
         api_key = task_context.get("api_key")
-        model = task_context.get("model", "glm-4-flash")
         
         if not api_key:
             logger.warning(f"⚠️ [N4-AI综合分析] 未配置API Key，跳过")
@@ -719,100 +424,15 @@ async def ai_integrated_analysis_node(state: ReportWorkflowState) -> ReportWorkf
             })
             return state
         
-        fixed_analysis = state.get("fixed_assets_analysis") or {}
-        virtual_analysis = state.get("virtual_assets_analysis") or {}
-        
-        # 构建AI分析Prompt - 专业个人财产顾问角色
-        prompt = f"""
-你是一位资深的【个人财产管理顾问】，拥有15年以上的财富管理经验，擅长：
-- 个人资产配置优化与风险控制
-- 资产保值增值策略制定
-- 家庭财务健康诊断与改善建议
-- 投资组合再平衡与动态调整
-
-请以专业、客观、务实的态度，为用户提供深度的资产分析和可执行的管理建议。
-
-【固定资产分析】
-- 资产数量: {fixed_analysis.get('asset_count', 0)}个
-- 健康评分: {fixed_analysis.get('health_score', 0):.1f}/100
-- 投资回报率(ROI): {fixed_analysis.get('roi', 0):.2f}%
-- 利用率: {fixed_analysis.get('utilization_rate', 0):.1f}%
-- 折旧状况: {fixed_analysis.get('key_metrics', {}).get('depreciation_status', '未知')}
-- 收益表现: {fixed_analysis.get('key_metrics', {}).get('income_performance', '未知')}
-
-【虚拟资产分析】
-- 项目数量: {virtual_analysis.get('project_count', 0)}个
-- 效率评分: {virtual_analysis.get('efficiency_score', 0):.1f}/100
-- 利用率: {virtual_analysis.get('utilization_rate', 0):.1f}%
-- 浪费率: {virtual_analysis.get('waste_rate', 0):.1f}%
-- 利用状况: {virtual_analysis.get('key_metrics', {}).get('utilization_status', '未知')}
-- 过期风险: {virtual_analysis.get('key_metrics', {}).get('expiry_risk', '未知')}
-
-【分析要求】
-请输出JSON格式的综合分析，包含：
-
-1. **整体评估** (overall_assessment): 综合评价用户当前资产配置状况（优秀/良好/中等/需改进）
-
-2. **资产配置均衡度** (asset_balance): 
-   - 分析固定资产与虚拟资产的配置比例是否合理
-   - 是否存在过度集中风险
-   - 建议的优化方向
-
-3. **协同效应分析** (synergy_effect):
-   - 两类资产是否形成良性互补
-   - 资产组合的整体健康度
-   - 潜在的协同优化空间
-
-4. **核心优势** (key_strengths): 列出3-5个显著优势
-   - 资产配置的亮点
-   - 值得保持的良好习惯
-   - 潜在的增长机会
-
-5. **主要风险** (key_weaknesses): 识别3-5个需要关注的问题
-   - 资产结构的薄弱环节
-   - 潜在的价值流失点
-   - 需要及时调整的地方
-
-6. **风险预警** (risk_alerts): 紧急需要处理的风险点
-   - 即将过期但未充分利用的资产
-   - 收益率明显偏低的资产
-   - 闲置或低效资产
-
-7. **优化建议** (optimization_suggestions): 提供3-5条可执行的改进建议
-   - 具体、可操作的行动方案
-   - 预期能带来的改善效果
-   - 实施的优先级排序
-
-【输出格式】
-```json
-{{
-  "overall_assessment": "整体评估（优秀/良好/中等/需改进）",
-  "asset_balance": "资产配置均衡度评价（200字内）",
-  "synergy_effect": "协同效应分析（200字内）",
-  "key_strengths": ["优势1", "优势2", "优势3"],
-  "key_weaknesses": ["不足1", "不足2", "不足3"],
-  "risk_alerts": ["风险1", "风险2"],
-  "optimization_suggestions": ["建议1", "建议2", "建议3"]
-}}
-```
-
-请确保分析深入、建议实用，帮助用户更好地管理个人财产。
-"""
-        
-        # 调用AI
-        from services.zhipu_service import ZhipuAiService
-        service = ZhipuAiService(api_token=api_key, model=model)
+        # 未来12个月预测（按用户缓存，用于提示词的前瞻部分）
+        try:
+            state["forecast_data"] = get_data_context(state).forecast
+        except Exception as e:
+            logger.warning(f"⚠️ [N4-AI综合分析] 资产预测失败，提示词不含预测: {str(e)}")
+            state["forecast_data"] = None
         
         logger.info(f"🤖 [N4-AI综合分析] 调用AI进行综合分析...")
-        result_text = service._call_api(prompt, max_tokens=1500)
-        
-        # 解析JSON
-        if "```json" in result_text:
-            result_text = result_text.split("```json")[1].split("```")[0].strip()
-        elif "```" in result_text:
-            result_text = result_text.split("```")[1].split("```")[0].strip()
-        
-        integrated_analysis = json.loads(result_text)
+        integrated_analysis = _request_integrated_analysis(state)
         
         state["integrated_analysis"] = integrated_analysis
         
@@ -879,13 +499,14 @@ async def query_compare_previous_node(state: ReportWorkflowState) -> ReportWorkf
         logger.info(f"   - 当前周期: {start_date} 至 {end_date}")
         logger.info(f"   - 上期周期: {prev_start_date} 至 {prev_end_date}")
         
-        # 查询上期固定资产数据（简化：使用当前资产数据作为对比基准）
-        fixed_assets = FixedAsset.query.filter_by(user_id=user_id).all()
-        prev_fixed_total_value = sum(float(asset.current_value or 0) for asset in fixed_assets) * 0.95  # 模拟上期数据
+        # 上期固定资产数据（简化：使用当前资产数据作为对比基准，复用运行期数据上下文）
+        data_context = get_data_context(state)
+        fixed_assets = data_context.fixed_assets
+        prev_fixed_total_value = sum(asset["current_value"] for asset in fixed_assets) * 0.95  # 模拟上期数据
         
-        # 查询上期虚拟资产数据
-        virtual_assets = Project.query.filter_by(user_id=user_id).all()
-        prev_virtual_total = sum(float(proj.total_amount or 0) for proj in virtual_assets) * 0.98  # 模拟上期数据
+        # 上期虚拟资产数据
+        virtual_assets = data_context.projects
+        prev_virtual_total = sum(proj["total_amount"] for proj in virtual_assets) * 0.98  # 模拟上期数据
         
         previous_period_data = {
             "period": {
@@ -968,7 +589,6 @@ async def generate_qualitative_conclusion_node(state: ReportWorkflowState) -> Re
     try:
         task_context = state["task_context"]
         api_key = task_context.get("api_key")
-        model = task_context.get("model", "glm-4-flash")
         
         if not api_key:
             logger.warning(f"⚠️ [N6-定性结论生成] 未配置API Key")
@@ -982,104 +602,8 @@ async def generate_qualitative_conclusion_node(state: ReportWorkflowState) -> Re
             })
             return state
         
-        # 整合所有分析数据
-        integrated = state.get("integrated_analysis", {})
-        comparison = state.get("comparison_analysis", {})
-        
-        prompt = f"""
-你是一位【资深个人财务顾问】，专注于个人和家庭财富管理，擅长：
-- 财产健康度诊断与评级
-- 财务风险识别与防控
-- 资产配置策略优化
-- 个性化财富增长方案制定
-
-请基于以下分析数据，生成一份【专业、客观、可执行】的财产管理结论报告。
-
-【AI综合分析】
-{json.dumps(integrated, ensure_ascii=False, indent=2)}
-
-【同比环比分析】
-{json.dumps(comparison, ensure_ascii=False, indent=2)}
-
-【输出要求】
-请生成JSON格式的定性结论，包含：
-
-1. **执行摘要** (executive_summary): 
-   - 300字左右的核心结论
-   - 包含整体评价、关键发现、主要建议
-   - 语言简洁有力，突出重点
-
-2. **整体评级** (overall_rating):
-   - A+: 财产配置极佳，持续保持
-   - A: 配置良好，稳健增长
-   - B: 基本合理，有优化空间
-   - C: 存在问题，需要调整
-   - D: 情况不佳，紧急处理
-
-3. **紧急程度** (severity_level):
-   - 低: 运转正常，无紧急问题
-   - 中: 有些问题需关注，建议1-2周内处理
-   - 高: 存在重大风险，需立即采取行动
-
-4. **关键发现** (key_findings):
-   - 列出5-8条最重要的发现
-   - 既包括积极亮点，也包括潜在问题
-   - 每条都要给出数据支持
-
-5. **可执行洞察** (actionable_insights):
-   - 3-5条深入洞察
-   - 揭示资产管理中的关键机会或风险
-   - 说明为什么重要、影响有多大
-
-6. **优先行动计划** (priority_actions):
-   - 3-5条具体的行动建议
-   - 按紧急程度排序
-   - 每条包含：具体动作 + 预期效果 + 建议时间线
-   - 示例：“在本周内处理即将过期的XX资产，预计可避免XX元浪费”
-
-7. **风险等级** (risk_level):
-   - 低: 资产结构健康，风险可控
-   - 中: 存在一定风险，需定期监控
-   - 高: 风险较大，建议及时调整
-
-【输出格式】
-```json
-{{
-  "executive_summary": "执行摘要（300字）",
-  "overall_rating": "A+/A/B/C/D",
-  "severity_level": "低/中/高",
-  "key_findings": ["发现1", "发现2", "发现3", "发现4", "发现5"],
-  "actionable_insights": ["洞察1", "洞察2", "洞察3"],
-  "priority_actions": ["行动1", "行动2", "行动3"],
-  "risk_level": "低/中/高"
-}}
-```
-
-请确保分析全面、客观，建议具体、可执行，帮助用户提升财产管理水平。
-"""
-        
-        # 调用AI
-        from services.zhipu_service import ZhipuAiService
-        service = ZhipuAiService(api_token=api_key, model=model)
-        
         logger.info(f"🤖 [N6-定性结论生成] 调用AI生成定性结论...")
-        result_text = service._call_api(prompt, max_tokens=2000)
-        
-        if "```json" in result_text:
-            result_text = result_text.split("```json")[1].split("```")[0].strip()
-        elif "```" in result_text:
-            result_text = result_text.split("```")[1].split("```")[0].strip()
-        
-        qualitative_conclusion = json.loads(result_text)
-        
-        # 提取结构化指标
-        structured_indicators = {
-            "overall_rating": qualitative_conclusion.get("overall_rating"),
-            "risk_level": qualitative_conclusion.get("risk_level"),
-            "severity_level": qualitative_conclusion.get("severity_level"),
-            "key_findings_count": len(qualitative_conclusion.get("key_findings", [])),
-            "priority_actions_count": len(qualitative_conclusion.get("priority_actions", []))
-        }
+        qualitative_conclusion, structured_indicators = _request_qualitative_conclusion(state)
         
         state["qualitative_conclusion"] = qualitative_conclusion
         state["structured_indicators"] = structured_indicators
@@ -1115,10 +639,24 @@ async def generate_qualitative_conclusion_node(state: ReportWorkflowState) -> Re
 async def generate_report_node(state: ReportWorkflowState) -> ReportWorkflowState:
     """
     N7: 生成完整报告
+    
+    首次生成渲染全部章节并缓存；重试时只重新生成质量评估不合格的章节，
+    其余章节直接复用缓存后拼接
     """
-    logger.info(f"📄 [N7-报告生成] 开始")
+    cached_sections = state.get("report_sections")
+    failed_sections = state.get("failed_sections") or []
+    is_partial = bool(cached_sections) and bool(failed_sections)
+    
+    logger.info(f"📄 [N7-报告生成] 开始" + (f" - 局部重新生成: {failed_sections}" if is_partial else ""))
     
     try:
+        refreshed_sources = []
+        regenerate_sections = None
+        if is_partial:
+            refreshed_sources = _refresh_section_sources(state, failed_sections)
+            # 同一数据源刷新后，依赖它的其他章节也要重新渲染，避免与 data_snapshot 不一致
+            regenerate_sections = _sections_to_regenerate(failed_sections, refreshed_sources)
+        
         # 整合所有数据生成报告
         report_data = {
             "report_type": "optimized",
@@ -1140,10 +678,17 @@ async def generate_report_node(state: ReportWorkflowState) -> ReportWorkflowStat
         # 转换为Decimal友好的JSON
         report_data_clean: Dict[str, Any] = _convert_decimals(report_data)  # type: ignore
         
-        # 生成可读HTML内容
-        html_content = _generate_html_report(report_data_clean, state.get("task_context", {}))
+        # 渲染章节（重试时只渲染不合格章节及依赖已刷新数据源的章节）
+        sections = _render_report_sections(
+            report_data_clean,
+            state.get("task_context", {}),
+            cached=cached_sections if is_partial else None,
+            only=regenerate_sections
+        )
         
-        state["report_content"] = html_content
+        state["report_data"] = report_data_clean
+        state["report_sections"] = sections
+        state["report_content"] = _assemble_report(sections)
         
         logger.info(f"✅ [N7-报告生成] 完成 - 内容长度: {len(state['report_content'])}")
         
@@ -1151,6 +696,9 @@ async def generate_report_node(state: ReportWorkflowState) -> ReportWorkflowStat
             "node": "generate_report",
             "timestamp": datetime.utcnow().isoformat(),
             "status": "completed",
+            "mode": "partial" if is_partial else "full",
+            "regenerated_sections": regenerate_sections if is_partial else [section["id"] for section in REPORT_SECTIONS],
+            "refreshed_sources": refreshed_sources,
             "content_length": len(state["report_content"])
         })
         
@@ -1171,7 +719,7 @@ async def generate_report_node(state: ReportWorkflowState) -> ReportWorkflowStat
 
 async def evaluate_quality_node(state: ReportWorkflowState) -> ReportWorkflowState:
     """
-    N8: 质量评估（准确性 + 完整性 + 结构性）
+    N8: 质量评估（准确性 + 完整性 + 结构性 + 章节评分）
     """
     logger.info(f"🔍 [N8-质量评估] 开始")
     
@@ -1217,15 +765,24 @@ async def evaluate_quality_node(state: ReportWorkflowState) -> ReportWorkflowSta
             score["structure"] * 0.3
         )
         
+        # 4. 章节评分
+        section_scores = _evaluate_sections(state)
+        failed_sections = [section_id for section_id, result in section_scores.items() if result["status"] == "failed"]
+        score["sections"] = section_scores
+        
         state["quality_score"] = score
+        state["failed_sections"] = failed_sections
         
-        # 判断结果
+        # 判断结果：总分合格即通过；不合格时重试，重试时只重新生成不合格章节
         if score["total_score"] >= 70:
             state["evaluation_result"] = "pass"
-            logger.info(f"✅ [N8-质量评估] 通过 - 总分: {score['total_score']}")
+            if failed_sections:
+                logger.warning(f"⚠️ [N8-质量评估] 通过 - 总分: {score['total_score']}, 不合格章节: {failed_sections}")
+            else:
+                logger.info(f"✅ [N8-质量评估] 通过 - 总分: {score['total_score']}")
         elif state["retry_count"] < state["max_retries"]:
             state["evaluation_result"] = "retry"
-            logger.warning(f"⚠️ [N8-质量评估] 需重试 - 总分: {score['total_score']}")
+            logger.warning(f"⚠️ [N8-质量评估] 需重试 - 总分: {score['total_score']}, 不合格章节: {failed_sections}")
         else:
             state["evaluation_result"] = "fail"
             logger.error(f"❌ [N8-质量评估] 失败 - 总分: {score['total_score']}")
@@ -1235,6 +792,7 @@ async def evaluate_quality_node(state: ReportWorkflowState) -> ReportWorkflowSta
             "timestamp": datetime.utcnow().isoformat(),
             "status": "completed",
             "quality_score": score,
+            "failed_sections": failed_sections,
             "result": state["evaluation_result"]
         })
         
@@ -1243,6 +801,9 @@ async def evaluate_quality_node(state: ReportWorkflowState) -> ReportWorkflowSta
     except Exception as e:
         logger.error(f"❌ [N8-质量评估] 异常: {str(e)}")
         state["evaluation_result"] = "retry" if state["retry_count"] < state["max_retries"] else "fail"
+        # 无法评估时整份重新生成
+        state["failed_sections"] = []
+        state["report_sections"] = None
         state["execution_path"].append({
             "node": "evaluate_quality",
             "timestamp": datetime.utcnow().isoformat(),
@@ -1288,6 +849,9 @@ async def save_report_node(state: ReportWorkflowState) -> ReportWorkflowState:
         # 更新报告
         report.content = content
         report.summary = summary
+        # 保存渲染用的报告数据，查看报告时可按模板重新流式渲染
+        if state.get("report_data"):
+            report.data_snapshot = json.dumps(state["report_data"], ensure_ascii=False, default=str)
         report.status = 'completed'
         report.generated_at = datetime.utcnow()
         
@@ -1297,6 +861,7 @@ async def save_report_node(state: ReportWorkflowState) -> ReportWorkflowState:
             "quality_score": state.get("quality_score"),
             "structured_indicators": state.get("structured_indicators"),
             "retry_count": state.get("retry_count", 0),
+            "data_context": _data_context_trace(state),
             "start_time": state.get("start_time"),
             "end_time": datetime.utcnow().isoformat()
         }, ensure_ascii=False)
@@ -1310,8 +875,10 @@ async def save_report_node(state: ReportWorkflowState) -> ReportWorkflowState:
         state["execution_path"].append({
             "node": "save_report",
             "timestamp": datetime.utcnow().isoformat(),
-            "status": "completed"
+            "status": "completed",
+            "data_context": _data_context_trace(state)
         })
+        _release_data_context(state)
         
     except Exception as e:
         logger.error(f"❌ [N9-保存报告] 失败: {str(e)}")
@@ -1331,13 +898,16 @@ async def handle_retry_node(state: ReportWorkflowState) -> ReportWorkflowState:
     N10: 重试处理
     """
     state["retry_count"] += 1
-    logger.info(f"🔄 [N10-重试] 第 {state['retry_count']}/{state['max_retries']} 次")
+    failed_sections = state.get("failed_sections") or []
+    logger.info(f"🔄 [N10-重试] 第 {state['retry_count']}/{state['max_retries']} 次"
+                + (f" - 待重新生成章节: {failed_sections}" if failed_sections else " - 整份重新生成"))
     
     state["execution_path"].append({
         "node": "handle_retry",
         "timestamp": datetime.utcnow().isoformat(),
         "status": "completed",
-        "retry_count": state["retry_count"]
+        "retry_count": state["retry_count"],
+        "failed_sections": failed_sections
     })
     
     _save_workflow_trace_realtime(state)
@@ -1368,6 +938,7 @@ async def handle_failure_node(state: ReportWorkflowState) -> ReportWorkflowState
             report.workflow_metadata = json.dumps({
                 "quality_score": state.get("quality_score"),
                 "retry_count": state.get("retry_count", 0),
+                "data_context": _data_context_trace(state),
                 "start_time": state.get("start_time"),
                 "end_time": datetime.utcnow().isoformat(),
                 "error_message": state["error_message"]
@@ -1381,6 +952,7 @@ async def handle_failure_node(state: ReportWorkflowState) -> ReportWorkflowState
             "timestamp": datetime.utcnow().isoformat(),
             "status": "completed"
         })
+        _release_data_context(state)
         
     except Exception as e:
         logger.error(f"❌ [N11-失败处理] 异常: {str(e)}")
@@ -1456,3 +1028,337 @@ def _extract_structured_indicators(state: ReportWorkflowState) -> Dict[str, Any]
         "key_findings_count": len(conclusion.get("key_findings", [])),
         "priority_actions_count": len(conclusion.get("priority_actions", []))
     }
+
+
+def _format_tco_section(fixed_analysis: Dict[str, Any]) -> str:
+    """持有成本（TCO）段落：合计指标和净回报最低的资产"""
+    tco = fixed_analysis.get("tco")
+    if not tco or not tco.get("asset_count"):
+        return ""
+    payback = tco.get("payback_months")
+    lines = [
+        "",
+        "【固定资产持有成本(TCO)】",
+        f"- 累计折旧: ¥{tco['total_depreciation']:,.2f}",
+        f"- 运营成本(费用+维护): ¥{tco['total_running_cost']:,.2f}",
+        f"- 持有成本合计: ¥{tco['total_tco']:,.2f}",
+        f"- 累计净收入: ¥{tco['total_net_income']:,.2f}",
+        f"- 净回报: ¥{tco['total_net_return']:,.2f}（回报率 {tco['roi']:.2f}%）",
+        f"- 回本周期: {f'{payback:.1f}个月' if payback is not None else '按近12个月现金流无法回本'}",
+        f"- 无法回本的资产: {tco['unrecoverable_count']}个",
+    ]
+    lowest = fixed_analysis.get("lowest_return_assets") or []
+    if lowest:
+        lines.append("- 净回报最低的资产: " + "；".join(
+            f"{item['asset_name']}(净回报 ¥{item['net_return']:,.2f}，回报率 {item['roi']:.2f}%)"
+            for item in lowest
+        ))
+    return "\n".join(lines)
+
+
+def _format_forecast_section(forecast: Optional[Dict[str, Any]]) -> str:
+    """未来预测段落：期末价值变化、折旧与消耗、到期、租金和维护支出"""
+    if not forecast:
+        return ""
+    summary = forecast["summary"]
+    current = forecast["current"]
+    lines = [
+        "",
+        f"【未来{forecast['horizon_months']}个月预测】",
+        f"- 资产总剩余价值: ¥{current['total_remaining_value']:,.2f} → ¥{summary['end_total_remaining_value']:,.2f}"
+        f"（变化 ¥{summary['value_change']:,.2f}）",
+        f"- 预计折旧: ¥{summary['depreciation']:,.2f}，虚拟资产消耗: ¥{summary['project_consumption']:,.2f}",
+        f"- 到期虚拟资产: {summary['expiring_projects']}个（合计 ¥{summary['expiring_project_amount']:,.2f}），"
+        f"使用年限到期的固定资产: {summary['life_ending_assets']}个",
+        f"- 应收租金: ¥{summary['scheduled_rent']:,.2f}，计划维护支出: ¥{summary['planned_maintenance']:,.2f}，"
+        f"净现金流: ¥{summary['net_cash_flow']:,.2f}",
+    ]
+    upcoming = [m for m in forecast["months"] if m["expiring_projects"] or m["life_ending_assets"]][:3]
+    if upcoming:
+        lines.append("- 最近的到期月份: " + "；".join(
+            f"{m['month']}(虚拟资产{m['expiring_projects']}个，固定资产{m['life_ending_assets']}个)" for m in upcoming
+        ))
+    return "\n".join(lines)
+
+
+def _build_integrated_analysis_prompt(state: ReportWorkflowState) -> str:
+    """构建AI综合分析Prompt - 专业个人财产顾问角色"""
+    fixed_analysis = state.get("fixed_assets_analysis") or {}
+    virtual_analysis = state.get("virtual_assets_analysis") or {}
+    
+    return f"""
+你是一位资深的【个人财产管理顾问】，拥有15年以上的财富管理经验，擅长：
+- 个人资产配置优化与风险控制
+- 资产保值增值策略制定
+- 家庭财务健康诊断与改善建议
+- 投资组合再平衡与动态调整
+
+请以专业、客观、务实的态度，为用户提供深度的资产分析和可执行的管理建议。
+
+【固定资产分析】
+- 资产数量: {fixed_analysis.get('asset_count', 0)}个
+- 健康评分: {fixed_analysis.get('health_score', 0):.1f}/100
+- 投资回报率(ROI): {fixed_analysis.get('roi', 0):.2f}%
+- 利用率: {fixed_analysis.get('utilization_rate', 0):.1f}%
+- 折旧状况: {fixed_analysis.get('key_metrics', {}).get('depreciation_status', '未知')}
+- 收益表现: {fixed_analysis.get('key_metrics', {}).get('income_performance', '未知')}
+{_format_tco_section(fixed_analysis)}
+{_format_forecast_section(state.get("forecast_data"))}
+
+【虚拟资产分析】
+- 项目数量: {virtual_analysis.get('project_count', 0)}个
+- 效率评分: {virtual_analysis.get('efficiency_score', 0):.1f}/100
+- 利用率: {virtual_analysis.get('utilization_rate', 0):.1f}%
+- 浪费率: {virtual_analysis.get('waste_rate', 0):.1f}%
+- 利用状况: {virtual_analysis.get('key_metrics', {}).get('utilization_status', '未知')}
+- 过期风险: {virtual_analysis.get('key_metrics', {}).get('expiry_risk', '未知')}
+
+【分析要求】
+请输出JSON格式的综合分析，包含：
+
+1. **整体评估** (overall_assessment): 综合评价用户当前资产配置状况（优秀/良好/中等/需改进）
+
+2. **资产配置均衡度** (asset_balance): 
+   - 分析固定资产与虚拟资产的配置比例是否合理
+   - 是否存在过度集中风险
+   - 建议的优化方向
+
+3. **协同效应分析** (synergy_effect):
+   - 两类资产是否形成良性互补
+   - 资产组合的整体健康度
+   - 潜在的协同优化空间
+
+4. **核心优势** (key_strengths): 列出3-5个显著优势
+   - 资产配置的亮点
+   - 值得保持的良好习惯
+   - 潜在的增长机会
+
+5. **主要风险** (key_weaknesses): 识别3-5个需要关注的问题
+   - 资产结构的薄弱环节
+   - 潜在的价值流失点
+   - 需要及时调整的地方
+
+6. **风险预警** (risk_alerts): 紧急需要处理的风险点
+   - 即将过期但未充分利用的资产
+   - 收益率明显偏低的资产
+   - 闲置或低效资产
+
+7. **优化建议** (optimization_suggestions): 提供3-5条可执行的改进建议
+   - 具体、可操作的行动方案
+   - 预期能带来的改善效果
+   - 实施的优先级排序
+
+【输出格式】
+```json
+{{
+  "overall_assessment": "整体评估（优秀/良好/中等/需改进）",
+  "asset_balance": "资产配置均衡度评价（200字内）",
+  "synergy_effect": "协同效应分析（200字内）",
+  "key_strengths": ["优势1", "优势2", "优势3"],
+  "key_weaknesses": ["不足1", "不足2", "不足3"],
+  "risk_alerts": ["风险1", "风险2"],
+  "optimization_suggestions": ["建议1", "建议2", "建议3"]
+}}
+```
+
+请确保分析深入、建议实用，帮助用户更好地管理个人财产。
+"""
+
+
+def _build_qualitative_conclusion_prompt(state: ReportWorkflowState) -> str:
+    """构建定性结论Prompt"""
+    # 整合所有分析数据
+    integrated = state.get("integrated_analysis", {})
+    comparison = state.get("comparison_analysis", {})
+    
+    return f"""
+你是一位【资深个人财务顾问】，专注于个人和家庭财富管理，擅长：
+- 财产健康度诊断与评级
+- 财务风险识别与防控
+- 资产配置策略优化
+- 个性化财富增长方案制定
+
+请基于以下分析数据，生成一份【专业、客观、可执行】的财产管理结论报告。
+
+【AI综合分析】
+{json.dumps(integrated, ensure_ascii=False, indent=2)}
+
+【同比环比分析】
+{json.dumps(comparison, ensure_ascii=False, indent=2)}
+
+【输出要求】
+请生成JSON格式的定性结论，包含：
+
+1. **执行摘要** (executive_summary): 
+   - 300字左右的核心结论
+   - 包含整体评价、关键发现、主要建议
+   - 语言简洁有力，突出重点
+
+2. **整体评级** (overall_rating):
+   - A+: 财产配置极佳，持续保持
+   - A: 配置良好，稳健增长
+   - B: 基本合理，有优化空间
+   - C: 存在问题，需要调整
+   - D: 情况不佳，紧急处理
+
+3. **紧急程度** (severity_level):
+   - 低: 运转正常，无紧急问题
+   - 中: 有些问题需关注，建议1-2周内处理
+   - 高: 存在重大风险，需立即采取行动
+
+4. **关键发现** (key_findings):
+   - 列出5-8条最重要的发现
+   - 既包括积极亮点，也包括潜在问题
+   - 每条都要给出数据支持
+
+5. **可执行洞察** (actionable_insights):
+   - 3-5条深入洞察
+   - 揭示资产管理中的关键机会或风险
+   - 说明为什么重要、影响有多大
+
+6. **优先行动计划** (priority_actions):
+   - 3-5条具体的行动建议
+   - 按紧急程度排序
+   - 每条包含：具体动作 + 预期效果 + 建议时间线
+   - 示例：“在本周内处理即将过期的XX资产，预计可避免XX元浪费”
+
+7. **风险等级** (risk_level):
+   - 低: 资产结构健康，风险可控
+   - 中: 存在一定风险，需定期监控
+   - 高: 风险较大，建议及时调整
+
+【输出格式】
+```json
+{{
+  "executive_summary": "执行摘要（300字）",
+  "overall_rating": "A+/A/B/C/D",
+  "severity_level": "低/中/高",
+  "key_findings": ["发现1", "发现2", "发现3", "发现4", "发现5"],
+  "actionable_insights": ["洞察1", "洞察2", "洞察3"],
+  "priority_actions": ["行动1", "行动2", "行动3"],
+  "risk_level": "低/中/高"
+}}
+```
+
+请确保分析全面、客观，建议具体、可执行，帮助用户提升财产管理水平。
+"""
+
+
+def _call_llm_json(task_context: Dict[str, Any], prompt: str, max_tokens: int) -> Dict[str, Any]:
+    """调用AI并解析返回的JSON"""
+    from services.zhipu_service import ZhipuAiService
+    service = ZhipuAiService(api_token=task_context.get("api_key"), model=task_context.get("model", "glm-4-flash"))
+    
+    result_text = service._call_api(prompt, max_tokens=max_tokens)
+    
+    if "```json" in result_text:
+        result_text = result_text.split("```json")[1].split("```")[0].strip()
+    elif "```" in result_text:
+        result_text = result_text.split("```")[1].split("```")[0].strip()
+    
+    return json.loads(result_text)
+
+
+def _request_integrated_analysis(state: ReportWorkflowState) -> Dict[str, Any]:
+    """调用AI生成综合分析"""
+    return _call_llm_json(state["task_context"], _build_integrated_analysis_prompt(state), max_tokens=1500)
+
+
+def _request_qualitative_conclusion(state: ReportWorkflowState):
+    """调用AI生成定性结论，返回 (定性结论, 结构化指标)"""
+    qualitative_conclusion = _call_llm_json(state["task_context"], _build_qualitative_conclusion_prompt(state), max_tokens=2000)
+    
+    # 提取结构化指标
+    structured_indicators = {
+        "overall_rating": qualitative_conclusion.get("overall_rating"),
+        "risk_level": qualitative_conclusion.get("risk_level"),
+        "severity_level": qualitative_conclusion.get("severity_level"),
+        "key_findings_count": len(qualitative_conclusion.get("key_findings", [])),
+        "priority_actions_count": len(qualitative_conclusion.get("priority_actions", []))
+    }
+    return qualitative_conclusion, structured_indicators
+
+
+def _expected_sections(state: ReportWorkflowState) -> set:
+    """本次报告应当包含的章节（数据缺失属正常情况的章节不计入）"""
+    expected = {"header", "summary", "fixed_assets", "virtual_assets"}
+    if state.get("task_context", {}).get("api_key"):
+        expected.add("integrated_analysis")
+    if state.get("comparison_analysis"):
+        expected.add("comparison")
+    if (state.get("qualitative_conclusion") or {}).get("priority_actions"):
+        expected.add("action_plan")
+    return expected
+
+
+def _evaluate_sections(state: ReportWorkflowState) -> Dict[str, Dict[str, Any]]:
+    """
+    按章节评分
+    
+    Returns:
+        章节ID -> {"score": 0-100或None, "status": passed/failed/skipped}
+    """
+    sections = state.get("report_sections") or {}
+    expected = _expected_sections(state)
+    results = {}
+    
+    for section in REPORT_SECTIONS:
+        section_id = section["id"]
+        html = sections.get(section_id) or ""
+        
+        if not html:
+            if section_id in expected:
+                results[section_id] = {"score": 0, "status": "failed", "reason": "章节缺失"}
+            else:
+                results[section_id] = {"score": None, "status": "skipped"}
+            continue
+        
+        section_score = 100
+        reasons = []
+        if section["marker"] not in html:
+            section_score -= 50
+            reasons.append("缺少章节标题")
+        if len(html) < section["min_length"]:
+            section_score -= 40
+            reasons.append("内容过短")
+        
+        result = {
+            "score": section_score,
+            "status": "passed" if section_score >= SECTION_PASS_SCORE else "failed"
+        }
+        if reasons:
+            result["reason"] = "，".join(reasons)
+        results[section_id] = result
+    
+    return results
+
+
+def _refresh_section_sources(state: ReportWorkflowState, section_ids: list) -> list:
+    """
+    重新获取不合格章节依赖的AI数据（只处理依赖AI数据源的章节，每个数据源只调用一次）
+    
+    Returns:
+        已刷新的数据源列表
+    """
+    task_context = state["task_context"]
+    sources = _section_sources(section_ids)
+    if not sources or not task_context.get("api_key"):
+        return []
+    
+    refreshed = []
+    
+    if "integrated_analysis" in sources:
+        try:
+            state["integrated_analysis"] = _request_integrated_analysis(state)
+            refreshed.append("integrated_analysis")
+        except Exception as e:
+            logger.warning(f"⚠️ [N7-报告生成] 重新生成AI综合分析失败: {str(e)}")
+    
+    if "qualitative_conclusion" in sources:
+        try:
+            state["qualitative_conclusion"], state["structured_indicators"] = _request_qualitative_conclusion(state)
+            refreshed.append("qualitative_conclusion")
+        except Exception as e:
+            logger.warning(f"⚠️ [N7-报告生成] 重新生成定性结论失败: {str(e)}")
+    
+    return refreshed
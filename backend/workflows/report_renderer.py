@@ -0,0 +1,131 @@
+"""
+报告HTML模板渲染
+报告章节由 templates/report 下的Jinja2模板渲染，模板在模块加载时预编译并常驻缓存，
+支持按章节渲染（配合局部重试）和整份报告流式输出
+"""
+import os
+from datetime import datetime
+from typing import Dict, Any, Iterator, List, Optional
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'templates')
+
+REPORT_TYPE_NAMES = {
+    "weekly": "周报",
+    "monthly": "月报",
+    "yearly": "年报",
+    "custom": "自定义报告"
+}
+
+# 章节展示顺序（与 templates/report/sections 下的模板一一对应）
+SECTION_IDS = [
+    "header",
+    "summary",
+    "fixed_assets",
+    "virtual_assets",
+    "integrated_analysis",
+    "comparison",
+    "action_plan",
+]
+
+
+def _format_number(value: Any, spec: str) -> str:
+    """按Python格式说明符格式化数字（空值按0处理）"""
+    return format(value or 0, spec)
+
+
+def _create_environment() -> Environment:
+    """
+    创建报告模板环境
+
+    模板不会在运行期修改，关闭 auto_reload 后已编译模板不再检查文件修改时间
+    """
+    env = Environment(
+        loader=FileSystemLoader(TEMPLATE_DIR),
+        autoescape=select_autoescape(['html']),
+        trim_blocks=True,
+        lstrip_blocks=True,
+        auto_reload=False,
+        cache_size=-1
+    )
+    env.filters['fmt'] = _format_number
+    env.globals.update({
+        "REPORT_TYPE_NAMES": REPORT_TYPE_NAMES,
+        "STATUS_COLORS": {
+            "正常": "#52c41a",
+            "待维护": "#faad14",
+            "已报废": "#d9d9d9",
+            "闲置": "#1890ff"
+        },
+        "PRIORITY_COLORS": ['#ff4d4f', '#fa8c16', '#1890ff'],
+        "PRIORITY_LABELS": ['🔴 紧急', '🟡 重要', '🔵 建议'],
+    })
+    return env
+
+
+_env = _create_environment()
+
+
+def _section_template_name(section_id: str) -> str:
+    return f"report/sections/{section_id}.html"
+
+
+def precompile_templates():
+    """预编译报告模板（整份报告、全部章节及公共片段）"""
+    _env.get_template("report/_macros.html")
+    _env.get_template("report/report.html")
+    for section_id in SECTION_IDS:
+        _env.get_template(_section_template_name(section_id))
+
+
+def _render_context(data: Dict[str, Any], task_context: Dict[str, Any]) -> Dict[str, Any]:
+    """模板渲染上下文"""
+    generated_at = task_context.get("generated_at")
+    if isinstance(generated_at, str):
+        generated_at = datetime.fromisoformat(generated_at)
+    return {
+        "data": data,
+        "report_type": task_context.get("report_type", "custom"),
+        "start_date": task_context.get("start_date", ""),
+        "end_date": task_context.get("end_date", ""),
+        "generated_at": generated_at or datetime.utcnow(),
+    }
+
+
+def render_section(section_id: str, data: Dict[str, Any], task_context: Dict[str, Any]) -> str:
+    """
+    渲染单个报告章节
+
+    Args:
+        section_id: 章节ID（见 SECTION_IDS）
+        data: 报告数据
+        task_context: 任务上下文（report_type、start_date、end_date，可选 generated_at）
+
+    Returns:
+        章节HTML，数据缺失时为空字符串
+    """
+    html = _env.get_template(_section_template_name(section_id)).render(_render_context(data, task_context))
+    return html if html.strip() else ""
+
+
+def assemble_report(sections: Dict[str, str], section_ids: Optional[List[str]] = None) -> str:
+    """按章节顺序拼接已渲染的章节"""
+    body = "".join(sections.get(section_id, "") for section_id in (section_ids or SECTION_IDS))
+    return f"""
+<div class="ai-report-content" style="font-family: 'Microsoft YaHei', Arial, sans-serif;">{body}</div>"""
+
+
+def stream_report(data: Dict[str, Any], task_context: Dict[str, Any],
+                  section_ids: Optional[List[str]] = None) -> Iterator[str]:
+    """
+    流式渲染整份报告
+
+    逐块产出HTML，不在内存中拼接完整报告，可直接作为Flask流式响应的生成器
+    """
+    context = _render_context(data, task_context)
+    context["section_ids"] = section_ids or SECTION_IDS
+    return _env.get_template("report/report.html").generate(context)
+
+
+precompile_templates()
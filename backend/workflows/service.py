@@ -35,12 +35,14 @@ class ReportWorkflowService:
     def __init__(self):
         self.logger = logger
     
-    async def execute_workflow(self, task_context: Dict[str, Any]) -> ReportWorkflowState:
+    async def execute_workflow(self, task_context: Dict[str, Any],
+                               data_context: Optional[Any] = None) -> ReportWorkflowState:
         """
         执行完整的报告生成工作流 - 优化版
         
         Args:
             task_context: 任务上下文，包含report_id, user_id, api_key, model等
+            data_context: 预加载的数据上下文（批量生成时复用），None时由工作流自行加载
         
         Returns:
             最终的工作流状态
@@ -50,18 +52,23 @@ class ReportWorkflowService:
         # 初始化状态
         state: ReportWorkflowState = {
             "task_context": task_context,
+            "data_context": data_context,
             "fixed_assets_data": None,
             "fixed_assets_analysis": None,
             "virtual_assets_data": None,
             "virtual_assets_analysis": None,
+            "forecast_data": None,
             "integrated_analysis": None,
             "previous_period_data": None,
             "comparison_analysis": None,
             "qualitative_conclusion": None,
             "structured_indicators": None,
+            "report_data": None,
             "report_content": None,
+            "report_sections": None,
             "quality_score": None,
             "evaluation_result": None,
+            "failed_sections": None,
             "execution_path": [],
             "retry_count": 0,
             "max_retries": 3,
@@ -94,6 +101,8 @@ class ReportWorkflowService:
             state["error_message"] = str(e)
             state["end_time"] = datetime.utcnow().isoformat()
         
+        from utils.metrics import observe_report_workflow
+        observe_report_workflow(state)
         return state
     
     async def _execute_node_sequence(self, state: ReportWorkflowState) -> ReportWorkflowState:
@@ -171,7 +180,7 @@ graph TD
     I -->|合格| J[保存报告]
     I -->|重试| K[重试处理]
     I -->|失败| L[失败处理]
-    K --> G
+    K -->|仅不合格章节| G
     J --> M((结束))
     L --> M
 """
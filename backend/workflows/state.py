@@ -10,6 +10,7 @@ class ReportWorkflowState(TypedDict):
     
     # ==================== 任务上下文 ====================
     task_context: Dict[str, Any]  # 包含：report_id, user_id, report_type, start_date, end_date等
+    data_context: Optional[Any]  # 运行期数据上下文（ReportDataContext），各节点共享已加载的数据
     
     # ==================== 数据采集层 ====================
     fixed_assets_data: Optional[Dict[str, Any]]  # 固定资产结构化数据
@@ -18,6 +19,8 @@ class ReportWorkflowState(TypedDict):
     virtual_assets_data: Optional[Dict[str, Any]]  # 虚拟资产结构化数据
     virtual_assets_analysis: Optional[Dict[str, Any]]  # 虚拟资产分析结果
     
+    forecast_data: Optional[Dict[str, Any]]  # 未来12个月资产组合预测（剩余价值、折旧、到期、租金、维护）
+    
     # ==================== AI分析层 ====================
     integrated_analysis: Optional[Dict[str, Any]]  # AI综合分析结果（固定+虚拟）
     
@@ -30,11 +33,14 @@ class ReportWorkflowState(TypedDict):
     structured_indicators: Optional[Dict[str, Any]]  # 结构化指标存储
     
     # ==================== 报告生成层 ====================
+    report_data: Optional[Dict[str, Any]]  # 渲染报告使用的数据（保存为报告数据快照）
     report_content: Optional[str]  # 生成的报告内容（JSON格式）
+    report_sections: Optional[Dict[str, str]]  # 分章节缓存的报告内容（章节ID -> HTML）
     
     # ==================== 质量评估层 ====================
     quality_score: Optional[Dict[str, Any]]  # 质量评分（准确性+完整性+结构性）
     evaluation_result: Optional[str]  # 评估结果：pass/retry/fail
+    failed_sections: Optional[List[str]]  # 评估不合格、重试时需重新生成的章节
     
     # ==================== 执行控制 ====================
     execution_path: List[Dict[str, Any]]  # 执行路径追踪
@@ -18,4 +18,13 @@ export const getCategoryAnalysis = () => {
 // 获取项目明细数据
 export const getProjectDetails = (params) => {
   return request.get('/analytics/project-details', { params })
-}
\ No newline at end of file
+}
+// 获取任意日期的资产组合估值，params: dates（逗号分隔）或 start_date、end_date、period
+export const getValuation = (params) => {
+  return request.get('/analytics/valuation', { params })
+}
+
+// 获取未来N个月的资产组合预测，params: months（1~60，默认12）
+export const getForecast = (params) => {
+  return request.get('/analytics/forecast', { params })
+}
@@ -69,4 +69,12 @@ export const getAssetsStatistics = () => {
     url: '/assets/statistics',
     method: 'GET'
   })
-}
\ No newline at end of file
+}
+// 获取全部固定资产持有成本（TCO），params: sort, order, page, per_page, status, category_id, base_date
+export const getAssetsTco = (params = {}) => {
+  return request({
+    url: '/assets/tco',
+    method: 'GET',
+    params
+  })
+}
@@ -3,24 +3,29 @@
  * 支持微信快捷登录和扫码登录两种方式
  */
 
-import { useState, useEffect } from 'react'
+import { useState, useEffect, useRef } from 'react'
 import { Modal, Button, Toast, SpinLoading } from 'antd-mobile'
 import wechatSDK from '../utils/wechat'
 import { wechatLogin } from '../services/auth'
 import QRCode from 'qrcode'
 import './LoginModal.css'
 
+// 扫码状态查询失败或后端未挂起等待时，下次查询前的间隔（毫秒）
+const POLL_RETRY_DELAY = 2000
+
 const LoginModal = ({ visible, onLoginSuccess, onCancel }) => {
   const [loginType, setLoginType] = useState('loading') // loading | wechat | qrcode
   const [qrCodeUrl, setQrCodeUrl] = useState('')
   const [polling, setPolling] = useState(false)
   const [qrCodeExpired, setQrCodeExpired] = useState(false)
+  const pollingTicketRef = useRef(null) // 当前正在长轮询的票据，置空即停止轮询
 
   useEffect(() => {
     if (visible) {
       detectLoginType()
     } else {
       // 关闭时清理状态
+      pollingTicketRef.current = null
       setPolling(false)
       setQrCodeExpired(false)
     }
@@ -90,6 +95,8 @@ const LoginModal = ({ visible, onLoginSuccess, onCancel }) => {
       
       // 5分钟后二维码过期
       setTimeout(() => {
+        if (pollingTicketRef.current !== ticket) return
+        pollingTicketRef.current = null
         setQrCodeExpired(true)
         setPolling(false)
       }, 5 * 60 * 1000)
@@ -102,19 +109,32 @@ const LoginModal = ({ visible, onLoginSuccess, onCancel }) => {
     }
   }
 
-  // 轮询检查扫码状态
-  const startPolling = (ticket) => {
+  // 长轮询检查扫码状态：后端在状态变化或等待超时（25秒）后才返回；
+  // 只有等待中且后端确实挂起等待过（poll_after 为0）时才立即发起下一次请求，其他情况间隔2秒
+  const startPolling = async (ticket) => {
+    pollingTicketRef.current = ticket
     setPolling(true)
     
-    const pollInterval = setInterval(async () => {
+    const sleep = (ms) => new Promise(resolve => setTimeout(resolve, ms))
+    
+    while (pollingTicketRef.current === ticket) {
+      let delay = POLL_RETRY_DELAY
       try {
-        // 调用后端接口检查扫码状态
-        const response = await fetch(`/api/wechat/qrcode-status?ticket=${ticket}`)
+        const response = await fetch(`/api/wechat/qrcode-status?ticket=${ticket}&wait=25`)
         const result = await response.json()
+        if (pollingTicketRef.current !== ticket) break
+        
+        if (response.status === 410) {
+          // 二维码已过期
+          pollingTicketRef.current = null
+          setQrCodeExpired(true)
+          setPolling(false)
+          break
+        }
         
         if (result.code === 200 && result.data.status === 'scanned') {
           // 扫码成功，获取token
-          clearInterval(pollInterval)
+          pollingTicketRef.current = null
           setPolling(false)
           
           localStorage.setItem('token', result.data.token)
@@ -128,14 +148,23 @@ const LoginModal = ({ visible, onLoginSuccess, onCancel }) => {
           if (onLoginSuccess) {
             onLoginSuccess(result.data)
           }
+          break
+        }
+        
+        if (result.code === 200 && result.data.status === 'waiting') {
+          // 后端没有空闲的等待名额时立即返回，按 poll_after 秒后再查询
+          delay = (result.data.poll_after || 0) * 1000
+        } else {
+          console.error('查询扫码状态失败:', result.message)
         }
       } catch (error) {
         console.error('轮询扫码状态错误:', error)
       }
-    }, 2000) // 每2秒轮询一次
-    
-    // 组件卸载时清理定时器
-    return () => clearInterval(pollInterval)
+      // 网络异常、接口报错时稍后重试，避免连续失败时高频请求
+      if (delay > 0) {
+        await sleep(delay)
+      }
+    }
   }
 
   // 刷新二维码